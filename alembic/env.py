@@ -0,0 +1,79 @@
+"""Alembicのマイグレーション実行環境
+
+接続先は ``-x url=...`` または alembic.ini の sqlalchemy.url で指定でき、
+どちらも無い場合はアプリケーションと同じエンジン（database.engine）を使用する。
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import Engine, create_engine, pool
+
+from database import Base
+import models  # noqa: F401  テーブル定義をメタデータに登録する
+
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def get_url() -> str:
+    """マイグレーションを適用するデータベースのURLを返す"""
+    url = context.get_x_argument(as_dictionary=True).get("url")
+    if url:
+        return url
+    url = config.get_main_option("sqlalchemy.url")
+    if url:
+        return url
+    from database import engine
+    return engine.url.render_as_string(hide_password=False)
+
+
+def get_engine() -> Engine:
+    """マイグレーション用のエンジンを作成する"""
+    return create_engine(get_url(), poolclass=pool.NullPool)
+
+
+def run_migrations_offline() -> None:
+    """SQLを出力するモードでマイグレーションを実行する"""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """データベースに接続してマイグレーションを実行する"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    engine = get_engine()
+    with engine.connect() as connection:
+        _run(connection)
+    engine.dispose()
+
+
+def _run(connection) -> None:
+    # SQLiteはALTER TABLEの機能が限られるため、バッチモードで変更する
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
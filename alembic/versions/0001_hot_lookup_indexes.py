@@ -0,0 +1,71 @@
+"""頻繁に検索するカラムのインデックスを追加する
+
+- articles.article_id: 記事の取得・更新・削除・公開APIの詳細（一意インデックス）
+- articles(user_id, article_id): ユーザーの記事一覧・退会時の記事削除
+- users.email: ログイン・パスワード変更・ユーザー登録時の重複確認（一意インデックス）
+
+email_verifications.email はテーブル作成時の一意制約によるインデックスで検索できるため、
+追加しない。
+
+テーブルは Base.metadata.create_all で作成済みの前提で（カラムの追加は以降のリビジョンで行う）、
+既に同名のインデックスがある場合は作成しない。PostgreSQLでは書き込みを止めないよう
+CREATE INDEX CONCURRENTLY で作成する。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (インデックス名, テーブル名, カラム, 一意インデックスかどうか)
+INDEXES = [
+    ("ix_articles_article_id", "articles", ["article_id"], True),
+    ("ix_articles_user_id_article_id", "articles", ["user_id", "article_id"], False),
+    ("ix_users_email", "users", ["email"], True),
+]
+
+
+def _check_duplicates(table: str, column: str) -> None:
+    """一意インデックスを作成する前に重複した値が無いことを確認する"""
+    duplicates = op.get_bind().execute(sa.text(
+        f"SELECT {column}, COUNT(*) FROM {table} WHERE {column} IS NOT NULL "
+        f"GROUP BY {column} HAVING COUNT(*) > 1 LIMIT 5"
+    )).all()
+    if duplicates:
+        values = ", ".join(str(row[0]) for row in duplicates)
+        raise RuntimeError(
+            f"{table}.{column} に重複した値があるため一意インデックスを作成できません: {values}"
+        )
+
+
+def upgrade() -> None:
+    for name, table, columns, unique in INDEXES:
+        if unique:
+            _check_duplicates(table, columns[0])
+    if op.get_bind().dialect.name == "postgresql":
+        # CONCURRENTLYはトランザクション内で実行できない
+        with op.get_context().autocommit_block():
+            for name, table, columns, unique in INDEXES:
+                op.create_index(
+                    name, table, columns, unique=unique,
+                    if_not_exists=True, postgresql_concurrently=True
+                )
+        return
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _columns, _unique in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
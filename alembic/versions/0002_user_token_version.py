@@ -0,0 +1,47 @@
+"""users.token_version カラムを追加する
+
+アクセストークンの ver クレームと比較し、一致しないトークンを拒否するための
+カラム。全端末からのログアウト（POST /api/v1/logout-all）とパスワード変更で
+1つ進める。既存のユーザーは0（ver クレームの無い既存のトークンと同じ世代）とする。
+
+Base.metadata.create_all で作成済みのテーブルには既にカラムがあるため、
+その場合は追加しない。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    """テーブルに指定したカラムがあるかどうかを返す"""
+    columns = sa.inspect(op.get_bind()).get_columns(table)
+    return any(existing["name"] == column for existing in columns)
+
+
+def upgrade() -> None:
+    if _has_column("users", "token_version"):
+        return
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    if not _has_column("users", "token_version"):
+        return
+    # SQLiteはDROP COLUMNに制約があるため、テーブルを作り直す
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("token_version")
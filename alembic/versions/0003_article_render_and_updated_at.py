@@ -0,0 +1,74 @@
+"""articles の変換済みHTML・更新日時のカラムを追加する
+
+- articles.body_html / articles.render_version: 公開APIで返す変換済みHTMLと、
+  それを作成したレンダラーのスタンプ
+- articles.updated_at（インデックス付き）: 公開APIのETag / Last-Modified の計算に使う。
+  既存の記事は作成日時が分からないため、現在日時を設定する
+- article_stats.updated_at: 記事の作成・削除で更新し、記事一覧の Last-Modified に使う
+
+以前は scripts/rerender_articles.py と scripts/add_updated_at_columns.py で
+既存のデータベースに追加していたカラム。Base.metadata.create_all で作成済みの
+テーブルには既にカラムがあるため、その場合は追加しない。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (テーブル名, カラム名, 型)
+COLUMNS = [
+    ("articles", "body_html", sa.String),
+    ("articles", "render_version", sa.String),
+    ("articles", "updated_at", sa.DateTime),
+    ("article_stats", "updated_at", sa.DateTime),
+]
+
+
+def _columns(table: str) -> set:
+    """テーブルのカラム名を返す（テーブルが無い場合は空）"""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return set()
+    return {column["name"] for column in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    for table, name, type_ in COLUMNS:
+        existing = _columns(table)
+        if existing and name not in existing:
+            op.add_column(table, sa.Column(name, type_(), nullable=True))
+    op.create_index(
+        "ix_articles_updated_at", "articles", ["updated_at"], if_not_exists=True
+    )
+    articles = sa.table("articles", sa.column("updated_at", sa.DateTime()))
+    op.execute(
+        articles.update()
+        .where(articles.c.updated_at.is_(None))
+        .values(updated_at=datetime.utcnow())
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_articles_updated_at", table_name="articles", if_exists=True)
+    for table in ("article_stats", "articles"):
+        existing = _columns(table)
+        names = [name for owner, name, _type in COLUMNS if owner == table and name in existing]
+        if not names:
+            continue
+        # SQLiteはDROP COLUMNに制約があるため、テーブルを作り直す
+        with op.batch_alter_table(table) as batch_op:
+            for name in names:
+                batch_op.drop_column(name)
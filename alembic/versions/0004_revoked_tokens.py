@@ -0,0 +1,54 @@
+"""revoked_tokens テーブルを追加する
+
+ログアウトで無効化したトークンのID（jti）を、トークンの有効期限まで保持するテーブル
+（utils.token_revocation）。
+
+- expires_at（インデックス付き）: 有効期限を過ぎた行の定期的な削除に使う
+- revoked_at（インデックス付き）: 他のプロセスで無効化されたjtiの同期に使う
+
+Base.metadata.create_all で作成済みの場合は作成しない。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = "revoked_tokens"
+
+# (インデックス名, カラム)
+INDEXES = [
+    ("ix_revoked_tokens_expires_at", ["expires_at"]),
+    ("ix_revoked_tokens_revoked_at", ["revoked_at"]),
+]
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table(TABLE):
+        op.create_table(
+            TABLE,
+            sa.Column("jti", sa.String(64), primary_key=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("revoked_at", sa.DateTime(), nullable=False),
+        )
+    for name, columns in INDEXES:
+        op.create_index(name, TABLE, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table(TABLE):
+        return
+    for name, _columns in reversed(INDEXES):
+        op.drop_index(name, table_name=TABLE, if_exists=True)
+    op.drop_table(TABLE)
@@ -0,0 +1,58 @@
+"""email_outbox テーブルを追加する
+
+ユーザー登録・退会などの変更と同じトランザクションで書き込み、コミット後に
+utils.email_outbox のワーカーが送信するメールを保持するテーブル。
+
+- (status, next_attempt_at) のインデックス: ワーカーが送信待ちの行を次に試みる日時の順に取得する
+
+Base.metadata.create_all で作成済みの場合は作成しない。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = "email_outbox"
+
+# (インデックス名, カラム)
+INDEXES = [
+    ("ix_email_outbox_status_next_attempt_at", ["status", "next_attempt_at"]),
+]
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table(TABLE):
+        op.create_table(
+            TABLE,
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("kind", sa.String(32), nullable=False),
+            sa.Column("recipient", sa.String(), nullable=False),
+            sa.Column("payload", sa.String(), nullable=False),
+            sa.Column("status", sa.String(16), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+            sa.Column("last_error", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+    for name, columns in INDEXES:
+        op.create_index(name, TABLE, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table(TABLE):
+        return
+    for name, _columns in reversed(INDEXES):
+        op.drop_index(name, table_name=TABLE, if_exists=True)
+    op.drop_table(TABLE)
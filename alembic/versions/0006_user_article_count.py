@@ -0,0 +1,60 @@
+"""users.article_count カラムと article_stats テーブルを追加する
+
+記事一覧で COUNT(*) を実行しないよう、記事数の集計値を保持する（utils.article_stats）。
+
+- users.article_count: ユーザーが作成した記事数。既存のユーザーは articles から集計する
+- article_stats: 全記事数の集計行（集計行はアプリケーションの起動時に作成する）
+
+以前は scripts/rebuild_article_counts.py で既存のデータベースに追加していた。
+Base.metadata.create_all で作成済みのカラム・テーブルは追加しない。
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    """テーブルに指定したカラムがあるかどうかを返す"""
+    columns = sa.inspect(op.get_bind()).get_columns(table)
+    return any(existing["name"] == column for existing in columns)
+
+
+def upgrade() -> None:
+    if not _has_column("users", "article_count"):
+        op.add_column(
+            "users",
+            sa.Column("article_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+        op.execute(
+            "UPDATE users SET article_count = "
+            "(SELECT COUNT(*) FROM articles WHERE articles.user_id = users.id)"
+        )
+    if not sa.inspect(op.get_bind()).has_table("article_stats"):
+        op.create_table(
+            "article_stats",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("total_articles", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("article_stats"):
+        op.drop_table("article_stats")
+    if not _has_column("users", "article_count"):
+        return
+    # SQLiteはDROP COLUMNに制約があるため、テーブルを作り直す
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("article_count")
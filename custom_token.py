@@ -2,15 +2,20 @@
 # import pprint
 import os
 from enum import Enum
+from uuid import uuid4
 from typing import Optional, Dict, Union
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from fastapi import APIRouter, Depends, status, HTTPException
+from sqlalchemy import Engine
 from sqlalchemy.orm import Session
 
-from database import db_env, get_db
+from database import db_env, engine, get_db
 from models import User
 from exceptions import UserNotFoundError
+from utils.token_cache import decode_token
+from utils.token_revocation import token_id, token_revocation_store
+from logger.structured_logger import get_logger
 
 
 # JWTペイロードの型定義
@@ -20,10 +25,15 @@ router = APIRouter(
     tags=["Auth"]
 )
 
+logger = get_logger(__name__)
+
 SECRET_KEY = db_env.get("secret_key")
 ALGORITHM: str = db_env.get("algo") or "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# ユーザーのトークンの世代（User.token_version）を保持するクレーム
+TOKEN_VERSION_CLAIM = "ver"
+
 
 class TokenType(Enum):
     """トークンタイプの定義"""
@@ -50,7 +60,8 @@ class TokenConfig:
 def create_access_token(
     data: JWTPayload,
     expires_delta: Optional[timedelta] = None,
-    token_type: TokenType = TokenType.ACCESS
+    token_type: TokenType = TokenType.ACCESS,
+    token_version: Optional[int] = None
 ) -> str:
     """アクセストークンを作成する関数（改善版）
 
@@ -60,6 +71,8 @@ def create_access_token(
     :type expires_delta: timedelta
     :param token_type: トークンの種類
     :type token_type: TokenType
+    :param token_version: ユーザーのトークンの世代（User.token_version）
+    :type token_version: Optional[int]
     :return: JWTトークン
     :rtype: str
     :raises ValueError: データが無効な場合
@@ -84,12 +97,15 @@ def create_access_token(
             )
             expire = datetime.now(timezone.utc) + default_expire
 
-        # トークンタイプと有効期限を追加
+        # トークンタイプと有効期限、無効化に使うトークンのIDを追加
         to_encode.update({
             "exp": expire,
             "iat": datetime.now(timezone.utc),
             "type": token_type.value
         })
+        to_encode.setdefault("jti", uuid4().hex)
+        if token_version is not None:
+            to_encode[TOKEN_VERSION_CLAIM] = token_version
 
         # 環境変数の検証
         secret_key = SECRET_KEY
@@ -110,6 +126,31 @@ def create_access_token(
             )
 
 
+def _reject_revoked(
+    token: str,
+    payload: JWTPayload,
+    bind: Engine,
+    credentials_exception: Exception
+    ) -> None:
+    """ログアウトで無効化されたトークンを拒否する
+
+    検証済みトークンのキャッシュは無効化を反映しないため、キャッシュの有無に関係なく確認する。
+
+    :param token: 検証済みのトークン
+    :type token: str
+    :param payload: トークンのペイロード
+    :type payload: JWTPayload
+    :param bind: 無効化状態を保持するデータベースのエンジン
+    :type bind: Engine
+    :param credentials_exception: 認証例外
+    :type credentials_exception: Exception
+    :raises Exception: トークンが無効化されている場合
+    """
+    if token_revocation_store.is_revoked(bind, token_id(token, payload)):
+        logger.warning("無効化されたトークンです")
+        raise credentials_exception
+
+
 def verify_token_with_type(
     token: str,
     expected_type: TokenType,
@@ -130,28 +171,22 @@ def verify_token_with_type(
     try:
         secret_key = SECRET_KEY
         if secret_key is None:
-            print(
-                "SECRET_KEYが設定されていません"
-                )
+            logger.error("SECRET_KEYが設定されていません")
             raise ValueError(
                 "SECRET_KEYが設定されていません"
                 )
         algorithm = ALGORITHM
-        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+        payload = decode_token(token, secret_key, algorithms=[algorithm])
 
         # トークンタイプの検証
         token_type = payload.get("type")
         if token_type != expected_type.value:
-            print(
-                f"無効なトークンタイプ: 期待={expected_type.value}, \
-                実際={token_type}"
-                )
+            logger.warning("無効なトークンタイプ: 期待=%s, 実際=%s", expected_type.value, token_type)
             raise credentials_exception
+        _reject_revoked(token, payload, engine, credentials_exception)
         return payload
     except JWTError as e:
-        print(
-            f"トークン検証エラー: {str(e)}"
-            )
+        logger.warning("トークン検証エラー: %s", e)
         raise credentials_exception
 
 
@@ -173,21 +208,18 @@ def verify_token(
     """
     try:
         if SECRET_KEY is None:
-            print("SECRET_KEYが設定されていません")
+            logger.error("SECRET_KEYが設定されていません")
             raise credentials_exception
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token, SECRET_KEY, algorithms=[ALGORITHM])
+        _reject_revoked(token, payload, db.get_bind().engine, credentials_exception)
         email_raw = payload.get("sub")
         id_raw = payload.get("id")
 
         if email_raw is None:
-            print(
-                "トークンからemailが取得できませんでした"
-                )
+            logger.warning("トークンからemailが取得できませんでした")
             raise credentials_exception
         if id_raw is None:
-            print(
-                "トークンからidが取得できませんでした"
-                )
+            logger.warning("トークンからidが取得できませんでした")
             raise credentials_exception
         email: str = str(email_raw)
         user_id: int = int(id_raw)
@@ -195,9 +227,7 @@ def verify_token(
         from schemas import TokenData
         token_data = TokenData(email=email)
     except JWTError:
-        print(
-            "JWTErrorが発生しました。"
-            )
+        logger.warning("JWTErrorが発生しました。")
         raise credentials_exception
     user = get_user_by_id(user_id, db)
     return user
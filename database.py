@@ -1,14 +1,19 @@
 """データベース接続モジュール"""
 import os
 from pathlib import Path
-from typing import Union, Optional, Dict, List, Generator
+from typing import Any, Callable, Union, Optional, Dict, List, Generator, TypeVar
 from typing_extensions import TypedDict
 from dotenv import load_dotenv
 
 from sqlalchemy import create_engine, Engine
 from sqlalchemy.orm import sessionmaker, Session, DeclarativeBase
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 from exceptions import DatabaseConnectionError
+from logger.structured_logger import get_logger
+
+
+logger = get_logger(__name__)
 
 
 class EnvironmentConfig(TypedDict, total=False):
@@ -35,13 +40,9 @@ def check_env_file(
         else default_env_path
 
     if not default_env_path.exists():
-        print(
-            "スタート"
-            )
+        logger.info("スタート")
     else:
-        print(
-            "前処理の開始"
-            )
+        logger.info("前処理の開始")
     return default_env_path
 
 env_var = check_env_file()
@@ -65,21 +66,15 @@ def read_env_var(env_path: Path) -> EnvironmentConfig:
     if posgre_database_url:
         result["posgre_url"] = posgre_database_url
     else:
-        print(
-            "DB_URLが取得できませんでした。"
-            )
+        logger.warning("DB_URLが取得できませんでした。")
     if secret_key:
         result["secret_key"] = secret_key
     else:
-        print(
-            "SECRET_KEYが取得できませんでした。"
-            )
+        logger.warning("SECRET_KEYが取得できませんでした。")
     if algo:
         result["algo"] = algo
     else:
-        print(
-            "ALGORITHMが取得できませんでした。"
-            )
+        logger.warning("ALGORITHMが取得できませんでした。")
     if cors_origins:
         if "," in cors_origins:
             result["cors_origins"] = [
@@ -91,13 +86,9 @@ def read_env_var(env_path: Path) -> EnvironmentConfig:
                 cors_origins.strip()
                 ]
     else:
-        print(
-            "CORS_ORIGINSが取得できませんでした。"
-            )
+        logger.warning("CORS_ORIGINSが取得できませんでした。")
     if not result:
-        print(
-            "環境変数の取得に失敗しました。"
-            )
+        logger.error("環境変数の取得に失敗しました。")
         return EnvironmentConfig()
     else:
         return result
@@ -117,16 +108,12 @@ def create_database_engine() -> Engine:
         if environment == "production":
             posgre_database_url = db_env.get("posgre_url")
             if not posgre_database_url:
-                print(
-                    "DBのURLが設定されていません。"
-                    )
+                logger.error("DBのURLが設定されていません。")
                 raise DatabaseConnectionError(
                     "本番環境DBのURLが設定されていません。"
                     )
             if not posgre_database_url.startswith("postgresql"):
-                print(
-                    "DBのURLが不正です。"
-                    )
+                logger.error("DBのURLが不正です。")
                 raise DatabaseConnectionError(
                     "DBのURLが不正です。"
                     )
@@ -142,9 +129,7 @@ def create_database_engine() -> Engine:
         else:
             # 開発環境用SQLiteエンジンを作成
             sqlite_url = "sqlite:///blog.db"
-            print(
-                f"開発環境: SQLiteデータベースに接続します ({sqlite_url})"
-            )
+            logger.info("開発環境: SQLiteデータベースに接続します (%s)", sqlite_url)
             engine = create_engine(
                 sqlite_url,
                 connect_args={"check_same_thread": False},
@@ -191,9 +176,7 @@ def create_session(engine: Engine) -> sessionmaker[Session]:
             )
         return SessionLocal
     except Exception as e:
-        print(
-            f"セッション作成に失敗しました。: {str(e)}"
-            )
+        logger.error("セッション作成に失敗しました。: %s", e)
         raise
 
 session = create_session(engine)
@@ -213,9 +196,26 @@ def get_db() -> Generator[Session, None, None]:
         # HTTPExceptionは正常な処理フローの一部なので、ログ出力せずに再スロー
         raise
     except Exception as e:
-        print(
-            f"DBセッションのコミットに失敗しました。: {str(e)}"
-            )
+        logger.error("DBセッションのコミットに失敗しました。: %s", e)
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+T = TypeVar("T")
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """同期のDB処理をワーカースレッドで実行し、完了を待つ
+
+    Sessionの処理はブロッキングI/Oのため、async関数から直接呼び出すと
+    クエリの完了までイベントループ上の他のリクエストが全て止まる。
+    メール送信など他のコルーチンを待つ必要の無いエンドポイントは、
+    async def ではなく def で定義する（FastAPIがワーカースレッドで実行する）。
+
+    :param func: 実行する関数（Sessionのメソッドや、Sessionを使う関数）
+    :type func: Callable[..., T]
+    :return: 関数の戻り値
+    :rtype: T
+    """
+    return await run_in_threadpool(func, *args, **kwargs)
@@ -1,6 +1,8 @@
 """カスタム例外クラスの定義モジュール"""
 from typing import Optional
 
+from fastapi import HTTPException, status
+
 
 class DatabaseConnectionError(Exception):
     """データベース接続エラーを表すカスタム例外
@@ -89,3 +91,30 @@ class DatabaseError(Exception):
     def __init__(self, message: str):
         self.message = message
         super().__init__(self.message)
+
+
+class SearchSortUnavailableError(HTTPException):
+    """関連度順の検索が要求されたが、全文検索インデックスを使用できない場合の例外
+
+    ILIKE検索では関連度を計算できないため、並び順を黙って変更せずに400を返す。
+    """
+    def __init__(self) -> None:
+        self.message = "関連度順の検索は現在利用できません。sort=newを指定してください。"
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=self.message
+        )
+
+
+class PasswordHashBusyError(HTTPException):
+    """パスワードのハッシュ化・検証の待ち行列が上限に達した場合の例外
+
+    HTTPExceptionを継承しているため、捕捉しなければ503（Retry-After付き）が返る。
+    """
+    def __init__(self, retry_after: int = 1):
+        self.message = "ただいま混み合っています。しばらくしてから再度お試しください。"
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=self.message,
+            headers={"Retry-After": str(retry_after)}
+        )
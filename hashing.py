@@ -1,11 +1,138 @@
-"""パスワードのハッシュ化と検証を行うためのクラスを定義。"""
+"""パスワードのハッシュ化と検証を行うためのクラスを定義。
+
+bcryptは1回に数百ミリ秒かかるため、async関数からは ``Hash.bcrypt_async`` /
+``Hash.verify_async`` を使い、専用のスレッドプールで実行する。
+プールの同時実行数と待ち行列の長さには上限があり、上限を超えた場合は
+PasswordHashBusyError（503）を返して、記事の取得など他の処理への影響を防ぐ。
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
 from passlib.context import CryptContext
 
+from exceptions import PasswordHashBusyError
+
 password_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto"
 )
 
+# ハッシュ処理を同時に実行するスレッド数（bcryptはGILを解放するため、CPUコア数まで並列化できる）
+PASSWORD_HASH_WORKERS = max(1, int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1))))
+
+# 実行待ちにできるハッシュ処理の数（超えた場合は503を返す）
+PASSWORD_HASH_MAX_QUEUE = max(0, int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32")))
+
+T = TypeVar("T")
+
+
+class PasswordHashPool:
+    """パスワードのハッシュ処理を実行する、上限付きのスレッドプール
+
+    :param max_workers: 同時に実行する数
+    :param max_queue: 実行待ちにできる数
+    """
+
+    def __init__(self, max_workers: int, max_queue: int) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash"
+                )
+            return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """ハッシュ処理をプールで実行し、完了を待つ
+
+        :param func: 実行する関数
+        :type func: Callable[..., T]
+        :return: 関数の戻り値
+        :rtype: T
+        :raises PasswordHashBusyError: 実行中と実行待ちの合計が上限に達している場合
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordHashBusyError()
+            self._in_flight += 1
+        submitted = time.monotonic()
+
+        def task() -> T:
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self._running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        try:
+            future = self._get_executor().submit(task)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        # 待っている側がキャンセルされても、スレッドで実行中の間は枠を解放しない
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future: "Future[Any]") -> None:
+        """ハッシュ処理の終了時（実行前にキャンセルされた場合を含む）に枠を解放する"""
+        with self._lock:
+            self._in_flight -= 1
+            if not future.cancelled():
+                self.completed += 1
+
+    def stats(self) -> Dict[str, float]:
+        """プールの統計情報を返す
+
+        :return: workers, max_queue, running, queue_depth, completed, rejected,
+            wait_avg_ms, wait_max_ms を含む辞書
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self._in_flight - self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_avg_ms": self._wait_total / self.completed * 1000 if self.completed else 0.0,
+                "wait_max_ms": self._wait_max * 1000,
+            }
+
+    def reset_stats(self) -> None:
+        """統計情報を初期化する"""
+        with self._lock:
+            self.completed = 0
+            self.rejected = 0
+            self._wait_total = 0.0
+            self._wait_max = 0.0
+
+
+password_hash_pool = PasswordHashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
 
 class Hash:
     """パスワードのハッシュ化と検証を行うクラス"""
@@ -25,4 +152,24 @@ class Hash:
         :param hashed_password: ハッシュ化されたパスワード
         :return: 一致する場合は True, それ以外は False
         """
-        return password_context.verify(plain_password, hashed_password)
\ No newline at end of file
+        return password_context.verify(plain_password, hashed_password)
+
+    @staticmethod
+    async def bcrypt_async(password: str) -> str:
+        """パスワードを専用のスレッドプールでハッシュ化
+
+        :param password: ハッシュ化するパスワード
+        :raises PasswordHashBusyError: プールが混み合っている場合（503）
+        """
+        return await password_hash_pool.run(Hash.bcrypt, password)
+
+    @staticmethod
+    async def verify_async(plain_password: str, hashed_password: str) -> bool:
+        """平文のパスワードとハッシュ化されたパスワードを専用のスレッドプールで比較
+
+        :param plain_password: 平文のパスワード
+        :param hashed_password: ハッシュ化されたパスワード
+        :return: 一致する場合は True, それ以外は False
+        :raises PasswordHashBusyError: プールが混み合っている場合（503）
+        """
+        return await password_hash_pool.run(Hash.verify, plain_password, hashed_password)
@@ -1,43 +1,24 @@
-"""カスタムロガーパッケージ"""
-from logging import getLogger, FileHandler, Formatter, INFO, ERROR
-from pathlib import Path
+"""カスタムロガーパッケージ
 
-
-"""ロガーの設定
-
-:param log_dir: ログファイルの保存先ディレクトリ
-:type log_dir: str
-:param log_file: ログファイル名
-:type log_file: str
-:param log_level: ログレベル
+ログの書き込みは logger.structured_logger のハンドラー（書き込み用のスレッドと
+ローテーションするファイル）で行う。
 """
+from logging import getLogger, Formatter, INFO
+
+from logger.structured_logger import LOG_DIR, TEXT_FORMAT, setup_logging
 
 
 # ロガーの設定
-log_dir = Path(__file__).parent.parent / 'log'
-log_dir.mkdir(parents=True, exist_ok=True)  # ディレクトリが存在しない場合は作成
+log_dir = LOG_DIR
 
-# INFOレベルのロガーを作成
+# INFOレベルのロガーを作成（app.log・error.log への書き込みは structured_logger で行う）
 logger = getLogger("app_logger")
 logger.setLevel(INFO)
 
-# フォーマットの設定
-formatter = Formatter('%(asctime)s - %(levelname)s - %(message)s')
-
-# INFOログのハンドラー
-info_handler = FileHandler(log_dir / 'app.log')
-info_handler.setLevel(INFO)
-info_handler.setFormatter(formatter)
-
-# ERRORログのハンドラー
-error_handler = FileHandler(log_dir / 'error.log')
-error_handler.setLevel(ERROR)
-error_handler.setFormatter(formatter)
+# フォーマットの設定（コンソールとテキスト形式のファイルで使う形式）
+formatter = Formatter(TEXT_FORMAT)
 
-# ハンドラーをロガーに追加（重複追加を防ぐ）
-if not logger.handlers:
-    logger.addHandler(info_handler)
-    logger.addHandler(error_handler)
+setup_logging()
 
 # INFOレベルを呼び出し先でに記録する
 def create_logger(info_msg: str) -> None:
@@ -55,4 +36,4 @@ def create_error_logger(error_msg: str) -> None:
     :param error_msg: ログに記録するメッセージ
     :type error_msg: str
     """
-    logger.error(error_msg)
\ No newline at end of file
+    logger.error(error_msg)
@@ -0,0 +1,242 @@
+"""構造化ログを非同期に書き込むモジュール
+
+アプリケーションのモジュールは ``get_logger(__name__)`` でロガーを取得し、
+``logger.info("ユーザー作成開始 - メール: %s", email)`` のように引数を渡して記録する。
+メッセージの組み立て（% による書式化）は、そのレベルが記録される場合にだけ
+書き込み用のスレッドで行う。
+
+- ルートロガーには ``QueueHandler`` だけを登録し、ファイル・コンソールへの書き込みは
+  ``QueueListener`` のスレッドで行う（イベントループ上で書き込みを待たない）。
+- ログは LOG_DIR の app.log（INFO以上）と error.log（ERROR以上）に書き込み、
+  LOG_MAX_BYTES ごと（LOG_ROTATE_WHEN を設定した場合はその間隔ごと）にローテーションする。
+- モジュールごとのレベルは LOG_LEVELS（例: ``routers.article=WARNING,database=DEBUG``）で変更する。
+- 件数の多いINFOログは ``extra=SAMPLED`` を付けて記録すると、LOG_SAMPLE_RATE の割合だけ残す。
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+# 全体のログレベル
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# モジュールごとのログレベル（"モジュール名=レベル" をカンマ区切りで指定）
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+# ログファイルの保存先ディレクトリ
+LOG_DIR = Path(os.getenv("LOG_DIR", str(Path(__file__).parent.parent / "log")))
+
+# ログファイルの形式（json: 1行に1つのJSON、text: 従来の形式）
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+# コンソール（標準出力）にも出力する
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() == "true"
+
+# ログファイルをローテーションするサイズ（バイト）と、残す世代数
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+# 時間でローテーションする場合の間隔（例: "midnight", "H"。空の場合はサイズでローテーションする）
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+
+# SAMPLED を付けたINFO以下のログを残す割合（0〜1）
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+# 書き込み待ちのログの最大数（超えた分は破棄し、リクエストの処理を待たせない）
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+
+# 従来のテキスト形式
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 件数の多いINFOログに付ける extra（LOG_SAMPLE_RATE の割合だけ残す）
+SAMPLED = {"sampled": True}
+
+# LogRecord が標準で持つ属性（これ以外の属性は extra で渡された項目としてJSONに含める）
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sampled"}
+
+# 書き込み用のスレッドに渡しても安全な引数の型（それ以外は呼び出し元で書式化する）
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+
+class JsonFormatter(logging.Formatter):
+    """ログを1行のJSONに変換するフォーマッター"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """SAMPLED を付けたINFO以下のログを、rate の割合だけ残すフィルター
+
+    :param rate: 残す割合（0〜1）
+    :type rate: float
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not getattr(record, "sampled", False):
+            return True
+        if self.rate >= 1 or random.random() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class AsyncQueueHandler(QueueHandler):
+    """ログを書き込み用のスレッドに渡すハンドラー
+
+    QueueHandler は渡す前にメッセージを書式化するが、引数が変更されない値だけの場合は
+    書式化を書き込み用のスレッドで行う。キューが一杯の場合は待たずに破棄する。
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            # トレースバックのフレームは後で変わるため、ここで文字列にする
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        args = record.args
+        if args and not (
+            isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args)
+        ):
+            # ORMのオブジェクトなどを別のスレッドで参照しないよう、ここで書式化する
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: Optional[AsyncQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_sampling_filter: Optional[SamplingFilter] = None
+
+
+def _file_handler(path: Path, level: int) -> logging.Handler:
+    """ローテーションするファイルのハンドラーを作成する"""
+    handler: logging.Handler
+    if LOG_ROTATE_WHEN:
+        handler = TimedRotatingFileHandler(
+            path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+    else:
+        handler = RotatingFileHandler(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        )
+    handler.setLevel(level)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def _apply_levels(levels: str) -> None:
+    """LOG_LEVELS の形式で指定されたモジュールごとのレベルを設定する"""
+    for item in levels.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+
+def setup_logging() -> None:
+    """ルートロガーに非同期のハンドラーを登録し、書き込み用のスレッドを開始する
+
+    2回目以降の呼び出しでは何もしない。
+    """
+    global _handler, _listener, _sampling_filter
+    if _listener is not None:
+        return
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    handlers: List[logging.Handler] = [
+        _file_handler(LOG_DIR / "app.log", logging.INFO),
+        _file_handler(LOG_DIR / "error.log", logging.ERROR),
+    ]
+    if LOG_CONSOLE:
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console)
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+    _sampling_filter = SamplingFilter(LOG_SAMPLE_RATE)
+    _handler = AsyncQueueHandler(log_queue)
+    _handler.addFilter(_sampling_filter)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(_handler)
+    _apply_levels(LOG_LEVELS)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """書き込み待ちのログを全て書き込み、書き込み用のスレッドを終了する"""
+    global _handler, _listener
+    if _listener is None:
+        return
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _handler, _listener = None, None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """モジュールのロガーを返す（初回に setup_logging を行う）
+
+    :param name: ロガー名（通常は __name__）
+    :type name: str
+    :return: ロガー
+    :rtype: logging.Logger
+    """
+    setup_logging()
+    return logging.getLogger(name)
+
+
+def get_log_handlers() -> List[logging.Handler]:
+    """書き込み用のスレッドで使うハンドラーを返す"""
+    return list(_listener.handlers) if _listener is not None else []
+
+
+def stats() -> Dict[str, int]:
+    """破棄したログの件数を返す"""
+    return {
+        "dropped_queue_full": _handler.dropped if _handler is not None else 0,
+        "dropped_sampled": _sampling_filter.dropped if _sampling_filter is not None else 0,
+    }
@@ -1,15 +1,52 @@
 """FastAPIのエントリーポイント"""
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator, List
+
 from fastapi import FastAPI, Depends, status, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from database import Base, engine, db_env
+from hashing import password_hash_pool
 from schemas import validation_exception_handler
 from routers import article, user, auth
 from logger.custom_logger import create_logger, create_error_logger
+from utils.article_search import ensure_search_index
+from utils.article_id_allocator import ensure_article_id_allocator
+from utils.article_stats import ensure_article_stats
+from utils.token_revocation import run_revocation_maintenance
+from utils.email_outbox import email_outbox_worker
+from utils.email_sender import close_smtp_pool
+from utils.search_cache import search_cache
+from utils.metrics import (
+    MetricsMiddleware,
+    PROMETHEUS_CONTENT_TYPE,
+    Sample,
+    render_prometheus,
+    render_samples,
+)
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """起動時にバックグラウンド処理を開始し、終了時に停止する"""
+    # 無効化したトークンの取り込みと、期限切れの行の削除
+    maintenance = asyncio.create_task(run_revocation_maintenance(engine))
+    # 送信待ちのメール（email_outbox）の送信
+    outbox = asyncio.create_task(email_outbox_worker.run(engine))
+    try:
+        yield
+    finally:
+        for task in (maintenance, outbox):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await close_smtp_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # 環境変数から取得したCORS_ORIGINSリストを使用
 origins = db_env.get("cors_origins", [])
@@ -56,7 +93,16 @@ app.add_middleware(
     allow_headers=["*"],  # 許可するHTTPヘッダー
 )
 
+# ルートごとのリクエスト数・レイテンシを記録するミドルウェア（CORSの処理も含めて計測する）
+app.add_middleware(MetricsMiddleware)
+
 Base.metadata.create_all(engine)
+# 記事検索用の全文検索インデックスを準備する
+ensure_search_index(engine)
+# 記事IDの一意インデックスと採番用シーケンスを準備する
+ensure_article_id_allocator(engine)
+# 記事数の集計行を準備する（記事一覧の読み取り時には作成しない）
+ensure_article_stats(engine)
 
 
 @app.exception_handler(
@@ -103,6 +149,52 @@ async def handler(
         )
 
 
+def component_samples() -> List[Sample]:
+    """パスワードハッシュのスレッドプール・記事検索のキャッシュの統計情報をメトリクスにする
+
+    :return: (メトリクス名, 種類, 説明, 値) の一覧
+    :rtype: List[Sample]
+    """
+    pool = password_hash_pool.stats()
+    cache = search_cache.stats()
+    return [
+        ("password_hash_workers", "gauge",
+         "Number of password hashing worker threads.", pool["workers"]),
+        ("password_hash_running", "gauge",
+         "Number of password hashing tasks currently running.", pool["running"]),
+        ("password_hash_queue_depth", "gauge",
+         "Number of password hashing tasks waiting for a worker.", pool["queue_depth"]),
+        ("password_hash_wait_seconds_avg", "gauge",
+         "Average time password hashing tasks waited for a worker.", pool["wait_avg_ms"] / 1000),
+        ("password_hash_wait_seconds_max", "gauge",
+         "Longest time a password hashing task waited for a worker.", pool["wait_max_ms"] / 1000),
+        ("password_hash_completed_total", "counter",
+         "Total number of completed password hashing tasks.", pool["completed"]),
+        ("password_hash_rejected_total", "counter",
+         "Total number of password hashing tasks rejected because the queue was full.",
+         pool["rejected"]),
+        ("search_cache_hits_total", "counter",
+         "Total number of article search cache hits.", cache["hits"]),
+        ("search_cache_misses_total", "counter",
+         "Total number of article search cache misses.", cache["misses"]),
+        ("search_cache_size", "gauge",
+         "Number of article search results in the cache.", cache["size"]),
+        ("search_cache_max_size", "gauge",
+         "Maximum number of article search results kept in the cache.", cache["maxsize"]),
+        ("search_cache_evictions_total", "counter",
+         "Total number of article search results evicted from the cache.", cache["evictions"]),
+    ]
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """ルートごとのメトリクスと、各処理の統計情報をPrometheusのテキスト形式で返す"""
+    return PlainTextResponse(
+        render_prometheus() + render_samples(component_samples()),
+        media_type=PROMETHEUS_CONTENT_TYPE
+    )
+
+
 app.include_router(article.router)
 app.include_router(user.router)
 app.include_router(auth.router)
\ No newline at end of file
@@ -2,7 +2,7 @@
 from datetime import datetime, timedelta
 from typing import Optional, List
 from uuid import uuid4
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index, Sequence
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from database import Base
@@ -20,18 +20,39 @@ class Article(Base):
 
     :param body: 記事の本文
 
+    :param body_html: 記事の本文を変換したHTML（書き込み時に保存する）
+
+    :param render_version: body_htmlを作成したレンダラーのスタンプ
+
+    :param updated_at: 記事の作成・最終更新日時（ETag・Last-Modifiedの計算に使用する）
+
     :param user_id: 記事を作成したユーザーのID
 
     :param owner: 特定の記事を作成したユーザーの情報を取得するためのリレーションシップ
     """
 
     __tablename__ = "articles"
+    __table_args__ = (
+        # ユーザーの記事一覧・更新・削除（user_idで絞り込み、article_idで特定する）
+        Index("ix_articles_user_id_article_id", "user_id", "article_id"),
+    )
 
     # SQLAlchemy 2.0スタイルでデータベースカラムを定義
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    article_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # 公開APIの主キーとして使うため、重複を一意インデックスで防ぐ
+    article_id: Mapped[int] = mapped_column(
+        Integer, nullable=False, unique=True, index=True
+        )
     title: Mapped[str] = mapped_column(String, nullable=False)
     body: Mapped[str] = mapped_column(String, nullable=False)
+    # 変換済みHTMLとレンダラースタンプ（公開APIではこちらをそのまま返す）
+    body_html: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    render_version: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # 条件付きGETで変更の有無を判定するため、書き込みのたびに更新する
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True, index=True,
+        default=datetime.utcnow, onupdate=datetime.utcnow
+        )
     # Userクラスのidを外部キーとして指定する
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"))
     # 特定の記事を作成したユーザーの情報を取得する
@@ -55,6 +76,10 @@ class User(Base):
 
     :param is_active: ユーザーの有効状態
 
+    :param article_count: ユーザーが作成した記事数（記事の作成・削除時に更新する）
+
+    :param token_version: 発行済みトークンの世代（増やすとそれ以前のトークンが全て無効になる）
+
     :param blogs: 特定のユーザーが作成した記事の情報を全て取得するためのリレーションシップ
     """
 
@@ -62,13 +87,128 @@ class User(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[Optional[str]] = mapped_column(String)
-    email: Mapped[Optional[str]] = mapped_column(String)
+    # ログイン・パスワード変更・登録時の重複確認で検索するため、一意インデックスを作成する
+    email: Mapped[Optional[str]] = mapped_column(String, unique=True, index=True)
     password: Mapped[Optional[str]] = mapped_column(String)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # 記事一覧でCOUNT(*)を実行しないよう、記事数を保持する
+    article_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+        )
+    # トークンの ver クレームと一致しない場合は認証しない（全端末からのログアウトで増やす）
+    token_version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+        )
     # 特定のユーザーが作成した記事の情報を全て取得する
     blogs: Mapped[List["Article"]] = relationship("Article", back_populates="owner")
 
 
+class ArticleStats(Base):
+    """記事全体の集計値を保持するテーブル
+
+    記事の作成・削除と同じトランザクションで更新し、
+    一覧取得時のCOUNT(*)を不要にする。
+
+    :param id: 集計行のID（全体の集計は1行のみ）
+
+    :param total_articles: 全記事数
+
+    :param updated_at: 記事の作成・削除により記事一覧が最後に変わった日時
+    """
+    __tablename__ = "article_stats"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    total_articles: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True, default=datetime.utcnow
+        )
+
+
+# PostgreSQLで記事IDの採番に使うシーケンス（SQLiteでは作成されない）
+ARTICLE_ID_SEQUENCE = Sequence("article_id_seq", metadata=Base.metadata)
+
+
+class IdCounter(Base):
+    """連番の払い出し状況を保持するテーブル
+
+    シーケンスの無いSQLiteで、記事IDをブロック単位（hi/lo方式）で予約するために使う。
+
+    :param name: 連番の名前（記事IDは"articles"）
+
+    :param next_value: 次に予約できる値
+    """
+    __tablename__ = "id_counters"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    next_value: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class RevokedToken(Base):
+    """ログアウトなどで無効化したトークンを保持するテーブル
+
+    トークンそのものではなくjtiのみを、トークンの有効期限まで保持する。
+    有効期限を過ぎた行は utils.token_revocation の定期処理で削除する。
+
+    :param jti: トークンのID（jtiの無いトークンはトークンのSHA-256）
+
+    :param expires_at: トークンの有効期限（UTC）
+
+    :param revoked_at: 無効化した日時（UTC、他のプロセスとの同期に使用する）
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[str] = mapped_column(String(64), primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    revoked_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow, index=True
+        )
+
+
+class EmailOutbox(Base):
+    """送信待ちのメールを保持するテーブル（トランザクショナル・アウトボックス）
+
+    ユーザー登録・退会などの変更と同じトランザクションで書き込み、
+    コミット後に utils.email_outbox のワーカーが送信する。
+
+    :param id: 自動付与されるDBのID
+
+    :param kind: メールの種類（"verification"・"registration_complete"・"account_deletion"）
+
+    :param recipient: 宛先のメールアドレス
+
+    :param payload: メールの作成に使う値（JSON）
+
+    :param status: 送信状態（"pending"、再送を諦めた行は "dead"。送信が完了した行は削除する）
+
+    :param attempts: 送信を試みた回数
+
+    :param next_attempt_at: 次に送信を試みる日時（UTC、送信中は他のワーカーが取得しないよう先に進める）
+
+    :param last_error: 最後に失敗した送信のエラー
+
+    :param created_at: 書き込んだ日時（UTC）
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # ワーカーが送信待ちの行を次に試みる日時の順に取得する
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    recipient: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[str] = mapped_column(String, nullable=False, default="{}")
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow
+        )
+    last_error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow
+        )
+
+
 class EmailVerification(Base):
     """メール確認用のモデル"""
     __tablename__ = 'email_verifications'
@@ -4,16 +4,22 @@ from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from database import db_env, get_db
+from database import db_env, get_db, run_db
 from models import User
 from schemas import TokenData
-from custom_token import SECRET_KEY
+from custom_token import SECRET_KEY, TOKEN_VERSION_CLAIM
 from database import db_env
+from utils.token_cache import decode_token
+from utils.token_revocation import token_id, token_revocation_store
+from utils.user_cache import CachedUser, user_cache
+from logger.structured_logger import get_logger
 
 
 ALGORITHM: str = db_env.get("algo") or "HS256"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/login")
 
+logger = get_logger(__name__)
+
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
@@ -21,6 +27,11 @@ async def get_current_user(
     ) -> User:
     """トークンを検証し、現在のユーザーを取得する
 
+    直近に取得したユーザーはキャッシュ（utils.user_cache）の情報からセッションに属する
+    User を作成するため、キャッシュが有効な間はデータベースを検索しない。
+    トークンの ver クレームがユーザーの token_version と一致しない場合
+    （全端末からのログアウト・パスワード変更より前に発行された場合）は認証しない。
+
     :param token: 認証トークン
     :param db: データベースセッション
     :param id: トークンから取得したユーザーID
@@ -38,7 +49,7 @@ async def get_current_user(
             raise credentials_exception
         if token is None:
             raise credentials_exception
-        payload = jwt.decode(
+        payload = decode_token(
             token,
             SECRET_KEY,
             algorithms=[ALGORITHM]
@@ -50,17 +61,37 @@ async def get_current_user(
         email: str = str(email_raw)
         try:
             user_id: int = int(id_raw)
+            # ver クレームの無いトークンは世代0として扱う
+            token_version: int = int(payload.get(TOKEN_VERSION_CLAIM) or 0)
         except (ValueError, TypeError):
             raise credentials_exception
         token_data = TokenData(email=email)
     except JWTError as e:
-        print(
-            f"JWTErrorが発生しました: {str(e)}"
-            )
+        logger.warning("JWTErrorが発生しました: %s", e)
+        raise credentials_exception
+
+    # ログアウトで無効化されたトークンを拒否する（多くの場合I/Oなしで判定できる）
+    engine = db.get_bind().engine
+    jti = token_id(token, payload)
+    if token_revocation_store.might_be_revoked(engine, jti) and await run_db(
+        token_revocation_store.is_revoked, engine, jti
+    ):
         raise credentials_exception
 
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        if cached.token_version != token_version:
+            raise credentials_exception
+        return cached.to_model(db)
+
     # ユーザー情報を取得
-    user = db.query(User).filter(User.id == user_id).first()
+    version = user_cache.version
+    user = await run_db(
+        lambda: db.query(User).filter(User.id == user_id).first()
+    )
     if user is None:
         raise credentials_exception
+    user_cache.put(CachedUser.from_model(user), version)
+    if (user.token_version or 0) != token_version:
+        raise credentials_exception
     return user
\ No newline at end of file
@@ -1,15 +1,46 @@
 """エンドポイントのルーティングを定義するモジュール"""
+import os
+from datetime import datetime
 from typing import Optional, List
-from fastapi import APIRouter, Depends, status, HTTPException, Query
-from sqlalchemy import func, or_
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, insert, select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 import urllib.parse
-import markdown
 
 from models import Article, User as UserModel
 from schemas import ArticleBase, PublicArticle
 from database import get_db
 from oauth2 import get_current_user
+from utils.markdown_renderer import (
+    apply_rendered_body, get_article_html, render_markdown, renderer_stamp,
+)
+from utils.conditional_request import (
+    is_not_modified, make_etag, not_modified_response, set_validators,
+)
+from utils.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from utils.article_search import (
+    SORT_NEWEST, SORT_RELEVANCE, index_inserted_rows, search_articles,
+    uses_normalized_search,
+)
+from utils.search_cache import articles_generation, search_cache
+from utils.article_id_allocator import allocate_article_ids
+from utils.streaming import (
+    STREAM_FORMAT_PATTERN, forward_headers, is_stream_format, stream_query,
+)
+from utils.article_stats import (
+    TOTAL_COUNT_HEADER,
+    adjust_article_count,
+    get_articles_last_modified,
+    get_total_article_count,
+    get_user_article_count,
+)
+from logger.structured_logger import SAMPLED, get_logger
+
+
+# 一括作成で一度に受け付ける記事数の上限
+BULK_CREATE_MAX_ITEMS = int(os.getenv("BULK_CREATE_MAX_ITEMS", "5000"))
 
 
 # TODO:APIレスポンスの型定義
@@ -18,22 +49,53 @@ router = APIRouter(
     tags=["articles"],
 )
 
+logger = get_logger(__name__)
+
+
+# PublicArticleの作成に必要なカラム（ストリーミング時は記事全体を読み込まない）
+PUBLIC_ARTICLE_COLUMNS = (
+    Article.article_id, Article.title, Article.body,
+    Article.body_html, Article.render_version,
+)
+
+
+def _to_public_article(row: Row) -> PublicArticle:
+    """記事の行をPublicArticleに変換する（保存済みのHTMLを使用する）"""
+    return PublicArticle(
+        article_id=row.article_id,
+        title=row.title,
+        body_html=get_article_html(row)
+    )
+
+
+def _article_etag(article_id: int, updated_at: datetime) -> str:
+    """記事の更新日時とレンダラースタンプから記事詳細のETagを作成する"""
+    return make_etag("article", article_id, updated_at.isoformat(), renderer_stamp())
+
 
 @router.get(
     "/articles",
     status_code=status.HTTP_200_OK,
     response_model=List[ArticleBase]
 )
-async def all_fetch(
+def all_fetch(
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user),
     limit: Optional[int] = Query(
         None, ge=1,
         description="取得する記事数（指定しない場合は全件取得）"
-        )
-) -> List[ArticleBase]:
+        ),
+    stream: Optional[str] = Query(
+        None, pattern=STREAM_FORMAT_PATTERN,
+        description="ストリーミングで返す形式（json: JSON配列、ndjson: 1行1記事）"
+        ),
+    response: Response = None  # type: ignore[assignment]
+) -> List[ArticleBase] | Response:
     """ログインユーザーが作成した記事のみを取得するエンドポイント
 
+    ユーザーの記事総数はレスポンスヘッダー ``X-Total-Count`` で返す。
+    ``stream`` を指定した場合は、記事を一定件数ずつ読み込みながら逐次返す。
+
     :param db: データベースセッション
 
     :type db: Session
@@ -46,9 +108,17 @@ async def all_fetch(
 
     :type limit: Optional[int]
 
-    :return: 記事のリスト
+    :param stream: ストリーミングで返す形式（指定しない場合は通常のJSON）
 
-    :rtype: List[ArticleBase]
+    :type stream: Optional[str]
+
+    :param response: レスポンスヘッダー設定用のレスポンス
+
+    :type response: Response
+
+    :return: 記事のリスト（ストリーミング時はStreamingResponse）
+
+    :rtype: List[ArticleBase] | Response
 
     :raises HTTPException: 記事が見つからない場合
 
@@ -56,26 +126,49 @@ async def all_fetch(
     """
 
     try:
-        # 記事の総数を取得
-        total_count = db.query(Article).filter(
-            Article.user_id == current_user.id).count()
+        # 記事の総数を取得（集計値を使用するためCOUNT(*)は実行しない）
+        total_count = get_user_article_count(db, current_user.id)
+        if response is not None:
+            response.headers[TOTAL_COUNT_HEADER] = str(total_count)
+
+        if is_stream_format(stream):
+            stmt = select(
+                Article.article_id, Article.title, Article.body, Article.user_id
+            ).where(Article.user_id == current_user.id).limit(limit)
+            logger.info(
+                "ユーザーID: %s のブログ記事をストリーミングで返します。全%s件 (形式: %s)",
+                current_user.id,
+                total_count,
+                stream
+            )
+            return stream_query(
+                db.get_bind(), stmt,
+                lambda row: ArticleBase(
+                    article_id=row.article_id,
+                    title=row.title,
+                    body=row.body,
+                    user_id=row.user_id
+                ),
+                stream, forward_headers(response)
+            )
 
         query = db.query(Article).filter(Article.user_id == current_user.id)
 
         # 記事数を指定する場合
         if limit:
             user_blogs = query.limit(limit).all()
-            print(
-                f"ユーザーID: {current_user.id} のブログ記事を取得しました。 \
-                全{total_count}件中{len(user_blogs)}件表示")
+            logger.info(
+                "ユーザーID: %s のブログ記事を取得しました。 全%s件中%s件表示",
+                current_user.id,
+                total_count,
+                len(user_blogs)
+            )
         else:
             # 全件取得
             user_blogs = query.all()
-            print(
-                f"ユーザーID: {current_user.id}  \
-                のブログ記事を全件取得しました。全{total_count}件")
+            logger.info("ユーザーID: %s のブログ記事を全件取得しました。全%s件", current_user.id, total_count)
     except ValueError as e:
-        print(f"ブログ記事の取得に失敗しました。")
+        logger.warning("ブログ記事の取得に失敗しました。")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Articles not found"
@@ -83,22 +176,25 @@ async def all_fetch(
 
     # 記事が見つからない場合は空のリストを返す
     if not user_blogs:
-        print(
-            f"ユーザーID: {current_user.id} のブログ記事が見つかりませんでした。"
-            )
+        logger.info("ユーザーID: %s のブログ記事が見つかりませんでした。", current_user.id)
         return []
 
     # ログメッセージを条件によって変更
     if limit:
-        print(
-            f"ユーザーID: {current_user.id} のブログ記事 \
-            {len(user_blogs)}件を取得しました。(制限: {limit}, 総数: {total_count})"
-            )
+        logger.info(
+            "ユーザーID: %s のブログ記事 %s件を取得しました。(制限: %s, 総数: %s)",
+            current_user.id,
+            len(user_blogs),
+            limit,
+            total_count
+        )
     else:
-        print(
-            f"ユーザーID: {current_user.id} のブログ記事 \
-            全{len(user_blogs)}件を取得しました。(総数: {total_count})"
-            )
+        logger.info(
+            "ユーザーID: %s のブログ記事 全%s件を取得しました。(総数: %s)",
+            current_user.id,
+            len(user_blogs),
+            total_count
+        )
 
     return [
         ArticleBase(
@@ -115,7 +211,7 @@ async def all_fetch(
     status_code=status.HTTP_200_OK,
     response_model=ArticleBase
     )
-async def get_article(
+def get_article(
     id: int,
     db: Session = Depends(get_db)
     ) -> ArticleBase:
@@ -137,10 +233,9 @@ async def get_article(
     """
     try:
         id_blog = db.query(Article).filter(Article.article_id == id).first()
-        print(id_blog)
-        print("指定したIDのブログ記事を取得しました。")
+        logger.info("指定したIDのブログ記事を取得しました。ID: %s", id)
     except ValueError as e:
-        print(f"指定したIDのブログ記事に失敗しました。")
+        logger.warning("指定したIDのブログ記事に失敗しました。")
         # エラー発生時に明示的な404を返す
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, \
@@ -162,7 +257,7 @@ async def get_article(
 @router.post(
     "/articles"
     )
-async def create_article(
+def create_article(
     blog: ArticleBase,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
@@ -196,11 +291,8 @@ async def create_article(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="本文は必須項目です"
         )
-    # 記事は自動採番する
-    max_article_id = db.query(
-        func.max(Article.article_id
-                )).scalar() or 0
-    new_article_id = max_article_id + 1
+    # 記事IDは記事テーブルを走査せずに採番する（同時に作成しても重複しない）
+    new_article_id, = allocate_article_ids(db)
 
     new_blog = Article(
         article_id=new_article_id,
@@ -208,8 +300,14 @@ async def create_article(
         body=blog.body,
         user_id=current_user.id
     )
+    # 公開APIで再変換しないよう、変換済みHTMLを保存する
+    apply_rendered_body(new_blog)
     db.add(new_blog)
+    # 記事数の集計値を同じトランザクションで更新する
+    adjust_article_count(db, current_user.id, 1)
     db.commit()
+    # 検索結果のキャッシュを無効化する
+    articles_generation.bump()
     db.refresh(new_blog)
     return ArticleBase(
         article_id=new_blog.article_id,
@@ -219,12 +317,120 @@ async def create_article(
     )
 
 
+@router.post(
+    "/articles/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=List[ArticleBase]
+)
+def create_articles_bulk(
+    blogs: List[ArticleBase],
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+    ) -> List[ArticleBase]:
+    """複数の記事をまとめて作成するエンドポイント
+
+    記事IDは1回でまとめて採番し（SQLiteでは連続した範囲）、全ての記事を1回の複数行INSERTで
+    1つのトランザクションとして追加する。1件でも不正な記事があれば何も作成しない。
+
+    :param blogs: 記事の内容のリスト
+
+    :type blogs: List[ArticleBase]
+
+    :param db: データベースセッション
+
+    :type db: Session
+
+    :param current_user: 現在のユーザー
+
+    :type current_user: User
+
+    :return: 作成された記事のリスト（リクエストと同じ順序）
+
+    :rtype: List[ArticleBase]
+
+    :raises HTTPException: 記事が空・上限超過・必須項目が空の場合（400）、
+        データベースエラーが発生した場合（500）
+    """
+    if not blogs:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="作成する記事が指定されていません"
+        )
+    if len(blogs) > BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"一度に作成できる記事は{BULK_CREATE_MAX_ITEMS}件までです"
+        )
+    for index, blog in enumerate(blogs):
+        if blog.title is None or blog.title.strip() == "":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{index + 1}件目: タイトルは必須項目です"
+            )
+        if blog.body is None or blog.body.strip() == "":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{index + 1}件目: 本文は必須項目です"
+            )
+    try:
+        # 記事IDはまとめて採番する
+        article_ids = allocate_article_ids(db, len(blogs))
+        stamp = renderer_stamp()
+        now = datetime.utcnow()
+        params = [
+            {
+                "article_id": article_ids[index],
+                "title": blog.title,
+                "body": blog.body,
+                "body_html": render_markdown(blog.body),
+                "render_version": stamp,
+                "user_id": current_user.id,
+                "updated_at": now,
+            } for index, blog in enumerate(blogs)
+        ]
+        # 集計行の作成は記事の追加前に行う（追加した記事を二重に数えないため）
+        adjust_article_count(db, current_user.id, len(params))
+        rows = db.execute(
+            insert(Article).returning(
+                Article.id, Article.article_id, Article.title, Article.body,
+                Article.user_id, sort_by_parameter_order=True
+            ),
+            params
+        ).all()
+        # 一括INSERTではマッパーイベントが発生しないため、検索用インデックスを直接更新する
+        index_inserted_rows(db, rows)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error("記事の一括作成に失敗しました。user_id: %s, エラー: %s", current_user.id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="記事の一括作成に失敗しました"
+        )
+    articles_generation.bump()
+    logger.info(
+        "記事を一括作成しました。user_id: %s, %s件 (article_id: %s〜%s)",
+        current_user.id,
+        len(rows),
+        rows[0].article_id,
+        rows[-1].article_id
+    )
+    return [
+        ArticleBase(
+            article_id=row.article_id,
+            title=row.title,
+            body=row.body,
+            user_id=row.user_id
+        ) for row in rows
+    ]
+
+
 @router.post(
     "/articles",
     status_code=status.HTTP_201_CREATED,
     response_model=ArticleBase
 )
-async def update_article(
+def update_article(
     article_id: int,
     blog: ArticleBase,
     db: Session = Depends(get_db),
@@ -282,15 +488,13 @@ async def update_article(
             )
         update_blog.title = blog.title
         update_blog.body = blog.body
+        apply_rendered_body(update_blog)
         db.commit()
+        articles_generation.bump()
         db.refresh(update_blog)
-        print(
-            f"記事を更新しました。article_id: {article_id}, \
-            user_id: {current_user.id}")
+        logger.info("記事を更新しました。article_id: %s, user_id: %s", article_id, current_user.id)
     except ValueError as e:
-        print(
-            f"記事の更新に失敗しました。 \
-            article_id: {article_id}")
+        logger.warning("記事の更新に失敗しました。 article_id: %s", article_id)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Article not updated. article_id: {article_id}"
@@ -307,7 +511,7 @@ async def update_article(
     "/articles",
     status_code=status.HTTP_200_OK
 )
-async def delete_article(
+def delete_article(
     article_id: int,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
@@ -340,13 +544,13 @@ async def delete_article(
                 -> Article_id:{article_id}"
             )
         db.delete(delete_blog)
+        # 記事数の集計値を同じトランザクションで更新する
+        adjust_article_count(db, delete_blog.user_id, -1)
         db.commit()
-        print(f"記事を削除しました。article_id: {article_id}")
-        print(f"記事を削除しました。article_id: {article_id}")
+        articles_generation.bump()
+        logger.info("記事を削除しました。article_id: %s", article_id)
     except ValueError as e:
-        print(
-            f"記事の削除に失敗しました。article_id: {article_id}"
-        )
+        logger.warning("記事の削除に失敗しました。article_id: %s", article_id)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Article not deleted. article_id: {article_id}"
@@ -359,7 +563,7 @@ async def delete_article(
     status_code=status.HTTP_200_OK,
     response_model=List[PublicArticle]
 )
-async def get_public_articles(
+def get_public_articles(
     db: Session = Depends(get_db),
     limit: Optional[int] = Query(
         None, ge=1,
@@ -368,10 +572,31 @@ async def get_public_articles(
     skip: Optional[int] = Query(
         0, ge=0,
         description="スキップする記事数（ページネーション用）"
-    )
-) -> List[PublicArticle]:
+    ),
+    after: Optional[str] = Query(
+        None,
+        description="前ページのレスポンスヘッダーX-Next-Cursorの値（指定時はskipより優先）"
+    ),
+    stream: Optional[str] = Query(
+        None, pattern=STREAM_FORMAT_PATTERN,
+        description="ストリーミングで返す形式（json: JSON配列、ndjson: 1行1記事）"
+    ),
+    request: Request = None,  # type: ignore[assignment]
+    response: Response = None  # type: ignore[assignment]
+) -> List[PublicArticle] | Response:
     """認証なしでパブリック記事を取得するエンドポイント
 
+    次ページが存在する場合は、レスポンスヘッダー ``X-Next-Cursor`` に
+    次ページ取得用のカーソルを返す。カーソルを ``after`` に指定すると
+    記事IDでシークするため、深いページでも先頭ページと同じコストで取得できる。
+    記事の総数はレスポンスヘッダー ``X-Total-Count`` で返す。
+
+    記事数と最終更新日時から ``ETag`` / ``Last-Modified`` を返し、
+    ``If-None-Match`` / ``If-Modified-Since`` が一致する場合は記事を取得せずに304を返す。
+
+    ``stream`` を指定した場合は、記事を一定件数ずつ読み込みながら逐次返す
+    （次ページのカーソルは返さない）。
+
     :param db: データベースセッション
 
     :type db: Session
@@ -380,51 +605,104 @@ async def get_public_articles(
 
     :type limit: Optional[int]
 
-    :param skip: スキップする記事数
+    :param skip: スキップする記事数（互換性のため残している）
 
     :type skip: Optional[int]
 
-    :return: パブリック記事のリスト
+    :param after: 次ページ取得用のカーソル
 
-    :rtype: List[PublicArticle]
+    :type after: Optional[str]
+
+    :param stream: ストリーミングで返す形式（指定しない場合は通常のJSON）
 
-    :raises HTTPException: データベースエラーが発生した場合
+    :type stream: Optional[str]
+
+    :param request: 条件付きGETのヘッダー参照用のリクエスト
+
+    :type request: Request
+
+    :param response: レスポンスヘッダー設定用のレスポンス
+
+    :type response: Response
+
+    :return: パブリック記事のリスト（変更が無い場合は304レスポンス）
+
+    :rtype: List[PublicArticle] | Response
+
+    :raises HTTPException: カーソルが不正な場合やデータベースエラーが発生した場合
     """
+    cursor_id = decode_cursor(after) if after else None
     try:
-        # 記事の総数を取得
-        total_count = db.query(Article).count()
+        # 記事の総数を取得（集計値を使用するためCOUNT(*)は実行しない）
+        total_count = get_total_article_count(db)
+        # 記事数・最終更新日時・取得条件が同じであれば内容も同じ
+        last_modified = get_articles_last_modified(db)
+        # 最終更新日時が分からない場合（概算モード）は記事の作成・削除を検知できないため、
+        # ETag・Last-Modified を付けずに毎回内容を返す
+        if last_modified is not None:
+            etag = make_etag(
+                "articles", total_count, last_modified.isoformat(),
+                limit, skip, cursor_id, renderer_stamp()
+            )
+            if is_not_modified(request, etag, last_modified):
+                logger.debug("パブリック記事は更新されていません (304)")
+                return not_modified_response(etag, last_modified)
+            set_validators(response, etag, last_modified)
+        if response is not None:
+            response.headers[TOTAL_COUNT_HEADER] = str(total_count)
+        if is_stream_format(stream):
+            stmt = select(*PUBLIC_ARTICLE_COLUMNS) \
+                .order_by(Article.article_id.desc()).limit(limit)
+            if cursor_id is not None:
+                stmt = stmt.where(Article.article_id < cursor_id)
+            elif skip:
+                stmt = stmt.offset(skip)
+            logger.info("パブリック記事をストリーミングで返します。全%s件 (形式: %s)", total_count, stream)
+            return stream_query(
+                db.get_bind(), stmt, _to_public_article,
+                stream, forward_headers(response)
+            )
         # 記事ID順でソート
         query = db.query(Article).order_by(Article.article_id.desc())
-        # skipが指定されている場合
-        if skip:
+        if cursor_id is not None:
+            # カーソルが指定されている場合は記事IDでシーク
+            query = query.filter(Article.article_id < cursor_id)
+        elif skip:
+            # skipが指定されている場合
             query = query.offset(skip)
         # limitが指定されている場合
         if limit:
             query = query.limit(limit)
         public_articles = query.all()
-        # Markdown変換を行ってPublicArticleオブジェクトに変換
-        md = markdown.Markdown(extensions=['nl2br'])
-        result_articles = []
-        for article in public_articles:
-            body_html = md.convert(article.body)
-            result_articles.append(PublicArticle(
+        # 保存済みのHTMLを使用してPublicArticleオブジェクトに変換
+        result_articles = [
+            PublicArticle(
                 article_id=article.article_id,
                 title=article.title,
-                body_html=body_html
-            ))
+                body_html=get_article_html(article)
+            ) for article in public_articles
+        ]
+        cursor = next_cursor(
+            result_articles[-1].article_id if result_articles else None,
+            len(result_articles), limit
+        )
+        if cursor and response is not None:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
         if limit:
-            print(
-                f"パブリック記事を取得しました。 \
-                全{total_count}件中{len(result_articles)}件表示 "
-                f"(skip: {skip}, limit: {limit})"
+            logger.info(
+                "パブリック記事を取得しました。 全%s件中%s件表示 (skip: %s, limit: %s)",
+                total_count,
+                len(result_articles),
+                skip,
+                limit,
+                extra=SAMPLED
             )
         else:
-            print(
-                f"パブリック記事を全件取得しました。 \
-                全{total_count}件 (skip: {skip})"
+            logger.info(
+                "パブリック記事を全件取得しました。 全%s件 (skip: %s)", total_count, skip, extra=SAMPLED
             )
     except Exception as e:
-        print(f"パブリック記事の取得に失敗しました: {str(e)}")
+        logger.exception("パブリック記事の取得に失敗しました: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="記事の取得に失敗しました"
@@ -437,7 +715,7 @@ async def get_public_articles(
     status_code=status.HTTP_200_OK,
     response_model=List[PublicArticle]
 )
-async def search_public_articles(
+def search_public_articles(
     q: str = Query(..., min_length=1,
     description="検索キーワード（日本語対応）"),
     db: Session = Depends(get_db),
@@ -448,10 +726,28 @@ async def search_public_articles(
     skip: Optional[int] = Query(
         0, ge=0,
         description="スキップする記事数（ページネーション用）"
-    )
+    ),
+    after: Optional[str] = Query(
+        None,
+        description="前ページのレスポンスヘッダーX-Next-Cursorの値（指定時はskipより優先）"
+    ),
+    sort: str = Query(
+        SORT_NEWEST, pattern=f"^({SORT_NEWEST}|{SORT_RELEVANCE})$",
+        description="並び順（new: 新しい順、relevance: 関連度順）"
+    ),
+    response: Response = None  # type: ignore[assignment]
 ) -> List[PublicArticle]:
     """キーワードでパブリック記事を検索するエンドポイント（日本語対応）
 
+    全文検索インデックスが利用できる場合はインデックスを使用し、
+    利用できない場合はILIKEによる部分一致検索を行う。
+
+    次ページが存在する場合は、レスポンスヘッダー ``X-Next-Cursor`` に
+    次ページ取得用のカーソルを返す。検索結果の総数はレスポンスヘッダー
+    ``X-Total-Count`` で返す（カーソル指定時はカーソル以降の件数）。
+    ``sort=relevance`` の場合はカーソルを使用せず、skipでページを指定する。
+    全文検索インデックスを使用できずILIKE検索になる場合、``sort=relevance`` は400を返す。
+
     :param q: 検索キーワード（日本語・英語対応）
 
     :type q: str
@@ -464,58 +760,96 @@ async def search_public_articles(
 
     :type limit: Optional[int]
 
-    :param skip: スキップする記事数
+    :param skip: スキップする記事数（互換性のため残している）
 
     :type skip: Optional[int]
 
+    :param after: 次ページ取得用のカーソル
+
+    :type after: Optional[str]
+
+    :param sort: 並び順
+
+    :type sort: str
+
+    :param response: レスポンスヘッダー設定用のレスポンス
+
+    :type response: Response
+
     :return: 検索結果の記事リスト
 
     :rtype: List[PublicArticle]
 
-    :raises HTTPException: データベースエラーが発生した場合
+    :raises HTTPException: カーソルが不正な場合、関連度順を利用できない場合や
+        データベースエラーが発生した場合
     """
+    cursor_id = decode_cursor(after) \
+        if after and sort == SORT_NEWEST else None
     try:
         # URLデコードして日本語キーワードを正しく処理
         decoded_query = urllib.parse.unquote(q, encoding='utf-8')
         # 複数のキーワードに対応（スペース区切り）
         keywords = decoded_query.strip().split()
-        query = db.query(Article)
-        # 各キーワードでAND検索（タイトルまたは本文に含まれる）
-        for keyword in keywords:
-            search_filter = f"%{keyword}%"
-            query = query.filter(
-                or_(
-                    Article.title.ilike(search_filter),
-                    Article.body.ilike(search_filter)
-                )
+        # 同じ条件の検索結果がキャッシュにあればそのまま返す
+        cache_key = search_cache.make_key(
+            keywords, limit, skip or 0, cursor_id, sort,
+            normalize=uses_normalized_search(db.get_bind())
+        )
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            result_articles, total_count, cursor = cached
+            if response is not None:
+                response.headers[TOTAL_COUNT_HEADER] = str(total_count)
+                if cursor:
+                    response.headers[NEXT_CURSOR_HEADER] = cursor
+            logger.info(
+                "記事検索結果をキャッシュから返しました。キーワード: '%s'",
+                decoded_query,
+                extra=SAMPLED
             )
-        # 記事ID降順でソート
-        query = query.order_by(Article.article_id.desc())
-        # 検索結果の総数を取得
-        total_count = query.count()
-        # ページネーション適用
-        if skip:
-            query = query.offset(skip)
-        query = query.limit(limit)
-        search_results = query.all()
-        # Markdown変換を行ってPublicArticleオブジェクトに変換
-        md = markdown.Markdown(extensions=['nl2br'])
-        result_articles = []
-        for article in search_results:
-            body_html = md.convert(article.body)
-            result_articles.append(PublicArticle(
+            return list(result_articles)
+        generation = articles_generation.value
+        # 各キーワードでAND検索（タイトルまたは本文に含まれる）
+        # 検索結果と総数は1回のクエリで取得する
+        search_results, total_count, backend = search_articles(
+            db, keywords, limit, skip or 0, cursor_id, sort
+        )
+        if response is not None:
+            response.headers[TOTAL_COUNT_HEADER] = str(total_count)
+        # 保存済みのHTMLを使用してPublicArticleオブジェクトに変換
+        result_articles = [
+            PublicArticle(
                 article_id=article.article_id,
                 title=article.title,
-                body_html=body_html
-            ))
-        print(
-            f"記事検索を実行しました。キーワード: '{decoded_query}' "
-            f"(キーワード数: {len(keywords)}), "
-            f"検索結果: {len(result_articles)}件/{total_count}件 "
-            f"(skip: {skip}, limit: {limit})"
+                body_html=get_article_html(article)
+            ) for article in search_results
+        ]
+        # 関連度順の場合は記事IDでシークできないためカーソルを返さない
+        cursor = next_cursor(
+            result_articles[-1].article_id if result_articles else None,
+            len(result_articles), limit
+        ) if sort == SORT_NEWEST else None
+        if cursor and response is not None:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
+        search_cache.put(
+            cache_key, (tuple(result_articles), total_count, cursor), generation
+        )
+        logger.info(
+            "記事検索を実行しました。キーワード: '%s' (キーワード数: %s, 検索方式: %s), "
+            "検索結果: %s件/%s件 (skip: %s, limit: %s)",
+            decoded_query,
+            len(keywords),
+            backend,
+            len(result_articles),
+            total_count,
+            skip,
+            limit,
+            extra=SAMPLED
         )
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"記事検索に失敗しました。キーワード: '{q}', エラー: {str(e)}")
+        logger.exception("記事検索に失敗しました。キーワード: '%s', エラー: %s", q, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="記事検索に失敗しました"
@@ -523,17 +857,52 @@ async def search_public_articles(
     return result_articles
 
 
+@router.get(
+    "/public/articles/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+def export_public_articles(
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """全てのパブリック記事をNDJSON（1行1記事）で書き出すエンドポイント
+
+    記事を一定件数ずつ読み込みながら逐次返すため、
+    記事数に関係なくメモリ使用量は一定になる。記事ID昇順で返す。
+
+    :param db: データベースセッション
+
+    :type db: Session
+
+    :return: NDJSON形式のストリーミングレスポンス
+
+    :rtype: StreamingResponse
+    """
+    stmt = select(*PUBLIC_ARTICLE_COLUMNS).order_by(Article.article_id)
+    logger.info("パブリック記事のエクスポートを開始します")
+    return stream_query(
+        db.get_bind(), stmt, _to_public_article, "ndjson",
+        {"Content-Disposition": 'attachment; filename="articles.ndjson"'}
+    )
+
+
 @router.get(
     "/public/articles/{article_id}",
     status_code=status.HTTP_200_OK,
     response_model=PublicArticle
 )
-async def get_public_article_by_id(
+def get_public_article_by_id(
     article_id: int,
-    db: Session = Depends(get_db)
-) -> PublicArticle:
+    db: Session = Depends(get_db),
+    request: Request = None,  # type: ignore[assignment]
+    response: Response = None  # type: ignore[assignment]
+) -> PublicArticle | Response:
     """指定されたIDのパブリック記事を取得するエンドポイント
 
+    記事の更新日時から ``ETag`` / ``Last-Modified`` を返す。
+    条件付きGETの場合は更新日時のみを取得し、一致すれば本文を取得・変換せずに304を返す。
+
     :param article_id: 取得する記事のID
 
     :type article_id: int
@@ -542,41 +911,63 @@ async def get_public_article_by_id(
 
     :type db: Session
 
-    :return: 指定されたIDの記事詳細
+    :param request: 条件付きGETのヘッダー参照用のリクエスト
+
+    :type request: Request
+
+    :param response: レスポンスヘッダー設定用のレスポンス
 
-    :rtype: PublicArticle
+    :type response: Response
+
+    :return: 指定されたIDの記事詳細（変更が無い場合は304レスポンス）
+
+    :rtype: PublicArticle | Response
 
     :raises HTTPException: 記事が見つからない場合や取得エラーが発生した場合
     """
     try:
+        if request is not None and (
+            "if-none-match" in request.headers
+            or "if-modified-since" in request.headers
+        ):
+            # 更新日時のみを取得して判定する
+            row = db.execute(
+                select(Article.updated_at)
+                .where(Article.article_id == article_id)
+            ).first()
+            updated_at = row[0] if row is not None else None
+            if isinstance(updated_at, datetime):
+                etag = _article_etag(article_id, updated_at)
+                if is_not_modified(request, etag, updated_at):
+                    logger.debug("記事は更新されていません (304)。ID: %s", article_id)
+                    return not_modified_response(etag, updated_at)
         # 記事IDで記事を検索
         article = db.query(Article).filter \
         (Article.article_id == article_id).first()
         if not article:
-            print(
-                f"記事が見つかりません。ID: {article_id}"
-                )
+            logger.warning("記事が見つかりません。ID: %s", article_id)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"記事ID {article_id} の記事が見つかりません"
             )
-        # Markdown変換を行ってPublicArticleオブジェクトに変換
-        md = markdown.Markdown(extensions=['nl2br'])
-        body_html = md.convert(article.body)
+        # 保存済みのHTMLを使用してPublicArticleオブジェクトに変換
         result_article = PublicArticle(
             article_id=article.article_id,
             title=article.title,
-            body_html=body_html
+            body_html=get_article_html(article)
         )
-        print(
-            f"記事詳細を取得しました。ID: {article_id}, \
-            タイトル: {article.title}"
+        if isinstance(article.updated_at, datetime):
+            set_validators(
+                response, _article_etag(article_id, article.updated_at),
+                article.updated_at
             )
+        logger.info(
+            "記事詳細を取得しました。ID: %s, タイトル: %s", article_id, article.title, extra=SAMPLED
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        print(
-            f"記事詳細の取得に失敗しました。 \
-            ID: {article_id}, エラー: {str(e)}"
-            )
+        logger.exception("記事詳細の取得に失敗しました。 ID: %s, エラー: %s", article_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="記事詳細の取得に失敗しました"
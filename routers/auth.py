@@ -1,21 +1,28 @@
 """認証機能を実装するためのルーターモジュール"""
-from typing import List, Set, Dict, Generator, Optional
-from jose import JWTError, jwt
-from fastapi import APIRouter, Depends, status, HTTPException
+import time
+from typing import Any, List, Dict, Generator, Optional
+from jose import JWTError
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Response
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 import logging
 from typing import Optional
 
 from schemas import ShowArticle, PasswordChange
-from database import session, get_db
+from database import engine, session, get_db, run_db
 from hashing import Hash
-from custom_token import create_access_token
+from custom_token import ALGORITHM, SECRET_KEY, TokenConfig, TokenType, create_access_token
 from models import User, Article
 from oauth2 import get_current_user
-from utils.email_sender import send_registration_complete_email
+from utils.email_outbox import email_outbox_worker, enqueue_email
 from utils.email_validator import is_valid_email_domain
+from utils.token_cache import decode_token, token_payload_cache
+from utils.token_revocation import token_id, token_revocation_store
+from utils.user_cache import user_cache
+from utils.streaming import STREAM_FORMAT_PATTERN, is_stream_format, stream_query
 from exceptions import DatabaseConnectionError
+from logger.structured_logger import get_logger
 
 
 # 認証レスポンスの型定義
@@ -51,6 +58,8 @@ router = APIRouter(
     tags=["auth"],
 )
 
+logger = get_logger(__name__)
+
 
 @router.post('/login')
 async def login(
@@ -87,78 +96,89 @@ async def login(
     :return: アクセストークンを返します。token_type:bearer
     :rtype: dict
     :raises HTTPException: ユーザー名またはパスワードが無効な場合
+    :raises PasswordHashBusyError: パスワード検証の待ち行列が上限に達している場合（503）
     """
 
 
     # メールドメインの検証
     if not is_valid_email_domain(request.username):
-        print(
-            f"許可されていないドメインです: {request.username}"
-            )
+        logger.warning("許可されていないドメインです: %s", request.username)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"無効なユーザー名です"
         )
 
-    user = db.query(User).filter(User.email == request.username).first()
+    user = await run_db(
+        lambda: db.query(User).filter(User.email == request.username).first()
+    )
     if not user:
-        print(
-            f"無効なユーザー名です: {request.username}"
-            )
+        logger.warning("無効なユーザー名です: %s", request.username)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"無効なユーザー名です"
         )
-    if not user.password or not Hash.verify(
+    if not user.password or not await Hash.verify_async(
         request.password,
         user.password
     ):
-        print(
-            f"無効なパスワードです: {request.password}"
-        )
+        logger.warning("無効なパスワードです: %s", request.username)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="無効なパスワードです"
         )
     try:
         access_token = create_access_token(
-            data={"sub": user.email or "", "id": user.id}
+            data={"sub": user.email or "", "id": user.id},
+            token_version=user.token_version
         )
     except RuntimeError as token_error:
-        print(
-            f"アクセストークンの生成に失敗しました: {str(token_error)}"
-            )
+        logger.error("アクセストークンの生成に失敗しました: %s", token_error)
         raise HTTPException(
             status_code=status.HTTP_504_GATEWAY_TIMEOUT,
             detail="アクセストークンの生成に失敗しました"
         )
     except Exception as unexpected_error:
-        print(
-            f"予期しないエラーが発生しました: {str(unexpected_error)}"
-            )
+        logger.exception("予期しないエラーが発生しました: %s", unexpected_error)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="アクセストークンの生成に失敗しました"
         )
     try:
-        db.commit()
+        await run_db(db.commit)
     except Exception as db_error:
-        db.rollback()
-        print(
-            f"DBセッションのコミットに失敗しました: {str(db_error)}"
-            )
+        await run_db(db.rollback)
+        logger.error("DBセッションのコミットに失敗しました: %s", db_error)
         raise DatabaseConnectionError(
             message="データベースエラーが発生しました"
         )
-    print(
-        f"ログインに成功しました: {user.email}"
-        )
+    logger.info("ログインに成功しました: %s", user.email)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 # OAuth2スキームを定義
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
-token_blacklist: Set[str] = set()
+
+
+def _decode_bearer_token(token: str) -> Dict[str, Any]:
+    """設定された鍵・アルゴリズムでトークンを検証し、ペイロードを返す
+
+    :param token: 認証トークン
+    :type token: str
+    :return: トークンのペイロード
+    :rtype: Dict[str, Any]
+    :raises HTTPException: トークンが無効な場合、またはSECRET_KEYが設定されていない場合
+    """
+    invalid_token = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="無効なトークンです"
+    )
+    if SECRET_KEY is None:
+        logger.error("SECRET_KEYが設定されていません")
+        raise invalid_token
+    try:
+        return decode_token(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise invalid_token
 
 
 def verify_token(
@@ -180,28 +200,19 @@ def verify_token(
 
     :raises HTTPException: トークンが無効化されている場合
     """
-    if token in token_blacklist:
+    payload = _decode_bearer_token(token)
+    if token_revocation_store.is_revoked(engine, token_id(token, payload)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="トークンが無効化されています"
         )
-    try:
-        # トークンの検証ロジックを実装
-        payload = jwt.decode(
-            token, "SECRET_KEY", algorithms=["HS256"]
-            )
-        email = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="無効なトークンです"
-            )
-        return {"email": email}
-    except JWTError:
+    email = payload.get("sub")
+    if email is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="無効なトークンです"
         )
+    return {"email": email}
 
 
 @router.post(
@@ -210,7 +221,8 @@ def verify_token(
 async def logout(
     token: str = Depends(
         oauth2_scheme
-        )
+        ),
+    db: Session = Depends(get_db)
     ) -> Dict[str, str]:
     """ログアウトエンドポイント:http://<環境のURL>/api/v1/logout
 
@@ -230,42 +242,118 @@ async def logout(
         }
 
     エラー時：
-    401 Unauthorized：トークンが無効な場合
-    422 Unprocessable Entity：トークンが既に無効化されている場合::
+    401 Unauthorized：トークンが無効な場合::
 
         {
-            "detail": "トークンが無効化されています"
+            "detail": "無効なトークンです"
         }
 
+    トークンのID（jti）を有効期限まで revoked_tokens テーブルに記録し、
+    全てのワーカープロセスで無効化する（utils.token_revocation）。
+
     :param token: 認証トークン（ヘッダーから自動取得）
     :type token: str
+    :param db: データベースセッション
+    :type db: Session
     :raises HTTPException: トークンが無効な場合
     :return: ログアウト結果メッセージ
     :rtype: dict
     """
-    # トークンをブラックリストに追加して無効化
-    token_blacklist.add(token)
-    print("ログアウトに成功しました")
+    payload = _decode_bearer_token(token)
+    # 有効期限の無いトークンは、アクセストークンの既定の有効期限まで無効化する
+    expires_at = payload.get("exp") or (
+        time.time() + TokenConfig.DEFAULT_EXPIRES[TokenType.ACCESS].total_seconds()
+    )
+    await run_db(
+        token_revocation_store.revoke, db.get_bind().engine, token_id(token, payload), expires_at
+    )
+    token_payload_cache.discard(token)
+    logger.info("ログアウトに成功しました")
     return {"message": "ログアウトしました"}
 
 
+def _bump_token_version(db: Session, user_id: int) -> None:
+    """ユーザーのトークンの世代を1つ進める（同時に実行しても取りこぼさないようSQLで加算する）"""
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+    )
+    db.commit()
+
+
+@router.post(
+    '/logout-all'
+    )
+async def logout_all(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+    ) -> Dict[str, str]:
+    """全端末からのログアウトエンドポイント:http://<環境のURL>/api/v1/logout-all
+
+    リクエストヘッダー::
+
+        Authorization: Bearer <token>
+
+    レスポンス：成功時(200 OK), 失敗時(401 Unauthorized)::
+
+        {
+            "message": "全ての端末からログアウトしました"
+        }
+
+    ユーザーの token_version を1つ進め、それまでに発行した全てのトークン
+    （ver クレームが古いもの）を無効にする。トークンごとの記録は行わない。
+    他のワーカープロセスでは、ユーザーのキャッシュが期限切れになるまで
+    （最大 USER_CACHE_MAX_STALENESS 秒）古いトークンを受け付ける場合がある。
+
+    :param current_user: 認証済みユーザー
+    :type current_user: User
+    :param db: データベースセッション
+    :type db: Session
+    :return: ログアウト結果メッセージ
+    :rtype: dict
+    """
+    await run_db(_bump_token_version, db, current_user.id)
+    user_cache.invalidate(current_user.id)
+    logger.info("全ての端末からログアウトしました: user_id=%s", current_user.id)
+    return {"message": "全ての端末からログアウトしました"}
+
+
 @router.get(
     "/article",
     response_model=List[ShowArticle]
     )
-async def get_all_blogs(
-    db: Session = Depends(get_db)
-) -> List[ShowArticle]:
+def get_all_blogs(
+    db: Session = Depends(get_db),
+    stream: Optional[str] = Query(
+        None, pattern=STREAM_FORMAT_PATTERN,
+        description="ストリーミングで返す形式（json: JSON配列、ndjson: 1行1記事）"
+        )
+) -> List[ShowArticle] | Response:
     """ログインユーザの全ての記事を取得するエンドポイント
 
+    ``stream`` を指定した場合は、記事を一定件数ずつ読み込みながら逐次返すため、
+    記事数に関係なくメモリ使用量は一定になる。
+
     :param db: データベースセッション
 
     :type db: Session
 
-    :return: 記事のリスト
+    :param stream: ストリーミングで返す形式（指定しない場合は通常のJSON）
+
+    :type stream: Optional[str]
 
-    :rtype: List[ShowArticle]
+    :return: 記事のリスト（ストリーミング時はStreamingResponse）
+
+    :rtype: List[ShowArticle] | Response
     """
+    if is_stream_format(stream):
+        stmt = select(Article.id, Article.title, Article.body).order_by(Article.id)
+        return stream_query(
+            db.get_bind(), stmt,
+            lambda row: ShowArticle(id=row.id, title=row.title, body=row.body),
+            stream
+        )
     articles = db.query(Article).all()
     return [
         ShowArticle(
@@ -282,42 +370,52 @@ async def change_password(
     db: Session = Depends(get_db)
 ) -> PasswordChangeResponse:
     """仮パスワードから新パスワードへの変更を行うエンドポイント（認証不要）"""
-    print(f"Password change attempt for username: {request.username}")
+    logger.info("Password change attempt for username: %s", request.username)
 
     # ユーザーの存在確認
-    user = db.query(User).filter(User.email == request.username).first()
+    user = await run_db(
+        lambda: db.query(User).filter(User.email == request.username).first()
+    )
     if not user:
-        print(
-            f"User not found: {request.username}"
-            )
+        logger.warning("User not found: %s", request.username)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="ユーザーが見つかりません"
         )
 
     # 仮パスワードの検証
-    if not user.password or not Hash.verify(request.temp_password, user.password):
-        print(
-            f"Invalid temporary password for user: {request.username}"
-            )
+    if not user.password or not await Hash.verify_async(request.temp_password, user.password):
+        logger.warning("Invalid temporary password for user: %s", request.username)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="仮パスワードが無効です"
         )
 
     # 新しいパスワードのハッシュ化と更新
-    hashed_new_password = Hash.bcrypt(request.new_password)
+    hashed_new_password = await Hash.bcrypt_async(request.new_password)
     user.password = hashed_new_password
+    # 変更前のパスワードで発行したトークンを全て無効にする
+    user.token_version = User.token_version + 1
+    # 登録完了メールはパスワードの変更と同じトランザクションで送信待ちに追加する
+    if user.email:
+        user_name = user.name if user.name else user.email.split('@')[0]
+        enqueue_email(db, "registration_complete", user.email, username=user_name)
 
     try:
-        db.commit()
-        print(f"Password changed successfully for user: {request.username}")
+        await run_db(db.commit)
+        email_outbox_worker.notify()
+        # 変更前のユーザー情報で認証が続かないよう、キャッシュを無効化する
+        user_cache.invalidate(user.id)
+        # コミットで失効した属性は、イベントループ外で再読み込みする
+        await run_db(db.refresh, user)
+        logger.info("Password changed successfully for user: %s", request.username)
 
         # 新しいアクセストークンを生成
         access_token = create_access_token(
-            data={"sub": user.email or "", "id": user.id}
+            data={"sub": user.email or "", "id": user.id},
+            token_version=user.token_version
         )
-        print(f"New access token created for user: {request.username}")
+        logger.debug("New access token created for user: %s", request.username)
 
         # レスポンスデータの初期化
         response_data: PasswordChangeResponse = {
@@ -327,59 +425,17 @@ async def change_password(
             "token_type": "bearer",
             "email_sent": False
         }
-        # メール送信処理（改善されたエラーハンドリング）
-        email_error_details: Optional[str] = None
+        # 登録完了メールはワーカーが送信する（送信待ちに追加した場合は email_sent をTrueにする）
         if user.email:
-            try:
-                user_name = user.name if user.name else user.email.split('@')[0]
-                await send_registration_complete_email(user.email, user_name)
-                print(
-                    f"Registration complete email sent successfully to: {user.email}"
-                    )
-                response_data["email_sent"] = True
-            except ConnectionError as conn_error:
-                error_msg = "メールサーバーに接続できませんでした"
-                email_error_details = f"Connection error: {str(conn_error)}"
-                print(
-                    f"Email connection error for {user.email}: {conn_error}"
-                    )
-            except TimeoutError as timeout_error:
-                error_msg = "メール送信がタイムアウトしました"
-                email_error_details = f"Timeout error: {str(timeout_error)}"
-                print(
-                    f"Email timeout error for {user.email}: {timeout_error}"
-                    )
-            except ValueError as value_error:
-                error_msg = "無効なメールアドレスです"
-                email_error_details = f"Invalid email format: {str(value_error)}"
-                print(
-                    f"Invalid email format for {user.email}: {value_error}"
-                    )
-            except Exception as email_error:
-                error_msg = "メール送信中に予期しないエラーが発生しました"
-                email_error_details = f"Unexpected error: {str(email_error)}"
-                print(
-                    f"Unexpected email error for {user.email}: {email_error}"
-                    )
-            # メール送信エラーの場合の処理
-            if email_error_details:
-                response_data["email_sent"] = False
-                response_data["email_error"] = error_msg
-                # 詳細なエラー情報はログに記録し、ユーザーには一般的なメッセージを返す
-                print(
-                    f"Email sending failed for {user.email}: {email_error_details}"
-                    )
+            response_data["email_sent"] = True
+            logger.info("Registration complete email queued for: %s", user.email)
         else:
-            print(
-                f"No email address for user: {request.username}"
-                )
+            logger.warning("No email address for user: %s", request.username)
             response_data["email_error"] = "ユーザーにメールアドレスが設定されていません"
         return response_data
     except Exception as db_error:
-        db.rollback()
-        print(
-            f"Database error during password change for {request.username}: {str(db_error)}"
-            )
+        await run_db(db.rollback)
+        logger.error("Database error during password change for %s: %s", request.username, db_error)
         # データベースエラーの種類に応じた詳細なエラーハンドリング
         if "constraint" in str(db_error).lower():
             error_detail = "データベース制約違反が発生しました"
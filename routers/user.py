@@ -1,5 +1,4 @@
 """ユーザ認証機能を実装するためのルーターモジュール"""
-import traceback
 import os
 from typing import Dict, Any, Optional
 from fastapi import APIRouter, status, HTTPException, Depends, Query
@@ -12,12 +11,16 @@ from schemas import User as UserSchema, AccountDeletionRequest
 from pydantic import BaseModel
 from models import User as UserModel
 from models import EmailVerification
-from database import get_db
+from database import get_db, run_db
 from hashing import Hash
 from oauth2 import get_current_user
-from utils.email_sender import send_verification_email, send_account_deletion_email
+from utils.email_outbox import email_outbox_worker, enqueue_email
 from utils.email_validator import is_valid_email_domain
-from exceptions import UserNotFoundError, EmailVerificationError, DatabaseError
+from utils.article_stats import adjust_article_count
+from utils.search_cache import articles_generation
+from utils.user_cache import user_cache
+from exceptions import UserNotFoundError, EmailVerificationError, DatabaseError, PasswordHashBusyError
+from logger.structured_logger import get_logger
 
 
 class IntegrityError(Exception):
@@ -45,6 +48,8 @@ router = APIRouter(
     tags=["user"],
 )
 
+logger = get_logger(__name__)
+
 
 # 環境変数の読み込む
 ALLOWED_EMAIL_DOMAINS_RAW = os.getenv("ALLOWED_EMAIL_DOMAINS", "")
@@ -75,33 +80,35 @@ async def create_user(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="メールアドレスが必要です。"
             )
-        print(f"ユーザー作成開始 - メール: {user.email}")
+        logger.info("ユーザー作成開始 - メール: %s", user.email)
 
         # ドメイン制限チェック
         if ENABLE_DOMAIN_RESTRICTION and not is_valid_email_domain(user.email):
-            print(f"ドメイン検証失敗 - メール: {user.email}")
+            logger.warning("ドメイン検証失敗 - メール: %s", user.email)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"このメールアドレスのドメインは許可されていません。"
             )
         # メールアドレスの重複チェック
-        existing_user = db.query(UserModel).filter(
-            UserModel.email == user.email
-        ).first()
+        existing_user = await run_db(
+            lambda: db.query(UserModel).filter(
+                UserModel.email == user.email
+            ).first()
+        )
 
         if existing_user:
-            print(
-                f"既存のメールアドレスが検出されました: {user.email}"
-                )
+            logger.info("既存のメールアドレスが検出されました: %s", user.email)
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="このメールアドレスは既に使用されています。"
             )
         # メール認証が有効な場合の従来の処理
         if ENABLE_EMAIL_VERIFICATION:
-            existing_verification = db.query(EmailVerification).filter(
-                EmailVerification.email == user.email
-            ).first()
+            existing_verification = await run_db(
+                lambda: db.query(EmailVerification).filter(
+                    EmailVerification.email == user.email
+                ).first()
+            )
 
             if existing_verification:
                 if existing_verification.is_verified:
@@ -115,19 +122,15 @@ async def create_user(
                     existing_verification.created_at = datetime.utcnow()
                     existing_verification.expires_at = datetime.utcnow() + timedelta(hours=24)
                     verification = existing_verification
-                    print(
-                        f"既存の確認レコードを更新しました: {user.email}"
-                        )
+                    logger.info("既存の確認レコードを更新しました: %s", user.email)
             else:
                 verification = EmailVerification.create_verification(user.email)
                 db.add(verification)
-                print(
-                    f"新しい確認レコードを作成しました: {user.email}"
-                    )
-            db.commit()
-            await send_verification_email(
-                user.email, verification.token
-                )
+                logger.info("新しい確認レコードを作成しました: %s", user.email)
+            # 確認メールは確認レコードと同じトランザクションで送信待ちに追加する
+            enqueue_email(db, "verification", user.email, token=verification.token)
+            await run_db(db.commit)
+            email_outbox_worker.notify()
             return {
                 "message": "ユーザー登録を受け付けました。確認メールをお送りしましたので、 \
                 メール内のリンクをクリックして登録を完了してください。",
@@ -145,15 +148,13 @@ async def create_user(
             new_user = UserModel(
                 name=user.name if hasattr(user, 'name') and user.name else user.email.split('@')[0],
                 email=user.email,
-                password=Hash.bcrypt(temp_password),
+                password=await Hash.bcrypt_async(temp_password),
                 is_active=True
             )
             db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
-            print(
-                f"ユーザーを直接作成しました: {user.email}"
-                )
+            await run_db(db.commit)
+            await run_db(db.refresh, new_user)
+            logger.info("ユーザーを直接作成しました: %s", user.email)
             return {
                 "message": "ユーザー登録が完了しました。 \
                 仮パスワード 'temp_password_123' でログインして、パスワードを変更してください。",
@@ -161,29 +162,24 @@ async def create_user(
                 "id": str(new_user.id),
                 "is_active": str(new_user.is_active)
             }
+    except PasswordHashBusyError:
+        await run_db(db.rollback)
+        raise
     except DatabaseError as e:
-        db.rollback()
-        error_detail = traceback.format_exc()
-        print(
-            f"データベースエラーが発生しました: {error_detail}"
-            )
+        await run_db(db.rollback)
+        logger.exception("データベースエラーが発生しました")
         raise DatabaseError(
             message="データベースで予期しないエラーが発生しました。"
         )
     except Exception as e:
-        db.rollback()
-        error_detail = traceback.format_exc()
-        print(
-            f"登録済みのメールアドレスでエラーが入力されました。: {error_detail}"
-            )
+        await run_db(db.rollback)
+        logger.exception("登録済みのメールアドレスでエラーが入力されました。")
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="このメールアドレスは既に登録済です。"
         )
     finally:
-        print(
-            "DBセッションをクローズします"
-            )
+        logger.debug("DBセッションをクローズします")
         db.close()
 
 
@@ -196,34 +192,22 @@ async def verify_email(
     token: str = Query(...),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
-    print(f"メール認証リクエスト受信 - 元のトークン: {token}")
     # URLデコード処理（安全性を確保）
     decoded_token = unquote(token)
-    print(
-        f"メール認証リクエスト受信 - デコード後トークン: {decoded_token}"
-        )
+    logger.info("メール認証リクエスト受信 - トークン: %s...", decoded_token[:8])
     if not decoded_token or len(decoded_token) < 10:
-        print(f"無効なトークン形式: {decoded_token}")
+        logger.warning("無効なトークン形式: %s...", decoded_token[:8])
         raise HTTPException(
             status_code=400,
             detail="無効なトークン形式です。"
         )
-    verification = db.query(EmailVerification).filter(
-        EmailVerification.token == decoded_token
-    ).first()
-    # データベース内の全トークンを確認
+    verification = await run_db(
+        lambda: db.query(EmailVerification).filter(
+            EmailVerification.token == decoded_token
+        ).first()
+    )
     if not verification:
-        all_verifications = db.query(EmailVerification).all()
-        print(
-            f"データベース内のトークン数: {len(all_verifications)}"
-            )
-        for v in all_verifications:
-            print(
-                f"DB内トークン: {v.token[:20]}..., Email: {v.email}, 確認済み: {v.is_verified}"
-                )
-        print(
-            f"トークンが見つかりません: {decoded_token[:20]}..."
-            )
+        logger.warning("トークンが見つかりません: %s...", decoded_token[:8])
         raise HTTPException(
             status_code=400,
             detail="無効なトークンです。"
@@ -239,7 +223,7 @@ async def verify_email(
             detail="トークンの有効期限が切れています。"
         )
     # 初期パスワード（固定値を使用）
-    user_password = Hash.bcrypt("temp_password_123")
+    user_password = await Hash.bcrypt_async("temp_password_123")
 
     # ユーザーの作成
     new_user = UserModel(
@@ -250,8 +234,8 @@ async def verify_email(
     )
     verification.is_verified = True
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_db(db.commit)
+    await run_db(db.refresh, new_user)
 
     return {
         "message": "メールアドレスの確認が完了しました。仮パスワードを変更して登録を完了してください。",
@@ -267,7 +251,7 @@ async def verify_email(
     summary="Get User (Authentication Required)",
     description="認証が必要なユーザー情報取得エンドポイント。ユーザーは自分自身の情報のみ取得可能。"
 )
-async def show_user(
+def show_user(
     user_id: int,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
@@ -286,10 +270,7 @@ async def show_user(
     """
     # 認証されたユーザーが自分以外の情報にアクセスしようとしていないかチェック
     if current_user.id != user_id:
-        print(
-            f"User {current_user.id} \
-            tried to access user {user_id}'s information"
-            )
+        logger.warning("User %s tried to access user %s's information", current_user.id, user_id)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="他のユーザーの情報にはアクセスできません"
@@ -297,17 +278,12 @@ async def show_user(
 
     user = db.query(UserModel).filter(UserModel.id == user_id).first()
     if not user:
-        print(
-            f"User with id {user_id} not found"
-            )
+        logger.info("User with id %s not found", user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with id {user_id} not found"
         )
-    print(
-        f"認証されたユーザー {current_user.id} \
-        がユーザー情報を取得しました: {user_id}"
-        )
+    logger.info("認証されたユーザー %s がユーザー情報を取得しました: %s", current_user.id, user_id)
     # SQLAlchemyモデルをPydanticスキーマに変換
     return UserSchema(
         email=user.email,
@@ -334,10 +310,11 @@ async def resend_verification_email(
         target_email = request.email
         # 認証されたユーザーが自分のメールアドレスでのみリクエスト可能にする
         if hasattr(current_user, 'email') and current_user.email != request.email:
-            print(
-                f"権限なし: 認証ユーザー({current_user.email}) \
-                が他のユーザー({request.email})の確認メール再送信を試行"
-                )
+            logger.warning(
+                "権限なし: 認証ユーザー(%s) が他のユーザー(%s)の確認メール再送信を試行",
+                current_user.email,
+                request.email
+            )
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="自分のメールアドレスのみ確認メール再送信が可能です"
@@ -347,10 +324,12 @@ async def resend_verification_email(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="メールアドレスまたはリクエストボディが必要です"
         )
-    verification = db.query(EmailVerification).filter(
-        EmailVerification.email == target_email,
-        EmailVerification.is_verified == False
-    ).first()
+    verification = await run_db(
+        lambda: db.query(EmailVerification).filter(
+            EmailVerification.email == target_email,
+            EmailVerification.is_verified == False
+        ).first()
+    )
 
     if not verification:
         raise HTTPException(
@@ -361,8 +340,10 @@ async def resend_verification_email(
     verification.token = str(uuid4())
     verification.created_at = datetime.utcnow()
     verification.expires_at = datetime.utcnow() + timedelta(hours=24)
-    db.commit()
-    await send_verification_email(target_email, verification.token)
+    new_token = verification.token
+    enqueue_email(db, "verification", target_email, token=new_token)
+    await run_db(db.commit)
+    email_outbox_worker.notify()
     return {"message": "確認メールを再送信しました。"}
 
 
@@ -396,30 +377,27 @@ async def delete_user_account(
     :raises HTTPException: ユーザーが見つからない場合
     """
     try:
-        print(
-            f"退会処理開始 - メール: \
-            {deletion_request.email}, \
-            認証ユーザー: {current_user.email}"
-            )
+        logger.info("退会処理開始 - メール: %s, 認証ユーザー: %s", deletion_request.email, current_user.email)
         deletion_request.validate_passwords_match()
         # 認証されたユーザーが削除対象のユーザーと同じかチェック
         if current_user.email != deletion_request.email:
-            print(
-                f"権限なし: 認証ユーザー({current_user.email}) \
-                が他のユーザー({deletion_request.email})のアカウント削除を試行"
-                )
+            logger.warning(
+                "権限なし: 認証ユーザー(%s) が他のユーザー(%s)のアカウント削除を試行",
+                current_user.email,
+                deletion_request.email
+            )
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="自分のアカウントのみ削除できます"
             )
         # ユーザーの存在確認
-        user = db.query(UserModel).filter(
-            UserModel.email == deletion_request.email
-        ).first()
+        user = await run_db(
+            lambda: db.query(UserModel).filter(
+                UserModel.email == deletion_request.email
+            ).first()
+        )
         if not user:
-            print(
-                f"退会対象ユーザーが見つかりません: {deletion_request.email}"
-                )
+            logger.warning("退会対象ユーザーが見つかりません: %s", deletion_request.email)
             raise UserNotFoundError(
                 user_id=None,
                 email=deletion_request.email
@@ -430,10 +408,8 @@ async def delete_user_account(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="ユーザーのパスワードが設定されていません"
             )
-        if not Hash.verify(deletion_request.password, user.password):
-            print(
-                f"パスワード検証失敗: {deletion_request.email}"
-                )
+        if not await Hash.verify_async(deletion_request.password, user.password):
+            logger.warning("パスワード検証失敗: %s", deletion_request.email)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="パスワードが正しくありません"
@@ -446,116 +422,88 @@ async def delete_user_account(
             )
         username = user.email.split('@')[0]
         user_email = user.email
-        print(
-            f"ユーザー検証完了: {user_email}, ID: {user.id}"
-            )
+        logger.info("ユーザー検証完了: %s, ID: %s", user_email, user.id)
         # ユーザーの記事を削除
         try:
             from models import Article
-            print(
-                f"記事削除処理開始: ユーザーID {user.id}"
-                )
-            articles = db.query(Article) \
-            .filter(Article.user_id == user.id).all()
+            logger.debug("記事削除処理開始: ユーザーID %s", user.id)
+            articles = await run_db(
+                lambda: db.query(Article)
+                .filter(Article.user_id == user.id).all()
+            )
             article_count = len(articles)
 
             for article in articles:
                 db.delete(article)
-            print(
-                f"ユーザーの記事を削除しました: {article_count}件"
-                )
+            # 全体の記事数を同じトランザクションで更新する
+            # （ユーザー自身の記事数はユーザー削除により不要になる）
+            await run_db(adjust_article_count, db, None, -article_count)
+            logger.info("ユーザーの記事を削除しました: %s件", article_count)
         except Exception as article_error:
-            print(
-                f"記事削除処理でエラー: {str(article_error)}"
-                )
+            logger.error("記事削除処理でエラー: %s", article_error)
             raise
         # メール認証テーブルからも削除
         try:
-            print(
-                f"メール認証レコード削除処理開始: {user_email}"
-                )
-            verification_records = db.query(EmailVerification).filter(
-                EmailVerification.email == user_email
-            ).all()
+            logger.debug("メール認証レコード削除処理開始: %s", user_email)
+            verification_records = await run_db(
+                lambda: db.query(EmailVerification).filter(
+                    EmailVerification.email == user_email
+                ).all()
+            )
 
             for verification in verification_records:
                 db.delete(verification)
-            print(
-                f"メール認証レコードを削除しました: \
-                {len(verification_records)}件"
-                )
+            logger.info("メール認証レコードを削除しました: %s件", len(verification_records))
         except Exception as verification_error:
-            print(
-                f"メール認証レコード削除処理でエラー: {str(verification_error)}"
-                )
+            logger.error("メール認証レコード削除処理でエラー: %s", verification_error)
             raise
         # ユーザー削除とコミット
         try:
-            print(
-                f"ユーザー削除処理開始: {user_email}"
-                )
+            logger.debug("ユーザー削除処理開始: %s", user_email)
+            deleted_user_id = user.id
             db.delete(user)
-            db.commit()
-            print(
-                f"ユーザーアカウント削除完了: {user_email}"
-                )
+            # 退会完了メールは削除と同じトランザクションで送信待ちに追加する
+            enqueue_email(db, "account_deletion", user_email, username=username)
+            await run_db(db.commit)
+            email_outbox_worker.notify()
+            # 削除した記事が検索結果のキャッシュに残らないよう無効化する
+            articles_generation.bump()
+            # 退会したユーザーのトークンで認証が通らないよう無効化する
+            user_cache.invalidate(deleted_user_id)
+            logger.info("ユーザーアカウント削除完了: %s", user_email)
         except Exception as commit_error:
-            print(
-                f"データベースコミット処理でエラー: {str(commit_error)}"
-                )
+            logger.error("データベースコミット処理でエラー: %s", commit_error)
             raise
-        # 退会完了メールを送信（メール送信失敗はログのみ）
-        try:
-            await send_account_deletion_email(user_email, username)
-            print(
-                f"退会完了メールを送信しました: {user_email}"
-                )
-            return {
-                "message": "退会処理が完了しました。",
-                "deleted_articles_count": str(article_count),
-                "email": user_email
-            }
-        except Exception as email_error:
-            print(
-                f"退会完了メールの送信に失敗しました: {str(email_error)}"
-                )
-            # データベースの削除は成功しているので、メール送信失敗でも処理は完了とする
-            return {
-                "message": "退会処理が完了しました。メール送信に失敗しましたが、アカウントは正常に削除されました。",
-                "deleted_articles_count": str(article_count),
-                "email": user_email
-            }
+        return {
+            "message": "退会処理が完了しました。",
+            "deleted_articles_count": str(article_count),
+            "email": user_email
+        }
     except UserNotFoundError as e:
-        db.rollback()
-        print(f"ユーザーが見つかりません: {str(e)}")
+        await run_db(db.rollback)
+        logger.warning("ユーザーが見つかりません: %s", e)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="指定されたメールアドレスのユーザーが見つかりません"
         )
     except ValueError as e:
-        db.rollback()
-        print(f"バリデーションエラー: {str(e)}")
+        await run_db(db.rollback)
+        logger.warning("バリデーションエラー: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     # パスワードが設定されていないケースと不一致のケースを明示的に処理
     except HTTPException:
-        db.rollback()
+        await run_db(db.rollback)
         raise
     except Exception as e:
-        db.rollback()
-        error_detail = traceback.format_exc()
-        print(
-            f"退会処理で予期しないエラーが発生しました: \
-            {error_detail}, {str(e)}"
-            )
+        await run_db(db.rollback)
+        logger.exception("退会処理で予期しないエラーが発生しました: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="退会処理中に予期しないエラーが発生しました"
         )
     finally:
-        print(
-            "DBセッションをクローズします"
-            )
+        logger.debug("DBセッションをクローズします")
         db.close()
\ No newline at end of file
@@ -3,7 +3,8 @@ from typing import Optional, Any
 from pydantic import BaseModel, Field, ConfigDict, EmailStr, computed_field
 from fastapi import Request
 from fastapi.exceptions import RequestValidationError
-import markdown
+
+from utils.markdown_renderer import render_markdown
 
 
 class LengthMismatchError(Exception):
@@ -42,10 +43,7 @@ class ArticleBase(BaseModel, validate_assignment=True):
         :return: HTML形式の本文
         :rtype: str
         """
-        # 改行を<br>タグに変換し、見出し（#）を太文字に変換
-        md = markdown.Markdown(extensions=['nl2br'])
-        html_content = md.convert(self.body)
-        return html_content
+        return render_markdown(self.body)
     class ConfigDict:
         model_config = ConfigDict(from_attributes=True)
 
@@ -158,10 +156,7 @@ class ShowArticle(BaseModel):
         """
         if self.body is None:
             return None
-        # 改行を<br>タグに変換し、見出し（#）を太文字に変換
-        md = markdown.Markdown(extensions=['nl2br'])
-        html_content = md.convert(self.body)
-        return html_content
+        return render_markdown(self.body)
     class ConfigDict:
         model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+遅いクエリがある場合の同時リクエストのレイテンシ計測スクリプト
+
+このスクリプトは以下の処理を行います：
+1. 一時ディレクトリにSQLiteデータベースを作成し、記事を登録
+2. 特定の記事IDの検索だけを遅くするフックを登録（遅いクエリの再現）
+3. 遅いリクエスト（GET /api/v1/articles/{id}）と速いリクエスト
+   （GET /api/v1/public/articles/{id}）を同時に送信し、速いリクエストのレイテンシを計測
+4. DB処理をイベントループ上で実行する場合（async def のエンドポイント、変更前）と、
+   ワーカースレッドで実行する場合（def のエンドポイント、変更後）を比較
+
+使用例::
+
+    python scripts/benchmark_blocking_db.py
+    python scripts/benchmark_blocking_db.py --slow-requests 8 --slow-seconds 0.2 \\
+        --output reports/json_data/blocking_db_benchmark.json
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+# プロジェクトルートをインポートパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, FastAPI  # noqa: E402
+from fastapi.routing import APIRoute  # noqa: E402
+from sqlalchemy import Engine, create_engine, event  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from database import Base, get_db  # noqa: E402
+from models import Article, User  # noqa: E402
+from oauth2 import get_current_user  # noqa: E402
+from routers import article  # noqa: E402
+
+
+# 遅いクエリを発生させる記事ID（存在しない記事）
+SLOW_ARTICLE_ID = 999_999
+
+
+def create_database(
+    path: Path,
+    articles: int,
+    slow_seconds: float,
+    pool_size: int
+    ) -> Engine:
+    """記事を登録し、遅いクエリのフックを設定したエンジンを作成する"""
+    # 変更前の動作ではイベントループが止まり接続が返却されないため、
+    # 接続待ちで止まらないよう全リクエスト分の接続を用意する
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False},
+        pool_size=pool_size, max_overflow=0
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, name="bench", email="bench@example.com", password="x"))
+    session.add_all([
+        Article(article_id=number, title=f"記事{number}", body="本文", user_id=1)
+        for number in range(1, articles + 1)
+    ])
+    session.commit()
+    session.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _slow_query(
+        conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+        ) -> None:
+        if parameters and SLOW_ARTICLE_ID in tuple(parameters):
+            time.sleep(slow_seconds)
+
+    return engine
+
+
+def blocking(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """同期のDB処理をイベントループ上でそのまま実行するエンドポイント（変更前の動作）"""
+    @functools.wraps(endpoint)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return endpoint(*args, **kwargs)
+    return wrapper
+
+
+def create_app(engine: Engine, offload: bool) -> FastAPI:
+    """記事ルーターを登録したアプリケーションを作成する"""
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db() -> Iterator[Session]:
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    if offload:
+        app.include_router(article.router)
+    else:
+        router = APIRouter()
+        for route in article.router.routes:
+            if isinstance(route, APIRoute):
+                router.add_api_route(
+                    route.path, blocking(route.endpoint), methods=list(route.methods),
+                    status_code=route.status_code, response_model=route.response_model,
+                )
+        app.include_router(router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1)
+    return app
+
+
+async def measure(
+    app: FastAPI,
+    slow_requests: int,
+    fast_requests: int,
+    interval: float
+    ) -> Dict[str, float]:
+    """遅いリクエストと速いリクエストを同時に送信し、速いリクエストのレイテンシを返す"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def timed(path: str, scheduled: float) -> float:
+            # イベントループが止まっている間の待ち時間も含めるため、
+            # 送信予定時刻からのレイテンシを計測する
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await client.get(path)
+            return (time.perf_counter() - scheduled) * 1000
+
+        started = time.perf_counter()
+        slow = [
+            asyncio.create_task(timed(f"/api/v1/articles/{SLOW_ARTICLE_ID}", started))
+            for _ in range(slow_requests)
+        ]
+        # 遅いリクエストの処理中に、速いリクエストを一定間隔で送る
+        fast_tasks = [
+            asyncio.create_task(timed(
+                f"/api/v1/public/articles/{number % 10 + 1}",
+                started + interval * (number + 1)
+            ))
+            for number in range(fast_requests)
+        ]
+        fast: List[float] = await asyncio.gather(*fast_tasks)
+        await asyncio.gather(*slow)
+    fast.sort()
+    return {
+        "median_ms": statistics.median(fast),
+        "p95_ms": fast[max(0, int(len(fast) * 0.95) - 1)],
+        "max_ms": fast[-1],
+    }
+
+
+def main() -> None:
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(
+        description="遅いクエリがある場合の同時リクエストのレイテンシを計測します"
+    )
+    parser.add_argument("--articles", type=int, default=100, help="登録する記事数")
+    parser.add_argument("--slow-requests", type=int, default=4, help="遅いリクエストの数")
+    parser.add_argument("--slow-seconds", type=float, default=0.2, help="遅いクエリの所要時間（秒）")
+    parser.add_argument("--fast-requests", type=int, default=20, help="速いリクエストの数")
+    parser.add_argument("--interval", type=float, default=0.01, help="速いリクエストの送信間隔（秒）")
+    parser.add_argument("--output", help="結果を保存するJSONファイルのパス")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database(
+            Path(directory) / "benchmark.db", args.articles, args.slow_seconds,
+            args.slow_requests + args.fast_requests
+        )
+        for label, offload in (("before", False), ("after", True)):
+            app = create_app(engine, offload)
+            results[label] = asyncio.run(
+                measure(app, args.slow_requests, args.fast_requests, args.interval)
+            )
+            print(
+                f"{'変更前（イベントループ上）' if label == 'before' else '変更後（ワーカースレッド）'}: "
+                f"速いリクエスト 中央値 {results[label]['median_ms']:.1f}ms / "
+                f"p95 {results[label]['p95_ms']:.1f}ms / 最大 {results[label]['max_ms']:.1f}ms"
+            )
+        engine.dispose()
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "slow_requests": args.slow_requests,
+            "slow_seconds": args.slow_seconds,
+            "fast_requests": args.fast_requests,
+            "interval": args.interval,
+            **results,
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"結果を保存しました: {output}")
+
+
+if __name__ == "__main__":
+    main()
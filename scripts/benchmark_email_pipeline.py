@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+ユーザー登録とメール送信の負荷計測スクリプト
+
+このスクリプトは以下の処理を行います：
+1. aiosmtpd でローカルのSMTPサーバーを起動（接続時・送信時の遅延と、一時エラーの割合を指定できる）
+2. 一時ディレクトリにSQLiteデータベース（--database-url で変更できる）を作成し、
+   ユーザールーターのアプリケーションを作成
+3. アウトボックスのワーカー（utils.email_outbox）を起動
+4. ASGIのまま POST /api/v1/user と POST /api/v1/resend-verification を同時に送信
+5. 全てのメールが送信されるまで待ち、以下を表示
+   - 登録のスループット（1秒あたりの登録数、全てのメールが届くまでを含む）
+   - エンドポイントごとのレイテンシ（p50・p99）
+   - SMTPサーバーに届いたメール数と、デッドレターになったメール数
+
+使用例::
+
+    python scripts/benchmark_email_pipeline.py
+    python scripts/benchmark_email_pipeline.py --registrations 500 --concurrency 20 \\
+        --smtp-latency 0.02 --failure-rate 0.1 \\
+        --output reports/json_data/email_pipeline_benchmark.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+# プロジェクトルートをインポートパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 計測用の設定（モジュールの読み込み時に参照されるため、インポート前に設定する。環境変数で上書きできる）
+os.environ.setdefault("ENABLE_DOMAIN_RESTRICTION", "false")
+os.environ.setdefault("ENABLE_EMAIL_VERIFICATION", "true")
+os.environ.setdefault("CORS_ORIGINS", "https://example.com")
+os.environ.setdefault("MAIL_FROM", "noreply@example.com")
+os.environ.setdefault("MAIL_USERNAME", "")
+os.environ.setdefault("MAIL_STARTTLS", "False")
+# 一時エラーのメールを計測時間内に再送する
+os.environ.setdefault("EMAIL_OUTBOX_BACKOFF_BASE", "0.05")
+os.environ.setdefault("EMAIL_OUTBOX_BACKOFF_MAX", "1")
+os.environ.setdefault("EMAIL_CIRCUIT_RESET_TIMEOUT", "0.5")
+
+import httpx  # noqa: E402
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import SMTP, Envelope, Session as SMTPSession  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import Engine, create_engine, func, select  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from database import Base, get_db  # noqa: E402
+from models import EmailOutbox, User  # noqa: E402
+from oauth2 import get_current_user  # noqa: E402
+from routers import user  # noqa: E402
+from utils.email_outbox import email_outbox_worker  # noqa: E402
+from utils.email_sender import close_smtp_pool, get_smtp_pool  # noqa: E402
+
+
+class LatencyHandler:
+    """遅延と一時エラーを発生させ、届いたメールを数えるハンドラ"""
+
+    def __init__(self, connect_latency: float, latency: float, failure_rate: float) -> None:
+        self.connect_latency = connect_latency
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.connections = 0
+        self.delivered = 0
+        self.rejected = 0
+
+    async def handle_EHLO(
+        self, server: SMTP, session: SMTPSession, envelope: Envelope,
+        hostname: str, responses: List[str]
+    ) -> List[str]:
+        # STARTTLS・AUTHの往復の代わりに、接続ごとに1回だけ遅延を入れる
+        self.connections += 1
+        await asyncio.sleep(self.connect_latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server: SMTP, session: SMTPSession, envelope: Envelope) -> str:
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            self.rejected += 1
+            return "451 Temporary failure, please retry"
+        self.delivered += 1
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    """空いているポート番号を返す"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def create_app(engine: Engine) -> FastAPI:
+    """ユーザールーターを登録したアプリケーションを作成する"""
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db() -> Iterator[Session]:
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(user.router)
+    app.dependency_overrides[get_db] = override_get_db
+    # 再送信はクエリパラメータのメールアドレスで行うため、認証ユーザーは誰でもよい
+    app.dependency_overrides[get_current_user] = lambda: User(id=0, email="bench@example.com")
+    return app
+
+
+def percentile(latencies: List[float], ratio: float) -> float:
+    """レイテンシの百分位数を返す"""
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """レイテンシ（ミリ秒）の集計を返す"""
+    return {
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": max(latencies),
+    }
+
+
+def outbox_counts(engine: Engine) -> Dict[str, int]:
+    """送信待ち・デッドレターの行数を返す"""
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+        ).all()
+    return {status: count for status, count in rows}
+
+
+async def run(args: argparse.Namespace, engine: Engine) -> Dict[str, Any]:
+    """登録と再送信を送信し、全てのメールが送信されるまでを計測する"""
+    handler = LatencyHandler(args.connect_latency, args.smtp_latency, args.failure_rate)
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    os.environ["MAIL_SERVER"] = controller.hostname
+    os.environ["MAIL_PORT"] = str(controller.port)
+    get_smtp_pool()
+    worker = asyncio.create_task(email_outbox_worker.run(engine, poll_interval=0.1))
+
+    latencies: Dict[str, List[float]] = {"create_user": [], "resend_verification": []}
+    statuses: Dict[str, int] = {}
+    slots = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=create_app(engine))
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def timed(name: str, method: str, path: str, **kwargs: Any) -> None:
+                started = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                latencies[name].append((time.perf_counter() - started) * 1000)
+                key = f"{name}:{response.status_code}"
+                statuses[key] = statuses.get(key, 0) + 1
+
+            async def register(number: int) -> None:
+                email = f"user{number}@example.com"
+                async with slots:
+                    await timed("create_user", "POST", "/api/v1/user", json={"email": email})
+                    if number < args.registrations * args.resend_ratio:
+                        await timed(
+                            "resend_verification", "POST", "/api/v1/resend-verification",
+                            params={"email": email}
+                        )
+
+            started = time.perf_counter()
+            await asyncio.gather(*(register(number) for number in range(args.registrations)))
+            responded = time.perf_counter() - started
+
+            # 全てのメールが送信される（またはデッドレターになる）まで待つ
+            deadline = time.perf_counter() + args.drain_timeout
+            while outbox_counts(engine).get("pending", 0) and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+            completed = time.perf_counter() - started
+    finally:
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        await close_smtp_pool()
+        controller.stop()
+
+    counts = outbox_counts(engine)
+    return {
+        "registrations": args.registrations,
+        "concurrency": args.concurrency,
+        "connect_latency": args.connect_latency,
+        "smtp_latency": args.smtp_latency,
+        "failure_rate": args.failure_rate,
+        "responses_seconds": responded,
+        "completed_seconds": completed,
+        "registrations_per_second": args.registrations / completed,
+        "requests_per_second": sum(map(len, latencies.values())) / responded,
+        "latency": {name: summarize(values) for name, values in latencies.items() if values},
+        "statuses": statuses,
+        "smtp": {
+            "connections": handler.connections,
+            "delivered": handler.delivered,
+            "rejected": handler.rejected,
+        },
+        "outbox": {"pending": counts.get("pending", 0), "dead": counts.get("dead", 0)},
+        "worker": email_outbox_worker.stats(),
+    }
+
+
+def main() -> None:
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(
+        description="ローカルのSMTPサーバーを使い、ユーザー登録とメール送信のスループットを計測します"
+    )
+    parser.add_argument("--registrations", type=int, default=200, help="登録するユーザー数")
+    parser.add_argument("--concurrency", type=int, default=10, help="同時に送信するリクエスト数")
+    parser.add_argument("--resend-ratio", type=float, default=0.5, help="確認メールを再送信するユーザーの割合")
+    parser.add_argument(
+        "--connect-latency", type=float, default=0.05,
+        help="SMTPの接続ごとの遅延（秒、STARTTLS・AUTHの往復の代わり）"
+    )
+    parser.add_argument("--smtp-latency", type=float, default=0.01, help="メール1通ごとの遅延（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="一時エラー（451）を返す割合")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="メールの送信を待つ最大時間（秒）")
+    parser.add_argument(
+        "--database-url",
+        help="使用するデータベースのURL（省略時は一時ディレクトリのSQLite。テーブルは作成する）"
+    )
+    parser.add_argument("--output", help="結果を保存するJSONファイルのパス")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database_url:
+            engine = create_engine(args.database_url, pool_size=args.concurrency, max_overflow=10)
+        else:
+            # SQLiteは書き込みを1つずつしか行えないため、ロックの解放を待つ時間を長くする
+            engine = create_engine(
+                f"sqlite:///{Path(directory) / 'benchmark.db'}",
+                connect_args={"check_same_thread": False, "timeout": 30}
+            )
+        Base.metadata.create_all(bind=engine)
+        results = asyncio.run(run(args, engine))
+        engine.dispose()
+
+    print(
+        f"登録: {results['registrations_per_second']:.1f}件/秒 "
+        f"（レスポンスまで {results['responses_seconds']:.2f}秒、"
+        f"全てのメールの送信まで {results['completed_seconds']:.2f}秒）"
+    )
+    for name, latency in results["latency"].items():
+        print(f"{name}: p50 {latency['p50_ms']:.1f}ms / p99 {latency['p99_ms']:.1f}ms")
+    print(
+        f"SMTP: 届いたメール {results['smtp']['delivered']}通、一時エラー {results['smtp']['rejected']}回、"
+        f"接続 {results['smtp']['connections']}回、デッドレター {results['outbox']['dead']}件、"
+        f"未送信 {results['outbox']['pending']}件"
+    )
+    print(f"ステータス: {results['statuses']}")
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"結果を保存しました: {output}")
+
+
+if __name__ == "__main__":
+    main()
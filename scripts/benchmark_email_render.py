@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+メール本文の作成にかかる時間の計測スクリプト
+
+このスクリプトは以下の処理を行います：
+1. 確認メール・登録完了メール・退会完了メールのメッセージを繰り返し作成
+   - 起動時にコンパイルしたテンプレートを使う（utils.email_sender の build_*_message）
+   - 作成のたびにテンプレートを読み込み、コンパイルする（キャッシュしない場合）
+2. 1通あたりの作成時間と1秒あたりの作成数を表示
+
+使用例::
+
+    python scripts/benchmark_email_render.py
+    python scripts/benchmark_email_render.py --iterations 20000 \\
+        --output reports/json_data/email_render_benchmark.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+# プロジェクトルートをインポートパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 確認メールのURLの作成に必要
+os.environ.setdefault("CORS_ORIGINS", "https://example.com")
+
+from fastapi_mail import MessageSchema  # noqa: E402
+
+import utils.email_sender as email_sender  # noqa: E402
+
+
+BUILDERS: Dict[str, Callable[[int], MessageSchema]] = {
+    "verification": lambda number: email_sender.build_verification_message(
+        f"user{number}@example.com", f"token-{number}"
+    ),
+    "registration_complete": lambda number: email_sender.build_registration_complete_message(
+        f"user{number}@example.com", f"user{number}"
+    ),
+    "account_deletion": lambda number: email_sender.build_account_deletion_message(
+        f"user{number}@example.com", f"user{number}"
+    ),
+}
+
+
+def measure(build: Callable[[int], MessageSchema], iterations: int) -> Dict[str, float]:
+    """メッセージを iterations 通作成し、1通あたりの時間を返す"""
+    started = time.perf_counter()
+    for number in range(iterations):
+        build(number)
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": elapsed,
+        "microseconds_per_message": elapsed / iterations * 1_000_000,
+        "messages_per_second": iterations / elapsed,
+    }
+
+
+def recompiling(build: Callable[[int], MessageSchema]) -> Callable[[int], MessageSchema]:
+    """作成のたびにテンプレートをコンパイルし直す場合の作成関数を返す"""
+    def build_without_cache(number: int) -> MessageSchema:
+        email_sender.EMAIL_TEMPLATES = email_sender.load_email_templates()
+        return build(number)
+    return build_without_cache
+
+
+def main() -> None:
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="メール本文の作成にかかる時間を計測します")
+    parser.add_argument("--iterations", type=int, default=10000, help="種類ごとに作成するメッセージ数")
+    parser.add_argument("--output", help="結果を保存するJSONファイルのパス")
+    args = parser.parse_args()
+
+    cached_templates = email_sender.EMAIL_TEMPLATES
+    results: Dict[str, Any] = {"iterations": args.iterations}
+    for name, build in BUILDERS.items():
+        # ウォームアップ
+        measure(build, min(args.iterations, 100))
+        cached = measure(build, args.iterations)
+        uncached = measure(recompiling(build), max(1, args.iterations // 100))
+        email_sender.EMAIL_TEMPLATES = cached_templates
+        results[name] = {"cached": cached, "compile_per_message": uncached}
+        print(
+            f"{name}: {cached['microseconds_per_message']:.1f}µs/通 "
+            f"（{cached['messages_per_second']:.0f}通/秒）、"
+            f"毎回コンパイルする場合 {uncached['microseconds_per_message']:.1f}µs/通"
+        )
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"結果を保存しました: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+記事検索の関連度順ベンチマークスクリプト
+
+このスクリプトは以下の処理を行います：
+1. 指定した件数の記事を疑似的に生成し、プロセス内の転置インデックスに登録
+2. 同じ検索語で記事ID降順（sort=new）と関連度順（sort=relevance）の検索を繰り返す
+3. 件数ごとの検索レイテンシ（中央値・p95）とメモリ使用量を表示
+
+データベースには接続せず、utils/article_index.ArticleIndex を直接使用する。
+3文字以上の検索語の候補をデータベースの行で確定する処理は計測に含まない。
+
+使用例::
+
+    python scripts/benchmark_search.py --sizes 10000,100000,1000000
+    python scripts/benchmark_search.py --sizes 10000 --output reports/json_data/search_benchmark.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# プロジェクトルートをインポートパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.article_index import ArticleIndex  # noqa: E402
+from utils.text_tokens import normalize_text  # noqa: E402
+
+
+# 疑似記事の生成に使用する単語
+WORDS = [
+    "東京", "京都", "大阪", "天気", "ラーメン", "プログラミング", "Python", "FastAPI",
+    "データベース", "検索", "記事", "旅行", "カメラ", "料理", "レシピ", "開発", "設計",
+    "テスト", "日記", "読書", "映画", "音楽", "散歩", "公園", "電車", "学校", "仕事",
+]
+
+# 計測に使用する検索語（出現頻度の高い語・低い語・複数語）
+QUERIES = [["東京"], ["ラーメン"], ["python", "検索"], ["京"], ["データベース", "設計"]]
+
+
+def build_index(size: int, seed: int) -> ArticleIndex:
+    """疑似記事を登録したインデックスを作成する
+
+    :param size: 記事数
+    :type size: int
+    :param seed: 乱数のシード
+    :type seed: int
+    :return: 作成したインデックス
+    :rtype: ArticleIndex
+    """
+    rng = random.Random(seed)
+    index = ArticleIndex()
+    for row_id in range(1, size + 1):
+        title = " ".join(rng.choices(WORDS, k=3))
+        body = "、".join(rng.choices(WORDS, k=rng.randint(10, 60)))
+        index.add(row_id, row_id, title, body)
+    return index
+
+
+def measure(index: ArticleIndex, ranked: bool, repeat: int) -> Dict[str, float]:
+    """検索レイテンシを計測する（ミリ秒）"""
+    timings: List[float] = []
+    for _ in range(repeat):
+        for keywords in QUERIES:
+            runs = [normalize_text(keyword) for keyword in keywords]
+            started = time.perf_counter()
+            index.search(runs, ranked=ranked)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main() -> None:
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="記事検索の関連度順のレイテンシを計測します")
+    parser.add_argument(
+        "--sizes", default="10000,100000,1000000",
+        help="記事数（カンマ区切り）"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="検索語ごとの計測回数")
+    parser.add_argument("--seed", type=int, default=42, help="乱数のシード")
+    parser.add_argument("--output", help="結果を保存するJSONファイルのパス")
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        started = time.perf_counter()
+        index = build_index(size, args.seed)
+        build_seconds = time.perf_counter() - started
+        usage = index.memory_usage()
+        unranked = measure(index, ranked=False, repeat=args.repeat)
+        ranked = measure(index, ranked=True, repeat=args.repeat)
+        results.append({
+            "articles": size,
+            "build_seconds": build_seconds,
+            "bytes_per_document": usage["bytes_per_document"],
+            "unranked": unranked,
+            "ranked": ranked,
+        })
+        print(
+            f"{size:>9}件: 作成 {build_seconds:.1f}秒, "
+            f"1記事あたり約{usage['bytes_per_document']:.0f}バイト | "
+            f"新しい順 中央値 {unranked['median_ms']:.2f}ms / p95 {unranked['p95_ms']:.2f}ms | "
+            f"関連度順 中央値 {ranked['median_ms']:.2f}ms / p95 {ranked['p95_ms']:.2f}ms"
+        )
+        del index
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"結果を保存しました: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+SMTP送信のスループット計測スクリプト（メッセージごとの接続と、接続の使い回し）
+
+このスクリプトは以下の処理を行います：
+1. aiosmtpd でローカルのSMTPサーバーを起動（EHLOに遅延を入れ、STARTTLS・AUTHの往復を再現）
+2. 登録完了メールのメッセージを作成
+3. 以下の方法で全てのメッセージを送信し、1秒あたりの送信数を計測
+   - メッセージごとに接続・送信・切断する（変更前の FastMail と同じ）
+   - utils.smtp_pool のプールで1件ずつ送信する
+   - utils.smtp_pool のプールでバッチ送信する（utils.email_outbox のワーカーと同じ）
+
+使用例::
+
+    python scripts/benchmark_smtp_pool.py
+    python scripts/benchmark_smtp_pool.py --messages 500 --handshake-latency 0.05 \\
+        --output reports/json_data/smtp_pool_benchmark.json
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import time
+from email.message import Message
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+# プロジェクトルートをインポートパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aiosmtplib  # noqa: E402
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import SMTP, Envelope, Session as SMTPSession  # noqa: E402
+from fastapi_mail.msg import MailMsg  # noqa: E402
+
+from utils.email_sender import build_registration_complete_message  # noqa: E402
+from utils.smtp_pool import SMTPConnectionPool  # noqa: E402
+
+
+class CountingHandler:
+    """受信したメッセージと接続数を数えるハンドラ"""
+
+    def __init__(self, handshake_latency: float) -> None:
+        self.handshake_latency = handshake_latency
+        self.connections = 0
+        self.messages = 0
+
+    async def handle_EHLO(
+        self, server: SMTP, session: SMTPSession, envelope: Envelope,
+        hostname: str, responses: List[str]
+    ) -> List[str]:
+        # STARTTLS・AUTHの往復の代わりに、接続ごとに1回だけ遅延を入れる
+        self.connections += 1
+        await asyncio.sleep(self.handshake_latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server: SMTP, session: SMTPSession, envelope: Envelope) -> str:
+        self.messages += 1
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    """空いているポート番号を返す"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+async def build_messages(count: int) -> List[Message]:
+    """送信するメッセージを作成する"""
+    return [
+        await MailMsg(build_registration_complete_message(
+            f"user{number}@example.com", f"user{number}"
+        ))._message("noreply@example.com")
+        for number in range(count)
+    ]
+
+
+async def send_per_message(
+    factory: Callable[[], aiosmtplib.SMTP], messages: List[Message], concurrency: int
+    ) -> None:
+    """メッセージごとに接続・送信・切断する（変更前）"""
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send(message: Message) -> None:
+        async with slots:
+            smtp = factory()
+            await smtp.connect()
+            await smtp.send_message(message)
+            await smtp.quit()
+
+    await asyncio.gather(*(send(message) for message in messages))
+
+
+async def send_pooled(
+    factory: Callable[[], aiosmtplib.SMTP], messages: List[Message], concurrency: int
+    ) -> None:
+    """プールの接続で1件ずつ送信する"""
+    pool = SMTPConnectionPool(factory, size=concurrency)
+    await asyncio.gather(*(pool.send(message) for message in messages))
+    await pool.close()
+
+
+async def send_pooled_batches(
+    factory: Callable[[], aiosmtplib.SMTP],
+    messages: List[Message],
+    concurrency: int,
+    batch_size: int
+    ) -> None:
+    """プールの接続でバッチ送信する"""
+    pool = SMTPConnectionPool(factory, size=concurrency)
+    batches = [messages[start:start + batch_size] for start in range(0, len(messages), batch_size)]
+    results = await asyncio.gather(*(pool.send_batch(batch) for batch in batches))
+    await pool.close()
+    errors = [error for batch in results for error in batch if error is not None]
+    if errors:
+        raise errors[0]
+
+
+async def measure(
+    name: str,
+    send: Callable[[], Awaitable[None]],
+    handler: CountingHandler,
+    count: int
+    ) -> Dict[str, Any]:
+    """送信にかかった時間と接続数を計測する"""
+    handler.connections, handler.messages = 0, 0
+    started = time.perf_counter()
+    await send()
+    elapsed = time.perf_counter() - started
+    assert handler.messages == count, f"{name}: {handler.messages}/{count}件しか届いていません"
+    return {
+        "seconds": elapsed,
+        "messages_per_second": count / elapsed,
+        "connections": handler.connections,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """各方法で送信し、結果を返す"""
+    handler = CountingHandler(args.handshake_latency)
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        messages = await build_messages(args.messages)
+
+        def factory() -> aiosmtplib.SMTP:
+            return aiosmtplib.SMTP(hostname=controller.hostname, port=controller.port)
+
+        return {
+            "per_message_connection": await measure(
+                "per_message_connection",
+                lambda: send_per_message(factory, messages, args.concurrency),
+                handler, args.messages
+            ),
+            "pooled": await measure(
+                "pooled",
+                lambda: send_pooled(factory, messages, args.concurrency),
+                handler, args.messages
+            ),
+            "pooled_batches": await measure(
+                "pooled_batches",
+                lambda: send_pooled_batches(factory, messages, args.concurrency, args.batch_size),
+                handler, args.messages
+            ),
+        }
+    finally:
+        controller.stop()
+
+
+def main() -> None:
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(
+        description="メッセージごとの接続と接続の使い回しでSMTP送信のスループットを比較します"
+    )
+    parser.add_argument("--messages", type=int, default=200, help="送信するメッセージ数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時に使う接続数")
+    parser.add_argument("--batch-size", type=int, default=20, help="1本の接続で続けて送信する件数")
+    parser.add_argument(
+        "--handshake-latency", type=float, default=0.03,
+        help="接続ごとの遅延（秒、STARTTLS・AUTHの往復の代わり）"
+    )
+    parser.add_argument("--output", help="結果を保存するJSONファイルのパス")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    for name, result in results.items():
+        print(
+            f"{name}: {result['messages_per_second']:.1f}通/秒 "
+            f"（{result['seconds']:.2f}秒、接続{result['connections']}回）"
+        )
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "messages": args.messages,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+            "handshake_latency": args.handshake_latency,
+            **results,
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"結果を保存しました: {output}")
+
+
+if __name__ == "__main__":
+    main()
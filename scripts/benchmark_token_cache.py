@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+認証処理のコスト計測スクリプト（検証済みトークンのキャッシュの有無）
+
+このスクリプトは以下の処理を行います：
+1. 一時ディレクトリにSQLiteデータベースを作成し、ユーザーを登録
+2. アクセストークンを作成
+3. jwt.decode 単体と decode_token（キャッシュあり）の1回あたりの処理時間を計測
+4. oauth2.get_current_user 全体の1回あたりの処理時間を、
+   トークン・ユーザーのキャッシュなし（変更前）とキャッシュあり（変更後）で比較
+
+使用例::
+
+    python scripts/benchmark_token_cache.py
+    python scripts/benchmark_token_cache.py --iterations 20000 \\
+        --output reports/json_data/token_cache_benchmark.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict
+from unittest.mock import patch
+
+# プロジェクトルートをインポートパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jose import jwt  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+import custom_token  # noqa: E402
+import oauth2  # noqa: E402
+from database import Base  # noqa: E402
+from models import User  # noqa: E402
+from utils.token_cache import decode_token, token_payload_cache  # noqa: E402
+from utils.user_cache import user_cache  # noqa: E402
+
+
+SECRET_KEY = "benchmark_secret_key"
+
+
+def per_call_us(func: Callable[[], object], iterations: int) -> float:
+    """同期関数の1回あたりの処理時間（マイクロ秒）を返す"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+async def per_call_us_async(func: Callable[[], Awaitable[object]], iterations: int) -> float:
+    """async関数の1回あたりの処理時間（マイクロ秒）を返す"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+async def measure(db_path: Path, iterations: int) -> Dict[str, float]:
+    """トークンの検証と認証全体の処理時間を計測する"""
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    session = factory()
+    session.add(User(id=1, name="bench", email="bench@example.com", password="x"))
+    session.commit()
+    session.close()
+
+    token = custom_token.create_access_token(
+        data={"sub": "bench@example.com", "id": 1}, expires_delta=timedelta(hours=1)
+    )
+    algorithms = [oauth2.ALGORITHM]
+    results = {
+        "jwt_decode_us": per_call_us(
+            lambda: jwt.decode(token, SECRET_KEY, algorithms=algorithms), iterations
+        ),
+        "decode_token_cached_us": per_call_us(
+            lambda: decode_token(token, SECRET_KEY, algorithms), iterations
+        ),
+    }
+
+    db = factory()
+    # 変更前: 毎回トークンを検証し、ユーザーを検索する
+    token_payload_cache.maxsize, user_cache.maxsize = 0, 0
+    token_payload_cache.clear()
+    user_cache.clear()
+    results["get_current_user_uncached_us"] = await per_call_us_async(
+        lambda: oauth2.get_current_user(token, db), iterations
+    )
+    # 変更後: 検証済みのトークンとユーザーをキャッシュから返す
+    token_payload_cache.maxsize, user_cache.maxsize = 4096, 1024
+    await oauth2.get_current_user(token, db)
+    results["get_current_user_cached_us"] = await per_call_us_async(
+        lambda: oauth2.get_current_user(token, db), iterations
+    )
+    db.close()
+    engine.dispose()
+    return results
+
+
+def main() -> None:
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(
+        description="検証済みトークンのキャッシュの有無による認証処理のコストを計測します"
+    )
+    parser.add_argument("--iterations", type=int, default=5000, help="計測する回数")
+    parser.add_argument("--output", help="結果を保存するJSONファイルのパス")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory, \
+            patch.object(custom_token, "SECRET_KEY", SECRET_KEY), \
+            patch.object(oauth2, "SECRET_KEY", SECRET_KEY):
+        results = asyncio.run(measure(Path(directory) / "benchmark.db", args.iterations))
+
+    print(f"jwt.decode: {results['jwt_decode_us']:.1f}µs / 回")
+    print(f"decode_token（キャッシュあり）: {results['decode_token_cached_us']:.1f}µs / 回")
+    print(f"get_current_user（キャッシュなし）: {results['get_current_user_uncached_us']:.1f}µs / 回")
+    print(f"get_current_user（キャッシュあり）: {results['get_current_user_cached_us']:.1f}µs / 回")
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "iterations": args.iterations,
+            **results,
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"結果を保存しました: {output}")
+
+
+if __name__ == "__main__":
+    main()
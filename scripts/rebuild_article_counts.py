@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+記事数集計値の再計算スクリプト
+
+articlesテーブルからユーザー別・全体の記事数を再計算して保存します。
+
+ARTICLE_COUNT_MODE=approximate から exact に戻す場合などに実行してください。
+集計値用のカラム・テーブル（users.article_count・article_stats）は
+マイグレーション（alembic upgrade head）で追加します。
+
+使用例::
+
+    python scripts/rebuild_article_counts.py
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをインポートパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.orm import Session  # noqa: E402
+
+from database import engine  # noqa: E402
+from utils.article_stats import rebuild_article_counts  # noqa: E402
+
+
+def main() -> None:
+    """メイン実行関数"""
+    with Session(engine) as db:
+        total = rebuild_article_counts(db)
+    print(f"記事数の集計値を再計算しました: 全{total}件")
+
+
+if __name__ == "__main__":
+    main()
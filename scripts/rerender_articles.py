@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+記事HTML一括再変換スクリプト
+
+このスクリプトは以下の処理を行います：
+1. 保存済みHTMLが未作成、またはレンダラースタンプが現在と異なる記事を検出
+2. 複数プロセスで並列にMarkdownを変換し、バッチ単位でまとめて保存
+
+レンダラーのバージョン（utils/markdown_renderer.RENDERER_VERSION）や
+拡張機能を変更した場合に実行してください。既存のデータベースでは、
+先に ``alembic upgrade head`` で body_html / render_version カラムを追加してください。
+
+使用例::
+
+    python scripts/rerender_articles.py --batch-size 500 --workers 4
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+# プロジェクトルートをインポートパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import Engine, or_, select, update  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from database import engine as default_engine  # noqa: E402
+from models import Article  # noqa: E402
+from utils.markdown_renderer import render_markdown, renderer_stamp  # noqa: E402
+
+
+def _render_chunk(
+    rows: List[Tuple[int, str]]
+    ) -> List[Tuple[int, str]]:
+    """ワーカープロセスで記事本文をまとめて変換する"""
+    return [(row_id, render_markdown(body)) for row_id, body in rows]
+
+
+def _split(
+    rows: List[Tuple[int, str]], parts: int
+    ) -> List[List[Tuple[int, str]]]:
+    """行のリストをワーカー数に応じて分割する"""
+    size = max(1, -(-len(rows) // parts))
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+def rerender_articles(
+    engine: Engine,
+    batch_size: int = 500,
+    workers: int = 1,
+    force: bool = False
+    ) -> int:
+    """保存済みHTMLが古い記事を再変換して保存する
+
+    :param engine: SQLAlchemyのエンジン
+    :type engine: Engine
+    :param batch_size: 1回のトランザクションで更新する記事数
+    :type batch_size: int
+    :param workers: 変換に使用するプロセス数（1の場合は同一プロセスで変換）
+    :type workers: int
+    :param force: Trueの場合はスタンプに関係なく全記事を再変換する
+    :type force: bool
+    :return: 再変換した記事数
+    :rtype: int
+    """
+    stamp = renderer_stamp()
+    total = 0
+    last_id = 0
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with Session(engine) as db:
+            while True:
+                # 主キー順にシークしながら対象の記事を取得する
+                query = select(Article.id, Article.body).where(Article.id > last_id)
+                if not force:
+                    query = query.where(or_(
+                        Article.render_version.is_(None),
+                        Article.render_version != stamp
+                    ))
+                rows = [
+                    (row_id, body) for row_id, body in
+                    db.execute(query.order_by(Article.id).limit(batch_size))
+                ]
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                if executor is not None:
+                    rendered = [
+                        item
+                        for chunk in executor.map(_render_chunk, _split(rows, workers))
+                        for item in chunk
+                    ]
+                else:
+                    rendered = _render_chunk(rows)
+                params: List[Dict[str, Union[int, str]]] = [
+                    {"id": row_id, "body_html": html, "render_version": stamp}
+                    for row_id, html in rendered
+                ]
+                db.execute(update(Article), params)
+                db.commit()
+                total += len(params)
+                print(f"{total}件の記事を再変換しました (最終ID: {last_id})")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return total
+
+
+def main() -> None:
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="記事HTMLを一括で再変換します")
+    parser.add_argument(
+        "--batch-size", type=int, default=500,
+        help="1回のトランザクションで更新する記事数"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="変換に使用するプロセス数"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="レンダラースタンプに関係なく全記事を再変換する"
+    )
+    args = parser.parse_args()
+
+    print(f"記事HTMLの再変換を開始します (レンダラー: {renderer_stamp()})")
+    count = rerender_articles(
+        default_engine,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        force=args.force
+    )
+    print(f"再変換が完了しました: {count}件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""記事の一括作成エンドポイントのテスト"""
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base, get_db
+from models import Article, User
+from oauth2 import get_current_user
+from routers import article
+from utils import article_search
+from utils.article_index import article_index
+from utils.article_search import ensure_search_index, search_articles
+from utils.article_stats import get_total_article_count, get_user_article_count
+from utils.markdown_renderer import renderer_stamp
+from utils.search_cache import articles_generation
+
+
+@pytest.fixture
+def engine():
+    """既存の記事が1件あるインメモリデータベース"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, name="bulk", email="bulk@example.com", password="x"))
+    session.add(Article(article_id=10, title="既存", body="既存の本文", user_id=1))
+    session.commit()
+    session.close()
+    yield engine
+    article_index.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def client(factory):
+    """記事ルーターを登録したテスト用アプリケーション"""
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(article.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, email="bulk@example.com")
+    return TestClient(app)
+
+
+def _payload(count, prefix="一括"):
+    return [{"title": f"{prefix}{i}", "body": f"**本文{i}**"} for i in range(count)]
+
+
+class TestCreateArticlesBulk:
+    """記事の一括作成のテスト"""
+
+    def test_contiguous_ids_and_order(self, client, factory):
+        """連続した記事IDがリクエストと同じ順序で採番されるテスト"""
+        before = articles_generation.value
+        response = client.post("/api/v1/articles/bulk", json=_payload(3))
+
+        assert response.status_code == 201
+        created = response.json()
+        assert [item["article_id"] for item in created] == [11, 12, 13]
+        assert [item["title"] for item in created] == ["一括0", "一括1", "一括2"]
+        assert all(item["user_id"] == 1 for item in created)
+        assert articles_generation.value == before + 1
+
+        db = factory()
+        stored = db.query(Article).filter(Article.article_id == 12).first()
+        assert stored.body_html == "<p><strong>本文1</strong></p>"
+        assert stored.render_version == renderer_stamp()
+        assert stored.updated_at is not None
+        # 記事数の集計値は追加した件数だけ増える
+        assert get_total_article_count(db) == 4
+        assert get_user_article_count(db, 1) == 3
+        db.close()
+
+    def test_invalid_item_creates_nothing(self, client, factory):
+        """1件でも必須項目が空の場合は何も作成しないテスト"""
+        payload = _payload(3)
+        payload[1]["title"] = "  "
+        response = client.post("/api/v1/articles/bulk", json=payload)
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "2件目: タイトルは必須項目です"
+        db = factory()
+        assert db.query(Article).count() == 1
+        db.close()
+
+    def test_empty_and_too_many(self, client):
+        """空のリストと上限を超える件数は400になるテスト"""
+        assert client.post("/api/v1/articles/bulk", json=[]).status_code == 400
+        with patch.object(article, "BULK_CREATE_MAX_ITEMS", 2):
+            response = client.post("/api/v1/articles/bulk", json=_payload(3))
+        assert response.status_code == 400
+
+    def test_search_index_updated(self, client, engine, factory):
+        """一括作成した記事が全文検索の対象になるテスト"""
+        ensure_search_index(engine)
+        client.post("/api/v1/articles/bulk", json=_payload(2, prefix="東京"))
+
+        db = factory()
+        results, total, backend = search_articles(db, ["東京"], limit=10)
+        assert backend == "fts5"
+        assert [item.article_id for item in results] == [12, 11]
+        db.close()
+
+    def test_memory_index_updated(self, client, engine, factory):
+        """一括作成した記事がプロセス内の転置インデックスに反映されるテスト"""
+        with patch.object(article_search, "SEARCH_BACKEND", "memory"):
+            ensure_search_index(engine)
+        client.post("/api/v1/articles/bulk", json=_payload(2, prefix="大阪"))
+
+        db = factory()
+        results, total, backend = search_articles(db, ["大阪"], limit=10)
+        assert backend == "memory"
+        assert total == 2
+        db.close()
@@ -0,0 +1,281 @@
+"""記事IDの採番のテスト"""
+import asyncio
+import threading
+import time
+from unittest.mock import Mock
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base, get_db
+from models import Article, IdCounter, User
+from oauth2 import get_current_user
+from routers import article
+from utils.article_id_allocator import (
+    ARTICLE_ID_COUNTER,
+    ArticleIdAllocator,
+    article_id_allocator,
+    ensure_article_id_allocator,
+)
+
+
+@pytest.fixture
+def engine():
+    """既存の記事が2件あるインメモリデータベース"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        Article(article_id=3, title="既存1", body="本文"),
+        Article(article_id=7, title="既存2", body="本文"),
+    ])
+    session.commit()
+    session.close()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _counter_value(factory):
+    db = factory()
+    try:
+        return db.get(IdCounter, ARTICLE_ID_COUNTER).next_value
+    finally:
+        db.close()
+
+
+class TestArticleIdAllocator:
+    """ブロック単位の記事ID採番のテスト"""
+
+    def test_starts_after_existing_max(self, factory):
+        """カウンター行が無い場合は既存の最大値の次から採番するテスト"""
+        allocator = ArticleIdAllocator(block_size=5)
+        db = factory()
+
+        assert allocator.allocate(db) == [8]
+        assert allocator.allocate(db, 2) == [9, 10]
+        # 1ブロック分だけ予約し、以降は記事テーブルを参照しない
+        assert allocator.reservations == 1
+        assert _counter_value(factory) == 13
+        db.close()
+
+    def test_new_block_when_exhausted(self, factory):
+        """ブロックを使い切ると次のブロックを予約するテスト"""
+        allocator = ArticleIdAllocator(block_size=2)
+        db = factory()
+
+        ids = [allocator.allocate(db)[0] for _ in range(5)]
+
+        assert ids == [8, 9, 10, 11, 12]
+        assert allocator.reservations == 3
+        db.close()
+
+    def test_range_larger_than_block_is_contiguous(self, factory):
+        """ブロックより多い件数でも連続した範囲を払い出すテスト"""
+        allocator = ArticleIdAllocator(block_size=4)
+        db = factory()
+
+        assert allocator.allocate(db) == [8]
+        assert allocator.allocate(db, 6) == [12, 13, 14, 15, 16, 17]
+        assert allocator.allocate(db) == [9]
+        db.close()
+
+    def test_separate_allocators_do_not_overlap(self, factory):
+        """別プロセスを想定した複数の採番器でIDが重複しないテスト"""
+        first = ArticleIdAllocator(block_size=3)
+        second = ArticleIdAllocator(block_size=3)
+        db = factory()
+
+        ids = []
+        for _ in range(4):
+            ids += first.allocate(db) + second.allocate(db)
+
+        assert len(set(ids)) == len(ids)
+        assert min(ids) == 8
+        db.close()
+
+    def test_reservation_survives_rollback(self, factory):
+        """記事の作成がロールバックされても予約済みのIDを再利用しないテスト"""
+        allocator = ArticleIdAllocator(block_size=3)
+        db = factory()
+        allocator.allocate(db)
+        db.rollback()
+
+        # 別の採番器（別プロセス）は予約済みのブロックの後から採番する
+        assert ArticleIdAllocator(block_size=3).allocate(db) == [11]
+        db.close()
+
+    def test_allocate_zero(self, factory):
+        """0件の場合は予約しないテスト"""
+        allocator = ArticleIdAllocator()
+        db = factory()
+
+        assert allocator.allocate(db, 0) == []
+        assert allocator.reservations == 0
+        db.close()
+
+    def test_reserve_runs_outside_lock(self, factory):
+        """ブロックの予約中は他のスレッドの払い出しを待たせないテスト"""
+        allocator = ArticleIdAllocator(block_size=3)
+        reserve = allocator._reserve
+        held = []
+
+        def checking_reserve(engine, size):
+            held.append(allocator._lock.locked())
+            return reserve(engine, size)
+
+        allocator._reserve = checking_reserve
+        db = factory()
+
+        assert allocator.allocate(db, 2) == [8, 9]
+        assert allocator.allocate(db, 5) == [11, 12, 13, 14, 15]
+        assert held == [False, False]
+        db.close()
+
+    def test_unsupported_dialect(self):
+        """SQLite・PostgreSQL以外のデータベースでは採番しないテスト"""
+        db = Mock()
+        db.get_bind.return_value.engine.dialect.name = "mysql"
+
+        with pytest.raises(NotImplementedError):
+            ArticleIdAllocator().allocate(db)
+
+
+class TestUniqueArticleId:
+    """記事IDの一意インデックスのテスト"""
+
+    def test_duplicate_article_id_is_rejected(self, factory):
+        """同じ記事IDの記事を追加できないテスト"""
+        db = factory()
+        db.add(Article(article_id=7, title="重複", body="本文"))
+
+        with pytest.raises(IntegrityError):
+            db.commit()
+        db.rollback()
+        db.close()
+
+    def test_ensure_creates_index_on_existing_database(self):
+        """一意インデックスの無い既存データベースにインデックスを作成するテスト"""
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE articles (id INTEGER PRIMARY KEY, article_id INTEGER)"
+            )
+            connection.exec_driver_sql("INSERT INTO articles (article_id) VALUES (1)")
+
+        ensure_article_id_allocator(engine)
+
+        with engine.connect() as connection:
+            with pytest.raises(IntegrityError):
+                connection.exec_driver_sql(
+                    "INSERT INTO articles (article_id) VALUES (1)"
+                )
+        engine.dispose()
+
+
+@pytest.fixture
+def file_factory(tmp_path):
+    """複数の接続から同時に書き込めるファイルベースのデータベース"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'articles.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_wal(connection, _record):
+        connection.execute("PRAGMA journal_mode=WAL")
+
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    db.add(User(id=1, name="stress", email="stress@example.com", password="x"))
+    db.commit()
+    db.close()
+    yield factory
+    article_id_allocator.reset()
+    engine.dispose()
+
+
+def _create_app(factory):
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(article.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1)
+    return app
+
+
+def _run_creates(app, workers, per_worker):
+    """workers個のスレッドからそれぞれ別のイベントループで記事を作成する"""
+    results = []
+    errors = []
+    lock = threading.Lock()
+
+    async def worker(index):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for number in range(per_worker):
+                response = await client.post(
+                    "/api/v1/articles",
+                    json={"title": f"並列{index}-{number}", "body": "本文"},
+                )
+                with lock:
+                    if response.status_code == 200:
+                        results.append(response.json()["article_id"])
+                    else:
+                        errors.append(response.text)
+
+    threads = [
+        threading.Thread(target=asyncio.run, args=(worker(index),))
+        for index in range(workers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors, time.perf_counter() - started
+
+
+class TestConcurrentCreate:
+    """ASGIアプリケーションに並列で記事を作成するストレステスト"""
+
+    def test_parallel_creates_have_unique_ids(self, file_factory):
+        """並列に作成した記事の記事IDが重複せず、スループットが低下しないテスト"""
+        app = _create_app(file_factory)
+
+        serial_ids, serial_errors, serial_seconds = _run_creates(app, 1, 40)
+        parallel_ids, parallel_errors, parallel_seconds = _run_creates(app, 8, 40)
+
+        assert serial_errors == [] and parallel_errors == []
+        ids = serial_ids + parallel_ids
+        assert len(ids) == 360
+        assert len(set(ids)) == len(ids)
+
+        db = file_factory()
+        stored = db.execute(select(Article.article_id)).scalars().all()
+        db.close()
+        assert sorted(stored) == sorted(ids)
+
+        # ロック待ちで詰まらず、並列時のスループットが逐次の半分を下回らないこと
+        serial_rate = len(serial_ids) / serial_seconds
+        parallel_rate = len(parallel_ids) / parallel_seconds
+        print(f"逐次 {serial_rate:.0f}件/秒, 並列 {parallel_rate:.0f}件/秒")
+        assert parallel_rate >= serial_rate * 0.5
@@ -0,0 +1,321 @@
+"""utils/article_index.py の単体テスト"""
+import math
+from array import array
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Article, User
+from utils import article_search
+from utils.article_index import (
+    BM25_B,
+    BM25_K1,
+    ArticleIndex,
+    article_index,
+    document_frequencies,
+    document_text,
+    intersect_postings,
+)
+from utils.article_search import ensure_search_index, search_articles
+
+
+@pytest.fixture
+def engine():
+    """転置インデックスを作成したインメモリデータベース"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    user = User(name="index", email="index@example.com", password="x")
+    session.add(user)
+    session.commit()
+    session.add_all([
+        Article(article_id=1, title="東京の天気", body="今日は晴れです", user_id=user.id),
+        Article(article_id=2, title="Python入門", body="FastAPIで東京のAPIを作る", user_id=user.id),
+        Article(article_id=3, title="ラーメン", body="京都のラーメン屋", user_id=user.id),
+    ])
+    session.commit()
+    session.close()
+    with patch.object(article_search, "SEARCH_BACKEND", "memory"):
+        assert ensure_search_index(engine) is True
+    yield engine
+    article_index.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """アプリケーションと同じ設定のセッション"""
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+def _ids(results):
+    return [article.article_id for article in results]
+
+
+def _verifier(documents, runs):
+    """{行ID: (タイトル, 本文)} の記事で候補を確定する関数（データベースの代わり）"""
+    def verify(row_ids):
+        return {
+            row_id for row_id in row_ids
+            if all(run in document_text(*documents[row_id]) for run in runs)
+        }
+    return verify
+
+
+class TestPostings:
+    """ポスティングリストの操作のテスト"""
+
+    def test_intersect_postings(self):
+        """ソート済みマージで積集合が求められるテスト"""
+        left = array("I", [1, 3, 5, 7, 9])
+        right = array("I", [2, 3, 4, 9, 10])
+
+        assert list(intersect_postings(left, right)) == [3, 9]
+        assert list(intersect_postings(left, array("I"))) == []
+
+    def test_add_and_remove(self):
+        """追加・削除でポスティングリストが昇順に保たれるテスト"""
+        index = ArticleIndex()
+        index.add(5, 5, "東京", "")
+        index.add(2, 2, "東京タワー", "")
+        index.add(9, 9, "京都", "")
+
+        assert list(index._postings["東京"]) == [2, 5]
+        assert index.search(["東京"]) == [5, 2]
+
+        index.remove(5)
+        assert list(index._postings["東京"]) == [2]
+        index.remove(2)
+        assert "東京" not in index._postings
+        assert index.search(["京"]) == [9]
+
+    def test_no_text_kept(self):
+        """記事のテキストを保持しないテスト"""
+        index = ArticleIndex()
+        index.add(1, 1, "東京", "本文")
+
+        assert not hasattr(index, "_texts")
+        assert len(index) == 1
+
+    def test_replace_with_previous_text(self):
+        """索引済みのテキストを渡した置き換えで古いトークンが削除されるテスト"""
+        index = ArticleIndex()
+        index.add(1, 1, "東京", "本文")
+        index.add(2, 2, "東京", "")
+        index.add(1, 1, "大阪", "本文", previous=("東京", "本文"))
+
+        assert list(index._postings["東京"]) == [2]
+        assert index.search(["大阪"]) == [1]
+        assert len(index) == 2
+
+    def test_remove_without_previous_text(self):
+        """索引済みのテキストが分からない場合も全てのトークンが削除されるテスト"""
+        index = ArticleIndex()
+        index.add(1, 1, "東京", "本文")
+        index.add(1, 1, "大阪", "")
+
+        assert "東京" not in index._postings
+        assert "本文" not in index._postings
+        assert index.search(["大阪"]) == [1]
+        assert index._total_length == document_frequencies(document_text("大阪", ""))[1]
+
+    def test_phrase_verification(self):
+        """bigramが離れた位置にある記事は一致しないテスト"""
+        index = ArticleIndex()
+        # 「東京」「京都」を両方含むが「東京都」は含まない
+        documents = {1: ("東京と京都", ""), 2: ("東京都", "")}
+        for row_id, (title, body) in documents.items():
+            index.add(row_id, row_id, title, body)
+
+        assert index.search(["東京都"]) == [2, 1]
+        assert index.search(["東京都"], verify=_verifier(documents, ["東京都"])) == [2]
+
+    def test_title_body_boundary(self):
+        """タイトルと本文をまたいだ文字列は一致しないテスト"""
+        assert document_text("東京", "都庁") == "東京\n都庁"
+        index = ArticleIndex()
+        index.add(1, 1, "東京", "都庁")
+
+        assert index.search(["京都"]) == []
+
+    def test_short_runs_not_verified(self):
+        """2文字以下の検索語では確定処理を呼び出さないテスト"""
+        index = ArticleIndex()
+        index.add(1, 1, "東京", "")
+
+        def verify(row_ids):
+            raise AssertionError("verify should not be called")
+
+        assert index.search(["東京", "京"], verify=verify) == [1]
+
+    def test_memory_usage(self):
+        """1記事あたりのメモリ使用量が報告されるテスト"""
+        index = ArticleIndex()
+        assert index.memory_usage()["bytes_per_document"] == 0.0
+        index.add(1, 1, "東京", "本文")
+        usage = index.memory_usage()
+
+        assert usage["documents"] == 1
+        assert usage["tokens"] > 0
+        assert usage["bytes_per_document"] == usage["bytes"]
+
+
+class TestBM25Ranking:
+    """BM25による関連度順のテスト"""
+
+    def test_frequencies_weight_title(self):
+        """タイトルの出現回数が重み付けされるテスト"""
+        frequencies, length = document_frequencies(document_text("東京", "東京都"))
+
+        assert frequencies["東京"] == 3
+        assert frequencies["京都"] == 1
+        assert length == 4
+
+    def test_ranked_order(self):
+        """出現回数が多くタイトルに含まれる記事が上位になるテスト"""
+        index = ArticleIndex()
+        index.add(1, 1, "雑記", "東京に行った。長い長い長い本文が続く日記です")
+        index.add(2, 2, "雑記", "東京 東京 東京")
+        index.add(3, 3, "東京", "本文")
+        index.add(4, 4, "京都", "関係ない記事")
+
+        assert index.search(["東京"]) == [3, 2, 1]
+        ranked = index.search(["東京"], ranked=True)
+        assert ranked[-1] == 1
+        assert set(ranked) == {1, 2, 3}
+
+    def test_ties_fall_back_to_newest(self):
+        """スコアが同じ場合は記事ID降順になるテスト"""
+        index = ArticleIndex()
+        index.add(1, 10, "東京", "")
+        index.add(2, 30, "東京", "")
+        index.add(3, 20, "東京", "")
+
+        assert index.search(["東京"], ranked=True) == [2, 3, 1]
+
+    def test_matches_reference_implementation(self):
+        """ベクトル演算のスコアが1件ずつ計算した値と一致するテスト"""
+        index = ArticleIndex()
+        bodies = ["東京大学", "東京 東京", "東京タワーと東京駅", "大学の東京キャンパス"]
+        for i, body in enumerate(bodies, start=1):
+            index.add(i, i, "記事", body)
+        runs = ["東京", "大学"]
+        matched = index.candidates(runs)
+
+        scores = index.bm25_scores(matched, runs)
+
+        documents = len(bodies)
+        average = index._total_length / documents
+        for row_id, score in zip(matched, scores):
+            frequencies, length = document_frequencies(
+                document_text("記事", bodies[row_id - 1])
+            )
+            expected = 0.0
+            for token in ("東京", "大学"):
+                df = len(index._postings[token])
+                idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+                tf = frequencies[token]
+                expected += idf * tf * (BM25_K1 + 1) / (
+                    tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average)
+                )
+            assert score == pytest.approx(expected)
+
+    def test_remove_updates_statistics(self):
+        """削除した記事が文書長の合計から除かれるテスト"""
+        index = ArticleIndex()
+        index.add(1, 1, "東京", "本文")
+        index.add(2, 2, "京都", "本文")
+        index.remove(2)
+
+        assert index._total_length == document_frequencies(document_text("東京", "本文"))[1]
+        assert list(index._frequencies["本文"]) == [1]
+
+
+class TestInMemorySearch:
+    """転置インデックスを使用した検索のテスト"""
+
+    def test_search(self, db):
+        """データベースの索引を使わずに検索できるテスト"""
+        results, total, backend = search_articles(db, ["東京"], limit=10)
+
+        assert backend == "memory"
+        assert _ids(results) == [2, 1]
+        assert total == 2
+
+    def test_kana_and_pagination(self, db):
+        """カナの表記揺れ・ページネーションに対応するテスト"""
+        results, total, _ = search_articles(db, ["らーめん"], limit=10)
+        assert _ids(results) == [3]
+
+        results, total, _ = search_articles(db, ["京"], limit=1, skip=1)
+        assert _ids(results) == [2]
+        assert total == 3
+
+        results, total, _ = search_articles(db, ["京"], limit=1, cursor_id=2)
+        assert _ids(results) == [1]
+        assert total == 1
+
+    def test_phrase_verified_against_database(self, db):
+        """bigramが離れた位置にある記事をデータベースの行で除外するテスト"""
+        db.add(Article(article_id=4, title="東京と京都", body="", user_id=1))
+        db.add(Article(article_id=5, title="東京都庁", body="", user_id=1))
+        db.commit()
+
+        results, total, backend = search_articles(db, ["東京都"], limit=10)
+
+        assert backend == "memory"
+        assert _ids(results) == [5]
+        assert total == 1
+
+    def test_relevance_sort(self, db):
+        """関連度順で検索できるテスト"""
+        results, total, backend = search_articles(
+            db, ["東京"], limit=10, sort=article_search.SORT_RELEVANCE
+        )
+
+        assert backend == "memory"
+        assert _ids(results) == [1, 2]
+        assert total == 2
+
+    def test_incremental_updates(self, db):
+        """コミットした追加・更新・削除がインデックスに反映されるテスト"""
+        db.add(Article(article_id=4, title="大阪", body="たこ焼き", user_id=1))
+        db.commit()
+        results, _, _ = search_articles(db, ["大阪"], limit=10)
+        assert _ids(results) == [4]
+
+        article = db.query(Article).filter(Article.article_id == 4).first()
+        article.title = "名古屋"
+        db.commit()
+        assert search_articles(db, ["大阪"], limit=10)[0] == []
+        assert _ids(search_articles(db, ["名古屋"], limit=10)[0]) == [4]
+
+        db.delete(article)
+        db.commit()
+        assert search_articles(db, ["名古屋"], limit=10)[0] == []
+
+    def test_rollback_not_applied(self, db):
+        """ロールバックした変更はインデックスに反映されないテスト"""
+        db.add(Article(article_id=4, title="大阪", body="b", user_id=1))
+        db.flush()
+        db.rollback()
+
+        assert search_articles(db, ["大阪"], limit=10)[0] == []
+        assert len(article_index) == 3
+
+    def test_other_engine_not_indexed(self, engine):
+        """別のエンジンへの書き込みはインデックスに反映されないテスト"""
+        other = create_engine("sqlite:///:memory:", echo=False)
+        Base.metadata.create_all(bind=other)
+        session = sessionmaker(bind=other)()
+        session.add(Article(article_id=10, title="大阪", body="b"))
+        session.commit()
+        session.close()
+        other.dispose()
+
+        assert len(article_index) == 3
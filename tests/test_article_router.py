@@ -8,6 +8,16 @@ from sqlalchemy import func
 from typing import List, Optional
 import asyncio
 
+from utils.markdown_renderer import render_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_render_cache():
+    """Markdown変換キャッシュをテストごとに初期化する"""
+    render_cache.clear()
+    yield
+    render_cache.clear()
+
 
 class TestArticleRouterDependencies:
     """記事ルーターの依存関数テスト"""
@@ -77,7 +87,7 @@ class TestAllFetchEndpoint:
         
         # 非同期関数のテスト
         async def test_fetch():
-            result = await all_fetch(mock_db, mock_current_user, None)
+            result = all_fetch(mock_db, mock_current_user, None)
             return result
         
         result = asyncio.run(test_fetch())
@@ -111,7 +121,7 @@ class TestAllFetchEndpoint:
         
         # 非同期関数のテスト
         async def test_fetch():
-            result = await all_fetch(mock_db, mock_current_user, 2)
+            result = all_fetch(mock_db, mock_current_user, 2)
             return result
         
         result = asyncio.run(test_fetch())
@@ -139,7 +149,7 @@ class TestAllFetchEndpoint:
         
         # 非同期関数のテスト
         async def test_fetch():
-            result = await all_fetch(mock_db, mock_current_user, None)
+            result = all_fetch(mock_db, mock_current_user, None)
             return result
         
         result = asyncio.run(test_fetch())
@@ -161,7 +171,7 @@ class TestAllFetchEndpoint:
         # 非同期関数のテスト
         async def test_fetch():
             with pytest.raises(HTTPException) as exc_info:
-                await all_fetch(mock_db, mock_current_user, None)
+                all_fetch(mock_db, mock_current_user, None)
             return exc_info.value
         
         exception = asyncio.run(test_fetch())
@@ -201,7 +211,7 @@ class TestGetArticleEndpoint:
         
         # 非同期関数のテスト
         async def test_get():
-            result = await get_article(100, mock_db)
+            result = get_article(100, mock_db)
             return result
         
         result = asyncio.run(test_get())
@@ -231,7 +241,7 @@ class TestGetArticleEndpoint:
         # 非同期関数のテスト
         async def test_get():
             with pytest.raises(HTTPException) as exc_info:
-                await get_article(999, mock_db)
+                get_article(999, mock_db)
             return exc_info.value
         
         exception = asyncio.run(test_get())
@@ -253,7 +263,7 @@ class TestGetArticleEndpoint:
         # 非同期関数のテスト
         async def test_get():
             with pytest.raises(HTTPException) as exc_info:
-                await get_article(100, mock_db)
+                get_article(100, mock_db)
             return exc_info.value
         
         exception = asyncio.run(test_get())
@@ -295,7 +305,6 @@ class TestCreateArticleEndpoint:
         mock_db = Mock(spec=Session)
         mock_query = Mock()
         mock_db.query.return_value = mock_query
-        mock_query.scalar.return_value = 99  # 最大ID
         
         # 新記事オブジェクトのモック
         new_article = Mock()
@@ -304,10 +313,15 @@ class TestCreateArticleEndpoint:
         new_article.body = mock_article_data.body
         new_article.user_id = mock_current_user.id
         
-        with patch('routers.article.Article') as mock_article_model:
+        with patch('routers.article.Article') as mock_article_model, \
+             patch('routers.article.allocate_article_ids', return_value=[100]) as mock_allocate:
             mock_article_model.return_value = new_article
             
-            result = await create_article(mock_article_data, mock_db, mock_current_user)
+            result = create_article(mock_article_data, mock_db, mock_current_user)
+
+            # 記事IDは採番モジュールから取得する
+            mock_allocate.assert_called_once_with(mock_db)
+            assert mock_article_model.call_args.kwargs["article_id"] == 100
             
             # 結果検証
             assert result.article_id == 100
@@ -319,6 +333,35 @@ class TestCreateArticleEndpoint:
             mock_db.add.assert_called_once_with(new_article)
             mock_db.commit.assert_called_once()
             mock_db.refresh.assert_called_once_with(new_article)
+
+            # 変換済みHTMLが保存されることを確認
+            from utils.markdown_renderer import renderer_stamp
+            assert new_article.body_html == "<p>これは新しい記事の本文です。</p>"
+            assert new_article.render_version == renderer_stamp()
+
+    @pytest.mark.asyncio
+    async def test_write_bumps_articles_generation(self, mock_current_user):
+        """記事の作成・更新・削除で検索キャッシュの世代番号が進むテスト"""
+        from routers.article import create_article, delete_article, update_article
+        from schemas import ArticleBase
+        from utils.search_cache import articles_generation
+
+        mock_db = Mock(spec=Session)
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.first.return_value = Mock(
+            article_id=100, title="タイトル", body="本文", user_id=1
+        )
+        data = ArticleBase(article_id=100, title="タイトル", body="本文", user_id=1)
+        before = articles_generation.value
+
+        with patch('routers.article.allocate_article_ids', return_value=[100]):
+            create_article(data, mock_db, mock_current_user)
+        update_article(100, data, mock_db, mock_current_user)
+        delete_article(100, mock_db, mock_current_user)
+
+        assert articles_generation.value == before + 3
     
     @pytest.mark.asyncio
     async def test_create_article_empty_title(self, mock_current_user):
@@ -337,7 +380,7 @@ class TestCreateArticleEndpoint:
         )
         
         with pytest.raises(HTTPException) as exc_info:
-            await create_article(article_data, mock_db, mock_current_user)
+            create_article(article_data, mock_db, mock_current_user)
         
         assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
         assert "タイトルは必須項目です" in exc_info.value.detail
@@ -359,7 +402,7 @@ class TestCreateArticleEndpoint:
         )
         
         with pytest.raises(HTTPException) as exc_info:
-            await create_article(article_data, mock_db, mock_current_user)
+            create_article(article_data, mock_db, mock_current_user)
         
         assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
         assert "本文は必須項目です" in exc_info.value.detail
@@ -419,7 +462,7 @@ class TestUpdateArticleEndpoint:
             user_id=1
         )
         
-        result = await update_article(100, update_data, mock_db, mock_current_user)
+        result = update_article(100, update_data, mock_db, mock_current_user)
         
         # 更新確認
         assert mock_existing_article.title == "更新されたタイトル"
@@ -455,7 +498,7 @@ class TestUpdateArticleEndpoint:
         )
         
         with pytest.raises(HTTPException) as exc_info:
-            await update_article(999, update_data, mock_db, mock_current_user)
+            update_article(999, update_data, mock_db, mock_current_user)
         
         assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
         assert "Article not found" in exc_info.value.detail
@@ -482,7 +525,7 @@ class TestUpdateArticleEndpoint:
         )
         
         with pytest.raises(HTTPException) as exc_info:
-            await update_article(100, update_data, mock_db, mock_current_user)
+            update_article(100, update_data, mock_db, mock_current_user)
         
         assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
         assert "タイトルは必須項目です" in exc_info.value.detail
@@ -508,7 +551,7 @@ class TestUpdateArticleEndpoint:
         )
         
         with pytest.raises(HTTPException) as exc_info:
-            await update_article(100, update_data, mock_db, mock_current_user)
+            update_article(100, update_data, mock_db, mock_current_user)
         
         assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
         assert "Article not updated" in exc_info.value.detail
@@ -548,7 +591,7 @@ class TestDeleteArticleEndpoint:
         mock_query.first.return_value = mock_existing_article
         
         with patch('builtins.print') as mock_print:
-            result = await delete_article(100, mock_db, mock_current_user)
+            result = delete_article(100, mock_db, mock_current_user)
         
         # データベース操作確認
         mock_db.delete.assert_called_once_with(mock_existing_article)
@@ -573,7 +616,7 @@ class TestDeleteArticleEndpoint:
         mock_query.first.return_value = None  # 記事が見つからない
         
         with pytest.raises(HTTPException) as exc_info:
-            await delete_article(999, mock_db, mock_current_user)
+            delete_article(999, mock_db, mock_current_user)
         
         assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
         assert "Article not found" in exc_info.value.detail
@@ -591,7 +634,7 @@ class TestDeleteArticleEndpoint:
         mock_query.first.side_effect = ValueError("Database error")
         
         with pytest.raises(HTTPException) as exc_info:
-            await delete_article(100, mock_db, mock_current_user)
+            delete_article(100, mock_db, mock_current_user)
         
         assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
         assert "Article not deleted" in exc_info.value.detail
@@ -622,15 +665,16 @@ class TestPublicArticlesEndpoint:
         mock_query = Mock()
         mock_db.query.return_value = mock_query
         mock_query.count.return_value = 5
+        mock_db.get.return_value = Mock(total_articles=5)
         mock_query.order_by.return_value = mock_query
         mock_query.all.return_value = mock_articles
         
-        with patch('routers.article.markdown.Markdown') as mock_md_class:
+        with patch('utils.markdown_renderer.markdown.Markdown') as mock_md_class:
             mock_md_instance = Mock()
             mock_md_class.return_value = mock_md_instance
             mock_md_instance.convert.side_effect = lambda x: f"<p>{x}</p>"
             
-            result = await get_public_articles(mock_db)
+            result = get_public_articles(mock_db, limit=None, skip=0, after=None)
             
             # 結果検証
             assert len(result) == 5
@@ -648,16 +692,17 @@ class TestPublicArticlesEndpoint:
         mock_query = Mock()
         mock_db.query.return_value = mock_query
         mock_query.count.return_value = 10
+        mock_db.get.return_value = Mock(total_articles=10)
         mock_query.order_by.return_value = mock_query
         mock_query.limit.return_value = mock_query
         mock_query.all.return_value = mock_articles[:3]  # 3件のみ
         
-        with patch('routers.article.markdown.Markdown') as mock_md_class:
+        with patch('utils.markdown_renderer.markdown.Markdown') as mock_md_class:
             mock_md_instance = Mock()
             mock_md_class.return_value = mock_md_instance
             mock_md_instance.convert.side_effect = lambda x: f"<p>{x}</p>"
             
-            result = await get_public_articles(mock_db, limit=3)
+            result = get_public_articles(mock_db, limit=3, skip=0, after=None)
             
             # 結果検証
             assert len(result) == 3
@@ -673,20 +718,85 @@ class TestPublicArticlesEndpoint:
         mock_query = Mock()
         mock_db.query.return_value = mock_query
         mock_query.count.return_value = 10
+        mock_db.get.return_value = Mock(total_articles=10)
         mock_query.order_by.return_value = mock_query
         mock_query.offset.return_value = mock_query
         mock_query.all.return_value = mock_articles[2:]  # 2件スキップ
         
-        with patch('routers.article.markdown.Markdown') as mock_md_class:
+        with patch('utils.markdown_renderer.markdown.Markdown') as mock_md_class:
             mock_md_instance = Mock()
             mock_md_class.return_value = mock_md_instance
             mock_md_instance.convert.side_effect = lambda x: f"<p>{x}</p>"
             
-            result = await get_public_articles(mock_db, skip=2)
+            result = get_public_articles(mock_db, limit=None, skip=2, after=None)
             
             # 結果検証
             assert len(result) == 3
             mock_query.offset.assert_called_once_with(2)
+
+    @pytest.mark.asyncio
+    async def test_get_public_articles_with_cursor(self, mock_articles):
+        """カーソル指定時は記事IDでシークし、次ページのカーソルを返すテスト"""
+        from fastapi import Response
+        from routers.article import get_public_articles
+        from utils.pagination import encode_cursor, decode_cursor
+
+        mock_db = Mock(spec=Session)
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.count.return_value = 10
+        mock_db.get.return_value = Mock(total_articles=10)
+        mock_query.order_by.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.limit.return_value = mock_query
+        mock_query.all.return_value = mock_articles[:2]
+        response = Response()
+
+        result = get_public_articles(
+            mock_db, limit=2, skip=5, after=encode_cursor(50), response=response
+        )
+
+        assert len(result) == 2
+        mock_query.filter.assert_called_once()
+        mock_query.offset.assert_not_called()
+        assert decode_cursor(response.headers["X-Next-Cursor"]) == 2
+        assert response.headers["X-Total-Count"] == "10"
+        mock_query.count.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_public_articles_last_page_has_no_cursor(self, mock_articles):
+        """最終ページでは次ページのカーソルを返さないテスト"""
+        from fastapi import Response
+        from routers.article import get_public_articles
+
+        mock_db = Mock(spec=Session)
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.count.return_value = 5
+        mock_db.get.return_value = Mock(total_articles=5)
+        mock_query.order_by.return_value = mock_query
+        mock_query.limit.return_value = mock_query
+        mock_query.all.return_value = mock_articles[:3]
+        response = Response()
+
+        get_public_articles(
+            mock_db, limit=10, skip=0, after=None, response=response
+        )
+
+        assert "X-Next-Cursor" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_get_public_articles_invalid_cursor(self):
+        """不正なカーソルの場合は400エラーを返すテスト"""
+        from routers.article import get_public_articles
+
+        mock_db = Mock(spec=Session)
+
+        with pytest.raises(HTTPException) as exc_info:
+            get_public_articles(mock_db, limit=None, skip=0, after="@@invalid@@")
+
+        assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+        mock_db.query.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_get_public_articles_database_error(self):
@@ -698,7 +808,7 @@ class TestPublicArticlesEndpoint:
         mock_db.query.side_effect = Exception("Database connection error")
         
         with pytest.raises(HTTPException) as exc_info:
-            await get_public_articles(mock_db)
+            get_public_articles(mock_db, limit=None, skip=0, after=None)
         
         assert exc_info.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
         assert "記事の取得に失敗しました" in exc_info.value.detail
@@ -714,6 +824,8 @@ class TestGetPublicArticleByIdEndpoint:
         article.article_id = 100
         article.title = "特定記事"
         article.body = "**特定記事**の詳細本文です。"
+        article.body_html = None
+        article.render_version = None
         return article
     
     @pytest.mark.asyncio
@@ -728,17 +840,37 @@ class TestGetPublicArticleByIdEndpoint:
         mock_query.filter.return_value = mock_query
         mock_query.first.return_value = mock_article
         
-        with patch('routers.article.markdown.Markdown') as mock_md_class:
+        with patch('utils.markdown_renderer.markdown.Markdown') as mock_md_class:
             mock_md_instance = Mock()
             mock_md_class.return_value = mock_md_instance
             mock_md_instance.convert.side_effect = lambda x: f"<p>{x}</p>"
             
-            result = await get_public_article_by_id(100, mock_db)
+            result = get_public_article_by_id(100, mock_db)
             
             # 結果検証
             assert result.article_id == 100
             assert result.title == "特定記事"
             assert "<p>**特定記事**の詳細本文です。</p>" in result.body_html
+
+    @pytest.mark.asyncio
+    async def test_get_public_article_by_id_uses_stored_html(self, mock_article):
+        """保存済みHTMLがある場合は再変換しないことのテスト"""
+        from routers.article import get_public_article_by_id
+        from utils.markdown_renderer import renderer_stamp
+
+        mock_article.body_html = "<p><strong>保存済み</strong></p>"
+        mock_article.render_version = renderer_stamp()
+        mock_db = Mock(spec=Session)
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.first.return_value = mock_article
+
+        with patch('utils.markdown_renderer.markdown.Markdown') as mock_md_class:
+            result = get_public_article_by_id(100, mock_db)
+
+            assert result.body_html == "<p><strong>保存済み</strong></p>"
+            mock_md_class.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_get_public_article_by_id_not_found(self):
@@ -753,11 +885,11 @@ class TestGetPublicArticleByIdEndpoint:
         mock_query.first.return_value = None  # 記事が見つからない
         
         with pytest.raises(HTTPException) as exc_info:
-            await get_public_article_by_id(999, mock_db)
+            get_public_article_by_id(999, mock_db)
         
-        # 実際の動作では、内部のHTTPExceptionが外側のExceptionハンドラーで捕まえられて500エラーになる
-        assert exc_info.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
-        assert "記事詳細の取得に失敗しました" in exc_info.value.detail
+        # 内部のHTTPExceptionは500に変換せず、そのまま返す
+        assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
+        assert "記事ID 999 の記事が見つかりません" in exc_info.value.detail
     
     @pytest.mark.asyncio
     async def test_get_public_article_by_id_database_error(self):
@@ -769,7 +901,7 @@ class TestGetPublicArticleByIdEndpoint:
         mock_db.query.side_effect = Exception("Database error")
         
         with pytest.raises(HTTPException) as exc_info:
-            await get_public_article_by_id(100, mock_db)
+            get_public_article_by_id(100, mock_db)
         
         assert exc_info.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
         assert "記事詳細の取得に失敗しました" in exc_info.value.detail
@@ -0,0 +1,299 @@
+"""utils/article_search.py の単体テスト"""
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from exceptions import SearchSortUnavailableError
+from models import Article, User
+from utils import article_search
+from utils.article_search import (
+    ensure_search_index,
+    ngram_tokens,
+    normalize_text,
+    query_runs,
+    search_articles,
+)
+from utils.search_cache import search_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_search_cache():
+    """テスト間で検索結果のキャッシュを共有しない"""
+    search_cache.clear()
+    yield
+    search_cache.clear()
+
+
+@pytest.fixture
+def engine():
+    """全文検索インデックスを準備したインメモリデータベース"""
+    # エンドポイントはワーカースレッドで実行されるため、スレッド間で接続を共有する
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    assert ensure_search_index(engine) is True
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """アプリケーションと同じ設定のセッション"""
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def articles(db):
+    """検索対象の記事"""
+    user = User(name="search", email="search@example.com", password="x")
+    db.add(user)
+    db.commit()
+    rows = [
+        Article(article_id=1, title="東京の天気", body="今日は晴れです", user_id=user.id),
+        Article(article_id=2, title="Python入門", body="FastAPIで東京のAPIを作る", user_id=user.id),
+        Article(article_id=3, title="ラーメン", body="京都のラーメン屋", user_id=user.id),
+        Article(article_id=4, title="雑記", body="東京 東京 東京", user_id=user.id),
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def _ids(results):
+    return [article.article_id for article in results]
+
+
+class TestNormalization:
+    """正規化・トークン分割のテスト"""
+
+    def test_normalize_width_case_and_kana(self):
+        """全角英数字・大文字・カタカナが統一されるテスト"""
+        assert normalize_text("ＰｙｔｈｏｎとPYTHON") == "pythonとpython"
+        assert normalize_text("ラーメン") == "らーめん"
+        # 半角カナもNFKC正規化後にひらがなになる
+        assert normalize_text("ﾗｰﾒﾝ") == "らーめん"
+
+    def test_ngram_tokens(self):
+        """文字bigramと末尾の1文字に分割されるテスト"""
+        assert ngram_tokens("東京都") == ["東京", "京都", "都"]
+        assert ngram_tokens("a b") == ["a", "b"]
+
+    def test_query_runs(self):
+        """検索キーワードがフレーズ単位に分割されるテスト"""
+        assert query_runs(["東京都", "京"]) == [["東京", "京都"], ["京"]]
+        assert query_runs(["!!!"]) == []
+
+
+class TestSearchArticles:
+    """全文検索のテスト"""
+
+    def test_japanese_substring(self, db, articles):
+        """日本語の部分一致で検索できるテスト"""
+        results, total, backend = search_articles(db, ["東京"], limit=10)
+
+        assert backend == "fts5"
+        assert _ids(results) == [4, 2, 1]
+        assert total == 3
+
+    def test_single_character(self, db, articles):
+        """1文字のキーワードでも検索できるテスト"""
+        results, total, _ = search_articles(db, ["京"], limit=10)
+
+        assert _ids(results) == [4, 3, 2, 1]
+        assert total == 4
+
+    def test_and_search(self, db, articles):
+        """複数キーワードがAND検索になるテスト"""
+        results, total, _ = search_articles(db, ["東京", "api"], limit=10)
+
+        assert _ids(results) == [2]
+        assert total == 1
+
+    def test_kana_and_width_insensitive(self, db, articles):
+        """ひらがな・全角英字でも検索できるテスト"""
+        results, _, _ = search_articles(db, ["らーめん"], limit=10)
+        assert _ids(results) == [3]
+
+        results, _, _ = search_articles(db, ["ＦＡＳＴＡＰＩ"], limit=10)
+        assert _ids(results) == [2]
+
+    def test_no_false_positive_across_words(self, db, articles):
+        """フレーズとして連続しない文字列は一致しないテスト"""
+        results, total, _ = search_articles(db, ["京東"], limit=10)
+
+        assert results == []
+        assert total == 0
+
+    def test_pagination_returns_total(self, db, articles):
+        """ページ取得と同時に総数が返されるテスト"""
+        results, total, _ = search_articles(db, ["東京"], limit=2, skip=1)
+        assert _ids(results) == [2, 1]
+        assert total == 3
+
+        results, total, _ = search_articles(db, ["東京"], limit=2, cursor_id=4)
+        assert _ids(results) == [2, 1]
+        assert total == 2
+
+        results, total, _ = search_articles(db, ["東京"], limit=2, skip=10)
+        assert results == []
+        assert total == 3
+
+    def test_relevance_sort(self, db, articles):
+        """関連度順ではタイトル一致・出現回数の多い記事が先になるテスト"""
+        results, _, _ = search_articles(
+            db, ["東京"], limit=10, sort=article_search.SORT_RELEVANCE
+        )
+
+        assert _ids(results)[0] in (1, 4)
+        assert _ids(results)[-1] == 2
+
+
+class TestIndexMaintenance:
+    """記事の書き込みに合わせたインデックス更新のテスト"""
+
+    def test_update_and_delete(self, db, articles):
+        """記事の更新・削除が検索結果に反映されるテスト"""
+        article = db.query(Article).filter(Article.article_id == 3).first()
+        article.body = "東京のラーメン屋"
+        db.commit()
+
+        results, _, _ = search_articles(db, ["東京"], limit=10)
+        assert 3 in _ids(results)
+        results, _, _ = search_articles(db, ["京都"], limit=10)
+        assert results == []
+
+        db.delete(article)
+        db.commit()
+        results, _, _ = search_articles(db, ["ラーメン"], limit=10)
+        assert results == []
+
+    def test_rollback_discards_index_update(self, db, articles):
+        """ロールバック時は検索用テーブルも元に戻るテスト"""
+        db.add(Article(article_id=5, title="大阪", body="b", user_id=articles[0].user_id))
+        db.flush()
+        db.rollback()
+
+        results, _, _ = search_articles(db, ["大阪"], limit=10)
+        assert results == []
+
+    def test_existing_articles_indexed_on_creation(self):
+        """既存の記事がインデックス作成時に索引されるテスト"""
+        engine = create_engine("sqlite:///:memory:", echo=False)
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO articles (article_id, title, body) "
+                "VALUES (1, '既存記事', '本文')"
+            ))
+        ensure_search_index(engine)
+
+        session = sessionmaker(bind=engine)()
+        results, total, backend = search_articles(session, ["既存"], limit=10)
+        assert backend == "fts5"
+        assert _ids(results) == [1]
+        session.close()
+        engine.dispose()
+
+
+class TestLikeFallback:
+    """ILIKE検索へのフォールバックのテスト"""
+
+    def test_like_backend(self, db, articles):
+        """likeを指定した場合はILIKE検索になるテスト"""
+        with patch.object(article_search, "SEARCH_BACKEND", "like"):
+            results, total, backend = search_articles(db, ["東京"], limit=2)
+
+        assert backend == "like"
+        assert _ids(results) == [4, 2]
+        assert total == 3
+
+    def test_unindexed_engine(self):
+        """検索用テーブルが無い場合はILIKE検索になるテスト"""
+        engine = create_engine("sqlite:///:memory:", echo=False)
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        session.add(Article(article_id=1, title="東京", body="b"))
+        session.commit()
+
+        results, total, backend = search_articles(session, ["東京"], limit=10)
+        assert backend == "like"
+        assert _ids(results) == [1]
+        assert total == 1
+        session.close()
+        engine.dispose()
+
+    def test_relevance_rejected(self, db, articles):
+        """ILIKE検索では関連度順を指定すると400になるテスト"""
+        with patch.object(article_search, "SEARCH_BACKEND", "like"):
+            with pytest.raises(SearchSortUnavailableError) as exc_info:
+                search_articles(
+                    db, ["東京"], limit=10, sort=article_search.SORT_RELEVANCE
+                )
+
+        assert exc_info.value.status_code == 400
+
+    def test_symbol_only_relevance_rejected(self, db, articles):
+        """記号のみのキーワードで関連度順を指定すると400になるテスト"""
+        with pytest.raises(SearchSortUnavailableError):
+            search_articles(db, ["!!"], limit=10, sort=article_search.SORT_RELEVANCE)
+
+
+class TestSearchEndpoint:
+    """検索エンドポイントのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_search_headers(self, db, articles):
+        """総数とカーソルがレスポンスヘッダーで返されるテスト"""
+        from fastapi import Response
+        from routers.article import search_public_articles
+
+        response = Response()
+        results = search_public_articles(
+            q="東京", db=db, limit=2, skip=0, after=None,
+            sort="new", response=response
+        )
+
+        assert [article.article_id for article in results] == [4, 2]
+        assert response.headers["X-Total-Count"] == "3"
+        assert "X-Next-Cursor" in response.headers
+
+    @pytest.mark.asyncio
+    async def test_relevance_sort_has_no_cursor(self, db, articles):
+        """関連度順ではカーソルを返さないテスト"""
+        from fastapi import Response
+        from routers.article import search_public_articles
+
+        response = Response()
+        results = search_public_articles(
+            q="東京", db=db, limit=2, skip=0, after=None,
+            sort="relevance", response=response
+        )
+
+        assert len(results) == 2
+        assert "X-Next-Cursor" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_relevance_unavailable_returns_400(self, db, articles):
+        """ILIKE検索にフォールバックする場合、関連度順は500ではなく400を返すテスト"""
+        from fastapi import HTTPException, Response
+        from routers.article import search_public_articles
+
+        with patch.object(article_search, "SEARCH_BACKEND", "like"):
+            with pytest.raises(HTTPException) as exc_info:
+                search_public_articles(
+                    q="東京", db=db, limit=2, skip=0, after=None,
+                    sort="relevance", response=Response()
+                )
+            results = search_public_articles(
+                q="東京", db=db, limit=2, skip=0, after=None,
+                sort="new", response=Response()
+            )
+
+        assert exc_info.value.status_code == 400
+        assert [article.article_id for article in results] == [4, 2]
@@ -0,0 +1,166 @@
+"""utils/article_stats.py の単体テスト"""
+import pytest
+from unittest.mock import Mock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from database import Base
+from models import Article, ArticleStats, User
+from utils import article_stats
+from utils.article_stats import (
+    adjust_article_count,
+    ensure_article_stats,
+    get_total_article_count,
+    get_user_article_count,
+    rebuild_article_counts,
+)
+
+
+@pytest.fixture
+def engine():
+    """テスト用のインメモリデータベース"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """アプリケーションと同じ設定のセッション"""
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    """テスト用ユーザー"""
+    user = User(name="counter", email="counter@example.com", password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+class TestAdjustArticleCount:
+    """記事数の増減のテスト"""
+
+    def test_create_and_delete(self, db, user):
+        """作成・削除に合わせて全体とユーザー別の記事数が更新されるテスト"""
+        for i in range(3):
+            db.add(Article(article_id=i + 1, title="t", body="b", user_id=user.id))
+            adjust_article_count(db, user.id, 1)
+            db.commit()
+
+        assert get_total_article_count(db) == 3
+        assert get_user_article_count(db, user.id) == 3
+
+        article = db.query(Article).first()
+        db.delete(article)
+        adjust_article_count(db, user.id, -1)
+        db.commit()
+
+        assert get_total_article_count(db) == 2
+        assert get_user_article_count(db, user.id) == 2
+
+    def test_stats_row_initialized_from_existing_rows(self, db, user):
+        """集計行が無い場合は既存の記事数から作成されるテスト"""
+        db.add_all([
+            Article(article_id=1, title="t", body="b", user_id=user.id),
+            Article(article_id=2, title="t", body="b", user_id=user.id),
+        ])
+        db.commit()
+
+        db.add(Article(article_id=3, title="t", body="b", user_id=user.id))
+        adjust_article_count(db, user.id, 1)
+        db.commit()
+
+        assert get_total_article_count(db) == 3
+
+    def test_rollback_discards_counter_update(self, db, user):
+        """ロールバック時は記事数も元に戻るテスト"""
+        get_total_article_count(db)
+        db.add(Article(article_id=1, title="t", body="b", user_id=user.id))
+        adjust_article_count(db, user.id, 1)
+        db.rollback()
+
+        assert get_total_article_count(db) == 0
+        assert get_user_article_count(db, user.id) == 0
+
+    def test_user_deletion_decrements_total_only(self, db, user):
+        """ユーザー削除時は全体の記事数のみ減算されるテスト"""
+        for i in range(2):
+            db.add(Article(article_id=i + 1, title="t", body="b", user_id=user.id))
+            adjust_article_count(db, user.id, 1)
+        db.commit()
+
+        adjust_article_count(db, None, -2)
+        db.commit()
+
+        assert get_total_article_count(db) == 0
+
+
+class TestEnsureArticleStats:
+    """集計行の作成のテスト"""
+
+    def test_read_does_not_create_stats_row(self, db, user):
+        """集計行が無い場合は書き込まずに記事数を数えるテスト"""
+        db.add(Article(article_id=1, title="t", body="b", user_id=user.id))
+        db.commit()
+
+        assert get_total_article_count(db) == 1
+        assert db.get(ArticleStats, article_stats.GLOBAL_STATS_ID) is None
+
+    def test_ensure_article_stats(self, engine, db, user):
+        """起動時に既存の記事数で集計行が作成されるテスト"""
+        db.add(Article(article_id=1, title="t", body="b", user_id=user.id))
+        db.commit()
+
+        ensure_article_stats(engine)
+        ensure_article_stats(engine)
+
+        stats = db.get(ArticleStats, article_stats.GLOBAL_STATS_ID)
+        assert stats.total_articles == 1
+
+
+class TestApproximateCount:
+    """概算モードのテスト"""
+
+    def test_approximate_mode_ignored_on_sqlite(self, db):
+        """SQLiteでは概算モードが無効になるテスト"""
+        with patch.object(article_stats, "ARTICLE_COUNT_MODE", "approximate"):
+            assert article_stats.use_approximate_count(db) is False
+
+    def test_approximate_mode_uses_pg_class(self):
+        """PostgreSQLではpg_classの概算値を返すテスト"""
+        mock_db = Mock(spec=Session)
+        mock_db.get_bind.return_value.dialect.name = "postgresql"
+        mock_db.execute.return_value.scalar.return_value = 12345
+
+        with patch.object(article_stats, "ARTICLE_COUNT_MODE", "approximate"):
+            assert get_total_article_count(mock_db) == 12345
+            adjust_article_count(mock_db, None, 1)
+
+        # 概算モードでは全体の集計行を更新しない
+        mock_db.get.assert_not_called()
+
+
+class TestRebuildArticleCounts:
+    """集計値の再計算のテスト"""
+
+    def test_rebuild(self, db, user):
+        """記事テーブルから集計値が再計算されるテスト"""
+        other = User(name="other", email="other@example.com", password="x")
+        db.add(other)
+        db.commit()
+        db.add_all([
+            Article(article_id=1, title="t", body="b", user_id=user.id),
+            Article(article_id=2, title="t", body="b", user_id=user.id),
+            Article(article_id=3, title="t", body="b", user_id=other.id),
+        ])
+        db.commit()
+
+        assert rebuild_article_counts(db) == 3
+        assert get_total_article_count(db) == 3
+        assert get_user_article_count(db, user.id) == 2
+        assert get_user_article_count(db, other.id) == 1
@@ -4,9 +4,16 @@ from unittest.mock import Mock, patch, MagicMock
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.testclient import TestClient
-from sqlalchemy.orm import Session
+import time
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 from typing import Generator
 
+from database import Base
+from models import RevokedToken
+
 
 class TestLoginEndpoint:
     """ログインエンドポイントのテスト"""
@@ -57,7 +64,8 @@ class TestLoginEndpoint:
         mock_db.query.assert_called()
         mock_verify.assert_called_with("test_password", "hashed_password")
         mock_create_token.assert_called_with(
-            data={"sub": "test@example.com", "id": 1}
+            data={"sub": "test@example.com", "id": 1},
+            token_version=mock_user.token_version
         )
     
     def test_login_user_not_found(self, login_request_form):
@@ -109,30 +117,32 @@ class TestLoginEndpoint:
 class TestTokenVerification:
     """トークン検証機能のテスト"""
     
-    @patch('routers.auth.jwt.decode')
-    def test_verify_token_success(self, mock_jwt_decode):
+    @patch('routers.auth.SECRET_KEY', 'test_secret_key')
+    @patch('routers.auth.decode_token')
+    def test_verify_token_success(self, mock_decode_token):
         """トークン検証成功テスト"""
-        from routers.auth import verify_token
+        from routers.auth import ALGORITHM, verify_token
         
         # モック設定
-        mock_jwt_decode.return_value = {"sub": "test@example.com"}
+        mock_decode_token.return_value = {"sub": "test@example.com"}
         
         # テスト実行
         result = verify_token("valid_token")
         
-        # 結果検証
+        # 結果検証（設定された鍵・アルゴリズムで検証する）
         assert result == {"email": "test@example.com"}
-        mock_jwt_decode.assert_called_with(
-            "valid_token", "SECRET_KEY", algorithms=["HS256"]
+        mock_decode_token.assert_called_with(
+            "valid_token", "test_secret_key", algorithms=[ALGORITHM]
         )
     
-    @patch('routers.auth.jwt.decode')
-    def test_verify_token_no_subject(self, mock_jwt_decode):
+    @patch('routers.auth.SECRET_KEY', 'test_secret_key')
+    @patch('routers.auth.decode_token')
+    def test_verify_token_no_subject(self, mock_decode_token):
         """トークンにsubjectがない場合のテスト"""
         from routers.auth import verify_token
         
         # モック設定
-        mock_jwt_decode.return_value = {"exp": 1234567890}
+        mock_decode_token.return_value = {"exp": 1234567890}
         
         # テスト実行
         with pytest.raises(HTTPException) as exc_info:
@@ -142,14 +152,15 @@ class TestTokenVerification:
         assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
         assert "無効なトークンです" in str(exc_info.value.detail)
     
-    @patch('routers.auth.jwt.decode')
-    def test_verify_token_jwt_error(self, mock_jwt_decode):
+    @patch('routers.auth.SECRET_KEY', 'test_secret_key')
+    @patch('routers.auth.decode_token')
+    def test_verify_token_jwt_error(self, mock_decode_token):
         """JWT例外が発生した場合のテスト"""
         from routers.auth import verify_token
         from jose import JWTError
         
         # モック設定でJWTErrorを発生させる
-        mock_jwt_decode.side_effect = JWTError("Invalid token")
+        mock_decode_token.side_effect = JWTError("Invalid token")
         
         # テスト実行
         with pytest.raises(HTTPException) as exc_info:
@@ -160,51 +171,98 @@ class TestTokenVerification:
         assert "無効なトークンです" in str(exc_info.value.detail)
     
     def test_verify_token_blacklisted(self):
-        """ブラックリストに登録されたトークンのテスト"""
-        from routers.auth import verify_token, token_blacklist
-        
-        # トークンをブラックリストに追加
-        blacklisted_token = "blacklisted_token"
-        token_blacklist.add(blacklisted_token)
-        
+        """無効化されたトークンのテスト"""
+        from routers.auth import verify_token
+        from utils.token_revocation import token_id, token_revocation_store
+
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        payload = {"sub": "test@example.com", "jti": "blacklisted-jti", "exp": time.time() + 60}
+        token_revocation_store.revoke(engine, token_id("blacklisted_token", payload), payload["exp"])
+
         # テスト実行
-        with pytest.raises(HTTPException) as exc_info:
-            verify_token(blacklisted_token)
-        
+        with patch('routers.auth.engine', engine), \
+                patch('routers.auth.SECRET_KEY', 'test_secret_key'), \
+                patch('routers.auth.decode_token', return_value=payload):
+            with pytest.raises(HTTPException) as exc_info:
+                verify_token("blacklisted_token")
+
         # 例外検証
         assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
         assert "トークンが無効化されています" in str(exc_info.value.detail)
-        
-        # クリーンアップ
-        token_blacklist.remove(blacklisted_token)
+        engine.dispose()
+
+    def test_verify_token_with_configured_key(self):
+        """設定された鍵で署名したトークンを検証できるテスト"""
+        from custom_token import create_access_token
+        from routers.auth import verify_token
+
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        with patch('custom_token.SECRET_KEY', 'test_secret_key'), \
+                patch('routers.auth.SECRET_KEY', 'test_secret_key'), \
+                patch('routers.auth.engine', engine):
+            token = create_access_token(data={"sub": "test@example.com", "id": 1})
+            assert verify_token(token) == {"email": "test@example.com"}
+        engine.dispose()
+
+    def test_verify_token_missing_secret_key(self):
+        """SECRET_KEYが未設定の場合は401を返すテスト"""
+        from routers.auth import verify_token
+
+        with patch('routers.auth.SECRET_KEY', None):
+            with pytest.raises(HTTPException) as exc_info:
+                verify_token("valid_token")
+
+        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
 
 
 class TestLogoutEndpoint:
     """ログアウトエンドポイントのテスト"""
-    
+
     def test_logout_success(self):
         """ログアウト成功テスト"""
-        from routers.auth import logout, token_blacklist
+        from custom_token import create_access_token
+        from routers.auth import logout
+        from utils.token_revocation import token_revocation_store
         import asyncio
-        
-        # テスト前のブラックリストサイズ
-        initial_size = len(token_blacklist)
-        test_token = "test_logout_token"
-        
-        # 非同期関数のテスト
-        async def test_logout():
-            result = await logout(test_token)
-            return result
-        
-        result = asyncio.run(test_logout())
-        
+
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        with patch('custom_token.SECRET_KEY', 'test_secret_key'), \
+                patch('routers.auth.SECRET_KEY', 'test_secret_key'):
+            test_token = create_access_token(data={"sub": "test@example.com", "id": 1})
+
+            # 非同期関数のテスト
+            async def test_logout():
+                result = await logout(test_token, db)
+                return result
+
+            result = asyncio.run(test_logout())
+
         # 結果検証
         assert result == {"message": "ログアウトしました"}
-        assert test_token in token_blacklist
-        assert len(token_blacklist) == initial_size + 1
-        
+        jti = jwt.get_unverified_claims(test_token)["jti"]
+        assert token_revocation_store.is_revoked(engine, jti)
+        assert db.query(RevokedToken).count() == 1
+
         # クリーンアップ
-        token_blacklist.remove(test_token)
+        db.close()
+        engine.dispose()
+
+    def test_logout_invalid_token(self):
+        """無効なトークンでログアウトした場合のテスト"""
+        from routers.auth import logout
+        import asyncio
+
+        with patch('routers.auth.SECRET_KEY', 'test_secret_key'):
+            with pytest.raises(HTTPException) as exc_info:
+                asyncio.run(logout("test_logout_token", Mock(spec=Session)))
+
+        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
 
 
 class TestGetAllBlogsEndpoint:
@@ -233,7 +291,7 @@ class TestGetAllBlogsEndpoint:
         
         # 非同期関数のテスト
         async def test_get_blogs():
-            result = await get_all_blogs(mock_db)
+            result = get_all_blogs(mock_db)
             return result
         
         result = asyncio.run(test_get_blogs())
@@ -271,12 +329,12 @@ class TestChangePasswordEndpoint:
         user.password = "hashed_temp_password"
         return user
     
-    @patch('routers.auth.send_registration_complete_email')
+    @patch('routers.auth.enqueue_email')
     @patch('routers.auth.create_access_token')
     @patch('routers.auth.Hash.bcrypt')
     @patch('routers.auth.Hash.verify')
     def test_change_password_success(self, mock_verify, mock_bcrypt, 
-                                   mock_create_token, mock_send_email,
+                                   mock_create_token, mock_enqueue,
                                    password_change_request, mock_user):
         """パスワード変更成功テスト"""
         from routers.auth import change_password
@@ -288,7 +346,6 @@ class TestChangePasswordEndpoint:
         mock_verify.return_value = True
         mock_bcrypt.return_value = "hashed_new_password"
         mock_create_token.return_value = "new_access_token"
-        mock_send_email.return_value = None
         
         # 非同期関数のテスト
         async def test_change_password():
@@ -311,7 +368,9 @@ class TestChangePasswordEndpoint:
         mock_verify.assert_called_with("temp_password", "hashed_temp_password")
         mock_bcrypt.assert_called_with("new_password")
         mock_db.commit.assert_called_once()
-        mock_send_email.assert_called_once_with("test@example.com", "Test User")
+        mock_enqueue.assert_called_once_with(
+            mock_db, "registration_complete", "test@example.com", username="Test User"
+        )
     
     def test_change_password_user_not_found(self, password_change_request, mock_user):
         """ユーザーが見つからない場合のテスト"""
@@ -358,134 +417,35 @@ class TestChangePasswordEndpoint:
         assert exception.status_code == status.HTTP_400_BAD_REQUEST
         assert "無効な仮パスワードです" in str(exception.detail)
 
-    @patch('routers.auth.send_registration_complete_email')
-    @patch('routers.auth.create_access_token')
-    @patch('routers.auth.Hash.bcrypt')
-    @patch('routers.auth.Hash.verify')
-    def test_change_password_email_connection_error(self, mock_verify, mock_bcrypt, 
-                                                   mock_create_token, mock_send_email,
-                                                   password_change_request, mock_user):
-        """メール送信コネクションエラーのテスト"""
-        from routers.auth import change_password
-        import asyncio
-        
-        # モック設定
-        mock_db = Mock(spec=Session)
-        mock_db.query().filter().first.return_value = mock_user
-        mock_verify.return_value = True
-        mock_bcrypt.return_value = "hashed_new_password"
-        mock_create_token.return_value = "new_access_token"
-        mock_send_email.side_effect = ConnectionError("Connection failed")
-        
-        # 非同期関数のテスト
-        async def test_change_password():
-            result = await change_password(password_change_request, mock_db)
-            return result
-        
-        result = asyncio.run(test_change_password())
-        
-        # 結果検証
-        assert result["message"] == "パスワードが正常に変更されました。"
-        assert result["user_id"] == "1"
-        assert result["access_token"] == "new_access_token"
-        assert result["token_type"] == "bearer"
-        assert result["email_sent"] is False
-        assert result["email_error"] == "メールサーバーに接続できませんでした"
-        
-        # データベースコミット確認
-        mock_db.commit.assert_called_once()
-    
-    @patch('routers.auth.send_registration_complete_email')
+    @patch('routers.auth.enqueue_email')
     @patch('routers.auth.create_access_token')
     @patch('routers.auth.Hash.bcrypt')
     @patch('routers.auth.Hash.verify')
-    def test_change_password_email_timeout_error(self, mock_verify, mock_bcrypt, 
-                                                mock_create_token, mock_send_email,
-                                                password_change_request, mock_user):
-        """メール送信タイムアウトエラーのテスト"""
+    def test_change_password_email_queued_in_same_transaction(self, mock_verify, mock_bcrypt,
+                                                              mock_create_token, mock_enqueue,
+                                                              password_change_request, mock_user):
+        """登録完了メールをパスワード変更と同じトランザクションで送信待ちに追加するテスト"""
         from routers.auth import change_password
         import asyncio
-        
-        # モック設定
-        mock_db = Mock(spec=Session)
-        mock_db.query().filter().first.return_value = mock_user
-        mock_verify.return_value = True
-        mock_bcrypt.return_value = "hashed_new_password"
-        mock_create_token.return_value = "new_access_token"
-        mock_send_email.side_effect = TimeoutError("Timeout occurred")
-        
-        # 非同期関数のテスト
-        async def test_change_password():
-            result = await change_password(password_change_request, mock_db)
-            return result
-        
-        result = asyncio.run(test_change_password())
-        
-        # 結果検証
-        assert result["message"] == "パスワードが正常に変更されました。"
-        assert result["email_sent"] is False
-        assert result["email_error"] == "メール送信がタイムアウトしました"
-    
-    @patch('routers.auth.send_registration_complete_email')
-    @patch('routers.auth.create_access_token')
-    @patch('routers.auth.Hash.bcrypt')
-    @patch('routers.auth.Hash.verify')
-    def test_change_password_email_value_error(self, mock_verify, mock_bcrypt, 
-                                             mock_create_token, mock_send_email,
-                                             password_change_request, mock_user):
-        """メール送信バリューエラーのテスト"""
-        from routers.auth import change_password
-        import asyncio
-        
-        # モック設定
-        mock_db = Mock(spec=Session)
-        mock_db.query().filter().first.return_value = mock_user
-        mock_verify.return_value = True
-        mock_bcrypt.return_value = "hashed_new_password"
-        mock_create_token.return_value = "new_access_token"
-        mock_send_email.side_effect = ValueError("Invalid email format")
-        
-        # 非同期関数のテスト
-        async def test_change_password():
-            result = await change_password(password_change_request, mock_db)
-            return result
-        
-        result = asyncio.run(test_change_password())
-        
-        # 結果検証
-        assert result["email_sent"] is False
-        assert result["email_error"] == "無効なメールアドレスです"
-    
-    @patch('routers.auth.send_registration_complete_email')
-    @patch('routers.auth.create_access_token')
-    @patch('routers.auth.Hash.bcrypt')
-    @patch('routers.auth.Hash.verify')
-    def test_change_password_email_general_error(self, mock_verify, mock_bcrypt, 
-                                                mock_create_token, mock_send_email,
-                                                password_change_request, mock_user):
-        """メール送信一般エラーのテスト"""
-        from routers.auth import change_password
-        import asyncio
-        
+
         # モック設定
         mock_db = Mock(spec=Session)
         mock_db.query().filter().first.return_value = mock_user
         mock_verify.return_value = True
         mock_bcrypt.return_value = "hashed_new_password"
         mock_create_token.return_value = "new_access_token"
-        mock_send_email.side_effect = Exception("Unexpected error")
-        
-        # 非同期関数のテスト
-        async def test_change_password():
-            result = await change_password(password_change_request, mock_db)
-            return result
-        
-        result = asyncio.run(test_change_password())
-        
-        # 結果検証
-        assert result["email_sent"] is False
-        assert result["email_error"] == "メール送信中に予期しないエラーが発生しました"
-    
+        # コミット時点で送信待ちに追加済みであることを記録する
+        queued_at_commit = []
+        mock_db.commit.side_effect = lambda: queued_at_commit.append(mock_enqueue.called)
+
+        with patch('routers.auth.email_outbox_worker') as mock_worker:
+            result = asyncio.run(change_password(password_change_request, mock_db))
+
+        # 結果検証（SMTPの送信を待たずに応答する）
+        assert result["email_sent"] is True
+        assert queued_at_commit == [True]
+        mock_worker.notify.assert_called_once()
+
     @pytest.fixture
     def mock_user_no_email(self):
         """メールアドレスなしのテスト用ユーザーモック"""
@@ -499,8 +459,8 @@ class TestChangePasswordEndpoint:
     @patch('routers.auth.create_access_token')
     @patch('routers.auth.Hash.bcrypt')
     @patch('routers.auth.Hash.verify')
-    @patch('routers.auth.send_registration_complete_email')
-    def test_change_password_no_email(self, mock_send_email, mock_verify, mock_bcrypt, 
+    @patch('routers.auth.enqueue_email')
+    def test_change_password_no_email(self, mock_enqueue, mock_verify, mock_bcrypt, 
                                     mock_create_token, password_change_request, 
                                     mock_user_no_email):
         """ユーザーにメールアドレスがない場合のテスト"""
@@ -532,7 +492,7 @@ class TestChangePasswordEndpoint:
             dynamic_user.email = None
             raise Exception("Email should not be sent")
         
-        mock_send_email.side_effect = email_side_effect
+        mock_enqueue.side_effect = email_side_effect
         
         # 非同期関数のテスト
         async def test_change_password():
@@ -549,7 +509,7 @@ class TestChangePasswordEndpoint:
         assert result["email_error"] == "ユーザーにメールアドレスが設定されていません"
         
         # メール送信が呼ばれていないことを確認
-        mock_send_email.assert_not_called()
+        mock_enqueue.assert_not_called()
 
 
 class TestChangePasswordAuthenticationRequired:
@@ -574,12 +534,12 @@ class TestChangePasswordAuthenticationRequired:
         request.new_password = "new_password_456"
         return request
     
-    @patch('routers.auth.send_registration_complete_email')
+    @patch('routers.auth.enqueue_email')
     @patch('routers.auth.create_access_token')
     @patch('routers.auth.Hash.bcrypt')
     @patch('routers.auth.Hash.verify')
     def test_change_password_with_authentication_success(self, mock_verify, mock_bcrypt, 
-                                                        mock_create_token, mock_send_email,
+                                                        mock_create_token, mock_enqueue,
                                                         password_change_request_auth, mock_current_user):
         """認証済みユーザーのパスワード変更成功テスト"""
         from routers.auth import change_password
@@ -591,7 +551,6 @@ class TestChangePasswordAuthenticationRequired:
         mock_verify.return_value = True
         mock_bcrypt.return_value = "hashed_new_password"
         mock_create_token.return_value = "new_access_token"
-        mock_send_email.return_value = None
         
         # 非同期関数のテスト
         async def test_change_password():
@@ -0,0 +1,208 @@
+"""utils/conditional_request.py と公開APIの条件付きGETのテスト"""
+from datetime import datetime, timedelta
+
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import Article, User
+from routers.article import get_public_article_by_id, get_public_articles
+from utils.article_stats import adjust_article_count
+from utils.conditional_request import http_date, is_not_modified, make_etag
+
+
+def _request(**headers: str) -> Request:
+    """指定したヘッダーを持つリクエストを作成する"""
+    return Request({
+        "type": "http",
+        "headers": [
+            (name.replace("_", "-").encode(), value.encode())
+            for name, value in headers.items()
+        ],
+    })
+
+
+@pytest.fixture
+def db():
+    """記事を登録したインメモリデータベースのセッション"""
+    # エンドポイントはワーカースレッドで実行されるため、スレッド間で接続を共有する
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    user = User(name="etag", email="etag@example.com", password="x")
+    session.add(user)
+    session.commit()
+    for article_id in (1, 2):
+        session.add(Article(
+            article_id=article_id, title=f"記事{article_id}", body="本文",
+            user_id=user.id
+        ))
+        adjust_article_count(session, user.id, 1)
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+class TestValidators:
+    """ETag・Last-Modifiedの判定のテスト"""
+
+    def test_make_etag(self):
+        """同じ値からは同じ強いETagが作成されるテスト"""
+        etag = make_etag("articles", 2, None, 10)
+
+        assert etag == make_etag("articles", 2, None, 10)
+        assert etag != make_etag("articles", 3, None, 10)
+        assert etag.startswith('"') and etag.endswith('"')
+
+    def test_http_date(self):
+        """HTTP日付形式に変換されるテスト"""
+        assert http_date(datetime(2025, 1, 2, 3, 4, 5)) == "Thu, 02 Jan 2025 03:04:05 GMT"
+
+    def test_if_none_match(self):
+        """If-None-Matchの一致判定のテスト"""
+        etag = make_etag("a")
+
+        assert is_not_modified(_request(if_none_match=etag), etag, None)
+        assert is_not_modified(_request(if_none_match=f'"x", W/{etag}'), etag, None)
+        assert is_not_modified(_request(if_none_match="*"), etag, None)
+        assert not is_not_modified(_request(if_none_match='"x"'), etag, None)
+        assert not is_not_modified(None, etag, None)
+
+    def test_if_modified_since(self):
+        """If-Modified-Sinceの判定と、If-None-Matchが優先されるテスト"""
+        modified = datetime(2025, 1, 2, 3, 4, 5, 678)
+        etag = make_etag("a")
+
+        assert is_not_modified(_request(if_modified_since=http_date(modified)), etag, modified)
+        earlier = http_date(modified - timedelta(seconds=1))
+        assert not is_not_modified(_request(if_modified_since=earlier), etag, modified)
+        assert not is_not_modified(_request(if_modified_since="invalid"), etag, modified)
+        assert not is_not_modified(
+            _request(if_none_match='"x"', if_modified_since=http_date(modified)),
+            etag, modified
+        )
+
+
+class TestPublicArticlesConditionalGet:
+    """記事一覧の条件付きGETのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_not_modified_until_write(self, db):
+        """記事の作成・更新・削除があるまで304を返すテスト"""
+        response = Response()
+        get_public_articles(
+            db=db, limit=10, skip=0, after=None, request=None, response=response
+        )
+        etag = response.headers["ETag"]
+        assert "Last-Modified" in response.headers
+        assert response.headers["Cache-Control"] == "public, no-cache"
+
+        result = get_public_articles(
+            db=db, limit=10, skip=0, after=None,
+            request=_request(if_none_match=etag), response=Response()
+        )
+        assert isinstance(result, Response)
+        assert result.status_code == 304
+        assert result.headers["ETag"] == etag
+
+        # 取得条件が異なる場合は別のETagになる
+        response = Response()
+        get_public_articles(
+            db=db, limit=1, skip=0, after=None, request=None, response=response
+        )
+        assert response.headers["ETag"] != etag
+
+        # 記事を削除すると一覧のETagが変わる
+        article = db.query(Article).filter(Article.article_id == 1).first()
+        db.delete(article)
+        adjust_article_count(db, article.user_id, -1)
+        db.commit()
+        result = get_public_articles(
+            db=db, limit=10, skip=0, after=None,
+            request=_request(if_none_match=etag), response=Response()
+        )
+        assert isinstance(result, list)
+        assert [item.article_id for item in result] == [2]
+
+    @pytest.mark.asyncio
+    async def test_no_validators_without_last_modified(self, db):
+        """最終更新日時が分からない場合（概算モード）はETagを付けず304も返さないテスト"""
+        with patch("routers.article.get_articles_last_modified", return_value=None):
+            response = Response()
+            get_public_articles(
+                db=db, limit=10, skip=0, after=None, request=None, response=response
+            )
+            assert "ETag" not in response.headers
+            assert "Last-Modified" not in response.headers
+
+            result = get_public_articles(
+                db=db, limit=10, skip=0, after=None,
+                request=_request(if_none_match="*"), response=Response()
+            )
+        assert isinstance(result, list)
+        assert [item.article_id for item in result] == [2, 1]
+
+
+class TestPublicArticleConditionalGet:
+    """記事詳細の条件付きGETのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_etag_and_last_modified(self, db):
+        """記事の更新まで304を返し、更新後は新しい内容を返すテスト"""
+        response = Response()
+        result = get_public_article_by_id(
+            2, db=db, request=None, response=response
+        )
+        assert result.article_id == 2
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+
+        result = get_public_article_by_id(
+            2, db=db, request=_request(if_none_match=etag), response=Response()
+        )
+        assert result.status_code == 304
+        result = get_public_article_by_id(
+            2, db=db, request=_request(if_modified_since=last_modified),
+            response=Response()
+        )
+        assert result.status_code == 304
+
+        article = db.query(Article).filter(Article.article_id == 2).first()
+        article.updated_at = article.updated_at + timedelta(seconds=5)
+        article.title = "更新後"
+        db.commit()
+        result = get_public_article_by_id(
+            2, db=db, request=_request(if_none_match=etag), response=Response()
+        )
+        assert result.title == "更新後"
+
+    @pytest.mark.asyncio
+    async def test_updated_at_set_on_write(self, db):
+        """記事の更新時にupdated_atが更新されるテスト"""
+        article = db.query(Article).filter(Article.article_id == 1).first()
+        before = article.updated_at
+        assert before is not None
+        article.body = "新しい本文"
+        db.commit()
+
+        assert article.updated_at >= before
+
+    @pytest.mark.asyncio
+    async def test_missing_article_is_404_without_traceback(self, db):
+        """存在しない記事は500ではなく404を返し、スタックトレースを記録しないテスト"""
+        with patch("routers.article.logger.exception") as mock_exception:
+            with pytest.raises(HTTPException) as exc_info:
+                get_public_article_by_id(
+                    999, db=db, request=None, response=Response()
+                )
+
+        assert exc_info.value.status_code == 404
+        mock_exception.assert_not_called()
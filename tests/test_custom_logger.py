@@ -33,13 +33,16 @@ class TestCustomLoggerConfiguration:
 
     def test_logger_handlers_setup(self):
         """ロガーハンドラー設定のテスト"""
+        import logging
         from logger.custom_logger import logger
+        from logger.structured_logger import AsyncQueueHandler, get_log_handlers
         
-        # ハンドラーが設定されていることを確認
-        assert len(logger.handlers) >= 2
+        # ルートロガーの非同期ハンドラーに伝搬することを確認
+        assert logger.propagate
+        assert any(isinstance(h, AsyncQueueHandler) for h in logging.getLogger().handlers)
         
-        # FileHandlerが含まれていることを確認
-        file_handlers = [h for h in logger.handlers if isinstance(h, FileHandler)]
+        # 書き込み用のスレッドにFileHandlerが含まれていることを確認
+        file_handlers = [h for h in get_log_handlers() if isinstance(h, FileHandler)]
         assert len(file_handlers) >= 2
 
     def test_formatter_configuration(self):
@@ -134,9 +137,9 @@ class TestLoggerIntegration:
 
     def test_logger_file_paths(self):
         """ログファイルパス設定のテスト"""
-        from logger.custom_logger import logger
+        from logger.structured_logger import get_log_handlers
         
-        file_handlers = [h for h in logger.handlers if isinstance(h, FileHandler)]
+        file_handlers = [h for h in get_log_handlers() if isinstance(h, FileHandler)]
         
         # ファイルハンドラーが存在することを確認
         assert len(file_handlers) >= 2
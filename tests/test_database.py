@@ -1,3 +1,7 @@
+import asyncio
+import threading
+import time
+
 import pytest
 import os
 import tempfile
@@ -12,6 +16,7 @@ from database import (
     create_database_engine,
     create_session,
     get_db,
+    run_db,
     EnvironmentConfig
 )
 from exceptions import DatabaseConnectionError
@@ -231,3 +236,51 @@ class TestEnvironmentConfig:
         assert isinstance(config, dict)
         assert len(config) == 0
         # Renderから環境変数を取得する想定
+
+
+class TestRunDb:
+    """DB処理をワーカースレッドで実行する機能のテスト"""
+
+    async def test_run_db_runs_in_worker_thread(self):
+        """run_dbが関数を別スレッドで実行し、戻り値を返すテスト"""
+        def work(value, *, suffix):
+            return threading.get_ident(), f"{value}{suffix}"
+
+        thread_id, result = await run_db(work, "記事", suffix="1")
+
+        assert thread_id != threading.get_ident()
+        assert result == "記事1"
+
+    async def test_run_db_propagates_exception(self):
+        """関数で発生した例外がそのまま呼び出し元に伝わるテスト"""
+        def fail():
+            raise ValueError("失敗")
+
+        with pytest.raises(ValueError, match="失敗"):
+            await run_db(fail)
+
+    async def test_slow_query_does_not_block_event_loop(self):
+        """遅い処理の実行中も他のコルーチンが進むテスト"""
+        def slow_query():
+            time.sleep(0.2)
+            return "done"
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        async def query_and_count():
+            result = await run_db(slow_query)
+            return result, ticks
+
+        (result, ticks_during_query), _ = await asyncio.gather(
+            query_and_count(), ticker()
+        )
+
+        assert result == "done"
+        # クエリの完了までにticker()が全て進んでいる（イベントループが止まっていない）
+        assert ticks_during_query == 10
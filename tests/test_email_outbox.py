@@ -0,0 +1,228 @@
+"""utils/email_outbox.py の単体テスト"""
+import asyncio
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import EmailOutbox, User
+from utils.email_outbox import (
+    CircuitBreaker,
+    EmailOutboxWorker,
+    backoff_delay,
+    enqueue_email,
+    requeue_dead_letters,
+)
+
+
+@pytest.fixture
+def engine():
+    """アウトボックスのあるデータベース"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _enqueue(engine, count=1):
+    """登録完了メールを count 件送信待ちに追加する"""
+    db = sessionmaker(bind=engine)()
+    for number in range(count):
+        enqueue_email(db, "registration_complete", f"user{number}@example.com", username=f"user{number}")
+    db.commit()
+    db.close()
+
+
+def _rows(engine):
+    db = sessionmaker(bind=engine)()
+    rows = db.query(EmailOutbox).order_by(EmailOutbox.id).all()
+    db.close()
+    return rows
+
+
+class RecordingSender:
+    """送信したメッセージと、同時に送信したバッチ数の最大値を記録する"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.messages = []
+        self.batches = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, messages):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        self.batches.append(len(messages))
+        if self.error is not None:
+            return [self.error] * len(messages)
+        self.messages.extend(messages)
+        return [None] * len(messages)
+
+
+class TestEnqueueEmail:
+    """enqueue_email のテスト"""
+
+    def test_rolled_back_email_is_not_queued(self, engine):
+        """変更をロールバックした場合はメールも送信待ちに残らないテスト"""
+        db = sessionmaker(bind=engine)()
+        db.add(User(name="outbox", email="outbox@example.com", password="x"))
+        enqueue_email(db, "registration_complete", "outbox@example.com", username="outbox")
+        db.rollback()
+        db.close()
+
+        assert _rows(engine) == []
+
+    def test_unknown_kind(self, engine):
+        """不明なメールの種類は追加しないテスト"""
+        db = sessionmaker(bind=engine)()
+        with pytest.raises(ValueError):
+            enqueue_email(db, "unknown", "outbox@example.com")
+        db.close()
+
+
+class TestEmailOutboxWorker:
+    """EmailOutboxWorker のテスト"""
+
+    async def test_drain_sends_and_deletes(self, engine):
+        """送信した行を削除し、同時に送信する件数を制限するテスト"""
+        _enqueue(engine, 5)
+        sender = RecordingSender()
+        worker = EmailOutboxWorker(concurrency=2, sender=sender)
+
+        assert await worker.drain(engine) == 5
+
+        assert sorted(message.recipients[0] for message in sender.messages) == [
+            f"user{number}@example.com" for number in range(5)
+        ]
+        # 5件を2本の接続に分けて送信する
+        assert sender.max_active == 2
+        assert sorted(sender.batches) == [2, 3]
+        assert _rows(engine) == []
+        assert worker.stats()["sent"] == 5
+
+    async def test_failure_is_retried_with_backoff(self, engine):
+        """送信に失敗した行は間隔を空けて再送するテスト"""
+        _enqueue(engine)
+        worker = EmailOutboxWorker(sender=RecordingSender(ConnectionError("SMTP down")))
+
+        await worker.drain(engine)
+
+        row = _rows(engine)[0]
+        assert row.status == "pending"
+        assert row.attempts == 1
+        assert row.next_attempt_at > datetime.utcnow()
+        assert "SMTP down" in row.last_error
+        # 再送の時刻まで取得しない
+        assert await worker.drain(engine) == 0
+
+    async def test_dead_letter_after_max_attempts(self, engine):
+        """最大回数まで失敗した行をデッドレターにするテスト"""
+        _enqueue(engine)
+        worker = EmailOutboxWorker(max_attempts=2, sender=RecordingSender(ConnectionError("SMTP down")))
+
+        with patch("utils.email_outbox.backoff_delay", return_value=0):
+            await worker.drain(engine)
+
+        row = _rows(engine)[0]
+        assert (row.status, row.attempts) == ("dead", 2)
+        assert worker.stats()["dead"] == 1
+
+        assert requeue_dead_letters(engine) == 1
+        assert _rows(engine)[0].status == "pending"
+
+    async def test_invalid_message_is_dead_lettered_immediately(self, engine):
+        """再送しても成功しない行は再送せずデッドレターにするテスト"""
+        db = sessionmaker(bind=engine)()
+        enqueue_email(db, "registration_complete", "outbox@example.com")  # usernameが無い
+        db.commit()
+        db.close()
+        worker = EmailOutboxWorker(sender=RecordingSender())
+
+        await worker.drain(engine)
+
+        assert _rows(engine)[0].status == "dead"
+        assert worker.breaker.state == "closed"
+
+    async def test_circuit_breaker_stops_sending(self, engine):
+        """連続で失敗するとサーキットブレーカーを開き、送信を止めるテスト"""
+        _enqueue(engine, 5)
+        sender = RecordingSender(ConnectionError("SMTP down"))
+        worker = EmailOutboxWorker(
+            concurrency=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+            sender=sender, batch_size=1
+        )
+
+        with patch("utils.email_outbox.backoff_delay", return_value=0):
+            assert await worker.drain(engine) == 2
+
+        assert worker.breaker.state == "open"
+        assert sum(row.attempts for row in _rows(engine)) == 2
+
+    async def test_circuit_breaker_half_open_trial(self, engine):
+        """一定時間後に1件だけ試し、成功すれば送信を再開するテスト"""
+        _enqueue(engine, 3)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        sender = RecordingSender()
+        worker = EmailOutboxWorker(concurrency=3, breaker=breaker, sender=sender)
+
+        assert await worker.drain(engine) == 3
+
+        assert breaker.state == "closed"
+        assert len(sender.messages) == 3
+
+    async def test_partial_batch_failure(self, engine):
+        """バッチの一部だけ失敗した場合は、失敗した行だけを再送待ちにするテスト"""
+        _enqueue(engine, 3)
+
+        async def sender(messages):
+            return [None, ConnectionError("rejected"), None]
+
+        worker = EmailOutboxWorker(concurrency=1, sender=sender)
+        assert await worker.drain(engine) == 3
+
+        rows = _rows(engine)
+        assert [(row.recipient, row.status) for row in rows] == [("user1@example.com", "pending")]
+        assert worker.stats()["sent"] == 2
+
+    def test_rows_are_not_claimed_twice(self, engine):
+        """他のワーカーが取得した行は取得しないテスト"""
+        _enqueue(engine, 3)
+        first = EmailOutboxWorker()._claim(engine, 2)
+        second = EmailOutboxWorker()._claim(engine, 10)
+
+        assert len(first) == 2
+        assert {email.id for email in first}.isdisjoint(email.id for email in second)
+        assert len(second) == 1
+
+    async def test_run_sends_on_notify(self, engine):
+        """通知を受けるとすぐに送信するテスト"""
+        sender = RecordingSender()
+        worker = EmailOutboxWorker(sender=sender)
+        task = asyncio.create_task(worker.run(engine, poll_interval=60))
+        await asyncio.sleep(0.05)
+
+        _enqueue(engine)
+        worker.notify()
+        for _ in range(50):
+            if sender.messages:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+        assert len(sender.messages) == 1
+
+    def test_backoff_delay_grows_and_is_capped(self):
+        """再送の間隔が失敗するたびに増え、上限で打ち切られるテスト"""
+        assert 1 <= backoff_delay(1, base=2, maximum=600) <= 2
+        assert 16 <= backoff_delay(5, base=2, maximum=600) <= 32
+        assert 300 <= backoff_delay(20, base=2, maximum=600) <= 600
@@ -0,0 +1,64 @@
+"""utils/email_sender.py のメールテンプレートの単体テスト"""
+from unittest.mock import patch
+
+from fastapi_mail import MessageType, MultipartSubtypeEnum
+from fastapi_mail.msg import MailMsg
+
+from utils.email_sender import (
+    EMAIL_TEMPLATES,
+    build_account_deletion_message,
+    build_registration_complete_message,
+    build_verification_message,
+)
+
+
+class TestEmailTemplates:
+    """テンプレートから作成するメッセージのテスト"""
+
+    def test_templates_are_compiled_at_import(self):
+        """全ての種類のテンプレートを起動時にコンパイルしているテスト"""
+        assert set(EMAIL_TEMPLATES) == {"verification", "registration_complete", "account_deletion"}
+
+    async def test_message_is_multipart_plain_and_html(self):
+        """テキストとHTMLの両方を含むメッセージを作成するテスト"""
+        message = build_registration_complete_message("test@example.com", "testuser")
+
+        assert message.subject == "【Blog API】登録完了のお知らせ"
+        assert message.recipients == ["test@example.com"]
+        assert message.multipart_subtype == MultipartSubtypeEnum.alternative
+        assert "DOCTYPE html" not in message.body
+        assert "testuser" in message.body
+        assert "DOCTYPE html" in message.alternative_body
+        assert "testuser" in message.alternative_body
+
+        mime = await MailMsg(message)._message("noreply@example.com")
+        content_types = [part.get_content_type() for part in mime.walk()]
+        # より望ましいHTMLを後に置く
+        assert content_types.index("text/plain") < content_types.index("text/html")
+
+    def test_html_is_escaped(self):
+        """HTMLではユーザー名をエスケープし、テキストではそのまま使うテスト"""
+        message = build_account_deletion_message("test@example.com", "<b>user</b>")
+
+        assert "<b>user</b>" in message.body
+        assert "<b>user</b>" not in message.alternative_body
+        assert "&lt;b&gt;user&lt;/b&gt;" in message.alternative_body
+
+    @patch("utils.email_sender.LOCAL_CORS_ORIGINS", None)
+    @patch("utils.email_sender.CORS_ORIGINS", "https://example.com")
+    def test_verification_url(self):
+        """確認メールのテキスト・HTMLの両方に確認URLを含めるテスト"""
+        message = build_verification_message("test@example.com", "a+b/c")
+        url = "https://example.com/api/v1/verify-email?token=a%2Bb%2Fc"
+
+        assert url in message.body
+        assert url in message.alternative_body
+
+    @patch("utils.email_sender.PREFER_PLAIN_TEXT_EMAIL", True)
+    def test_prefer_plain_text(self):
+        """PREFER_PLAIN_TEXT_EMAIL の場合はテキストのみのメッセージにするテスト"""
+        message = build_registration_complete_message("test@example.com", "testuser")
+
+        assert message.subtype == MessageType.plain
+        assert message.alternative_body is None
+        assert "testuser" in message.body
@@ -0,0 +1,192 @@
+"""パスワードのハッシュ化と、ハッシュ処理用スレッドプールのテスト"""
+import asyncio
+import threading
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base, get_db
+from exceptions import PasswordHashBusyError
+from hashing import Hash, PasswordHashPool
+from models import User
+from routers import auth
+
+
+class TestHash:
+    """Hashクラスのテスト"""
+
+    def test_bcrypt_and_verify(self):
+        """ハッシュ化したパスワードを検証できるテスト"""
+        hashed = Hash.bcrypt("password123")
+
+        assert hashed != "password123"
+        assert Hash.verify("password123", hashed)
+        assert not Hash.verify("wrong-password", hashed)
+
+    async def test_async_api_runs_in_pool(self):
+        """非同期APIがイベントループ外のスレッドでハッシュ処理を実行するテスト"""
+        threads = []
+
+        def fake_bcrypt(password):
+            threads.append(threading.current_thread().name)
+            return f"hashed:{password}"
+
+        with patch("hashing.Hash.bcrypt", side_effect=fake_bcrypt):
+            assert await Hash.bcrypt_async("secret") == "hashed:secret"
+
+        assert threads[0].startswith("password-hash")
+        assert threads[0] != threading.current_thread().name
+
+    async def test_verify_async(self):
+        """非同期APIでパスワードを検証できるテスト"""
+        hashed = Hash.bcrypt("password123")
+
+        assert await Hash.verify_async("password123", hashed)
+        assert not await Hash.verify_async("wrong-password", hashed)
+
+
+class TestPasswordHashPool:
+    """PasswordHashPoolのテスト"""
+
+    async def test_rejects_when_saturated(self):
+        """実行中と実行待ちの合計が上限に達した場合に503の例外を送出するテスト"""
+        pool = PasswordHashPool(max_workers=1, max_queue=1)
+        release = threading.Event()
+        running = threading.Event()
+
+        def slow():
+            running.set()
+            release.wait(5)
+            return "done"
+
+        first = asyncio.create_task(pool.run(slow))
+        second = asyncio.create_task(pool.run(slow))
+        await asyncio.to_thread(running.wait, 5)
+        await asyncio.sleep(0)
+
+        stats = pool.stats()
+        assert stats["running"] == 1
+        assert stats["queue_depth"] == 1
+
+        with pytest.raises(PasswordHashBusyError) as exc_info:
+            await pool.run(slow)
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": "1"}
+
+        release.set()
+        assert await asyncio.gather(first, second) == ["done", "done"]
+        stats = pool.stats()
+        assert stats["completed"] == 2
+        assert stats["rejected"] == 1
+        assert stats["queue_depth"] == 0
+        assert stats["wait_max_ms"] > 0
+
+    async def test_propagates_errors(self):
+        """ハッシュ処理の例外を呼び出し元に伝え、待ち行列から外すテスト"""
+        pool = PasswordHashPool(max_workers=1, max_queue=0)
+
+        def broken():
+            raise ValueError("invalid hash")
+
+        with pytest.raises(ValueError):
+            await pool.run(broken)
+        assert pool.stats()["queue_depth"] == 0
+        assert await pool.run(lambda: "ok") == "ok"
+
+    async def test_cancelled_caller_keeps_slot_until_thread_finishes(self):
+        """呼び出し元がキャンセルされても、スレッドで実行中の間は枠を解放しないテスト"""
+        pool = PasswordHashPool(max_workers=1, max_queue=0)
+        release = threading.Event()
+        running = threading.Event()
+        finished = threading.Event()
+
+        def slow():
+            running.set()
+            release.wait(5)
+            finished.set()
+            return "done"
+
+        task = asyncio.create_task(pool.run(slow))
+        await asyncio.to_thread(running.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # スレッドは実行中のため、上限に達したまま
+        with pytest.raises(PasswordHashBusyError):
+            await pool.run(slow)
+        assert pool.stats()["running"] == 1
+        assert pool.stats()["queue_depth"] == 0
+
+        release.set()
+        await asyncio.to_thread(finished.wait, 5)
+        await asyncio.sleep(0.05)
+        assert pool.stats()["completed"] == 1
+        assert await pool.run(lambda: "ok") == "ok"
+
+    async def test_cancelled_before_start_is_not_completed(self):
+        """実行前にキャンセルされた処理は完了数に含めず、枠を解放するテスト"""
+        pool = PasswordHashPool(max_workers=1, max_queue=1)
+        release = threading.Event()
+        running = threading.Event()
+
+        def slow():
+            running.set()
+            release.wait(5)
+            return "done"
+
+        first = asyncio.create_task(pool.run(slow))
+        await asyncio.to_thread(running.wait, 5)
+        queued = asyncio.create_task(pool.run(slow))
+        await asyncio.sleep(0)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        assert pool.stats()["queue_depth"] == 0
+        release.set()
+        assert await first == "done"
+        assert pool.stats()["completed"] == 1
+
+
+class TestLoginWhenBusy:
+    """ハッシュ処理が混み合っている場合のログインのテスト"""
+
+    def test_login_returns_503(self):
+        """ハッシュ処理用プールが上限に達している場合にログインが503を返すテスト"""
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+        session = factory()
+        session.add(User(id=1, name="busy", email="busy@example.com", password="hashed"))
+        session.commit()
+        session.close()
+
+        def override_get_db():
+            db = factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = FastAPI()
+        app.include_router(auth.router)
+        app.dependency_overrides[get_db] = override_get_db
+
+        with patch("routers.auth.is_valid_email_domain", return_value=True), \
+                patch("routers.auth.Hash.verify_async",
+                      new=AsyncMock(side_effect=PasswordHashBusyError(retry_after=2))):
+            response = TestClient(app).post(
+                "/api/v1/login", data={"username": "busy@example.com", "password": "x"}
+            )
+        engine.dispose()
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
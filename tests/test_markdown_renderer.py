@@ -0,0 +1,174 @@
+"""utils/markdown_renderer.py と scripts/rerender_articles.py のテスト"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database import Base
+from models import Article
+from utils import markdown_renderer
+from utils.markdown_renderer import (
+    MarkdownRenderCache,
+    apply_rendered_body,
+    get_article_html,
+    render_cache,
+    render_markdown,
+    renderer_stamp,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_render_cache():
+    """Markdown変換キャッシュをテストごとに初期化する"""
+    render_cache.clear()
+    yield
+    render_cache.clear()
+
+
+class TestMarkdownRenderer:
+    """Markdown変換関数のテスト"""
+
+    def test_render_markdown_nl2br(self):
+        """改行が<br>に変換されることのテスト"""
+        html = render_markdown("一行目\n二行目")
+        assert "<br" in html
+
+    def test_renderer_stamp_contains_version_and_extensions(self):
+        """スタンプにバージョンと拡張機能が含まれることのテスト"""
+        stamp = renderer_stamp()
+        assert stamp.startswith(f"{markdown_renderer.RENDERER_VERSION}:")
+        assert "nl2br" in stamp
+
+    def test_renderer_stamp_changes_with_version(self):
+        """バージョン変更でスタンプが変わることのテスト"""
+        before = renderer_stamp()
+        with patch.object(markdown_renderer, "RENDERER_VERSION", 999):
+            assert renderer_stamp() != before
+
+    def test_apply_rendered_body(self):
+        """HTMLとスタンプが記事に保存されることのテスト"""
+        article = SimpleNamespace(body="**太字**", body_html=None, render_version=None)
+        apply_rendered_body(article)
+        assert article.body_html == "<p><strong>太字</strong></p>"
+        assert article.render_version == renderer_stamp()
+
+    def test_get_article_html_uses_stored_html(self):
+        """スタンプが一致する場合は保存済みHTMLを返すことのテスト"""
+        article = SimpleNamespace(
+            body="**太字**", body_html="<p>保存済み</p>",
+            render_version=renderer_stamp()
+        )
+        assert get_article_html(article) == "<p>保存済み</p>"
+
+    def test_get_article_html_rerenders_stale_html(self):
+        """スタンプが古い場合はその場で変換することのテスト"""
+        article = SimpleNamespace(
+            body="**太字**", body_html="<p>古い</p>", render_version="0:old"
+        )
+        assert get_article_html(article) == "<p><strong>太字</strong></p>"
+
+    def test_get_article_html_without_stored_html(self):
+        """保存済みHTMLが無い場合はその場で変換することのテスト"""
+        article = SimpleNamespace(body="本文", body_html=None, render_version=None)
+        assert get_article_html(article) == "<p>本文</p>"
+
+
+class TestMarkdownRenderCache:
+    """Markdown変換キャッシュのテスト"""
+
+    def test_render_markdown_uses_cache(self):
+        """同じ本文の2回目の変換はキャッシュから返すことのテスト"""
+        with patch("utils.markdown_renderer.markdown.Markdown",
+                   wraps=markdown_renderer.markdown.Markdown) as mock_md_class:
+            first = render_markdown("# 見出し")
+            second = render_markdown("# 見出し")
+
+        assert first == second
+        assert mock_md_class.call_count == 1
+        stats = render_cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["size"] == 1
+
+    def test_key_depends_on_stamp(self):
+        """レンダラースタンプが変わるとキーも変わることのテスト"""
+        assert MarkdownRenderCache.make_key("本文", "1:nl2br") != \
+            MarkdownRenderCache.make_key("本文", "2:nl2br")
+
+    def test_lru_eviction(self):
+        """最大件数を超えると最も古いエントリが破棄されることのテスト"""
+        cache = MarkdownRenderCache(maxsize=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        assert cache.get("a") == "A"  # aを最新にする
+        cache.put("c", "C")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+        assert cache.stats()["evictions"] == 1
+
+    def test_zero_size_disables_cache(self):
+        """最大件数が0の場合はキャッシュしないことのテスト"""
+        cache = MarkdownRenderCache(maxsize=0)
+        cache.put("a", "A")
+        assert cache.get("a") is None
+        assert cache.stats()["size"] == 0
+
+    def test_schema_body_html_uses_shared_cache(self):
+        """スキーマのbody_htmlが共通キャッシュを使用することのテスト"""
+        from schemas import ArticleBase, ShowArticle
+
+        ArticleBase(title="タイトル", body="共通の本文").body_html
+        ShowArticle(title="タイトル", body="共通の本文").body_html
+
+        stats = render_cache.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+
+
+class TestRerenderArticlesScript:
+    """記事HTML一括再変換スクリプトのテスト"""
+
+    @pytest.fixture
+    def engine(self):
+        """テスト用のインメモリデータベース"""
+        engine = create_engine("sqlite:///:memory:", echo=False)
+        Base.metadata.create_all(bind=engine)
+        yield engine
+        engine.dispose()
+
+    def test_rerender_articles_updates_stale_rows(self, engine):
+        """古い記事のみ再変換されることのテスト"""
+        from scripts.rerender_articles import rerender_articles
+
+        with Session(engine) as db:
+            db.add_all([
+                Article(article_id=1, title="未変換", body="**a**"),
+                Article(article_id=2, title="古い", body="**b**",
+                        body_html="<p>old</p>", render_version="0:old"),
+                Article(article_id=3, title="最新", body="**c**",
+                        body_html="<p>current</p>", render_version=renderer_stamp()),
+            ])
+            db.commit()
+
+        assert rerender_articles(engine, batch_size=1) == 2
+
+        with Session(engine) as db:
+            rows = {a.article_id: a for a in db.query(Article).all()}
+            assert rows[1].body_html == "<p><strong>a</strong></p>"
+            assert rows[2].body_html == "<p><strong>b</strong></p>"
+            assert rows[3].body_html == "<p>current</p>"
+            assert all(a.render_version == renderer_stamp() for a in rows.values())
+
+    def test_rerender_articles_force(self, engine):
+        """forceオプションで全記事が再変換されることのテスト"""
+        from scripts.rerender_articles import rerender_articles
+
+        with Session(engine) as db:
+            db.add(Article(article_id=1, title="最新", body="本文",
+                           body_html="<p>x</p>", render_version=renderer_stamp()))
+            db.commit()
+
+        assert rerender_articles(engine, force=True) == 1
@@ -0,0 +1,197 @@
+"""utils/metrics.py の単体テスト"""
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from utils.metrics import UNMATCHED_ROUTE, HTTPMetrics, MetricsMiddleware, render_samples
+
+
+def _create_app(metrics: HTTPMetrics) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="見つかりません")
+        return {"id": item_id}
+
+    @app.get("/error")
+    async def error():
+        raise RuntimeError("失敗")
+
+    return app
+
+
+@pytest.fixture
+def metrics():
+    return HTTPMetrics(buckets=(0.1, 1.0))
+
+
+@pytest.fixture
+def client(metrics):
+    return TestClient(_create_app(metrics), raise_server_exceptions=False)
+
+
+class TestMetricsMiddleware:
+    """MetricsMiddlewareのテスト"""
+
+    def test_records_templated_route(self, client, metrics):
+        """実際のURLではなくルートのパスごとに集計するテスト"""
+        for item_id in (1, 2, 0):
+            client.get(f"/items/{item_id}")
+
+        route = metrics.route("GET", "/items/{item_id}")
+        assert route.count == 3
+        assert route.statuses == {"2xx": 2, "4xx": 1}
+        assert metrics.stats()["routes"] == 1
+
+    def test_unmatched_and_method_not_allowed(self, client, metrics):
+        """一致しないURLはまとめ、メソッドだけが異なる場合はルートのパスで集計するテスト"""
+        client.get("/unknown/1")
+        client.get("/unknown/2")
+        client.post("/items/1")
+
+        assert metrics.route("GET", UNMATCHED_ROUTE).statuses == {"4xx": 2}
+        assert metrics.route("POST", "/items/{item_id}").statuses == {"4xx": 1}
+
+    def test_exception_is_recorded_as_5xx(self, client, metrics):
+        """例外で終了したリクエストを5xxとして記録するテスト"""
+        client.get("/error")
+
+        route = metrics.route("GET", "/error")
+        assert route.statuses == {"5xx": 1}
+        assert route.in_flight == 0
+
+    def test_response_size(self, client, metrics):
+        """レスポンスの本文のバイト数を記録するテスト"""
+        response = client.get("/items/1")
+
+        assert metrics.route("GET", "/items/{item_id}").size_sum == len(response.content)
+
+    async def test_in_flight_gauge(self, metrics):
+        """処理中のリクエスト数を記録するテスト"""
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, metrics=metrics)
+        started, release = asyncio.Event(), asyncio.Event()
+
+        @app.get("/slow")
+        async def slow():
+            started.set()
+            await release.wait()
+            return {}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            request = asyncio.create_task(client.get("/slow"))
+            await started.wait()
+            assert metrics.route("GET", "/slow").in_flight == 1
+            release.set()
+            await request
+
+        assert metrics.route("GET", "/slow").in_flight == 0
+
+
+class TestHTTPMetrics:
+    """HTTPMetricsのテスト"""
+
+    def test_histogram_buckets(self, metrics):
+        """レイテンシを区切りごとに数え、累積して出力するテスト"""
+        route = metrics.route("GET", "/items/{item_id}")
+        for latency in (0.05, 0.1, 0.5, 3.0):
+            metrics.observe(route, 200, latency, 10)
+
+        assert route.buckets == [2, 1, 1]
+        text = metrics.render_prometheus()
+        labels = 'method="GET",route="/items/{item_id}"'
+        assert f'http_request_duration_seconds_bucket{{{labels},le="0.1"}} 2' in text
+        assert f'http_request_duration_seconds_bucket{{{labels},le="1"}} 3' in text
+        assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 4' in text
+        assert f"http_request_duration_seconds_count{{{labels}}} 4" in text
+        assert f'http_requests_total{{{labels},status="2xx"}} 4' in text
+        assert f"http_response_size_bytes_sum{{{labels}}} 40" in text
+
+    def test_render_prometheus_format(self, metrics):
+        """メトリクスごとに HELP・TYPE を出力し、ラベルの値をエスケープするテスト"""
+        metrics.observe(metrics.route("GET", 'a"b\\c'), 200, 0.01, 1)
+
+        text = metrics.render_prometheus()
+        assert text.endswith("\n")
+        for name, kind in (
+            ("http_requests_total", "counter"),
+            ("http_request_duration_seconds", "histogram"),
+            ("http_requests_in_flight", "gauge"),
+            ("http_response_size_bytes", "summary"),
+        ):
+            assert f"# TYPE {name} {kind}" in text
+        assert 'route="a\\"b\\\\c"' in text
+
+    def test_render_samples(self):
+        """ラベルの無いメトリクスを HELP・TYPE 付きで出力するテスト"""
+        text = render_samples([
+            ("cache_hits_total", "counter", "Total number of cache hits.", 3),
+            ("wait_seconds_avg", "gauge", "Average wait.", 0.25),
+        ])
+
+        assert text.endswith("\n")
+        assert "# TYPE cache_hits_total counter\ncache_hits_total 3\n" in text
+        assert "# TYPE wait_seconds_avg gauge\nwait_seconds_avg 0.25\n" in text
+        assert render_samples([]) == ""
+
+
+def test_metrics_endpoint():
+    """/metrics がPrometheusのテキスト形式でメトリクスを返すテスト"""
+    from main import app
+
+    client = TestClient(app)
+    client.get("/api/v1/public/articles/does-not-exist")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'route="/api/v1/public/articles/{article_id}"' in response.text
+    assert "does-not-exist" not in response.text
+
+
+def test_metrics_endpoint_exports_password_hash_pool():
+    """/metrics がパスワードハッシュのスレッドプールの統計情報を返すテスト"""
+    from main import app
+
+    stats = {
+        "workers": 4, "max_queue": 32, "running": 4, "queue_depth": 3,
+        "completed": 10, "rejected": 2, "wait_avg_ms": 250.0, "wait_max_ms": 1500.0,
+    }
+    with patch("main.password_hash_pool.stats", return_value=stats):
+        response = TestClient(app).get("/metrics")
+
+    lines = response.text.splitlines()
+    assert "# TYPE password_hash_queue_depth gauge" in lines
+    assert "password_hash_queue_depth 3" in lines
+    assert "password_hash_running 4" in lines
+    assert "password_hash_wait_seconds_avg 0.25" in lines
+    assert "password_hash_wait_seconds_max 1.5" in lines
+    assert "# TYPE password_hash_rejected_total counter" in lines
+    assert "password_hash_rejected_total 2" in lines
+
+
+def test_metrics_endpoint_exports_search_cache():
+    """/metrics が記事検索のキャッシュの統計情報を返すテスト"""
+    from main import app
+
+    stats = {
+        "size": 5, "maxsize": 256, "hits": 7, "misses": 3, "evictions": 1,
+        "expirations": 0, "invalidations": 2, "hit_ratio": 0.7,
+    }
+    with patch("main.search_cache.stats", return_value=stats):
+        response = TestClient(app).get("/metrics")
+
+    lines = response.text.splitlines()
+    assert "# TYPE search_cache_hits_total counter" in lines
+    assert "search_cache_hits_total 7" in lines
+    assert "search_cache_misses_total 3" in lines
+    assert "# TYPE search_cache_size gauge" in lines
+    assert "search_cache_size 5" in lines
@@ -15,6 +15,18 @@ from sqlalchemy.orm import Session
 from oauth2 import get_current_user, oauth2_scheme, ALGORITHM
 from models import User
 from schemas import TokenData
+from utils.token_cache import token_payload_cache
+from utils.user_cache import user_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    """テストごとにユーザー情報・トークンのキャッシュを初期化する"""
+    user_cache.clear()
+    token_payload_cache.clear()
+    yield
+    user_cache.clear()
+    token_payload_cache.clear()
 
 
 class TestOAuth2Module:
@@ -214,6 +226,8 @@ class TestOAuth2Module:
                 # 結果の検証
                 assert result == sample_user
                 # JWTデコードが正しい引数で呼ばれることを確認
+                # （検証済みのトークンはキャッシュから返すため、キャッシュを初期化する）
+                token_payload_cache.clear()
                 with patch('oauth2.jwt.decode') as mock_decode:
                     mock_decode.return_value = payload
                     await get_current_user("complex_token", mock_db)
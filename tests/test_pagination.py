@@ -0,0 +1,47 @@
+"""utils/pagination.pyの単体テスト"""
+import pytest
+from fastapi import HTTPException, status
+
+from utils.pagination import decode_cursor, encode_cursor, next_cursor
+
+
+class TestCursorEncoding:
+    """カーソルのエンコード・デコードのテスト"""
+
+    @pytest.mark.parametrize("article_id", [0, 1, 42, 1_000_000])
+    def test_round_trip(self, article_id):
+        """エンコードしたカーソルが元の記事IDに戻ることのテスト"""
+        assert decode_cursor(encode_cursor(article_id)) == article_id
+
+    def test_cursor_is_opaque(self):
+        """カーソルに記事IDがそのまま含まれないことのテスト"""
+        cursor = encode_cursor(12345)
+        assert "12345" not in cursor
+        assert "=" not in cursor
+
+    @pytest.mark.parametrize("cursor", ["", "not-base64!!", "djI6MQ", "djE6YWJj"])
+    def test_invalid_cursor(self, cursor):
+        """不正なカーソルで400エラーになることのテスト"""
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor(cursor)
+        assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestNextCursor:
+    """次ページカーソル判定のテスト"""
+
+    def test_full_page_returns_cursor(self):
+        """ページが埋まっている場合はカーソルを返すテスト"""
+        assert decode_cursor(next_cursor(10, 5, 5)) == 10
+
+    def test_partial_page_returns_none(self):
+        """ページが埋まっていない場合はNoneを返すテスト"""
+        assert next_cursor(10, 3, 5) is None
+
+    def test_without_limit_returns_none(self):
+        """全件取得の場合はNoneを返すテスト"""
+        assert next_cursor(10, 100, None) is None
+
+    def test_empty_page_returns_none(self):
+        """空ページの場合はNoneを返すテスト"""
+        assert next_cursor(None, 0, 5) is None
@@ -0,0 +1,315 @@
+"""ルーターのクエリがインデックスを使用することを確認するテスト
+
+各エンドポイントを実行して発行されたSQLを記録し、EXPLAIN QUERY PLANで
+テーブル全体を走査するクエリが無いことを確認する。
+"""
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base, get_db
+from hashing import Hash
+from models import Article, EmailVerification, User
+from oauth2 import get_current_user
+from routers import article, auth, user
+from utils.article_stats import rebuild_article_counts
+from utils.query_plan import check_query_plans, find_full_scan, record_queries
+
+
+EMAIL = "plan@example.com"
+PASSWORD = "password123"
+
+
+@pytest.fixture
+def engine():
+    """ユーザーと記事を登録したインメモリデータベース"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, name="plan", email=EMAIL, password=Hash.bcrypt(PASSWORD)))
+    session.add(User(id=2, name="other", email="other@example.com", password=None))
+    session.add_all([
+        # 偶数の記事はユーザー1、奇数の記事はユーザー2が作成
+        Article(article_id=number, title=f"記事{number}", body="本文", user_id=1 + number % 2)
+        for number in range(1, 21)
+    ])
+    session.add(EmailVerification.create_verification(EMAIL))
+    session.commit()
+    # 集計行の初回作成（全件のCOUNT）は運用中のクエリではないため、事前に作成しておく
+    rebuild_article_counts(session)
+    session.close()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    """記事・認証・ユーザーのルーターを登録したテスト用アプリケーション"""
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def override_current_user():
+        db = factory()
+        try:
+            return db.get(User, 1)
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(article.router)
+    app.include_router(auth.router)
+    app.include_router(user.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = override_current_user
+    return TestClient(app)
+
+
+def _assert_no_full_scan(engine, recorder):
+    assert recorder.queries, "SQLが記録されていません"
+    full_scans = check_query_plans(engine, recorder.queries)
+    assert full_scans == [], "\n".join(
+        f"{plan}: {statement}" for statement, plan in full_scans
+    )
+
+
+class TestQueryPlans:
+    """ルーターのクエリの実行計画のテスト"""
+
+    async def test_article_endpoints_use_indexes(self, client, engine):
+        """記事の取得・更新・削除・公開APIがインデックスを使用するテスト"""
+        with record_queries(engine) as recorder:
+            assert client.get("/api/v1/articles", params={"limit": 5}).status_code == 200
+            assert client.get("/api/v1/articles/3").status_code == 200
+            assert client.post(
+                "/api/v1/articles", params={"article_id": 4},
+                json={"title": "更新", "body": "更新した本文"}
+            ).status_code == 200
+            first_page = client.get("/api/v1/public/articles", params={"limit": 5})
+            assert client.get("/api/v1/public/articles", params={
+                "limit": 5, "after": first_page.headers["X-Next-Cursor"]
+            }).status_code == 200
+            detail = client.get("/api/v1/public/articles/7")
+            assert detail.status_code == 200
+            assert client.get(
+                "/api/v1/public/articles/7",
+                headers={"If-None-Match": detail.headers["ETag"]}
+            ).status_code == 304
+            # 削除はレスポンスの本文が無いため、エンドポイントを直接呼び出す
+            db = sessionmaker(bind=engine)()
+            article.delete_article(8, db, db.get(User, 1))
+            db.close()
+
+        _assert_no_full_scan(engine, recorder)
+
+    def test_email_lookups_use_indexes(self, client, engine):
+        """メールアドレスでのユーザー・メール確認レコードの検索がインデックスを使用するテスト"""
+        with record_queries(engine) as recorder, \
+                patch("routers.auth.is_valid_email_domain", return_value=True), \
+                patch("routers.user.is_valid_email_domain", return_value=True):
+            assert client.post(
+                "/api/v1/login", data={"username": EMAIL, "password": "wrong-password"}
+            ).status_code == 403
+            assert client.post("/api/v1/change-password", json={
+                "username": "missing@example.com",
+                "temp_password": "temporary1", "new_password": "newpassword1",
+            }).status_code == 404
+            assert client.post("/api/v1/user", json={
+                "name": "plan", "email": EMAIL, "password": PASSWORD,
+            }).status_code == 409
+            assert client.post(
+                "/api/v1/resend-verification", json={"email": EMAIL}
+            ).status_code == 200
+            assert client.request("DELETE", "/api/v1/user/delete-account", json={
+                "email": EMAIL, "password": PASSWORD, "confirm_password": PASSWORD,
+            }).status_code == 200
+
+        statements = " ".join(statement for statement, _ in recorder.queries)
+        assert "users.email" in statements
+        assert "email_verifications.email" in statements
+        assert "articles.user_id" in statements
+        _assert_no_full_scan(engine, recorder)
+
+    def test_detects_full_scan(self, engine):
+        """インデックスの無いカラムでの検索を全件走査として検出するテスト"""
+        with engine.connect() as connection:
+            found = find_full_scan(
+                connection, "SELECT id FROM articles WHERE title = ?", ("記事1",)
+            )
+            indexed = find_full_scan(
+                connection, "SELECT id FROM articles WHERE article_id = ?", (1,)
+            )
+
+        assert found is not None and found.startswith("SCAN articles")
+        assert indexed is None
+
+
+class TestMigrations:
+    """Alembicのマイグレーションのテスト"""
+
+    def test_upgrade_adds_indexes_to_existing_database(self, tmp_path):
+        """インデックスの無い既存データベースにマイグレーションでインデックスを追加するテスト"""
+        url = f"sqlite:///{tmp_path / 'legacy.db'}"
+        legacy = create_engine(url)
+        with legacy.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR)"
+            )
+            connection.exec_driver_sql(
+                "CREATE TABLE articles (id INTEGER PRIMARY KEY, "
+                "article_id INTEGER NOT NULL, user_id INTEGER)"
+            )
+        config = Config(str(Path(__file__).parent.parent / "alembic.ini"))
+        config.set_main_option("sqlalchemy.url", url)
+        config.attributes["configure_logger"] = False
+
+        command.upgrade(config, "head")
+
+        inspector = inspect(legacy)
+        article_indexes = {
+            index["name"]: index for index in inspector.get_indexes("articles")
+        }
+        assert article_indexes["ix_articles_article_id"]["unique"]
+        assert article_indexes["ix_articles_user_id_article_id"]["column_names"] == [
+            "user_id", "article_id"
+        ]
+        user_indexes = {index["name"]: index for index in inspector.get_indexes("users")}
+        assert user_indexes["ix_users_email"]["unique"]
+        user_columns = {column["name"] for column in inspector.get_columns("users")}
+        assert "token_version" in user_columns
+
+        command.downgrade(config, "base")
+        assert inspect(legacy).get_indexes("articles") == []
+        user_columns = {column["name"] for column in inspect(legacy).get_columns("users")}
+        assert "token_version" not in user_columns
+        legacy.dispose()
+
+    def test_upgrade_adds_article_columns(self, tmp_path):
+        """既存データベースに、新しく作成した場合と同じカラムを追加するテスト"""
+        url = f"sqlite:///{tmp_path / 'columns.db'}"
+        legacy = create_engine(url)
+        with legacy.begin() as connection:
+            # 変更前の users テーブル
+            connection.exec_driver_sql(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR, email VARCHAR, "
+                "password VARCHAR, is_active BOOLEAN)"
+            )
+            connection.exec_driver_sql(
+                "CREATE TABLE articles (id INTEGER PRIMARY KEY, article_id INTEGER NOT NULL, "
+                "title VARCHAR NOT NULL, body VARCHAR NOT NULL, user_id INTEGER)"
+            )
+            connection.exec_driver_sql(
+                "CREATE TABLE article_stats (id INTEGER PRIMARY KEY, "
+                "total_articles INTEGER NOT NULL)"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO users (id, email) VALUES (1, 'a@example.com'), (2, 'b@example.com')"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO articles (article_id, title, body, user_id) "
+                "VALUES (1, 't', 'b', 1), (2, 't', 'b', 1)"
+            )
+        config = Config(str(Path(__file__).parent.parent / "alembic.ini"))
+        config.set_main_option("sqlalchemy.url", url)
+        config.attributes["configure_logger"] = False
+
+        command.upgrade(config, "head")
+
+        inspector = inspect(legacy)
+        for table in ("users", "articles", "article_stats"):
+            columns = {column["name"] for column in inspector.get_columns(table)}
+            assert columns == set(Base.metadata.tables[table].columns.keys())
+        indexes = {index["name"] for index in inspector.get_indexes("articles")}
+        assert "ix_articles_updated_at" in indexes
+        with legacy.connect() as connection:
+            assert connection.exec_driver_sql(
+                "SELECT COUNT(*) FROM articles WHERE updated_at IS NULL"
+            ).scalar() == 0
+            # 既存のユーザーの記事数を集計する
+            assert connection.exec_driver_sql(
+                "SELECT id, article_count FROM users ORDER BY id"
+            ).all() == [(1, 2), (2, 0)]
+        # ORMで User を検索できる
+        with sessionmaker(bind=legacy)() as session:
+            assert session.get(User, 1).article_count == 2
+
+        command.downgrade(config, "0005")
+        columns = {column["name"] for column in inspect(legacy).get_columns("users")}
+        assert "article_count" not in columns
+
+        command.downgrade(config, "0002")
+        columns = {column["name"] for column in inspect(legacy).get_columns("articles")}
+        assert not {"body_html", "render_version", "updated_at"} & columns
+        legacy.dispose()
+
+    @pytest.mark.parametrize(
+        "table, previous",
+        [("revoked_tokens", "0003"), ("email_outbox", "0004"), ("article_stats", "0005")]
+    )
+    def test_upgrade_creates_table(self, tmp_path, table, previous):
+        """既存データベースに、新しく作成した場合と同じテーブル・インデックスを追加するテスト"""
+        url = f"sqlite:///{tmp_path / 'tables.db'}"
+        legacy = create_engine(url)
+        with legacy.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR)"
+            )
+            connection.exec_driver_sql(
+                "CREATE TABLE articles (id INTEGER PRIMARY KEY, "
+                "article_id INTEGER NOT NULL, user_id INTEGER)"
+            )
+        config = Config(str(Path(__file__).parent.parent / "alembic.ini"))
+        config.set_main_option("sqlalchemy.url", url)
+        config.attributes["configure_logger"] = False
+
+        command.upgrade(config, "head")
+
+        inspector = inspect(legacy)
+        expected = Base.metadata.tables[table]
+        columns = {column["name"] for column in inspector.get_columns(table)}
+        assert columns == set(expected.columns.keys())
+        indexes = {index["name"] for index in inspector.get_indexes(table)}
+        assert indexes == {index.name for index in expected.indexes}
+
+        command.downgrade(config, previous)
+        assert not inspect(legacy).has_table(table)
+        legacy.dispose()
+
+    def test_upgrade_rejects_duplicate_emails(self, tmp_path):
+        """メールアドレスが重複している場合は一意インデックスを作成しないテスト"""
+        url = f"sqlite:///{tmp_path / 'duplicate.db'}"
+        legacy = create_engine(url)
+        with legacy.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR)"
+            )
+            connection.exec_driver_sql(
+                "CREATE TABLE articles (id INTEGER PRIMARY KEY, "
+                "article_id INTEGER NOT NULL, user_id INTEGER)"
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO users (email) VALUES ('a@example.com'), ('a@example.com')"
+            )
+        config = Config(str(Path(__file__).parent.parent / "alembic.ini"))
+        config.set_main_option("sqlalchemy.url", url)
+        config.attributes["configure_logger"] = False
+
+        with pytest.raises(RuntimeError, match="users.email"):
+            command.upgrade(config, "head")
+        assert inspect(legacy).get_indexes("users") == []
+        legacy.dispose()
@@ -0,0 +1,134 @@
+"""utils/search_cache.py の単体テスト"""
+import pytest
+from unittest.mock import Mock, patch
+from fastapi import Response
+from sqlalchemy.orm import Session
+
+from routers.article import search_public_articles
+from schemas import PublicArticle
+from utils import search_cache as search_cache_module
+from utils.search_cache import (
+    ArticleGeneration,
+    SearchResultCache,
+    articles_generation,
+    search_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_search_cache():
+    """テスト間で検索結果のキャッシュを共有しない"""
+    search_cache.clear()
+    yield
+    search_cache.clear()
+
+
+class TestSearchResultCache:
+    """TTL付きLRUキャッシュのテスト"""
+
+    def test_key_normalizes_keyword_set(self):
+        """キーワードの順序・重複・表記揺れを区別しないテスト"""
+        key = SearchResultCache.make_key(["東京", "ラーメン"], 10, 0, None, "new")
+
+        assert SearchResultCache.make_key(
+            ["らーめん", "東京", "東京"], 10, 0, None, "new"
+        ) == key
+        assert SearchResultCache.make_key(["東京", "ラーメン"], 10, 10, None, "new") != key
+        # 正規化しない検索方式ではカナの違いを区別する
+        assert SearchResultCache.make_key(
+            ["らーめん", "東京"], 10, 0, None, "new", normalize=False
+        ) != SearchResultCache.make_key(
+            ["ラーメン", "東京"], 10, 0, None, "new", normalize=False
+        )
+
+    def test_hit_and_lru_eviction(self):
+        """最大件数を超えると最も古く参照されたエントリが破棄されるテスト"""
+        generation = ArticleGeneration()
+        cache = SearchResultCache(2, 60, generation)
+        cache.put("a", 1, generation.value)
+        cache.put("b", 2, generation.value)
+        assert cache.get("a") == 1
+        cache.put("c", 3, generation.value)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["hits"] == 3
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == pytest.approx(0.75)
+
+    def test_ttl_expiration(self):
+        """有効期間を過ぎたエントリは破棄されるテスト"""
+        generation = ArticleGeneration()
+        cache = SearchResultCache(10, 5, generation)
+        with patch.object(search_cache_module.time, "monotonic", return_value=100.0):
+            cache.put("a", 1, generation.value)
+        with patch.object(search_cache_module.time, "monotonic", return_value=104.0):
+            assert cache.get("a") == 1
+        with patch.object(search_cache_module.time, "monotonic", return_value=105.0):
+            assert cache.get("a") is None
+
+        assert cache.stats()["expirations"] == 1
+
+    def test_generation_invalidation(self):
+        """世代番号が進むとエントリが無効になるテスト"""
+        generation = ArticleGeneration()
+        cache = SearchResultCache(10, 60, generation)
+        cache.put("a", 1, generation.value)
+        generation.bump()
+
+        assert cache.get("a") is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_put_skipped_when_written_during_search(self):
+        """検索中に書き込みがあった結果は保存しないテスト"""
+        generation = ArticleGeneration()
+        cache = SearchResultCache(10, 60, generation)
+        started = generation.value
+        generation.bump()
+        cache.put("a", 1, started)
+
+        assert cache.stats()["size"] == 0
+
+    def test_disabled(self):
+        """最大件数が0の場合はキャッシュしないテスト"""
+        generation = ArticleGeneration()
+        cache = SearchResultCache(0, 60, generation)
+        cache.put("a", 1, generation.value)
+
+        assert cache.get("a") is None
+
+
+class TestSearchEndpointCache:
+    """検索エンドポイントのキャッシュのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_cached_result_reused_until_write(self):
+        """同じ検索は書き込みがあるまでキャッシュから返されるテスト"""
+        mock_db = Mock(spec=Session)
+        article = Mock(article_id=1, title="東京", body="本文",
+                       body_html="<p>本文</p>", render_version=None)
+
+        with patch("routers.article.search_articles",
+                   return_value=([article], 1, "like")) as mock_search, \
+                patch("routers.article.get_article_html", return_value="<p>本文</p>"):
+            for _ in range(2):
+                response = Response()
+                results = search_public_articles(
+                    q="東京", db=mock_db, limit=10, skip=0, after=None,
+                    sort="new", response=response
+                )
+                assert results == [
+                    PublicArticle(article_id=1, title="東京", body_html="<p>本文</p>")
+                ]
+                assert response.headers["X-Total-Count"] == "1"
+            assert mock_search.call_count == 1
+
+            articles_generation.bump()
+            search_public_articles(
+                q="東京", db=mock_db, limit=10, skip=0, after=None,
+                sort="new", response=Response()
+            )
+            assert mock_search.call_count == 2
@@ -0,0 +1,177 @@
+"""utils/smtp_pool.py の単体テスト（aiosmtpd のローカルSMTPサーバーを使用する）"""
+import asyncio
+import socket
+from email.message import EmailMessage
+from unittest.mock import patch
+
+import aiosmtplib
+import pytest
+from aiosmtpd.controller import Controller
+from fastapi_mail import ConnectionConfig
+
+from utils.email_sender import (
+    build_registration_complete_message,
+    close_smtp_pool,
+    deliver_messages,
+)
+from utils.smtp_pool import SMTPConnectionPool
+
+
+class RecordingHandler:
+    """受信したメッセージと接続数を記録するハンドラ"""
+
+    def __init__(self):
+        self.recipients = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("reject"):
+            return "550 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recipients.extend(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    """ローカルのSMTPサーバー"""
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+def _pool(controller, **kwargs) -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        lambda: aiosmtplib.SMTP(hostname=controller.hostname, port=controller.port),
+        **kwargs
+    )
+
+
+def _message(recipient: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = recipient
+    message["Subject"] = "テスト"
+    message.set_content("本文")
+    return message
+
+
+class TestSMTPConnectionPool:
+    """SMTPConnectionPoolのテスト"""
+
+    async def test_batch_uses_one_connection(self, smtp_server):
+        """バッチのメッセージを1本の接続で送信するテスト"""
+        controller, handler = smtp_server
+        pool = _pool(controller)
+
+        results = await pool.send_batch([_message(f"user{n}@example.com") for n in range(5)])
+
+        assert results == [None] * 5
+        assert handler.recipients == [f"user{n}@example.com" for n in range(5)]
+        assert handler.connections == 1
+        await pool.close()
+
+    async def test_connection_is_reused(self, smtp_server):
+        """送信のたびに接続せず、保持している接続を使い回すテスト"""
+        controller, handler = smtp_server
+        pool = _pool(controller)
+
+        for number in range(3):
+            await pool.send(_message(f"user{number}@example.com"))
+
+        assert handler.connections == 1
+        assert pool.stats()["reused"] == 2
+        await pool.close()
+
+    async def test_concurrent_sends_are_limited_to_pool_size(self, smtp_server):
+        """同時に送信しても接続数がプールの大きさを超えないテスト"""
+        controller, handler = smtp_server
+        pool = _pool(controller, size=2)
+
+        await asyncio.gather(*(pool.send(_message(f"user{n}@example.com")) for n in range(8)))
+
+        assert len(handler.recipients) == 8
+        assert pool.stats()["opened"] <= 2
+        await pool.close()
+
+    async def test_rejected_message_does_not_break_batch(self, smtp_server):
+        """拒否されたメッセージの後も同じ接続で送信を続けるテスト"""
+        controller, handler = smtp_server
+        pool = _pool(controller)
+
+        results = await pool.send_batch([
+            _message("user0@example.com"), _message("reject@example.com"), _message("user1@example.com")
+        ])
+
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], aiosmtplib.SMTPException)
+        assert handler.recipients == ["user0@example.com", "user1@example.com"]
+        assert handler.connections == 1
+        await pool.close()
+
+    async def test_idle_connection_is_health_checked(self, smtp_server):
+        """しばらく使わなかった接続はNOOPで確認し、切断されていれば作り直すテスト"""
+        controller, handler = smtp_server
+        pool = _pool(controller, noop_after=0)
+        await pool.send(_message("user0@example.com"))
+        # サーバー側で切断された状態にする
+        pool._idle[0].smtp.close()
+
+        await pool.send(_message("user1@example.com"))
+
+        assert handler.recipients == ["user0@example.com", "user1@example.com"]
+        assert pool.stats()["opened"] == 2
+        await pool.close()
+
+    async def test_server_down_fails_every_message(self):
+        """サーバーに接続できない場合は全てのメッセージを失敗とするテスト"""
+        pool = SMTPConnectionPool(
+            lambda: aiosmtplib.SMTP(hostname="127.0.0.1", port=_free_port(), timeout=1)
+        )
+
+        results = await pool.send_batch([_message("user0@example.com"), _message("user1@example.com")])
+
+        assert all(isinstance(error, ConnectionError) for error in results)
+        assert len(results) == 2
+
+
+class TestDeliverMessages:
+    """utils.email_sender.deliver_messages のテスト"""
+
+    async def test_messages_are_sent_through_pool(self, smtp_server):
+        """メール設定のサーバーへ、プールの接続で送信するテスト"""
+        controller, handler = smtp_server
+        config = ConnectionConfig(
+            MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_FROM="noreply@example.com",
+            MAIL_PORT=controller.port, MAIL_SERVER=controller.hostname,
+            MAIL_STARTTLS=False, MAIL_SSL_TLS=False, USE_CREDENTIALS=False
+        )
+        messages = [
+            build_registration_complete_message(f"user{n}@example.com", f"user{n}") for n in range(3)
+        ]
+
+        with patch("utils.email_sender.get_mail_config", return_value=config):
+            try:
+                assert await deliver_messages(messages) == [None] * 3
+                assert await deliver_messages(messages[:1]) == [None]
+            finally:
+                await close_smtp_pool()
+
+        assert len(handler.recipients) == 4
+        assert handler.connections == 1
@@ -0,0 +1,155 @@
+"""utils/streaming.py とストリーミング・エクスポートのエンドポイントのテスト"""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base, get_db
+from models import Article, User
+from oauth2 import get_current_user
+from routers import article, auth
+from schemas import PublicArticle
+from utils.article_stats import adjust_article_count
+from utils.streaming import encode_items, is_stream_format, iter_rows
+
+
+@pytest.fixture
+def engine():
+    """スレッドをまたいで共有できるインメモリデータベース"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    user = User(name="stream", email="stream@example.com", password="x")
+    session.add(user)
+    session.commit()
+    for article_id in range(1, 8):
+        session.add(Article(
+            article_id=article_id, title=f"記事{article_id}",
+            body=f"本文{article_id}", user_id=user.id
+        ))
+        adjust_article_count(session, user.id, 1)
+    session.commit()
+    session.close()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    """記事・認証ルーターを登録したテスト用アプリケーション"""
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(article.router)
+    app.include_router(auth.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, email="stream@example.com")
+    return TestClient(app)
+
+
+class TestEncodeItems:
+    """JSON配列・NDJSONの書き出しのテスト"""
+
+    def _items(self, count):
+        return [
+            PublicArticle(article_id=i, title=f"記事{i}", body_html="<p>本文</p>")
+            for i in range(count)
+        ]
+
+    def test_json_array(self):
+        """JSON配列として読み込めるテスト"""
+        body = b"".join(encode_items(self._items(5), "json", batch_size=2))
+
+        assert [item["article_id"] for item in json.loads(body)] == [0, 1, 2, 3, 4]
+        assert b"".join(encode_items([], "json")) == b"[]"
+
+    def test_ndjson(self):
+        """1行1件のNDJSONとして書き出されるテスト"""
+        chunks = list(encode_items(self._items(5), "ndjson", batch_size=2))
+
+        # batch_size件ごとにまとめて返す
+        assert len(chunks) == 3
+        lines = b"".join(chunks).decode("utf-8").splitlines()
+        assert [json.loads(line)["title"] for line in lines] == [
+            "記事0", "記事1", "記事2", "記事3", "記事4"
+        ]
+
+    def test_is_stream_format(self):
+        """ストリーミング形式の判定のテスト"""
+        assert is_stream_format("json")
+        assert is_stream_format("ndjson")
+        assert not is_stream_format(None)
+        assert not is_stream_format("csv")
+
+
+class TestIterRows:
+    """クエリ結果の逐次読み込みのテスト"""
+
+    def test_reads_in_batches(self, engine):
+        """件数に関係なく全件を順に返すテスト"""
+        rows = list(iter_rows(
+            engine, select(Article.article_id).order_by(Article.article_id), batch_size=3
+        ))
+
+        assert [row.article_id for row in rows] == list(range(1, 8))
+
+
+class TestStreamingEndpoints:
+    """ストリーミングに対応したエンドポイントのテスト"""
+
+    def test_public_articles_stream(self, client):
+        """公開記事一覧をJSON配列でストリーミングするテスト"""
+        response = client.get("/api/v1/public/articles?stream=json")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["x-total-count"] == "7"
+        assert "etag" in response.headers
+        articles = response.json()
+        assert [item["article_id"] for item in articles] == [7, 6, 5, 4, 3, 2, 1]
+        assert articles[0]["body_html"] == "<p>本文7</p>"
+
+        # 通常のレスポンスと同じ内容になる
+        assert client.get("/api/v1/public/articles").json() == articles
+
+    def test_user_articles_stream(self, client):
+        """ログインユーザーの記事一覧をNDJSONでストリーミングするテスト"""
+        response = client.get("/api/v1/articles?stream=ndjson&limit=3")
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = response.text.splitlines()
+        assert len(lines) == 3
+        assert json.loads(lines[0])["user_id"] == 1
+
+    def test_all_blogs_stream(self, client):
+        """全記事一覧をストリーミングするテスト"""
+        response = client.get("/api/v1/article?stream=json")
+
+        assert [item["id"] for item in response.json()] == list(range(1, 8))
+
+    def test_invalid_format(self, client):
+        """未対応の形式はバリデーションエラーになるテスト"""
+        assert client.get("/api/v1/public/articles?stream=csv").status_code == 422
+
+    def test_export(self, client):
+        """全記事を記事ID昇順のNDJSONで書き出すテスト"""
+        response = client.get("/api/v1/public/articles/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert "articles.ndjson" in response.headers["content-disposition"]
+        lines = response.text.splitlines()
+        assert [json.loads(line)["article_id"] for line in lines] == list(range(1, 8))
@@ -0,0 +1,142 @@
+"""logger/structured_logger.py の単体テスト"""
+import json
+import logging
+import queue
+import sys
+from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
+from unittest.mock import patch
+
+from logger.structured_logger import (
+    AsyncQueueHandler,
+    JsonFormatter,
+    SamplingFilter,
+    SAMPLED,
+    _apply_levels,
+    _file_handler,
+)
+
+
+def _record(msg="メッセージ: %s", args=("値",), level=logging.INFO, **extra):
+    record = logging.LogRecord("tests.module", level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class TestJsonFormatter:
+    """JsonFormatterのテスト"""
+
+    def test_format_includes_extra_fields(self):
+        """メッセージと extra の項目を1行のJSONにするテスト"""
+        entry = json.loads(JsonFormatter().format(_record(user_id=1)))
+
+        assert entry["message"] == "メッセージ: 値"
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "tests.module"
+        assert entry["user_id"] == 1
+
+    def test_format_includes_exception(self):
+        """例外のトレースバックを含めるテスト"""
+        try:
+            raise ValueError("失敗")
+        except ValueError:
+            record = logging.LogRecord(
+                "tests.module", logging.ERROR, __file__, 1, "エラー", None, sys.exc_info()
+            )
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert "ValueError: 失敗" in entry["exc_info"]
+
+
+class TestSamplingFilter:
+    """SamplingFilterのテスト"""
+
+    def test_sampled_info_logs_are_dropped(self):
+        """SAMPLED を付けたINFOログだけを間引くテスト"""
+        sampling = SamplingFilter(rate=0)
+
+        assert not sampling.filter(_record(**SAMPLED))
+        assert sampling.filter(_record())
+        assert sampling.filter(_record(level=logging.WARNING, **SAMPLED))
+        assert sampling.dropped == 1
+
+    def test_rate_one_keeps_everything(self):
+        """割合が1の場合は全て残すテスト"""
+        sampling = SamplingFilter(rate=1)
+
+        assert all(sampling.filter(_record(**SAMPLED)) for _ in range(10))
+
+
+class TestAsyncQueueHandler:
+    """AsyncQueueHandlerのテスト"""
+
+    def test_immutable_args_are_formatted_later(self):
+        """引数が変更されない値だけの場合は書式化せずに渡すテスト"""
+        log_queue = queue.Queue()
+        AsyncQueueHandler(log_queue).handle(_record())
+
+        record = log_queue.get_nowait()
+        assert record.msg == "メッセージ: %s"
+        assert record.args == ("値",)
+        assert record.getMessage() == "メッセージ: 値"
+
+    def test_other_args_are_formatted_by_caller(self):
+        """オブジェクトを引数に渡した場合は呼び出し元で書式化するテスト"""
+        log_queue = queue.Queue()
+        AsyncQueueHandler(log_queue).handle(_record(args=(["一覧"],)))
+
+        record = log_queue.get_nowait()
+        assert record.msg == "メッセージ: ['一覧']"
+        assert record.args is None
+
+    def test_exception_is_rendered_before_queueing(self):
+        """トレースバックをキューに入れる前に文字列にするテスト"""
+        log_queue = queue.Queue()
+        try:
+            raise RuntimeError("失敗")
+        except RuntimeError:
+            record = _record()
+            record.exc_info = sys.exc_info()
+        AsyncQueueHandler(log_queue).handle(record)
+
+        queued = log_queue.get_nowait()
+        assert queued.exc_info is None
+        assert "RuntimeError: 失敗" in queued.exc_text
+
+    def test_full_queue_drops_without_blocking(self):
+        """キューが一杯の場合は待たずに破棄するテスト"""
+        handler = AsyncQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(_record())
+        handler.handle(_record())
+
+        assert handler.dropped == 1
+
+
+class TestConfiguration:
+    """ローテーションとモジュールごとのレベルのテスト"""
+
+    def test_size_based_rotation(self, tmp_path):
+        """LOG_ROTATE_WHEN が空の場合はサイズでローテーションするテスト"""
+        with patch("logger.structured_logger.LOG_ROTATE_WHEN", ""), \
+                patch("logger.structured_logger.LOG_MAX_BYTES", 1024):
+            handler = _file_handler(tmp_path / "app.log", logging.INFO)
+
+        assert isinstance(handler, RotatingFileHandler)
+        assert handler.maxBytes == 1024
+        handler.close()
+
+    def test_time_based_rotation(self, tmp_path):
+        """LOG_ROTATE_WHEN を設定した場合は時間でローテーションするテスト"""
+        with patch("logger.structured_logger.LOG_ROTATE_WHEN", "midnight"):
+            handler = _file_handler(tmp_path / "app.log", logging.INFO)
+
+        assert isinstance(handler, TimedRotatingFileHandler)
+        handler.close()
+
+    def test_per_module_levels(self):
+        """モジュールごとのレベルを設定するテスト"""
+        _apply_levels("tests.levels.a=WARNING, tests.levels.b=debug,invalid")
+
+        assert logging.getLogger("tests.levels.a").level == logging.WARNING
+        assert logging.getLogger("tests.levels.b").level == logging.DEBUG
@@ -0,0 +1,148 @@
+"""utils/token_cache.py の単体テスト"""
+import time
+from datetime import timedelta
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi import HTTPException
+from jose import JWTError, jwt
+from sqlalchemy.orm import Session
+
+from custom_token import TokenType, create_access_token, verify_token_with_type
+from routers.auth import logout
+from utils.token_cache import (
+    TokenPayloadCache,
+    decode_token,
+    key_fingerprint,
+    token_payload_cache,
+)
+
+
+SECRET = "test_secret_key"
+VERIFIER = (key_fingerprint(SECRET), ("HS256",))
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    """テスト間で検証済みトークンのキャッシュを共有しない"""
+    token_payload_cache.clear()
+    yield
+    token_payload_cache.clear()
+
+
+@pytest.fixture
+def token():
+    """5分間有効なアクセストークン"""
+    with patch("custom_token.SECRET_KEY", SECRET):
+        yield create_access_token(
+            data={"sub": "cache@example.com", "id": 1}, expires_delta=timedelta(minutes=5)
+        )
+
+
+class TestDecodeToken:
+    """decode_token のテスト"""
+
+    def test_second_decode_skips_verification(self, token):
+        """2回目以降は署名を検証せずキャッシュから返すテスト"""
+        first = decode_token(token, SECRET, ["HS256"])
+        with patch("utils.token_cache.jwt.decode") as mock_decode:
+            second = decode_token(token, SECRET, ["HS256"])
+
+        mock_decode.assert_not_called()
+        assert second == first
+        assert token_payload_cache.stats()["hits"] == 1
+
+    def test_returned_payload_is_a_copy(self, token):
+        """返したペイロードを変更してもキャッシュに影響しないテスト"""
+        decode_token(token, SECRET, ["HS256"])["sub"] = "changed@example.com"
+
+        assert decode_token(token, SECRET, ["HS256"])["sub"] == "cache@example.com"
+
+    def test_different_key_is_verified_again(self, token):
+        """異なる鍵で検証する場合はキャッシュを使わないテスト"""
+        decode_token(token, SECRET, ["HS256"])
+
+        with pytest.raises(JWTError):
+            decode_token(token, "another_secret", ["HS256"])
+
+    def test_invalid_token_is_not_cached(self):
+        """検証に失敗したトークンはキャッシュしないテスト"""
+        forged = jwt.encode(
+            {"sub": "cache@example.com", "id": 1, "exp": time.time() + 60},
+            "wrong_secret", algorithm="HS256"
+        )
+        for _ in range(2):
+            with pytest.raises(JWTError):
+                decode_token(forged, SECRET, ["HS256"])
+        assert token_payload_cache.stats()["size"] == 0
+
+    def test_entry_expires_at_exp(self, token):
+        """トークンの有効期限を過ぎたエントリは使わないテスト"""
+        payload = decode_token(token, SECRET, ["HS256"])
+
+        with patch("utils.token_cache.time.time", return_value=payload["exp"] + 1):
+            assert token_payload_cache.get(token, VERIFIER) is None
+
+    def test_secret_key_is_not_stored(self, token):
+        """署名の鍵そのものではなく、鍵のフィンガープリントを保持するテスト"""
+        decode_token(token, SECRET, ["HS256"])
+
+        (_exp, verifier, _payload), = token_payload_cache._entries.values()
+        assert verifier == VERIFIER
+        assert SECRET.encode() not in verifier[0]
+
+    def test_cached_token_before_nbf_is_rejected(self):
+        """nbf より前はキャッシュ済みのトークンも jwt.decode で拒否されるテスト"""
+        now = time.time()
+        payload = {"sub": "cache@example.com", "id": 1, "nbf": now + 30, "exp": now + 60}
+        token = jwt.encode(payload, SECRET, algorithm="HS256")
+        # 有効開始後に検証してキャッシュしたエントリ
+        token_payload_cache.put(token, VERIFIER, payload)
+
+        with pytest.raises(JWTError):
+            decode_token(token, SECRET, ["HS256"])
+        assert token_payload_cache.stats()["hits"] == 0
+        with patch("utils.token_cache.time.time", return_value=now + 40):
+            assert token_payload_cache.get(token, VERIFIER) == payload
+
+    def test_verify_token_with_type_uses_cache(self, token):
+        """verify_token_with_type もキャッシュを使うテスト"""
+        with patch("custom_token.SECRET_KEY", SECRET):
+            verify_token_with_type(token, TokenType.ACCESS, HTTPException(401))
+            with patch("utils.token_cache.jwt.decode") as mock_decode:
+                payload = verify_token_with_type(token, TokenType.ACCESS, HTTPException(401))
+
+        mock_decode.assert_not_called()
+        assert payload["type"] == "access"
+
+
+class TestTokenPayloadCache:
+    """TokenPayloadCache のテスト"""
+
+    def test_lru_eviction(self):
+        """最大件数を超えると最も古く参照されたエントリが破棄されるテスト"""
+        cache = TokenPayloadCache(1)
+        verifier = VERIFIER
+        exp = time.time() + 60
+        cache.put("a", verifier, {"exp": exp})
+        cache.put("b", verifier, {"exp": exp})
+
+        assert cache.get("a", verifier) is None
+        assert cache.get("b", verifier) == {"exp": exp}
+
+    def test_payload_without_exp_is_not_cached(self):
+        """有効期限の無いトークンはキャッシュしないテスト"""
+        cache = TokenPayloadCache(10)
+        cache.put("a", VERIFIER, {"sub": "a"})
+
+        assert cache.stats()["size"] == 0
+
+    async def test_logout_discards_entry(self, token):
+        """ログアウトしたトークンのエントリを削除するテスト"""
+        decode_token(token, SECRET, ["HS256"])
+
+        with patch("routers.auth.SECRET_KEY", SECRET), \
+                patch("routers.auth.run_db", new=AsyncMock()):
+            await logout(token, Mock(spec=Session))
+
+        assert token_payload_cache.get(token, VERIFIER) is None
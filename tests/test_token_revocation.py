@@ -0,0 +1,252 @@
+"""utils/token_revocation.py の単体テスト"""
+import asyncio
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from custom_token import TokenType, create_access_token, verify_token, verify_token_with_type
+from database import Base
+from models import RevokedToken, User
+from oauth2 import get_current_user
+from routers.auth import logout, logout_all
+from utils.query_plan import record_queries
+from utils.token_cache import token_payload_cache
+from utils.token_revocation import (
+    BloomFilter,
+    TokenRevocationStore,
+    run_revocation_maintenance,
+    token_id,
+    token_revocation_store,
+)
+from utils.user_cache import user_cache
+
+
+SECRET = "test_secret_key"
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """テスト間で無効化状態・キャッシュを共有しない"""
+    token_revocation_store.reset()
+    token_payload_cache.clear()
+    user_cache.clear()
+    with patch("custom_token.SECRET_KEY", SECRET), \
+            patch("oauth2.SECRET_KEY", SECRET), \
+            patch("routers.auth.SECRET_KEY", SECRET):
+        yield
+    token_revocation_store.reset()
+    token_payload_cache.clear()
+    user_cache.clear()
+
+
+@pytest.fixture
+def engine():
+    """ユーザーを1件登録したデータベース（各ワーカーのストアから共有する）"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, name="revoke", email="revoke@example.com", password="x"))
+    session.commit()
+    session.close()
+    yield engine
+    engine.dispose()
+
+
+def _token(token_version=None) -> str:
+    return create_access_token(
+        data={"sub": "revoke@example.com", "id": 1}, expires_delta=timedelta(minutes=5),
+        token_version=token_version
+    )
+
+
+class TestBloomFilter:
+    """BloomFilterのテスト"""
+
+    def test_no_false_negatives_and_low_false_positive_rate(self):
+        """登録した値は必ず含まれ、未登録の値の誤検出率が目安程度であるテスト"""
+        bloom = BloomFilter(1000, 0.01)
+        for number in range(1000):
+            bloom.add(f"revoked-{number}")
+
+        assert all(f"revoked-{number}" in bloom for number in range(1000))
+        false_positives = sum(f"other-{number}" in bloom for number in range(10000))
+        assert false_positives < 300
+
+
+class TestTokenRevocationStore:
+    """TokenRevocationStoreのテスト"""
+
+    def test_token_id_uses_jti(self):
+        """jtiがある場合はjti、無い場合はトークンのダイジェストを使うテスト"""
+        assert token_id("token", {"jti": "abc"}) == "abc"
+        assert len(token_id("token", {})) == 64
+
+    def test_not_revoked_without_io(self, engine):
+        """無効化されていないjtiはデータベースを検索せずに判定するテスト"""
+        store = TokenRevocationStore(capacity=100)
+        store.revoke(engine, "revoked", time.time() + 60)
+
+        with record_queries(engine) as recorder:
+            assert not store.is_revoked(engine, "active")
+            assert store.is_revoked(engine, "revoked")
+
+        assert len(recorder.queries) == 1
+        assert store.stats() == {"fast_path_hits": 1, "lookups": 1}
+
+    def test_sync_from_other_process(self, engine):
+        """他のプロセスで無効化されたjtiを同期で取り込むテスト"""
+        worker_a = TokenRevocationStore(capacity=100)
+        worker_b = TokenRevocationStore(capacity=100)
+        worker_b.sync(engine)
+
+        worker_a.revoke(engine, "revoked-by-a", time.time() + 60)
+        assert not worker_b.is_revoked(engine, "revoked-by-a")
+
+        assert worker_b.sync(engine) == 1
+        assert worker_b.is_revoked(engine, "revoked-by-a")
+
+    def test_compact_removes_expired(self, engine):
+        """期限切れの行を削除し、フィルタから除くテスト"""
+        store = TokenRevocationStore(capacity=100)
+        store.revoke(engine, "expired", time.time() - 1)
+        store.revoke(engine, "active", time.time() + 60)
+
+        assert store.compact(engine) == 1
+        assert not store.might_be_revoked(engine, "expired")
+        assert store.is_revoked(engine, "active")
+        session = sessionmaker(bind=engine)()
+        assert [row.jti for row in session.query(RevokedToken)] == ["active"]
+        session.close()
+
+    def test_compact_grows_filter(self, engine):
+        """件数が目安を超えた場合はフィルタを大きくするテスト"""
+        store = TokenRevocationStore(capacity=2)
+        for number in range(5):
+            store.revoke(engine, f"jti-{number}", time.time() + 60)
+
+        store.compact(engine)
+
+        assert store._states[engine].bloom.capacity == 8
+
+    async def test_maintenance_compacts_then_syncs(self, engine):
+        """定期処理が圧縮の後に同期を繰り返すテスト"""
+        with patch("utils.token_revocation.token_revocation_store.compact") as compact, \
+                patch("utils.token_revocation.token_revocation_store.sync") as sync:
+            task = asyncio.create_task(
+                run_revocation_maintenance(engine, sync_interval=0.01, compact_interval=60)
+            )
+            await asyncio.sleep(0.1)
+            task.cancel()
+
+        compact.assert_called_once_with(engine)
+        assert sync.call_count >= 1
+
+
+class TestLogoutRevokesToken:
+    """ログアウトと認証の連携のテスト"""
+
+    async def test_logged_out_token_is_rejected(self, engine):
+        """ログアウトしたトークンは get_current_user で拒否されるテスト"""
+        token = _token()
+        db = sessionmaker(bind=engine)()
+        assert (await get_current_user(token, db)).id == 1
+
+        await logout(token, db)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(token, db)
+        assert exc_info.value.status_code == 401
+        # 他のトークンは引き続き使用できる
+        assert (await get_current_user(_token(), db)).id == 1
+        db.close()
+
+    async def test_custom_token_verifiers_reject_logged_out_token(self, engine):
+        """custom_token の verify_token・verify_token_with_type もログアウトしたトークンを拒否するテスト"""
+        token = _token()
+        db = sessionmaker(bind=engine)()
+        exception = HTTPException(status_code=401)
+        with patch("custom_token.engine", engine):
+            assert verify_token(token, exception, db).id == 1
+            assert verify_token_with_type(token, TokenType.ACCESS, exception)["id"] == 1
+
+            await logout(token, db)
+
+            with pytest.raises(HTTPException):
+                verify_token(token, exception, db)
+            with pytest.raises(HTTPException):
+                verify_token_with_type(token, TokenType.ACCESS, exception)
+        db.close()
+
+    async def test_revocation_is_shared_across_workers(self, engine):
+        """他のワーカーでログアウトしたトークンを同期後に拒否するテスト"""
+        token = _token()
+        db = sessionmaker(bind=engine)()
+        other_worker = TokenRevocationStore()
+        with patch("routers.auth.token_revocation_store", other_worker):
+            await logout(token, db)
+        token_payload_cache.clear()
+
+        token_revocation_store.sync(engine)
+
+        with pytest.raises(HTTPException):
+            await get_current_user(token, db)
+        db.close()
+
+    def test_access_token_has_jti(self):
+        """アクセストークンに一意のjtiが含まれるテスト"""
+        first = jwt.get_unverified_claims(_token())["jti"]
+        second = jwt.get_unverified_claims(_token())["jti"]
+
+        assert first and first != second
+
+
+class TestLogoutAll:
+    """token_version による全端末からのログアウトのテスト"""
+
+    async def test_logout_all_rejects_previous_tokens(self, engine):
+        """全端末からのログアウト前に発行したトークンを全て拒否するテスト"""
+        tokens = [_token(token_version=0) for _ in range(3)]
+        db = sessionmaker(bind=engine)()
+        current_user = await get_current_user(tokens[0], db)
+
+        await logout_all(current_user, db)
+
+        for token in tokens:
+            with pytest.raises(HTTPException) as exc_info:
+                await get_current_user(token, db)
+            assert exc_info.value.status_code == 401
+        # 新しい世代で発行したトークンは使用できる
+        assert (await get_current_user(_token(token_version=1), db)).id == 1
+        # トークンごとの記録は行わない
+        assert db.query(RevokedToken).count() == 0
+        db.close()
+
+    async def test_cached_user_with_old_version_is_rejected(self, engine):
+        """キャッシュ済みのユーザーでも世代が異なるトークンは拒否するテスト"""
+        db = sessionmaker(bind=engine)()
+        await get_current_user(_token(token_version=0), db)
+
+        with pytest.raises(HTTPException):
+            await get_current_user(_token(token_version=1), db)
+        db.close()
+
+    async def test_token_without_version_claim_is_generation_zero(self, engine):
+        """ver クレームの無いトークンは世代0として扱うテスト"""
+        token = _token()
+        assert "ver" not in jwt.get_unverified_claims(token)
+        db = sessionmaker(bind=engine)()
+
+        assert (await get_current_user(token, db)).id == 1
+        await logout_all(await get_current_user(token, db), db)
+        with pytest.raises(HTTPException):
+            await get_current_user(token, db)
+        db.close()
@@ -0,0 +1,164 @@
+"""utils/user_cache.py の単体テスト"""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from custom_token import create_access_token
+from database import Base
+from models import User
+from oauth2 import get_current_user
+from utils.query_plan import record_queries
+from utils.user_cache import CachedUser, UserCache, user_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    """テスト間でユーザー情報のキャッシュを共有しない"""
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@pytest.fixture
+def engine():
+    """ユーザーを1件登録したインメモリデータベース"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, name="cache", email="cache@example.com", password="x", is_active=True))
+    session.commit()
+    session.close()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def token():
+    """ユーザー1のアクセストークン"""
+    with patch("custom_token.SECRET_KEY", "test_secret_key"), \
+            patch("oauth2.SECRET_KEY", "test_secret_key"):
+        yield create_access_token(
+            data={"sub": "cache@example.com", "id": 1}, expires_delta=timedelta(minutes=5)
+        )
+
+
+class TestUserCache:
+    """TTL付きLRUキャッシュのテスト"""
+
+    def test_expires_after_max_staleness(self):
+        """最大の古さを過ぎたエントリを返さないテスト"""
+        cache = UserCache(10, 30)
+        cache.put(CachedUser(1, "a", "a@example.com", True), cache.version)
+
+        assert cache.get(1).email == "a@example.com"
+        with patch("utils.user_cache.time.monotonic", return_value=10**9):
+            assert cache.get(1) is None
+
+    def test_put_skips_entries_invalidated_during_lookup(self):
+        """検索中に無効化されたユーザー情報を保存しないテスト"""
+        cache = UserCache(10, 30)
+        version = cache.version
+        cache.invalidate(1)
+        cache.put(CachedUser(1, "a", "a@example.com", True), version)
+
+        assert cache.get(1) is None
+
+    def test_lru_eviction(self):
+        """最大件数を超えると最も古く参照されたエントリが破棄されるテスト"""
+        cache = UserCache(1, 30)
+        cache.put(CachedUser(1, "a", None, True), cache.version)
+        cache.put(CachedUser(2, "b", None, True), cache.version)
+
+        assert cache.get(1) is None
+        assert cache.get(2).name == "b"
+
+
+class TestGetCurrentUserCache:
+    """get_current_user のキャッシュのテスト"""
+
+    async def test_second_request_skips_user_lookup(self, engine, token):
+        """2回目以降の認証ではユーザーを検索しないテスト"""
+        factory = sessionmaker(bind=engine)
+        with record_queries(engine) as recorder:
+            db = factory()
+            first = await get_current_user(token, db)
+            db.close()
+            db = factory()
+            second = await get_current_user(token, db)
+
+        assert first.id == second.id == 1
+        assert second.email == "cache@example.com"
+        assert len(recorder.queries) == 1
+        db.close()
+
+    async def test_cache_hit_returns_session_bound_user(self, engine, token):
+        """キャッシュから返すユーザーもセッションに属するUserモデルであるテスト"""
+        factory = sessionmaker(bind=engine)
+        db = factory()
+        await get_current_user(token, db)
+        db.close()
+
+        db = factory()
+        user = await get_current_user(token, db)
+        assert isinstance(user, User)
+        assert user in db
+        # キャッシュしていないカラムとリレーションシップは参照時に読み込む
+        assert user.password == "x"
+        assert user.blogs == []
+
+        user.name = "renamed"
+        db.commit()
+        assert user_cache.get(1) is None
+        db.close()
+        db = factory()
+        assert db.get(User, 1).name == "renamed"
+        db.close()
+
+    async def test_is_active_change_invalidates(self, engine, token):
+        """有効状態の変更をコミットするとキャッシュが無効化されるテスト"""
+        factory = sessionmaker(bind=engine)
+        db = factory()
+        await get_current_user(token, db)
+        assert user_cache.get(1) is not None
+
+        db.get(User, 1).is_active = False
+        db.commit()
+
+        assert user_cache.get(1) is None
+        assert (await get_current_user(token, db)).is_active is False
+        db.close()
+
+    async def test_rollback_keeps_cache(self, engine, token):
+        """ロールバックした変更ではキャッシュを無効化しないテスト"""
+        factory = sessionmaker(bind=engine)
+        db = factory()
+        await get_current_user(token, db)
+
+        db.get(User, 1).is_active = False
+        db.flush()
+        db.rollback()
+        db.commit()
+
+        assert user_cache.get(1) is not None
+        db.close()
+
+    async def test_deleted_user_is_rejected(self, engine, token):
+        """ユーザーの削除をコミットすると以後の認証が失敗するテスト"""
+        factory = sessionmaker(bind=engine)
+        db = factory()
+        await get_current_user(token, db)
+
+        db.delete(db.get(User, 1))
+        db.commit()
+
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_user(token, db)
+        assert exc_info.value.status_code == 401
+        db.close()
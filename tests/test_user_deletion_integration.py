@@ -57,9 +57,9 @@ class TestDeleteUserAccountIntegration:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
         assert "Not authenticated" in response.json()["detail"]
     
-    @patch('routers.user.send_account_deletion_email')
+    @patch('routers.user.enqueue_email')
     @patch('routers.user.Hash.verify')
-    def test_delete_account_success_with_auth(self, mock_hash_verify, mock_send_email, client, mock_user, mock_db, valid_deletion_data):
+    def test_delete_account_success_with_auth(self, mock_hash_verify, mock_enqueue, client, mock_user, mock_db, valid_deletion_data):
         """認証ありで正常なアカウント削除のテスト"""
         # 依存性のオーバーライド設定
         def override_get_current_user():
@@ -75,7 +75,6 @@ class TestDeleteUserAccountIntegration:
         try:
             # モックの設定
             mock_hash_verify.return_value = True
-            mock_send_email.return_value = AsyncMock()
             
             # ユーザークエリのモック（削除時に使用）
             user_query = MagicMock()
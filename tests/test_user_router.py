@@ -140,12 +140,11 @@ class TestCreateUserEndpoint:
         assert exc_info.value.status_code == status.HTTP_409_CONFLICT
         assert "このメールアドレスは既に使用されています" in exc_info.value.detail
     
-    @patch('routers.user.send_verification_email')
+    @patch('routers.user.enqueue_email')
     @patch('routers.user.is_valid_email_domain')
-    def test_create_user_email_verification_enabled_new_user(self, mock_domain_check, mock_send_email, mock_db, valid_user_schema):
+    def test_create_user_email_verification_enabled_new_user(self, mock_domain_check, mock_enqueue, mock_db, valid_user_schema):
         """メール認証有効で新規ユーザーの場合のテスト"""
         mock_domain_check.return_value = True
-        mock_send_email.return_value = AsyncMock()
         
         # 既存ユーザーなし、既存認証レコードなし
         mock_db.query.return_value.filter.return_value.first.return_value = None
@@ -162,10 +161,14 @@ class TestCreateUserEndpoint:
                 assert result["email"] == "test@example.com"
                 mock_db.add.assert_called_once()
                 mock_db.commit.assert_called_once()
+                # 確認メールはコミット前に送信待ちに追加する
+                mock_enqueue.assert_called_once_with(
+                    mock_db, "verification", "test@example.com", token="test-token"
+                )
     
-    @patch('routers.user.send_verification_email')
+    @patch('routers.user.enqueue_email')
     @patch('routers.user.is_valid_email_domain')
-    def test_create_user_email_verification_enabled_existing_verified(self, mock_domain_check, mock_send_email, mock_db, valid_user_schema):
+    def test_create_user_email_verification_enabled_existing_verified(self, mock_domain_check, mock_enqueue, mock_db, valid_user_schema):
         """メール認証有効で既に認証済みの場合のテスト"""
         mock_domain_check.return_value = True
         
@@ -182,12 +185,11 @@ class TestCreateUserEndpoint:
             assert exc_info.value.status_code == status.HTTP_409_CONFLICT
             assert "このメールアドレスは既に確認済みです" in exc_info.value.detail
     
-    @patch('routers.user.send_verification_email')
+    @patch('routers.user.enqueue_email')
     @patch('routers.user.is_valid_email_domain')
-    def test_create_user_email_verification_enabled_existing_unverified(self, mock_domain_check, mock_send_email, mock_db, valid_user_schema):
+    def test_create_user_email_verification_enabled_existing_unverified(self, mock_domain_check, mock_enqueue, mock_db, valid_user_schema):
         """メール認証有効で未認証レコードが既にある場合のテスト"""
         mock_domain_check.return_value = True
-        mock_send_email.return_value = AsyncMock()
         
         # 既存ユーザーなし、未認証レコードあり
         existing_verification = MagicMock()
@@ -413,7 +415,7 @@ class TestShowUserEndpoint:
         other_user_id = 456
         
         with pytest.raises(HTTPException) as exc_info:
-            asyncio.run(show_user(other_user_id, mock_db, mock_current_user))
+            show_user(other_user_id, mock_db, mock_current_user)
         
         assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
         assert "他のユーザーの情報にはアクセスできません" in exc_info.value.detail
@@ -424,7 +426,7 @@ class TestShowUserEndpoint:
         mock_db.query.return_value.filter.return_value.first.return_value = None
         
         with pytest.raises(HTTPException) as exc_info:
-            asyncio.run(show_user(user_id, mock_db, mock_current_user))
+            show_user(user_id, mock_db, mock_current_user)
         
         assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
         assert f"User with id {user_id} not found" in exc_info.value.detail
@@ -438,7 +440,7 @@ class TestShowUserEndpoint:
         mock_user.is_active = True
         mock_db.query.return_value.filter.return_value.first.return_value = mock_user
         
-        result = asyncio.run(show_user(user_id, mock_db, mock_current_user))
+        result = show_user(user_id, mock_db, mock_current_user)
         
         assert result.email == "current@example.com"
         assert result.password is None  # パスワードは返さない
@@ -542,9 +544,9 @@ class TestDeleteUserAccountEndpoint:
         assert exc_info.value.status_code == status.HTTP_400_BAD_REQUEST
         assert "ユーザーのメールアドレスが見つかりません" in exc_info.value.detail
     
-    @patch('routers.user.send_account_deletion_email')
+    @patch('routers.user.enqueue_email')
     @patch('routers.user.Hash.verify')
-    def test_delete_user_account_success(self, mock_hash_verify, mock_send_email, mock_db, valid_deletion_request):
+    def test_delete_user_account_success(self, mock_hash_verify, mock_enqueue, mock_db, valid_deletion_request):
         """正常なアカウント削除のテスト"""
         # 認証されたユーザーのモック
         mock_current_user = MagicMock()
@@ -552,7 +554,6 @@ class TestDeleteUserAccountEndpoint:
         mock_current_user.id = 123
         
         mock_hash_verify.return_value = True
-        mock_send_email.return_value = AsyncMock()
         
         # ユーザーのモック
         mock_user = MagicMock()
@@ -591,6 +592,9 @@ class TestDeleteUserAccountEndpoint:
         # 削除処理の確認
         assert mock_db.delete.call_count >= 4  # ユーザー、記事2つ、認証レコード1つ
         mock_db.commit.assert_called_once()
+        mock_enqueue.assert_called_once_with(
+            mock_db, "account_deletion", "test@example.com", username="test"
+        )
     
     def test_delete_user_account_password_mismatch(self, mock_db):
         """パスワード不一致の場合のテスト"""
@@ -650,10 +654,9 @@ class TestResendVerificationEmailEndpoint:
         assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
         assert "確認待ちのメールアドレスが見つかりません" in exc_info.value.detail
     
-    @patch('routers.user.send_verification_email')
-    def test_resend_verification_email_success(self, mock_send_email, mock_db):
+    @patch('routers.user.enqueue_email')
+    def test_resend_verification_email_success(self, mock_enqueue, mock_db):
         """認証メール再送成功のテスト"""
-        mock_send_email.return_value = AsyncMock()
         
         mock_verification = MagicMock()
         mock_verification.email = "test@example.com"
@@ -673,7 +676,9 @@ class TestResendVerificationEmailEndpoint:
         assert mock_verification.expires_at is not None
         
         mock_db.commit.assert_called_once()
-        mock_send_email.assert_called_once()
+        mock_enqueue.assert_called_once_with(
+            mock_db, "verification", "test@example.com", token=mock_verification.token
+        )
 
 
 class TestUserRouterIntegration:
@@ -810,12 +815,11 @@ class TestDeleteUserAccountWithAuth:
         assert "自分のアカウントのみ削除できます" in exc_info.value.detail
         mock_db.rollback.assert_called_once()
     
-    @patch('routers.user.send_account_deletion_email')
+    @patch('routers.user.enqueue_email')
     @patch('routers.user.Hash.verify')
-    def test_delete_user_account_success_with_auth(self, mock_hash_verify, mock_send_email, mock_db, mock_current_user, valid_deletion_request):
+    def test_delete_user_account_success_with_auth(self, mock_hash_verify, mock_enqueue, mock_db, mock_current_user, valid_deletion_request):
         """認証機能ありで正常なアカウント削除のテスト"""
         mock_hash_verify.return_value = True
-        mock_send_email.return_value = AsyncMock()
         
         # 記事のモック
         mock_articles = [MagicMock(), MagicMock()]
@@ -0,0 +1,175 @@
+"""記事IDを採番するモジュール
+
+記事テーブルを走査せず、同時に記事を作成しても重複しないように記事IDを払い出す。
+
+- PostgreSQL: シーケンス（article_id_seq）の ``nextval`` を使う。
+- SQLite: id_countersテーブルのカウンター行から ``ARTICLE_ID_BLOCK_SIZE`` 件ずつ
+  ブロックを予約し（hi/lo方式）、プロセス内ではブロックから順に払い出す。
+  予約は記事の作成とは別の短いトランザクションで確定するため、記事の作成が
+  ロールバックされても予約済みのIDが他のプロセスに払い出されることはない。
+
+ブロック方式では、再起動で未使用のIDが欠番になり、複数プロセスで運用すると
+記事IDの大小と作成順が一致しない場合がある。
+"""
+import os
+import threading
+import weakref
+from typing import List, Tuple
+
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import Session
+
+from models import ARTICLE_ID_SEQUENCE, IdCounter
+from logger.structured_logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# SQLiteで1回に予約する記事IDの件数
+ARTICLE_ID_BLOCK_SIZE = max(1, int(os.getenv("ARTICLE_ID_BLOCK_SIZE", "20")))
+
+# id_countersテーブルでの記事IDの連番の名前
+ARTICLE_ID_COUNTER = "articles"
+
+
+class ArticleIdAllocator:
+    """記事IDをブロック単位で予約し、プロセス内で払い出すクラス
+
+    :param block_size: 1回に予約する件数
+    """
+
+    def __init__(self, block_size: int = ARTICLE_ID_BLOCK_SIZE) -> None:
+        self.block_size = block_size
+        # エンジンごとの予約済みブロック（次に払い出す値, ブロックの終端）
+        self._blocks: "weakref.WeakKeyDictionary[Engine, Tuple[int, int]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self.reservations = 0
+
+    def allocate(self, db: Session, count: int = 1) -> List[int]:
+        """記事IDを払い出す
+
+        :param db: データベースセッション
+        :type db: Session
+        :param count: 払い出す件数
+        :type count: int
+        :return: 昇順の記事ID（SQLiteでは連続した範囲）
+        :rtype: List[int]
+        """
+        if count < 1:
+            return []
+        engine = db.get_bind().engine
+        dialect = engine.dialect.name
+        if dialect == "postgresql":
+            return self._allocate_from_sequence(db, count)
+        if dialect != "sqlite":
+            raise NotImplementedError(f"記事IDの採番に対応していないデータベースです: {dialect}")
+        with self._lock:
+            start, end = self._blocks.get(engine, (0, 0))
+            if end - start >= count:
+                self._blocks[engine] = (start + count, end)
+                return list(range(start, start + count))
+        # 予約はロックの外で行い、他のスレッドの払い出しを待たせない
+        if count >= self.block_size:
+            # ブロックより多い件数は専用に予約し、現在のブロックは残す
+            start = self._reserve(engine, count)
+        else:
+            # 残りで足りない場合は新しいブロックを予約する（範囲を連続させるため）。
+            # 同時に予約した他のスレッドのブロックの残りは欠番になる
+            start = self._reserve(engine, self.block_size)
+            with self._lock:
+                self._blocks[engine] = (start + count, start + self.block_size)
+        return list(range(start, start + count))
+
+    @staticmethod
+    def _allocate_from_sequence(db: Session, count: int) -> List[int]:
+        """PostgreSQLのシーケンスから記事IDを取得する
+
+        シーケンスはトランザクションに含まれないため、ロックを待たずに取得できる。
+        同時に採番された場合、複数件の記事IDは連続しないことがある。
+        """
+        name = ARTICLE_ID_SEQUENCE.name
+        if count == 1:
+            return [int(db.execute(text(f"SELECT nextval('{name}')")).scalar_one())]
+        values = db.execute(
+            text(f"SELECT nextval('{name}') FROM generate_series(1, :count)"),
+            {"count": count},
+        ).scalars().all()
+        return sorted(int(value) for value in values)
+
+    def _reserve(self, engine: Engine, size: int) -> int:
+        """カウンター行を進めてブロックを予約し、先頭の値を返す（SQLite用）
+
+        カウンター行が無い場合は、現在の記事IDの最大値の次から始める。
+        """
+        table = IdCounter.__tablename__
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"INSERT OR IGNORE INTO {table} (name, next_value) "
+                    "SELECT :name, COALESCE(MAX(article_id), 0) + 1 FROM articles"
+                ),
+                {"name": ARTICLE_ID_COUNTER},
+            )
+            next_value = connection.execute(
+                text(
+                    f"UPDATE {table} SET next_value = next_value + :size "
+                    "WHERE name = :name RETURNING next_value"
+                ),
+                {"name": ARTICLE_ID_COUNTER, "size": size},
+            ).scalar_one()
+        with self._lock:
+            self.reservations += 1
+        return int(next_value) - size
+
+    def reset(self) -> None:
+        """予約済みのブロックを破棄する（未使用のIDは欠番になる）"""
+        with self._lock:
+            self._blocks.clear()
+
+
+article_id_allocator = ArticleIdAllocator()
+
+
+def allocate_article_ids(db: Session, count: int = 1) -> List[int]:
+    """記事IDを払い出す
+
+    :param db: データベースセッション
+    :type db: Session
+    :param count: 払い出す件数
+    :type count: int
+    :return: 昇順の記事ID
+    :rtype: List[int]
+    """
+    return article_id_allocator.allocate(db, count)
+
+
+def ensure_article_id_allocator(engine: Engine) -> None:
+    """既存のデータベースで記事IDの採番を使えるようにする
+
+    記事IDの一意インデックスを作成し（既に重複がある場合は作成せずに警告する）、
+    PostgreSQLではシーケンスを記事IDの最大値より先に進める。
+
+    :param engine: SQLAlchemyのエンジン
+    :type engine: Engine
+    """
+    try:
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_articles_article_id "
+                "ON articles (article_id)"
+            ))
+    except Exception as e:
+        logger.warning("記事IDの一意インデックスを作成できませんでした（重複を確認してください）: %s", e)
+    if engine.dialect.name != "postgresql":
+        return
+    name = ARTICLE_ID_SEQUENCE.name
+    with engine.begin() as connection:
+        connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {name}"))
+        connection.execute(text(
+            f"SELECT setval('{name}', m.max_id + 1, false) "
+            f"FROM (SELECT COALESCE(MAX(article_id), 0) AS max_id FROM articles) m, "
+            f"{name} s WHERE s.last_value <= m.max_id"
+        ))
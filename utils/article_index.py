@@ -0,0 +1,486 @@
+"""記事検索用のプロセス内転置インデックスを管理するモジュール
+
+SQLiteで運用する単一プロセスの環境向けに、タイトルと本文の文字bigram・文字unigramから
+記事の行IDへの転置インデックスをメモリ上に保持し、データベースに問い合わせずに
+検索キーワードに一致する記事を特定する。
+
+・ポスティングリストは昇順の ``array('I')`` で保持し、ソート済みマージで積集合を取る
+
+・bigramの積集合で候補を絞り込んだ後、3文字以上の検索語は、呼び出し元がデータベースから
+  読み込んだ記事の正規化済みテキストの部分一致で確定する（本文はメモリに保持しない）
+
+・記事の追加・更新・削除はマッパーイベントで記録し、コミット時に反映する
+
+・関連度順の検索では、ポスティングリストと並行して保持する出現回数と
+  NumPy配列の文書長から、候補全件のBM25スコアを一括で計算する
+
+インデックスはプロセスごとに保持するため、複数プロセスで運用する場合は使用しないこと。
+"""
+import math
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import Engine, event, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapper, Session, object_session
+
+from models import Article
+from utils.text_tokens import WORD_RUN, normalize_text
+
+
+# セッションに記録する未コミットの変更のキー
+_PENDING_KEY = "article_index_pending"
+
+# BM25のパラメータ
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# タイトルに含まれるトークンの重み（FTS5のbm25と同じくタイトルを2倍に数える）
+TITLE_WEIGHT = 2
+
+# 出現回数の上限（array('H')に収まる値）
+_MAX_FREQUENCY = 0xFFFF
+
+# 候補の行IDのうち、検索語を実際に含むものを返す関数（フレーズの確定に使用する）
+Verifier = Callable[[List[int]], Set[int]]
+
+
+def document_text(title: str, body: str) -> str:
+    """索引・照合に使用する正規化済みテキストを作成する
+
+    記号・空白で区切られた単語はスペース、タイトルと本文は改行で区切るため、
+    区切りをまたいだ部分一致は発生しない。
+
+    :param title: 記事のタイトル
+    :type title: str
+    :param body: 記事の本文
+    :type body: str
+    :return: 正規化済みテキスト
+    :rtype: str
+    """
+    return "\n".join(
+        " ".join(WORD_RUN.findall(normalize_text(value or "")))
+        for value in (title, body)
+    )
+
+
+def document_frequencies(text: str) -> Tuple[Dict[str, int], int]:
+    """正規化済みテキストに含まれる文字bigram・文字unigramの出現回数を数える
+
+    タイトルの出現回数は ``TITLE_WEIGHT`` 倍に数える。
+
+    :param text: document_textで作成した正規化済みテキスト
+    :type text: str
+    :return: トークンごとの出現回数と、BM25で使用する文書長（bigram数）
+    :rtype: Tuple[Dict[str, int], int]
+    """
+    frequencies: Counter = Counter()
+    length = 0
+    title, _, body = text.partition("\n")
+    for weight, segment in ((TITLE_WEIGHT, title), (1, body)):
+        for run in segment.split():
+            counts = Counter(run)
+            bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+            counts.update(bigrams)
+            for token, count in counts.items():
+                frequencies[token] += count * weight
+            length += max(len(bigrams), 1) * weight
+    return dict(frequencies), length
+
+
+def needs_verification(runs: List[str]) -> bool:
+    """ポスティングリストの積集合だけでは一致を確定できない検索語を含むかどうかを返す
+
+    1〜2文字の検索語はunigram・bigramの有無で一致が決まるため、確定は不要。
+    """
+    return any(len(run) > 2 for run in runs)
+
+
+def run_tokens(run: str) -> List[str]:
+    """検索語1単語の照合に必要なトークンを返す（1文字の場合はunigram）"""
+    if len(run) == 1:
+        return [run]
+    return sorted({run[i:i + 2] for i in range(len(run) - 1)})
+
+
+def intersect_postings(left: array, right: array) -> array:
+    """昇順のポスティングリスト同士の積集合をソート済みマージで求める
+
+    :param left: 昇順の行IDの配列
+    :type left: array
+    :param right: 昇順の行IDの配列
+    :type right: array
+    :return: 両方に含まれる行IDの配列（昇順）
+    :rtype: array
+    """
+    result = array("I")
+    i, j = 0, 0
+    len_left, len_right = len(left), len(right)
+    while i < len_left and j < len_right:
+        a, b = left[i], right[j]
+        if a == b:
+            result.append(a)
+            i += 1
+            j += 1
+        elif a < b:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+class ArticleIndex:
+    """記事の転置インデックス
+
+    ``search`` は一致した記事の行IDを記事ID降順または関連度順で返し、
+    記事の取得は呼び出し元で行う。保持するのはポスティングリスト・出現回数・
+    文書長・記事IDのみで、記事のテキストは保持しない。
+    """
+
+    def __init__(self) -> None:
+        self.engine: Optional[Engine] = None
+        self._lock = threading.RLock()
+        self._postings: Dict[str, array] = {}
+        # ポスティングリストと同じ並びで保持するトークンの出現回数
+        self._frequencies: Dict[str, array] = {}
+        self._article_ids: Dict[int, int] = {}
+        # 行IDを添字とする文書長（BM25の正規化に使用する）
+        self._lengths = np.zeros(0, dtype=np.float64)
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._article_ids)
+
+    def is_enabled_for(self, bind: object) -> bool:
+        """指定したエンジンのインデックスを保持しているかどうかを返す"""
+        return self.engine is not None and bind is self.engine
+
+    def build(self, engine: Engine, batch_size: int = 1000) -> int:
+        """記事テーブルからインデックスを作成する
+
+        :param engine: SQLAlchemyのエンジン
+        :type engine: Engine
+        :param batch_size: 1回に読み込む記事数
+        :type batch_size: int
+        :return: 索引した記事数
+        :rtype: int
+        """
+        with self._lock:
+            self.clear()
+            last_id = 0
+            with engine.connect() as connection:
+                while True:
+                    rows = connection.execute(
+                        select(Article.id, Article.article_id, Article.title, Article.body)
+                        .where(Article.id > last_id)
+                        .order_by(Article.id)
+                        .limit(batch_size)
+                    ).all()
+                    if not rows:
+                        break
+                    last_id = rows[-1][0]
+                    for row_id, article_id, title, body in rows:
+                        self.add(row_id, article_id, title, body)
+            self.engine = engine
+            return len(self._article_ids)
+
+    def clear(self) -> None:
+        """インデックスを空にする"""
+        with self._lock:
+            self.engine = None
+            self._postings.clear()
+            self._frequencies.clear()
+            self._article_ids.clear()
+            self._lengths = np.zeros(0, dtype=np.float64)
+            self._total_length = 0
+
+    def add(
+        self,
+        row_id: int,
+        article_id: int,
+        title: str,
+        body: str,
+        previous: Optional[Tuple[str, str]] = None
+        ) -> None:
+        """記事をインデックスに追加する（既に存在する場合は置き換える）
+
+        :param row_id: 記事の行ID（articles.id）
+        :type row_id: int
+        :param article_id: 記事ID
+        :type article_id: int
+        :param title: 記事のタイトル
+        :type title: str
+        :param body: 記事の本文
+        :type body: str
+        :param previous: 索引済みのタイトルと本文（置き換え時に古いトークンの削除に使用する）
+        :type previous: Optional[Tuple[str, str]]
+        """
+        with self._lock:
+            if row_id in self._article_ids:
+                self.remove(row_id, previous)
+            frequencies, length = document_frequencies(document_text(title, body))
+            self._article_ids[row_id] = article_id
+            if row_id >= len(self._lengths):
+                grown = np.zeros(max(row_id + 1, len(self._lengths) * 2), dtype=np.float64)
+                grown[:len(self._lengths)] = self._lengths
+                self._lengths = grown
+            self._lengths[row_id] = length
+            self._total_length += length
+            for token, frequency in frequencies.items():
+                frequency = min(frequency, _MAX_FREQUENCY)
+                postings = self._postings.get(token)
+                if postings is None:
+                    self._postings[token] = array("I", [row_id])
+                    self._frequencies[token] = array("H", [frequency])
+                elif postings[-1] < row_id:
+                    # 通常は行IDの昇順に追加されるため末尾に追加するだけで済む
+                    postings.append(row_id)
+                    self._frequencies[token].append(frequency)
+                else:
+                    position = bisect_left(postings, row_id)
+                    if position < len(postings) and postings[position] == row_id:
+                        self._frequencies[token][position] = frequency
+                    else:
+                        postings.insert(position, row_id)
+                        self._frequencies[token].insert(position, frequency)
+
+    def remove(self, row_id: int, previous: Optional[Tuple[str, str]] = None) -> None:
+        """記事をインデックスから削除する
+
+        テキストを保持しないため、索引済みのタイトルと本文が分からない場合は
+        全てのポスティングリストから行IDを探して削除する。
+
+        :param row_id: 記事の行ID（articles.id）
+        :type row_id: int
+        :param previous: 索引済みのタイトルと本文
+        :type previous: Optional[Tuple[str, str]]
+        """
+        with self._lock:
+            if self._article_ids.pop(row_id, None) is None:
+                return
+            self._total_length -= int(self._lengths[row_id])
+            self._lengths[row_id] = 0
+            tokens: Iterable[str] = list(self._postings) if previous is None \
+                else document_frequencies(document_text(*previous))[0]
+            for token in tokens:
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                position = bisect_left(postings, row_id)
+                if position < len(postings) and postings[position] == row_id:
+                    del postings[position]
+                    del self._frequencies[token][position]
+                if not postings:
+                    del self._postings[token]
+                    del self._frequencies[token]
+
+    def candidates(self, runs: List[str]) -> array:
+        """全ての検索語のトークンを含む行IDをポスティングリストの積集合で求める"""
+        tokens = {token for run in runs for token in run_tokens(run)}
+        lists = []
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                return array("I")
+            lists.append(postings)
+        # 短いリストから順に積集合を取り、中間結果を小さく保つ
+        lists.sort(key=len)
+        result = lists[0]
+        for postings in lists[1:]:
+            if not result:
+                break
+            result = intersect_postings(result, postings)
+        return array("I", result)
+
+    def bm25_scores(self, row_ids: array, runs: List[str]) -> np.ndarray:
+        """候補の記事のBM25スコアをまとめて計算する
+
+        トークンごとにポスティングリストから候補の位置を二分探索で求め、
+        出現回数と文書長から全候補のスコアをベクトル演算で計算する。
+
+        :param row_ids: 全ての検索語のトークンを含む行IDの配列（昇順）
+        :type row_ids: array
+        :param runs: 正規化済みの検索語のリスト
+        :type runs: List[str]
+        :return: row_idsと同じ並びのスコア
+        :rtype: np.ndarray
+        """
+        candidates = np.frombuffer(row_ids, dtype=np.uint32)
+        scores = np.zeros(len(candidates), dtype=np.float64)
+        documents = len(self._article_ids)
+        if not documents or not len(candidates):
+            return scores
+        average_length = self._total_length / documents
+        norms = BM25_K1 * (
+            1 - BM25_B + BM25_B * self._lengths[candidates] / average_length
+        )
+        for token in {token for run in runs for token in run_tokens(run)}:
+            if token not in self._postings:
+                continue
+            postings = np.frombuffer(self._postings[token], dtype=np.uint32)
+            frequencies = np.frombuffer(self._frequencies[token], dtype=np.uint16)
+            # 確定処理の間に削除された記事は出現回数0として扱う
+            positions = np.minimum(np.searchsorted(postings, candidates), len(postings) - 1)
+            tf = np.where(
+                postings[positions] == candidates, frequencies[positions], 0
+            ).astype(np.float64)
+            df = len(postings)
+            idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+            scores += idf * tf * (BM25_K1 + 1) / (tf + norms)
+        return scores
+
+    def search(
+        self,
+        runs: List[str],
+        cursor_id: Optional[int] = None,
+        ranked: bool = False,
+        verify: Optional[Verifier] = None
+        ) -> List[int]:
+        """検索語を全て含む記事の行IDを返す
+
+        3文字以上の検索語を含む場合、bigramが離れた位置にある記事も候補に含まれるため、
+        ``verify`` で検索語を実際に含む記事に絞り込む（省略時は候補をそのまま返す）。
+        ``verify`` はロックを保持せずに呼び出す。
+
+        :param runs: 正規化済みの検索語（記号・空白を含まない単語）のリスト
+        :type runs: List[str]
+        :param cursor_id: カーソルが指す記事ID（この記事より古い記事のみ返す）
+        :type cursor_id: Optional[int]
+        :param ranked: Trueの場合はBM25スコアの降順、Falseの場合は記事ID降順で返す
+        :type ranked: bool
+        :param verify: 候補の行IDのうち、検索語を実際に含むものを返す関数
+        :type verify: Optional[Verifier]
+        :return: 一致した記事の行IDのリスト
+        :rtype: List[int]
+        """
+        if not runs:
+            return []
+        with self._lock:
+            candidates = [
+                row_id for row_id in self.candidates(runs)
+                if cursor_id is None or self._article_ids[row_id] < cursor_id
+            ]
+        if verify is not None and candidates and needs_verification(runs):
+            verified = verify(candidates)
+            candidates = [row_id for row_id in candidates if row_id in verified]
+        with self._lock:
+            # 確定処理の間に削除された記事を除外する
+            matched = array("I", (
+                row_id for row_id in candidates if row_id in self._article_ids
+            ))
+            if not ranked:
+                return sorted(matched, key=self._article_ids.__getitem__, reverse=True)
+            scores = self.bm25_scores(matched, runs)
+            article_ids = np.fromiter(
+                (self._article_ids[row_id] for row_id in matched),
+                dtype=np.int64, count=len(matched)
+            )
+        # スコアの降順、同点の場合は記事ID降順
+        order = np.lexsort((-article_ids, -scores))
+        row_ids: List[int] = np.frombuffer(matched, dtype=np.uint32)[order].tolist()
+        return row_ids
+
+    def memory_usage(self) -> Dict[str, float]:
+        """インデックスのおおよそのメモリ使用量を返す
+
+        :return: 記事数、トークン数、合計バイト数、1記事あたりのバイト数
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            size = sys.getsizeof(self._postings) + sys.getsizeof(self._frequencies) \
+                + sys.getsizeof(self._article_ids) + self._lengths.nbytes
+            for token, postings in self._postings.items():
+                size += sys.getsizeof(token) + sys.getsizeof(postings) \
+                    + sys.getsizeof(self._frequencies[token])
+            documents = len(self._article_ids)
+            return {
+                "documents": documents,
+                "tokens": len(self._postings),
+                "bytes": size,
+                "bytes_per_document": size / documents if documents else 0.0,
+            }
+
+
+# アプリケーション全体で共有するインデックス
+article_index = ArticleIndex()
+
+
+def record_change(session: Session, change: Tuple) -> None:
+    """未コミットの変更をセッションに記録する（コミット時にインデックスへ反映する）
+
+    マッパーイベントが発生しない一括INSERTなどでは、呼び出し元でこの関数を使用する。
+
+    :param session: 変更を行ったセッション
+    :type session: Session
+    :param change: ("add", 行ID, 記事ID, タイトル, 本文[, 索引済みのタイトルと本文])
+        または ("remove", 行ID[, 索引済みのタイトルと本文])
+    :type change: Tuple
+    """
+    if not article_index.is_enabled_for(session.get_bind()):
+        return
+    session.info.setdefault(_PENDING_KEY, []).append(change)
+
+
+def _record(target: Article, change: Tuple) -> None:
+    """マッパーイベントで記事の変更を記録する"""
+    session = object_session(target)
+    if session is not None:
+        record_change(session, change)
+
+
+@event.listens_for(Article, "after_insert")
+def _record_inserted_article(
+    mapper: Mapper[Article], connection: Connection, target: Article
+    ) -> None:
+    _record(target, ("add", target.id, target.article_id, target.title, target.body))
+
+
+def _previous_text(target: Article) -> Optional[Tuple[str, str]]:
+    """フラッシュ前のタイトルと本文を返す（読み込まれていない場合はNone）"""
+    state = inspect(target)
+    values = []
+    for history in (state.attrs.title.history, state.attrs.body.history):
+        previous = history.deleted or history.unchanged
+        if not previous:
+            return None
+        values.append(previous[0])
+    return values[0], values[1]
+
+
+@event.listens_for(Article, "after_update")
+def _record_updated_article(
+    mapper: Mapper[Article], connection: Connection, target: Article
+    ) -> None:
+    _record(target, (
+        "add", target.id, target.article_id, target.title, target.body,
+        _previous_text(target)
+    ))
+
+
+@event.listens_for(Article, "after_delete")
+def _record_deleted_article(
+    mapper: Mapper[Article], connection: Connection, target: Article
+    ) -> None:
+    _record(target, ("remove", target.id, _previous_text(target)))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session: Session) -> None:
+    """コミットされた変更をインデックスに反映する"""
+    changes: Iterable[Tuple] = session.info.pop(_PENDING_KEY, [])
+    for change in changes:
+        if change[0] == "add":
+            article_index.add(*change[1:])
+        else:
+            article_index.remove(*change[1:])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session: Session) -> None:
+    """ロールバックされた変更を破棄する"""
+    session.info.pop(_PENDING_KEY, None)
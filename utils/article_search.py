@@ -0,0 +1,540 @@
+"""記事の全文検索を行うモジュール
+
+日本語の検索語でもインデックスを使用できるよう、タイトルと本文をNFKC正規化・
+カタカナのひらがな化を行った上で文字bigramに分割し、検索用テーブルに保存する。
+
+・SQLite: FTS5仮想テーブル（unicode61トークナイザでbigramをそのまま索引する）
+
+・PostgreSQL: tsvectorカラムとGINインデックス
+
+検索語も同じ方法でbigramに分割し、連続するbigramをフレーズとして検索するため、
+従来のILIKE検索と同じ部分一致の結果をインデックス経由で取得できる。
+検索用テーブルが利用できない場合は従来のILIKE検索にフォールバックする。
+SEARCH_BACKEND=memory の場合はプロセス内の転置インデックス（utils/article_index.py）を使用する。
+"""
+import os
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import (
+    Column, Engine, Integer, MetaData, String, Table, event, func, inspect,
+    literal_column, or_, select, text,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Mapper, Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from exceptions import SearchSortUnavailableError
+from models import Article
+from utils.article_index import Verifier, article_index, document_text, record_change
+from utils.text_tokens import WORD_RUN, normalize_text
+from logger.structured_logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# 検索バックエンド
+# auto: 検索用テーブルが利用できる場合は全文検索、それ以外はILIKE検索（デフォルト）
+# fts: 全文検索を使用する（利用できない場合はILIKE検索）
+# like: 従来のILIKE検索のみを使用する
+# memory: プロセス内の転置インデックスを使用する（SQLiteのみ。それ以外はautoと同じ）
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto").lower()
+
+# 検索結果の並び順
+SORT_NEWEST = "new"
+SORT_RELEVANCE = "relevance"
+
+SEARCH_TABLE = "article_search"
+
+# プロセス内インデックスの候補を確定する際、1回のクエリで読み込む記事数
+VERIFY_BATCH_SIZE = int(os.getenv("SEARCH_VERIFY_BATCH_SIZE", "500"))
+
+# 検索用テーブルの定義（create_allの対象外にするため別のMetaDataを使用する）
+_sqlite_metadata = MetaData()
+sqlite_search_table = Table(
+    SEARCH_TABLE, _sqlite_metadata,
+    Column("rowid", Integer, primary_key=True),
+    Column("title", String),
+    Column("body", String),
+)
+_postgres_metadata = MetaData()
+postgres_search_table = Table(
+    SEARCH_TABLE, _postgres_metadata,
+    Column("article_row_id", Integer, primary_key=True),
+    Column("document", String),
+)
+
+# 検索用テーブルを準備済みのエンジン
+_indexed_engines: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+
+def _run_tokens(run: str) -> List[str]:
+    """連続する文字列をbigramに分割する（末尾の1文字も単独のトークンにする）"""
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)] + [run[-1]]
+
+
+def ngram_tokens(value: str) -> List[str]:
+    """テキストを正規化してbigramトークンの列に分割する
+
+    :param value: 分割するテキスト
+    :type value: str
+    :return: bigramトークンのリスト
+    :rtype: List[str]
+    """
+    return [
+        token
+        for run in WORD_RUN.findall(normalize_text(value))
+        for token in _run_tokens(run)
+    ]
+
+
+def query_runs(keywords: Iterable[str]) -> List[List[str]]:
+    """検索キーワードをフレーズ単位のbigramトークンに分割する
+
+    各要素は1つのフレーズを表し、1文字のフレーズは前方一致で検索する。
+
+    :param keywords: 検索キーワードのリスト
+    :type keywords: Iterable[str]
+    :return: フレーズごとのトークンのリスト
+    :rtype: List[List[str]]
+    """
+    runs = []
+    for keyword in keywords:
+        for run in WORD_RUN.findall(normalize_text(keyword)):
+            if len(run) == 1:
+                runs.append([run])
+            else:
+                runs.append([run[i:i + 2] for i in range(len(run) - 1)])
+    return runs
+
+
+def _fts5_query(runs: List[List[str]]) -> str:
+    """FTS5のMATCH構文を作成する"""
+    phrases = []
+    for tokens in runs:
+        phrase = '"' + " ".join(tokens) + '"'
+        phrases.append(phrase + "*" if len(tokens[0]) == 1 else phrase)
+    return " AND ".join(phrases)
+
+
+def _tsquery(runs: List[List[str]]) -> str:
+    """PostgreSQLのto_tsquery構文を作成する"""
+    phrases = []
+    for tokens in runs:
+        if len(tokens[0]) == 1:
+            phrases.append(f"'{tokens[0]}':*")
+        else:
+            phrases.append(" <-> ".join(f"'{token}'" for token in tokens))
+    return " & ".join(f"({phrase})" for phrase in phrases)
+
+
+def _tsvector_literal(title: str, body: str) -> str:
+    """タイトル（重みA）と本文からtsvectorのリテラルを作成する"""
+    title_tokens = ngram_tokens(title)
+    entries = [f"'{token}':{i + 1}A" for i, token in enumerate(title_tokens)]
+    # タイトルと本文をまたいだフレーズが一致しないよう位置を空ける
+    offset = len(title_tokens) + 2
+    entries.extend(
+        f"'{token}':{min(offset + i, 16383)}"
+        for i, token in enumerate(ngram_tokens(body))
+    )
+    return " ".join(entries)
+
+
+def _index_row(dialect: str, row_id: int, title: str, body: str) -> Dict[str, Any]:
+    """検索用テーブルに保存する値を作成する"""
+    if dialect == "postgresql":
+        return {"id": row_id, "document": _tsvector_literal(title, body)}
+    return {
+        "id": row_id,
+        "title": " ".join(ngram_tokens(title)),
+        "body": " ".join(ngram_tokens(body)),
+    }
+
+
+def _insert_rows(connection: Connection, rows: List[Dict[str, Any]]) -> None:
+    """検索用テーブルに行を追加する"""
+    if not rows:
+        return
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (article_row_id, document) "
+            "VALUES (:id, CAST(:document AS tsvector)) "
+            "ON CONFLICT (article_row_id) DO UPDATE SET document = EXCLUDED.document"
+        ), rows)
+    else:
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, body) "
+            "VALUES (:id, :title, :body)"
+        ), rows)
+
+
+def _delete_row(connection: Connection, row_id: int) -> None:
+    """検索用テーブルから行を削除する"""
+    key = "article_row_id" if connection.dialect.name == "postgresql" else "rowid"
+    connection.execute(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} = :id"), {"id": row_id}
+    )
+
+
+def rebuild_search_index(connection: Connection, batch_size: int = 500) -> int:
+    """記事テーブルから検索用テーブルを作り直す
+
+    :param connection: データベース接続
+    :type connection: Connection
+    :param batch_size: 1回に追加する記事数
+    :type batch_size: int
+    :return: 索引した記事数
+    :rtype: int
+    """
+    dialect = connection.dialect.name
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    total = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(Article.id, Article.title, Article.body)
+            .where(Article.id > last_id)
+            .order_by(Article.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        _insert_rows(connection, [
+            _index_row(dialect, row_id, title, body)
+            for row_id, title, body in rows
+        ])
+        total += len(rows)
+    return total
+
+
+def ensure_search_index(engine: Engine) -> bool:
+    """検索用テーブルを作成し、記事の書き込みに合わせて更新されるようにする
+
+    テーブルを新しく作成した場合は既存の記事を索引する。
+    作成に失敗した場合（FTS5が無効なSQLiteなど）はILIKE検索を使用する。
+
+    :param engine: SQLAlchemyのエンジン
+    :type engine: Engine
+    :return: 全文検索が利用可能な場合はTrue
+    :rtype: bool
+    """
+    if SEARCH_BACKEND == "like":
+        return False
+    dialect = engine.dialect.name
+    if SEARCH_BACKEND == "memory":
+        if dialect == "sqlite":
+            count = article_index.build(engine)
+            usage = article_index.memory_usage()
+            logger.info(
+                "記事の転置インデックスを作成しました: %s件 (約%.1fKiB, 1記事あたり約%.0fバイト)",
+                count,
+                usage['bytes'] / 1024,
+                usage['bytes_per_document']
+            )
+            return True
+        logger.info("転置インデックスはSQLiteでのみ使用できます: %s", dialect)
+    try:
+        created = not inspect(engine).has_table(SEARCH_TABLE)
+        with engine.begin() as connection:
+            if dialect == "postgresql":
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                    "article_row_id INTEGER PRIMARY KEY "
+                    "REFERENCES articles (id) ON DELETE CASCADE, "
+                    "document TSVECTOR NOT NULL)"
+                ))
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document "
+                    f"ON {SEARCH_TABLE} USING GIN (document)"
+                ))
+            elif dialect == "sqlite":
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                    "USING fts5(title, body, tokenize='unicode61 remove_diacritics 0')"
+                ))
+            else:
+                logger.info("全文検索に対応していないデータベースです: %s", dialect)
+                return False
+            if created:
+                count = rebuild_search_index(connection)
+                logger.info("検索用インデックスを作成しました: %s件", count)
+    except Exception as e:
+        logger.warning("検索用インデックスの作成に失敗しました。ILIKE検索を使用します: %s", e)
+        return False
+    _indexed_engines.add(engine)
+    return True
+
+
+def is_search_index_enabled(engine: Any) -> bool:
+    """エンジンで全文検索が利用可能かどうかを返す"""
+    if SEARCH_BACKEND == "like":
+        return False
+    try:
+        return engine in _indexed_engines
+    except TypeError:
+        return False
+
+
+def index_inserted_rows(db: Session, rows: Iterable[Any]) -> None:
+    """一括INSERTで追加した記事を検索用インデックスに反映する
+
+    一括INSERTではマッパーイベントが発生しないため、呼び出し元で同じトランザクション内で呼び出す。
+
+    :param db: データベースセッション
+    :type db: Session
+    :param rows: 追加した記事の行（id, article_id, title, bodyを持つ）
+    :type rows: Iterable[Any]
+    """
+    rows = list(rows)
+    bind = db.get_bind()
+    if is_search_index_enabled(bind):
+        connection = db.connection()
+        _insert_rows(connection, [
+            _index_row(connection.dialect.name, row.id, row.title, row.body)
+            for row in rows
+        ])
+    for row in rows:
+        record_change(db, ("add", row.id, row.article_id, row.title, row.body))
+
+
+def uses_normalized_search(bind: Any) -> bool:
+    """キーワードを正規化して検索する方式（全文検索・転置インデックス）かどうかを返す
+
+    :param bind: セッションのエンジン
+    :type bind: Any
+    :return: ILIKE検索以外の方式を使用する場合はTrue
+    :rtype: bool
+    """
+    return article_index.is_enabled_for(bind) or is_search_index_enabled(bind)
+
+
+# 記事の書き込みに合わせて検索用テーブルを同じトランザクションで更新する
+@event.listens_for(Article, "after_insert")
+def _index_inserted_article(
+    mapper: Mapper[Article], connection: Connection, target: Article
+    ) -> None:
+    if not is_search_index_enabled(connection.engine):
+        return
+    _insert_rows(connection, [_index_row(
+        connection.dialect.name, target.id, target.title, target.body
+    )])
+
+
+@event.listens_for(Article, "after_update")
+def _index_updated_article(
+    mapper: Mapper[Article], connection: Connection, target: Article
+    ) -> None:
+    if not is_search_index_enabled(connection.engine):
+        return
+    state = inspect(target)
+    if not (
+        state.attrs.title.history.has_changes()
+        or state.attrs.body.history.has_changes()
+    ):
+        return
+    _delete_row(connection, target.id)
+    _insert_rows(connection, [_index_row(
+        connection.dialect.name, target.id, target.title, target.body
+    )])
+
+
+@event.listens_for(Article, "after_delete")
+def _unindex_deleted_article(
+    mapper: Mapper[Article], connection: Connection, target: Article
+    ) -> None:
+    if not is_search_index_enabled(connection.engine):
+        return
+    _delete_row(connection, target.id)
+
+
+def _paginate(
+    db: Session,
+    stmt: Any,
+    order_by: List[Any],
+    limit: Optional[int],
+    skip: int,
+    cursor_id: Optional[int]
+    ) -> Tuple[List[Article], int]:
+    """検索結果を1回のクエリで取得し、ウィンドウ関数で総数も同時に取得する
+
+    カーソル指定時の総数は、カーソル以降に一致する記事数になる。
+    """
+    if cursor_id is not None:
+        stmt = stmt.where(Article.article_id < cursor_id)
+    stmt = stmt.add_columns(func.count().over().label("total_count"))
+    stmt = stmt.order_by(*order_by)
+    if cursor_id is None and skip:
+        stmt = stmt.offset(skip)
+    if limit:
+        stmt = stmt.limit(limit)
+    rows = db.execute(stmt).all()
+    if rows:
+        return [row[0] for row in rows], int(rows[0].total_count)
+    if cursor_id is None and skip:
+        # 範囲外のページでは総数を取得できないため、件数のみ別途取得する
+        count_stmt = stmt.limit(None).offset(None).order_by(None)
+        total = db.execute(
+            select(func.count()).select_from(count_stmt.subquery())
+        ).scalar()
+        return [], int(total or 0)
+    return [], 0
+
+
+def _like_filter(keywords: List[str]) -> List[ColumnElement[bool]]:
+    """従来のILIKE検索の条件を作成する"""
+    conditions = []
+    for keyword in keywords:
+        search_filter = f"%{keyword}%"
+        conditions.append(or_(
+            Article.title.ilike(search_filter),
+            Article.body.ilike(search_filter)
+        ))
+    return conditions
+
+
+def _search_like(
+    db: Session,
+    keywords: List[str],
+    limit: Optional[int],
+    skip: int,
+    cursor_id: Optional[int],
+    sort: str
+    ) -> Tuple[List[Article], int, str]:
+    """従来のILIKE検索で記事ID降順に検索する
+
+    :raises SearchSortUnavailableError: 関連度順が指定された場合（400）
+    """
+    if sort == SORT_RELEVANCE:
+        logger.warning("全文検索インデックスを使用できないため、関連度順の検索を拒否しました")
+        raise SearchSortUnavailableError()
+    stmt = select(Article).where(*_like_filter(keywords))
+    articles, total = _paginate(
+        db, stmt, [Article.article_id.desc()], limit, skip, cursor_id
+    )
+    return articles, total, "like"
+
+
+def _phrase_verifier(db: Session, runs: List[str]) -> Verifier:
+    """候補の記事をデータベースから読み込み、検索語を全て含むものに絞り込む関数を返す"""
+    def verify(row_ids: List[int]) -> Set[int]:
+        matched: Set[int] = set()
+        for start in range(0, len(row_ids), VERIFY_BATCH_SIZE):
+            rows = db.execute(
+                select(Article.id, Article.title, Article.body)
+                .where(Article.id.in_(row_ids[start:start + VERIFY_BATCH_SIZE]))
+            )
+            for row_id, title, body in rows:
+                document = document_text(title, body)
+                if all(run in document for run in runs):
+                    matched.add(row_id)
+        return matched
+    return verify
+
+
+def _search_in_memory(
+    db: Session,
+    keywords: List[str],
+    limit: Optional[int],
+    skip: int,
+    cursor_id: Optional[int],
+    sort: str
+    ) -> Tuple[List[Article], int, str]:
+    """プロセス内の転置インデックスで検索し、該当ページの記事のみを主キーで取得する"""
+    runs = [
+        run for keyword in keywords
+        for run in WORD_RUN.findall(normalize_text(keyword))
+    ]
+    if not runs:
+        # 記号のみのキーワードはインデックスで扱えないため従来のILIKE検索を使う
+        return _search_like(db, keywords, limit, skip, cursor_id, sort)
+    row_ids = article_index.search(
+        runs, cursor_id, ranked=sort == SORT_RELEVANCE,
+        verify=_phrase_verifier(db, runs)
+    )
+    start = 0 if cursor_id is not None else skip
+    page_ids = row_ids[start:start + limit] if limit else row_ids[start:]
+    if not page_ids:
+        return [], len(row_ids), "memory"
+    loaded = {
+        article.id: article
+        for article in db.execute(
+            select(Article).where(Article.id.in_(page_ids))
+        ).scalars()
+    }
+    articles = [loaded[row_id] for row_id in page_ids if row_id in loaded]
+    return articles, len(row_ids), "memory"
+
+
+def search_articles(
+    db: Session,
+    keywords: List[str],
+    limit: Optional[int],
+    skip: int = 0,
+    cursor_id: Optional[int] = None,
+    sort: str = SORT_NEWEST
+    ) -> Tuple[List[Article], int, str]:
+    """キーワードに一致する記事を検索する
+
+    全てのキーワードを含む記事（AND検索）をタイトル・本文から検索する。
+
+    :param db: データベースセッション
+    :type db: Session
+    :param keywords: 検索キーワードのリスト
+    :type keywords: List[str]
+    :param limit: 取得する最大記事数
+    :type limit: Optional[int]
+    :param skip: スキップする記事数
+    :type skip: int
+    :param cursor_id: カーソルが指す記事ID（この記事より古い記事を返す）
+    :type cursor_id: Optional[int]
+    :param sort: 並び順（new: 新しい順、relevance: 関連度順）
+    :type sort: str
+    :return: 記事のリスト、一致した総数、使用したバックエンド名
+    :rtype: Tuple[List[Article], int, str]
+    :raises SearchSortUnavailableError: ILIKE検索にフォールバックする際に関連度順が指定された場合
+    """
+    newest_first = [Article.article_id.desc()]
+    bind = db.get_bind()
+    if article_index.is_enabled_for(bind):
+        return _search_in_memory(db, keywords, limit, skip, cursor_id, sort)
+    runs = query_runs(keywords)
+    if runs and is_search_index_enabled(bind):
+        if bind.dialect.name == "postgresql":
+            tsquery = func.to_tsquery("simple", _tsquery(runs))
+            rank = func.ts_rank(postgres_search_table.c.document, tsquery)
+            stmt = (
+                select(Article)
+                .join(
+                    postgres_search_table,
+                    postgres_search_table.c.article_row_id == Article.id
+                )
+                .where(postgres_search_table.c.document.op("@@")(tsquery))
+            )
+            order_by = [rank.desc(), *newest_first] \
+                if sort == SORT_RELEVANCE else newest_first
+            articles, total = _paginate(db, stmt, order_by, limit, skip, cursor_id)
+            return articles, total, "postgresql"
+        # bm25は値が小さいほど関連度が高い（タイトルの一致を2倍に重み付けする）
+        # bm25はウィンドウ関数と同じクエリでは使用できないため、副問い合わせで計算する
+        matches = (
+            select(
+                sqlite_search_table.c.rowid,
+                literal_column(f"bm25({SEARCH_TABLE}, 2.0, 1.0)").label("rank"),
+            )
+            .where(text(f"{SEARCH_TABLE} MATCH :match").bindparams(
+                match=_fts5_query(runs)
+            ))
+            .subquery()
+        )
+        stmt = select(Article).join(matches, matches.c.rowid == Article.id)
+        order_by = [matches.c.rank.asc(), *newest_first] \
+            if sort == SORT_RELEVANCE else newest_first
+        articles, total = _paginate(db, stmt, order_by, limit, skip, cursor_id)
+        return articles, total, "fts5"
+    # 全文検索が利用できない場合は従来のILIKE検索
+    return _search_like(db, keywords, limit, skip, cursor_id, sort)
@@ -0,0 +1,197 @@
+"""記事数の集計値を管理するモジュール"""
+import os
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Engine, func, select, text, update
+from sqlalchemy.orm import Session
+
+from models import Article, ArticleStats, User
+from logger.structured_logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# 記事数の取得モード
+# exact: 集計テーブルの値を返す（デフォルト）
+# approximate: PostgreSQLの統計情報（pg_class.reltuples）から概算値を返す。
+#   全体の集計行を更新しないため、記事作成が集中しても行ロックの競合が起きない。
+#   exactに戻す場合はscripts/rebuild_article_counts.pyで集計値を再計算すること。
+ARTICLE_COUNT_MODE = os.getenv("ARTICLE_COUNT_MODE", "exact").lower()
+
+# 記事の総数を返すレスポンスヘッダー
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# 全体の集計行のID
+GLOBAL_STATS_ID = 1
+
+
+def use_approximate_count(db: Session) -> bool:
+    """概算モードが有効かどうかを返す
+
+    概算モードはPostgreSQLでのみ有効で、それ以外のDBでは常に集計テーブルを使用する。
+
+    :param db: データベースセッション
+    :type db: Session
+    :return: 概算モードが有効な場合はTrue
+    :rtype: bool
+    """
+    if ARTICLE_COUNT_MODE != "approximate":
+        return False
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _ensure_stats_row(db: Session) -> ArticleStats:
+    """全体の集計行を取得し、存在しない場合は現在の記事数で作成する"""
+    # 未フラッシュの記事の追加・削除を含めずに数える（増減分は呼び出し元で加算する）
+    no_autoflush = {"autoflush": False}
+    stats = db.get(
+        ArticleStats, GLOBAL_STATS_ID, execution_options=no_autoflush
+        )
+    if stats is None:
+        total = db.execute(
+            select(func.count(Article.id)), execution_options=no_autoflush
+        ).scalar() or 0
+        stats = ArticleStats(id=GLOBAL_STATS_ID, total_articles=total)
+        db.add(stats)
+        db.flush()
+        logger.info("記事数の集計行を作成しました: %s件", total)
+    return stats
+
+
+def ensure_article_stats(engine: Engine) -> None:
+    """全体の集計行が無ければ現在の記事数で作成する（起動時に呼び出す）
+
+    :param engine: SQLAlchemyのエンジン
+    :type engine: Engine
+    """
+    with Session(engine) as db:
+        if db.get(ArticleStats, GLOBAL_STATS_ID) is None:
+            _ensure_stats_row(db)
+            db.commit()
+
+
+def adjust_article_count(
+    db: Session,
+    user_id: Optional[int],
+    delta: int
+    ) -> None:
+    """記事の作成・削除に合わせて記事数を更新する
+
+    呼び出し元のトランザクション内で更新するため、コミットは呼び出し元で行う。
+    記事の追加・削除をフラッシュする前に呼び出すこと。
+
+    :param db: データベースセッション
+    :type db: Session
+    :param user_id: 記事を作成したユーザーのID（ユーザー削除時はNone）
+    :type user_id: Optional[int]
+    :param delta: 記事数の増減
+    :type delta: int
+    """
+    if delta == 0:
+        return
+    if not use_approximate_count(db):
+        # 集計行の作成は、他の更新でフラッシュが発生する前に行う
+        _ensure_stats_row(db)
+        db.execute(
+            update(ArticleStats)
+            .where(ArticleStats.id == GLOBAL_STATS_ID)
+            .values(
+                total_articles=ArticleStats.total_articles + delta,
+                updated_at=datetime.utcnow()
+            )
+        )
+    if user_id is not None:
+        db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(article_count=User.article_count + delta)
+        )
+
+
+def get_total_article_count(db: Session) -> int:
+    """全記事数を取得する
+
+    :param db: データベースセッション
+    :type db: Session
+    :return: 全記事数（概算モードでは概算値）
+    :rtype: int
+    """
+    if use_approximate_count(db):
+        estimate = db.execute(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE relname = 'articles'"
+        )).scalar()
+        # ANALYZE前は-1が返るため、その場合は集計テーブルの値を使う
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    stats = db.get(ArticleStats, GLOBAL_STATS_ID)
+    if stats is None:
+        # 集計行は起動時（ensure_article_stats）に作成する。読み取りでは書き込まずに数える
+        return int(db.execute(select(func.count(Article.id))).scalar() or 0)
+    return int(stats.total_articles)
+
+
+def get_articles_last_modified(db: Session) -> Optional[datetime]:
+    """記事一覧の最終更新日時を取得する
+
+    記事の更新日時の最大値と、記事の作成・削除で更新される集計行の日時のうち
+    新しい方を返す（削除は記事の更新日時に現れないため）。
+    概算モードでは集計行を更新しないため、削除を検知できずNoneを返す。
+
+    :param db: データベースセッション
+    :type db: Session
+    :return: 最終更新日時（判定できない場合はNone）
+    :rtype: Optional[datetime]
+    """
+    if use_approximate_count(db):
+        return None
+    stats = db.get(ArticleStats, GLOBAL_STATS_ID)
+    latest = db.execute(select(func.max(Article.updated_at))).scalar()
+    candidates = [
+        value for value in (latest, getattr(stats, "updated_at", None))
+        if isinstance(value, datetime)
+    ]
+    return max(candidates) if candidates else None
+
+
+def get_user_article_count(db: Session, user_id: int) -> int:
+    """ユーザーが作成した記事数を取得する
+
+    :param db: データベースセッション
+    :type db: Session
+    :param user_id: ユーザーID
+    :type user_id: int
+    :return: 記事数
+    :rtype: int
+    """
+    count = db.execute(
+        select(User.article_count).where(User.id == user_id)
+    ).scalar()
+    return int(count or 0)
+
+
+def rebuild_article_counts(db: Session) -> int:
+    """記事テーブルから全ての集計値を再計算する
+
+    既存データベースへの導入時や、概算モードからexactモードに戻す場合に使用する。
+
+    :param db: データベースセッション
+    :type db: Session
+    :return: 再計算後の全記事数
+    :rtype: int
+    """
+    per_user = (
+        select(func.count(Article.id))
+        .where(Article.user_id == User.id)
+        .scalar_subquery()
+    )
+    db.execute(update(User).values(article_count=per_user))
+    total = db.execute(select(func.count(Article.id))).scalar() or 0
+    stats = db.get(ArticleStats, GLOBAL_STATS_ID)
+    if stats is None:
+        db.add(ArticleStats(id=GLOBAL_STATS_ID, total_articles=total))
+    else:
+        stats.total_articles = total
+    db.commit()
+    return int(total)
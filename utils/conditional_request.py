@@ -0,0 +1,100 @@
+"""条件付きGET（ETag / Last-Modified）を扱うモジュール"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+
+# 公開APIのキャッシュ方針（CDN・ブラウザは保存してよいが、使用前に必ず再検証する）
+PUBLIC_CACHE_CONTROL = "public, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """レスポンスの内容を決める値から強いETagを作成する
+
+    :param parts: 記事の更新日時・件数・ページネーション条件・レンダラースタンプなど
+    :type parts: Any
+    :return: ダブルクォートで囲んだETag
+    :rtype: str
+    """
+    source = "\0".join("" if part is None else str(part) for part in parts)
+    return '"' + hashlib.sha256(source.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def http_date(value: datetime) -> str:
+    """日時をHTTP日付形式に変換する（タイムゾーンの無い日時はUTCとして扱う）"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Matchの値にETagが含まれるかを弱い比較で判定する"""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in header.split(",")
+    )
+
+
+def is_not_modified(
+    request: Optional[Request],
+    etag: str,
+    last_modified: Optional[datetime]
+    ) -> bool:
+    """リクエストの条件ヘッダーから、クライアントの保持する内容が最新かを判定する
+
+    If-None-Matchがある場合はそれのみで判定し、If-Modified-Sinceは無視する（RFC 9110）。
+
+    :param request: リクエスト（直接呼び出し時はNone）
+    :type request: Optional[Request]
+    :param etag: 現在のETag
+    :type etag: str
+    :param last_modified: 現在の最終更新日時
+    :type last_modified: Optional[datetime]
+    :return: 304を返してよい場合はTrue
+    :rtype: bool
+    """
+    if request is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP日付は秒単位のため、秒未満を切り捨てて比較する
+    return last_modified.replace(microsecond=0) <= since
+
+
+def set_validators(
+    response: Optional[Response],
+    etag: str,
+    last_modified: Optional[datetime]
+    ) -> None:
+    """レスポンスにETag・Last-Modified・Cache-Controlを設定する"""
+    if response is None:
+        return
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = PUBLIC_CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime]) -> Response:
+    """本文を含まない304レスポンスを作成する"""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, last_modified)
+    return response
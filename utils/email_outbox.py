@@ -0,0 +1,435 @@
+"""送信待ちのメール（アウトボックス）を管理するモジュール
+
+エンドポイントではメールを直接送信せず、``enqueue_email`` でユーザー登録・退会などの
+変更と同じトランザクションに email_outbox テーブルの行を追加する。コミットに成功すれば
+メールは必ず送信待ちとして残り、SMTPの処理時間はレスポンスに含まれない。
+
+``EmailOutboxWorker`` はアプリケーションの起動時に開始するタスクで、送信待ちの行を
+EMAIL_OUTBOX_BATCH_SIZE 件までのバッチに分け、最大 EMAIL_OUTBOX_CONCURRENCY バッチを
+並行して送信する。各バッチは utils.smtp_pool の1本の接続で続けて送信する。
+
+- 送信に成功した行は削除する。
+- 失敗した行は指数関数的に間隔を空けて再送し、EMAIL_OUTBOX_MAX_ATTEMPTS 回失敗した行と、
+  宛先・内容が不正で再送しても成功しない行は status を "dead" にして残す（デッドレター）。
+- SMTPサーバーへの送信が続けて失敗した場合はサーキットブレーカーを開き、
+  EMAIL_CIRCUIT_RESET_TIMEOUT 秒の間は送信しない。その後に1件だけ試し、
+  成功すれば再開する。
+
+複数のワーカープロセスで同じ行を送信しないよう、取得時に next_attempt_at を
+EMAIL_OUTBOX_LEASE 秒先に進める。送信中にプロセスが終了した行は、その時間が過ぎると
+他のワーカーが再送する。
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi_mail import MessageSchema
+from sqlalchemy import Engine, delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from database import run_db
+from models import EmailOutbox
+from utils.email_sender import (
+    build_account_deletion_message,
+    build_registration_complete_message,
+    build_verification_message,
+    deliver_messages,
+)
+from logger.structured_logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# 同時に送信するバッチの最大数（SMTPの接続数。utils.smtp_pool の SMTP_POOL_SIZE に合わせる）
+EMAIL_OUTBOX_CONCURRENCY = max(1, int(os.getenv("EMAIL_OUTBOX_CONCURRENCY", "4")))
+
+# 1本の接続で続けて送信するメールの最大数
+EMAIL_OUTBOX_BATCH_SIZE = max(1, int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20")))
+
+# 送信を試みる最大回数（超えた行はデッドレターにする）
+EMAIL_OUTBOX_MAX_ATTEMPTS = max(1, int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8")))
+
+# 再送の間隔（秒）。失敗するたびに2倍にし、EMAIL_OUTBOX_BACKOFF_MAX で打ち切る
+EMAIL_OUTBOX_BACKOFF_BASE = float(os.getenv("EMAIL_OUTBOX_BACKOFF_BASE", "2"))
+EMAIL_OUTBOX_BACKOFF_MAX = float(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX", "600"))
+
+# 通知が無い場合に送信待ちの行を確認する間隔（秒、他のプロセスで追加された行や再送のため）
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", "5"))
+
+# 送信中の行を他のワーカーが取得しない時間（秒）
+EMAIL_OUTBOX_LEASE = float(os.getenv("EMAIL_OUTBOX_LEASE", "300"))
+
+# サーキットブレーカーを開く連続失敗回数と、開いている時間（秒）
+EMAIL_CIRCUIT_FAILURE_THRESHOLD = max(1, int(os.getenv("EMAIL_CIRCUIT_FAILURE_THRESHOLD", "5")))
+EMAIL_CIRCUIT_RESET_TIMEOUT = float(os.getenv("EMAIL_CIRCUIT_RESET_TIMEOUT", "30"))
+
+
+# メールの種類ごとのメッセージ作成関数（宛先と payload の値を引数に取る）
+EMAIL_BUILDERS: Dict[str, Callable[..., MessageSchema]] = {
+    "verification": build_verification_message,
+    "registration_complete": build_registration_complete_message,
+    "account_deletion": build_account_deletion_message,
+}
+
+# 再送しても成功しないエラー（メッセージを作成できない・宛先が不正など）
+PERMANENT_ERRORS = (ValueError, TypeError, KeyError)
+
+
+def enqueue_email(db: Session, kind: str, recipient: str, **params: Any) -> EmailOutbox:
+    """送信待ちのメールをセッションに追加する
+
+    コミットは呼び出し側で、変更と同じトランザクションで行う。
+    コミット後に ``email_outbox_worker.notify()`` を呼び出すと、すぐに送信を開始する。
+
+    :param db: データベースセッション
+    :type db: Session
+    :param kind: メールの種類（EMAIL_BUILDERS のキー）
+    :type kind: str
+    :param recipient: 宛先のメールアドレス
+    :type recipient: str
+    :param params: メッセージ作成関数に渡す値（JSONに変換できる値）
+    :return: 追加した行
+    :rtype: EmailOutbox
+    :raises ValueError: メールの種類が不正な場合
+    """
+    if kind not in EMAIL_BUILDERS:
+        raise ValueError(f"不明なメールの種類です: {kind}")
+    row = EmailOutbox(
+        kind=kind,
+        recipient=recipient,
+        payload=json.dumps(params, ensure_ascii=False),
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(row)
+    return row
+
+
+def backoff_delay(
+    attempts: int,
+    base: float = EMAIL_OUTBOX_BACKOFF_BASE,
+    maximum: float = EMAIL_OUTBOX_BACKOFF_MAX
+    ) -> float:
+    """attempts 回目の失敗の後、次に送信を試みるまでの秒数を返す
+
+    複数の行が同時に再送されないよう、間隔の後半をランダムにする。
+
+    :param attempts: 送信を試みた回数（1以上）
+    :type attempts: int
+    :return: 次に送信を試みるまでの秒数
+    :rtype: float
+    """
+    delay = min(maximum, base * 2.0 ** (max(1, attempts) - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """SMTPサーバーへの送信を止めるサーキットブレーカー
+
+    - closed: 送信する。連続で failure_threshold 回失敗すると open にする。
+    - open: reset_timeout 秒の間は送信しない。過ぎると half_open にする。
+    - half_open: 1件だけ送信を試み、成功すれば closed、失敗すれば open に戻す。
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = EMAIL_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = EMAIL_CIRCUIT_RESET_TIMEOUT
+        ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        """現在の状態（"closed"・"open"・"half_open"）"""
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+        return self._state
+
+    def retry_after(self) -> float:
+        """open の場合に、half_open になるまでの秒数を返す（それ以外は0）"""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self) -> None:
+        """送信の成功を記録する"""
+        self._state = "closed"
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        """送信の失敗を記録する"""
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self._state != "open":
+                logger.warning("メール送信のサーキットブレーカーを開きました: 連続%s回失敗", self._failures)
+            self._state = "open"
+            self._opened_at = time.monotonic()
+
+
+@dataclass(frozen=True)
+class _ClaimedEmail:
+    """送信のために取得した行"""
+    id: int
+    kind: str
+    recipient: str
+    payload: str
+    attempts: int
+
+
+class EmailOutboxWorker:
+    """送信待ちのメールを送信するワーカー"""
+
+    def __init__(
+        self,
+        concurrency: int = EMAIL_OUTBOX_CONCURRENCY,
+        max_attempts: int = EMAIL_OUTBOX_MAX_ATTEMPTS,
+        breaker: Optional[CircuitBreaker] = None,
+        sender: Callable[
+            [List[MessageSchema]], Awaitable[List[Optional[Exception]]]
+        ] = deliver_messages,
+        lease: float = EMAIL_OUTBOX_LEASE,
+        batch_size: int = EMAIL_OUTBOX_BATCH_SIZE
+        ) -> None:
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker()
+        self.sender = sender
+        self.lease = lease
+        self._in_flight: Set["asyncio.Task[None]"] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._sent = 0
+        self._retried = 0
+        self._dead = 0
+
+    def notify(self) -> None:
+        """送信待ちの行を追加したことを通知し、すぐに送信を開始させる"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _capacity(self) -> Tuple[int, int]:
+        """新たに送信を開始できるバッチ数と、1バッチの件数を返す"""
+        state = self.breaker.state
+        if state == "open":
+            return 0, 0
+        if state == "half_open":
+            # 1件だけ試す
+            return (0, 0) if self._in_flight else (1, 1)
+        return self.concurrency - len(self._in_flight), self.batch_size
+
+    def _claim(self, engine: Engine, limit: int) -> List[_ClaimedEmail]:
+        """送信時刻を過ぎた行を最大 limit 件取得し、他のワーカーが取得しないよう予約する"""
+        now = datetime.utcnow()
+        claimed = []
+        with Session(engine) as db:
+            rows = db.execute(
+                select(
+                    EmailOutbox.id, EmailOutbox.kind, EmailOutbox.recipient,
+                    EmailOutbox.payload, EmailOutbox.attempts, EmailOutbox.next_attempt_at
+                )
+                .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(limit)
+            ).all()
+            for row in rows:
+                # 同時に取得した他のワーカーと重複しないよう、取得時の next_attempt_at を条件にする
+                result = db.execute(
+                    update(EmailOutbox)
+                    .where(
+                        EmailOutbox.id == row.id,
+                        EmailOutbox.status == "pending",
+                        EmailOutbox.next_attempt_at == row.next_attempt_at,
+                    )
+                    .values(
+                        attempts=EmailOutbox.attempts + 1,
+                        next_attempt_at=now + timedelta(seconds=self.lease),
+                    )
+                )
+                if result.rowcount == 1:
+                    claimed.append(_ClaimedEmail(
+                        row.id, row.kind, row.recipient, row.payload, row.attempts + 1
+                    ))
+            db.commit()
+        return claimed
+
+    def _finish(
+        self,
+        engine: Engine,
+        sent_ids: List[int],
+        failures: List[Tuple[_ClaimedEmail, str, bool]]
+        ) -> List[bool]:
+        """送信結果を1つのトランザクションで記録する
+
+        送信が完了した行は削除し、失敗した行は再送待ちにする
+        （再送しない場合・最大回数に達した場合はデッドレターにする）。
+
+        :param sent_ids: 送信が完了した行のID
+        :type sent_ids: List[int]
+        :param failures: 失敗した行・エラー・再送しても成功しないかどうか
+        :type failures: List[Tuple[_ClaimedEmail, str, bool]]
+        :return: 失敗した行ごとに、デッドレターにした場合はTrue
+        :rtype: List[bool]
+        """
+        dead_flags = []
+        with Session(engine) as db:
+            if sent_ids:
+                db.execute(delete(EmailOutbox).where(EmailOutbox.id.in_(sent_ids)))
+            for email, error, permanent in failures:
+                dead = permanent or email.attempts >= self.max_attempts
+                values: Dict[str, Any] = {"last_error": error[:1000]}
+                if dead:
+                    values["status"] = "dead"
+                else:
+                    values["next_attempt_at"] = datetime.utcnow() + timedelta(
+                        seconds=backoff_delay(email.attempts)
+                    )
+                db.execute(update(EmailOutbox).where(EmailOutbox.id == email.id).values(**values))
+                dead_flags.append(dead)
+            db.commit()
+        return dead_flags
+
+    async def _send_batch(self, engine: Engine, emails: List[_ClaimedEmail]) -> None:
+        """バッチのメールを1本の接続で送信し、結果を記録する"""
+        failures: List[Tuple[_ClaimedEmail, str, bool]] = []
+        sendable: List[_ClaimedEmail] = []
+        messages: List[MessageSchema] = []
+        for email in emails:
+            try:
+                messages.append(
+                    EMAIL_BUILDERS[email.kind](email.recipient, **json.loads(email.payload))
+                )
+                sendable.append(email)
+            except PERMANENT_ERRORS as e:
+                failures.append((email, f"{type(e).__name__}: {e}", True))
+
+        results: List[Optional[Exception]] = []
+        if messages:
+            try:
+                results = await self.sender(messages)
+            except Exception as e:
+                results = [e] * len(messages)
+
+        sent_ids = []
+        for email, error in zip(sendable, results):
+            if error is None:
+                self.breaker.record_success()
+                sent_ids.append(email.id)
+            else:
+                self.breaker.record_failure()
+                failures.append((email, f"{type(error).__name__}: {error}", False))
+
+        dead_flags = await run_db(self._finish, engine, sent_ids, failures)
+        self._sent += len(sent_ids)
+        for (email, reason, permanent), dead in zip(failures, dead_flags):
+            if permanent:
+                self._dead += 1
+                logger.error("メールを送信できないためデッドレターにしました: id=%s, %s", email.id, reason)
+            elif dead:
+                self._dead += 1
+                logger.error(
+                    "メールの再送を%s回失敗したためデッドレターにしました: id=%s, %s",
+                    email.attempts,
+                    email.id,
+                    reason
+                )
+            else:
+                self._retried += 1
+                logger.warning("メールの送信に失敗しました（再送します）: id=%s, %s", email.id, reason)
+
+    async def drain(self, engine: Engine) -> int:
+        """送信時刻を過ぎた行が無くなるまで送信する
+
+        :param engine: アウトボックスのあるデータベースのエンジン
+        :type engine: Engine
+        :return: 送信を試みた件数
+        :rtype: int
+        """
+        processed = 0
+        while True:
+            batches, batch_size = self._capacity()
+            claimed = (
+                await run_db(self._claim, engine, batches * batch_size) if batches > 0 else []
+            )
+            if claimed:
+                # 取得した行を、並行して送信するバッチに均等に分ける
+                count = min(batches, len(claimed))
+                for index in range(count):
+                    task = asyncio.create_task(self._send_batch(engine, claimed[index::count]))
+                    self._in_flight.add(task)
+                    task.add_done_callback(self._in_flight.discard)
+            processed += len(claimed)
+            if not self._in_flight:
+                return processed
+            await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+    async def run(self, engine: Engine, poll_interval: float = EMAIL_OUTBOX_POLL_INTERVAL) -> None:
+        """送信待ちの行を送信し続ける
+
+        アプリケーションの起動時にタスクとして開始し、終了時にキャンセルする。
+        キャンセル時に送信中だった行は、EMAIL_OUTBOX_LEASE 秒後に再送される。
+
+        :param engine: アウトボックスのあるデータベースのエンジン
+        :type engine: Engine
+        :param poll_interval: 通知が無い場合に確認する間隔（秒）
+        :type poll_interval: float
+        """
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                self._wakeup.clear()
+                try:
+                    await self.drain(engine)
+                except SQLAlchemyError as e:
+                    logger.error("送信待ちのメールの取得に失敗しました: %s", e)
+                # サーキットブレーカーが開いている間は、通知があっても送信しない
+                timeout = self.breaker.retry_after() or poll_interval
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+        finally:
+            self._wakeup = None
+            for task in list(self._in_flight):
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """送信件数とサーキットブレーカーの状態を返す"""
+        return {
+            "sent": self._sent,
+            "retried": self._retried,
+            "dead": self._dead,
+            "in_flight": len(self._in_flight),
+            "circuit": self.breaker.state,
+        }
+
+
+def requeue_dead_letters(engine: Engine) -> int:
+    """デッドレターにした行を送信待ちに戻す（SMTPの設定を直した後などに使う）
+
+    :param engine: アウトボックスのあるデータベースのエンジン
+    :type engine: Engine
+    :return: 送信待ちに戻した件数
+    :rtype: int
+    """
+    with Session(engine) as db:
+        result = db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.status == "dead")
+            .values(status="pending", attempts=0, next_attempt_at=datetime.utcnow())
+        )
+        db.commit()
+        return result.rowcount
+
+
+email_outbox_worker = EmailOutboxWorker()
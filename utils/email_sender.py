@@ -1,12 +1,31 @@
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+from fastapi_mail import MessageSchema, ConnectionConfig, MessageType, MultipartSubtypeEnum
+from fastapi_mail.msg import MailMsg
+import aiosmtplib
 import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
 from urllib.parse import quote
 
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template, select_autoescape
+
+from utils.smtp_pool import SMTPConnectionPool
+from logger.structured_logger import get_logger
+
+
+logger = get_logger(__name__)
+
 
 CORS_ORIGINS = os.getenv("CORS_ORIGINS")
 LOCAL_CORS_ORIGINS = os.getenv("LOCAL_CORS_ORIGINS")
 SERVER_PORT = os.getenv("SERVER_PORT", "8080")
 
+# HTMLを含めず、テキストのみのメールを送信する
+PREFER_PLAIN_TEXT_EMAIL = os.getenv("PREFER_PLAIN_TEXT_EMAIL", "false").lower() == "true"
+
+# メールのテンプレートのディレクトリ
+EMAIL_TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+
 
 def get_mail_config() -> ConnectionConfig:
     """メール設定を取得する"""
@@ -23,11 +42,140 @@ def get_mail_config() -> ConnectionConfig:
     )
 
 
-async def send_verification_email(email: str, token: str) -> None:
-    """確認メールを送信する"""
-    print(
-        f"メール送信開始 - 宛先: {email}, トークン: {token}"
+@dataclass(frozen=True)
+class EmailTemplate:
+    """1種類のメールのテキスト・HTMLのテンプレート"""
+    plain: Template
+    html: Template
+
+
+def load_email_templates(template_dir: Path = EMAIL_TEMPLATE_DIR) -> Dict[str, EmailTemplate]:
+    """メールのテンプレートを全て読み込み、コンパイルする
+
+    :param template_dir: テンプレートのディレクトリ（<名前>.txt と <名前>.html の組）
+    :type template_dir: Path
+    :return: 名前ごとのテキスト・HTMLのテンプレート
+    :rtype: Dict[str, EmailTemplate]
+    """
+    environment = Environment(
+        loader=FileSystemLoader(str(template_dir)),
+        autoescape=select_autoescape(["html"]),
+        undefined=StrictUndefined,
+        auto_reload=False,
+    )
+    return {
+        path.stem: EmailTemplate(
+            plain=environment.get_template(f"{path.stem}.txt"),
+            html=environment.get_template(path.name),
+        )
+        for path in sorted(template_dir.glob("*.html"))
+    }
+
+
+# 起動時にコンパイルしたテンプレート（送信のたびに読み込まない）
+EMAIL_TEMPLATES = load_email_templates()
+
+
+def _build_message(subject: str, email: str, template_name: str, **context: str) -> MessageSchema:
+    """テンプレートからテキストとHTMLの両方を含むメッセージを作成する
+
+    PREFER_PLAIN_TEXT_EMAIL の場合はテキストのみのメッセージにする。
+    """
+    template = EMAIL_TEMPLATES[template_name]
+    plain_body = template.plain.render(context).replace('\n', '\r\n')
+    if PREFER_PLAIN_TEXT_EMAIL:
+        return MessageSchema(
+            subject=subject,
+            recipients=[email],
+            body=plain_body,
+            subtype=MessageType.plain,
+            charset="utf-8"
         )
+    # multipart/alternative はより望ましい形式を後に置くため、HTMLを後に添付する
+    return MessageSchema(
+        subject=subject,
+        recipients=[email],
+        body=plain_body,
+        alternative_body=template.html.render(context),
+        subtype=MessageType.plain,
+        multipart_subtype=MultipartSubtypeEnum.alternative,
+        charset="utf-8"
+    )
+
+
+# 送信に使う接続のプール（最初の送信時に get_mail_config の設定で作成する）
+_smtp_pool: Optional[SMTPConnectionPool] = None
+_smtp_pool_config: Optional[ConnectionConfig] = None
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """メール設定に従って認証済みの接続を使い回すプールを返す"""
+    global _smtp_pool, _smtp_pool_config
+    if _smtp_pool is None or _smtp_pool_config is None:
+        conf = get_mail_config()
+        if not conf:
+            raise Exception("メール設定が正しく設定されていません")
+        use_credentials = conf.USE_CREDENTIALS and bool(conf.MAIL_USERNAME)
+        _smtp_pool = SMTPConnectionPool(lambda: aiosmtplib.SMTP(
+            hostname=conf.MAIL_SERVER,
+            port=conf.MAIL_PORT,
+            username=conf.MAIL_USERNAME if use_credentials else None,
+            password=conf.MAIL_PASSWORD if use_credentials else None,
+            use_tls=conf.MAIL_SSL_TLS,
+            start_tls=conf.MAIL_STARTTLS,
+            validate_certs=conf.VALIDATE_CERTS,
+            timeout=conf.TIMEOUT,
+        ))
+        _smtp_pool_config = conf
+    return _smtp_pool
+
+
+async def close_smtp_pool() -> None:
+    """プールの接続を全て閉じる（アプリケーションの終了時に呼び出す）"""
+    global _smtp_pool, _smtp_pool_config
+    if _smtp_pool is not None:
+        await _smtp_pool.close()
+    _smtp_pool, _smtp_pool_config = None, None
+
+
+async def deliver_messages(messages: Sequence[MessageSchema]) -> List[Optional[Exception]]:
+    """複数のメッセージをプールの1本の接続で続けて送信する
+
+    :param messages: 送信するメッセージ
+    :type messages: Sequence[MessageSchema]
+    :return: メッセージごとの結果（成功した場合はNone、失敗した場合は例外）
+    :rtype: List[Optional[Exception]]
+    """
+    pool = get_smtp_pool()
+    conf = _smtp_pool_config
+    assert conf is not None
+    if conf.SUPPRESS_SEND:
+        return [None] * len(messages)
+    sender = conf.MAIL_FROM
+    if conf.MAIL_FROM_NAME is not None:
+        sender = f"{conf.MAIL_FROM_NAME} <{conf.MAIL_FROM}>"
+    mime_messages = [await MailMsg(message)._message(sender) for message in messages]
+    return await pool.send_batch(mime_messages)
+
+
+async def deliver_message(message: MessageSchema) -> None:
+    """メッセージを送信する
+
+    送信に失敗した場合は例外をそのまま送出する（再送は utils.email_outbox で行う）。
+
+    :param message: 送信するメッセージ
+    :type message: MessageSchema
+    """
+    error = (await deliver_messages([message]))[0]
+    if error is not None:
+        raise error
+
+
+def build_verification_message(email: str, token: str) -> MessageSchema:
+    """確認メールのメッセージを作成する
+
+    :raises ValueError: CORS_ORIGINS・LOCAL_CORS_ORIGINS のどちらも設定されていない場合
+    """
     encoded_token = quote(token, safe='')
     # 検証URLを構築
     if LOCAL_CORS_ORIGINS:
@@ -37,235 +185,51 @@ async def send_verification_email(email: str, token: str) -> None:
     else:
         raise ValueError("CORS_ORIGINSが設定されていません")
     verification_url = f"{base_url}/api/v1/verify-email?token={encoded_token}"
-    content = (
-        "こんにちは！\n\n"
-        "メールアドレスの確認をお願いします。\n\n"
-        "下記のリンク先よりパスワードを変更して、登録を完了してください：\n\n"
-        "初期パスワード：temp_password_123\n\n"
-        "以下のリンクをクリックしてください：\n"
-        f"{verification_url}\n\n"
-        "このリンクの有効時間は24時間です。\n\n"
-        "Blog API チーム"
+    return _build_message(
+        "【Blog API】メールアドレスの確認", email, "verification", verification_url=verification_url
+    )
+
+
+def build_registration_complete_message(email: str, username: str) -> MessageSchema:
+    """登録完了メールのメッセージを作成する"""
+    return _build_message(
+        "【Blog API】登録完了のお知らせ", email, "registration_complete", username=username
+    )
+
+
+def build_account_deletion_message(email: str, username: str) -> MessageSchema:
+    """退会完了メールのメッセージを作成する"""
+    return _build_message(
+        "【Blog API】退会完了のお知らせ", email, "account_deletion", username=username
     )
+
+
+async def send_verification_email(email: str, token: str) -> None:
+    """確認メールを送信する"""
+    logger.info("メール送信開始 - 宛先: %s, トークン: %s...", email, token[:8])
+    message = build_verification_message(email, token)
     try:
-        conf = get_mail_config()
-        if not conf:
-            raise Exception("メール設定が正しく設定されていません")
-        plain_body = content.replace('\n', '\r\n')
-        html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>メールアドレスの確認</title>
-</head>
-<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-        <h2 style="color: #2c3e50;">メールアドレスの確認</h2>
-        <p>こんにちは！</p>
-        <p>下記のリンク先よりパスワードを変更して、登録を完了してください：</p>
-        <div style="background-color: #fff3cd; padding: 15px; border-radius: 4px; margin: 20px 0; border-left: 4px solid #ffc107;">
-            <p style="margin: 0; font-weight: bold; color: #856404;">
-                初期パスワード：temp_password_123
-            </p>
-        </div>
-        <div style="text-align: center; margin: 30px 0;">
-            <a href="{verification_url}"
-               style="background-color: #3498db; color: white; padding: 12px 24px;
-                      text-decoration: none; border-radius: 4px; display: inline-block;
-                      font-weight: bold;">メールアドレスを確認する</a>
-        </div>
-        <p>または、以下のURLをコピーして<br>
-        ブラウザのアドレスバーに貼り付けてください：</p>
-        <div style="background-color: #f8f9fa; padding: 15px; border-radius: 4px; margin: 20px 0;">
-            <p style="word-break: break-all; font-family: monospace; margin: 0; font-size: 12px;">
-                {verification_url}
-            </p>
-        </div>
-        <p>ご不明な点がございましたら、<br>
-        お気軽にお問い合わせください。</p>
-        <p style="margin-top: 30px;">
-            <small style="background-color: #fff3cd; padding: 5px 10px; border-radius: 3px; color: #856404;">
-                ⏰ このリンクの有効時間は1時間です。
-            </small>
-        </p>
-        <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
-        <p style="color: #666; font-size: 12px; text-align: center;">
-            よろしくお願いいたします。<br><br>
-            <strong>Blog API チーム</strong>
-        </p>
-    </div>
-</body>
-</html>"""
-        PREFER_PLAIN_TEXT = os.getenv("PREFER_PLAIN_TEXT_EMAIL", "false").lower() == "true"
-        message = MessageSchema(
-            subject="【Blog API】メールアドレスの確認",
-            recipients=[email],
-            body=plain_body if PREFER_PLAIN_TEXT else html_body,
-            subtype=MessageType.plain if PREFER_PLAIN_TEXT else MessageType.html,
-            charset="utf-8"
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
-        print(
-            f"確認メールを送信しました: {email}"
-            )
+        await deliver_message(message)
+        logger.info("確認メールを送信しました: %s", email)
     except Exception as e:
-        print(f"メール送信エラー: {str(e)}")
+        logger.error("メール送信エラー: %s", e)
 
 
 async def send_registration_complete_email(email: str, username: str) -> None:
     """登録完了メールを送信する"""
-    print(
-        f"登録完了メール送信開始 - 宛先: {email}, ユーザー名: {username}"
-        )
-    content = (
-        f"こんにちは、{username}さん！\n\n"
-        "Blog APIへのご登録が完了しました。🎉\n\n"
-        "これからBlog APIの全ての機能をお使いいただけます：\n"
-        "• ブログ記事の作成・編集・削除\n"
-        "• コメントの投稿・管理\n"
-        "• プロフィールの管理\n"
-        "• その他の便利な機能\n\n"
-        "ご利用いただき、ありがとうございます。\n"
-        "何かご不明な点がございましたら、お気軽にお問い合わせください。\n\n"
-        "Blog API チーム"
-    )
+    logger.info("登録完了メール送信開始 - 宛先: %s, ユーザー名: %s", email, username)
     try:
-        conf = get_mail_config()
-        if not conf:
-            raise Exception("メール設定が正しく設定されていません")
-        plain_body = content.replace('\n', '\r\n')
-        html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>登録完了のお知らせ</title>
-</head>
-<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="text-align: center; margin-bottom: 30px;">
-            <h1 style="color: #27ae60; margin: 0;">🎉 登録完了！</h1>
-        </div>
-        <h2 style="color: #2c3e50;">こんにちは、{username}さん！</h2>
-        <p style="font-size: 16px; color: #27ae60; font-weight: bold;">
-            Blog APIへのご登録が完了しました。🎉
-        </p>
-        <p>これからBlog APIの全ての機能をお使いいただけます：</p>
-        <ul style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-            <li style="margin: 8px 0;">📝 ブログ記事の作成・編集・削除</li>
-            <li style="margin: 8px 0;">💬 コメントの投稿・管理</li>
-            <li style="margin: 8px 0;">👤 プロフィールの管理</li>
-            <li style="margin: 8px 0;">⚡ その他の便利な機能</li>
-        </ul>
-        <div style="background-color: #e8f5e8; padding: 20px; border-radius: 8px; border-left: 4px solid #27ae60; margin: 30px 0;">
-            <p style="margin: 0; color: #2d5a2d;">
-                <strong>ご利用いただき、ありがとうございます。</strong><br>
-                何かご不明な点がございましたら、お気軽にお問い合わせください。
-            </p>
-        </div>
-        <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
-        <p style="color: #666; font-size: 12px; text-align: center;">
-            今後ともよろしくお願いいたします。<br><br>
-            <strong>Blog API チーム</strong>
-        </p>
-    </div>
-</body>
-</html>"""
-        PREFER_PLAIN_TEXT = os.getenv("PREFER_PLAIN_TEXT_EMAIL", "false").lower() == "true"
-        message = MessageSchema(
-            subject="【Blog API】登録完了のお知らせ",
-            recipients=[email],
-            body=plain_body if PREFER_PLAIN_TEXT else html_body,
-            subtype=MessageType.plain if PREFER_PLAIN_TEXT else MessageType.html,
-            charset="utf-8"
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
-        print(f"登録完了メールを送信しました: {email}")
+        await deliver_message(build_registration_complete_message(email, username))
+        logger.info("登録完了メールを送信しました: %s", email)
     except Exception as e:
-        print(f"登録完了メール送信エラー: {str(e)}")
+        logger.error("登録完了メール送信エラー: %s", e)
 
 
 async def send_account_deletion_email(email: str, username: str) -> None:
     """退会完了メールを送信する"""
-    print(
-        f"退会完了メール送信開始 - 宛先: {email}, ユーザー名: {username}"
-        )
-    content = (
-        f"こんにちは、{username}さん\n\n"
-        "Blog APIからの退会手続きが完了いたしました。\n\n"
-        "これまでBlog APIをご利用いただき、誠にありがとうございました。\n"
-        "お客様の投稿された記事やデータは、ご要望に従って削除させていただきました。\n\n"
-        "退会に関する詳細：\n"
-        "• ユーザーアカウントの削除\n"
-        "• 投稿された記事の削除\n"
-        "• 個人情報の削除\n\n"
-        "また何かの機会がございましたら、いつでもお気軽にご利用ください。\n"
-        "新規登録はいつでも可能です。\n\n"
-        "今後ともよろしくお願いいたします。\n\n"
-        "Blog API チーム"
-    )
+    logger.info("退会完了メール送信開始 - 宛先: %s, ユーザー名: %s", email, username)
     try:
-        conf = get_mail_config()
-        if not conf:
-            raise Exception("メール設定が正しく設定されていません")
-        plain_body = content.replace('\n', '\r\n')
-        html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>退会完了のお知らせ</title>
-</head>
-<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="text-align: center; margin-bottom: 30px;">
-            <h1 style="color: #e74c3c; margin: 0;">👋 退会完了</h1>
-        </div>
-        <h2 style="color: #2c3e50;">こんにちは、{username}さん</h2>
-        <p style="font-size: 16px; color: #e74c3c; font-weight: bold;">
-            Blog APIからの退会手続きが完了いたしました。
-        </p>
-        <p>これまでBlog APIをご利用いただき、誠にありがとうございました。</p>
-        <p>お客様の投稿された記事やデータは、ご要望に従って削除させていただきました。</p>
-        <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-            <h3 style="color: #2c3e50; margin-top: 0;">退会に関する詳細：</h3>
-            <ul style="margin: 0;">
-                <li style="margin: 8px 0;">✅ ユーザーアカウントの削除</li>
-                <li style="margin: 8px 0;">✅ 投稿された記事の削除</li>
-                <li style="margin: 8px 0;">✅ 個人情報の削除</li>
-            </ul>
-        </div>
-        <div style="background-color: #e8f5e8; padding: 20px; border-radius: 8px; border-left: 4px solid #27ae60; margin: 30px 0;">
-            <p style="margin: 0; color: #2d5a2d;">
-                <strong>また何かの機会がございましたら、いつでもお気軽にご利用ください。</strong><br>
-                新規登録はいつでも可能です。
-            </p>
-        </div>
-        <hr style="border: none; border-top: 1px solid #eee; margin: 30px 0;">
-        <p style="color: #666; font-size: 12px; text-align: center;">
-            今後ともよろしくお願いいたします。<br><br>
-            <strong>Blog API チーム</strong>
-        </p>
-    </div>
-</body>
-</html>"""
-        PREFER_PLAIN_TEXT = os.getenv("PREFER_PLAIN_TEXT_EMAIL", "false").lower() == "true"
-        message = MessageSchema(
-            subject="【Blog API】退会完了のお知らせ",
-            recipients=[email],
-            body=plain_body if PREFER_PLAIN_TEXT else html_body,
-            subtype=MessageType.plain if PREFER_PLAIN_TEXT else MessageType.html,
-            charset="utf-8"
-        )
-        fm = FastMail(conf)
-        await fm.send_message(message)
-        print(
-            f"退会完了メールを送信しました: {email}"
-            )
+        await deliver_message(build_account_deletion_message(email, username))
+        logger.info("退会完了メールを送信しました: %s", email)
     except Exception as e:
-        print(
-            f"退会完了メール送信エラー: {str(e)}"
-            )
\ No newline at end of file
+        logger.error("退会完了メール送信エラー: %s", e)
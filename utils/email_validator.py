@@ -1,5 +1,9 @@
 from database import db_env
 import os
+from logger.structured_logger import get_logger
+
+
+logger = get_logger(__name__)
 
 
 def is_valid_email_domain(email: str) -> bool:
@@ -15,9 +19,7 @@ def is_valid_email_domain(email: str) -> bool:
         "ENABLE_DOMAIN_RESTRICTION", "false"
         ).lower() == "true"
     if not domain_restriction_enabled:
-        print(
-            f"ドメイン制限は無効です。すべてのドメインを許可: {email}"
-            )
+        logger.debug("ドメイン制限は無効です。すべてのドメインを許可: %s", email)
         return True
     # 許可されたドメインのリストを取得
     allowed_domains = os.getenv(
@@ -25,25 +27,17 @@ def is_valid_email_domain(email: str) -> bool:
         ).split(",")
     allowed_domains = [domain.strip() for domain in allowed_domains if domain.strip()]
     if not allowed_domains:
-        print(
-            "許可されたドメインが設定されていません。すべてのドメインを許可"
-            )
+        logger.debug("許可されたドメインが設定されていません。すべてのドメインを許可")
         return True
     # メールアドレスからドメイン部分を抽出
     try:
         domain = email.split("@")[1].lower()
         is_allowed = domain in [d.lower() for d in allowed_domains]
         if is_allowed:
-            print(
-                f"許可されたドメインです: {domain}"
-                )
+            logger.debug("許可されたドメインです: %s", domain)
         else:
-            print(
-                f"許可されていないドメインです: {domain}, 許可リスト: {allowed_domains}"
-                )
+            logger.warning("許可されていないドメインです: %s, 許可リスト: %s", domain, allowed_domains)
         return is_allowed
     except IndexError:
-        print(
-            f"不正なメールアドレス形式: {email}"
-            )
+        logger.warning("不正なメールアドレス形式: %s", email)
         return False
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""記事本文のMarkdownをHTMLに変換するモジュール"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+import markdown
+from sqlalchemy import Row
+
+from models import Article
+
+
+# レンダラーのバージョン
+# 変換結果が変わる修正（拡張機能の追加・変更など）を行った場合はインクリメントする
+RENDERER_VERSION = 1
+
+# 記事本文の変換に使用するMarkdown拡張機能
+MARKDOWN_EXTENSIONS: Tuple[str, ...] = ("nl2br",)
+
+
+# 変換結果キャッシュの最大件数
+MARKDOWN_CACHE_SIZE = int(os.getenv("MARKDOWN_CACHE_SIZE", "1024"))
+
+
+# 保存済みHTMLを持つ記事（記事のモデルと、カラムを指定して取得した行）
+RenderableArticle = Union[Article, Row[Any]]
+
+
+def renderer_stamp() -> str:
+    """現在のレンダラー設定を表すスタンプを返す
+
+    バージョンと拡張機能の組み合わせが変わると値も変わるため、
+    保存済みHTMLが古いかどうかの判定に使用する。
+
+    :return: レンダラースタンプ（例: ``1:nl2br``）
+    :rtype: str
+    """
+    return f"{RENDERER_VERSION}:{','.join(MARKDOWN_EXTENSIONS)}"
+
+
+class MarkdownRenderCache:
+    """Markdown変換結果を保持するLRUキャッシュ
+
+    本文とレンダラースタンプのハッシュをキーとし、最大件数を超えた場合は
+    最も古く参照されたエントリから破棄する。複数スレッドから参照されるため
+    操作はロックで保護する。
+
+    :param maxsize: 保持する最大件数（0の場合はキャッシュしない）
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(body: str, stamp: str) -> str:
+        """本文とレンダラースタンプからキャッシュキーを作成する"""
+        return hashlib.sha256(f"{stamp}\0{body}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """キャッシュから変換結果を取得する"""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: str, html: str) -> None:
+        """変換結果をキャッシュに保存する"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """キャッシュと統計情報を初期化する"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """キャッシュの統計情報を返す
+
+        :return: size, maxsize, hits, misses, evictionsを含む辞書
+        :rtype: Dict[str, int]
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+render_cache = MarkdownRenderCache(MARKDOWN_CACHE_SIZE)
+
+
+def render_markdown(body: str) -> str:
+    """MarkdownテキストをHTMLに変換する
+
+    同じ本文とレンダラー設定の組み合わせはキャッシュから返す。
+
+    :param body: Markdown形式の本文
+    :type body: str
+    :return: HTML形式の本文
+    :rtype: str
+    """
+    key = render_cache.make_key(body, renderer_stamp())
+    html = render_cache.get(key)
+    if html is not None:
+        return html
+    # 改行を<br>タグに変換し、見出し（#）を太文字に変換
+    md = markdown.Markdown(extensions=list(MARKDOWN_EXTENSIONS))
+    html = md.convert(body)
+    render_cache.put(key, html)
+    return html
+
+
+def apply_rendered_body(article: Article) -> None:
+    """記事の本文を変換し、HTMLとレンダラースタンプを記事に保存する
+
+    :param article: 変換対象の記事
+    :type article: Article
+    """
+    article.body_html = render_markdown(article.body)
+    article.render_version = renderer_stamp()
+
+
+def get_article_html(article: RenderableArticle) -> str:
+    """記事のHTML本文を取得する
+
+    保存済みHTMLが現在のレンダラーで作成されたものであればそのまま返し、
+    未作成または古い場合はその場で変換する。
+
+    :param article: 対象の記事
+    :type article: RenderableArticle
+    :return: HTML形式の本文
+    :rtype: str
+    """
+    if (
+        isinstance(article.body_html, str)
+        and article.render_version == renderer_stamp()
+    ):
+        return article.body_html
+    return render_markdown(article.body)
@@ -0,0 +1,274 @@
+"""リクエストのメトリクスを集計し、Prometheusのテキスト形式で出力するモジュール
+
+``MetricsMiddleware`` はASGIのミドルウェアで、ルートごとに以下を記録する。
+
+- リクエスト数（ステータスの分類 2xx・4xx など別）
+- レイテンシのヒストグラム（METRICS_LATENCY_BUCKETS の区切り）
+- 処理中のリクエスト数
+- レスポンスのサイズ（本文のバイト数の合計と件数）
+
+ルートのラベルには実際のURLではなくルートのパス（例: ``/api/v1/articles/{id}``）を使い、
+どのルートにも一致しないリクエストは UNMATCHED_ROUTE にまとめる（ラベルの数を増やさない）。
+
+記録はイベントループのスレッドだけで、await を挟まずに行うため、ロックを使わない。
+``render_prometheus()`` も同じスレッド（/metrics のエンドポイント）から呼び出すこと。
+"""
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# レイテンシのヒストグラムの区切り（秒、カンマ区切り）
+METRICS_LATENCY_BUCKETS = tuple(sorted(
+    float(bucket) for bucket in os.getenv(
+        "METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+    ).split(",") if bucket.strip()
+))
+
+# どのルートにも一致しないリクエストのルートのラベル
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Prometheusのテキスト形式の Content-Type
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ラベルの無いメトリクス（メトリクス名, 種類, 説明, 値）
+Sample = Tuple[str, str, str, float]
+
+
+class RouteMetrics:
+    """1つのルート（メソッドとパス）のメトリクス
+
+    :param buckets: ヒストグラムの区切りの数
+    :type buckets: int
+    """
+
+    __slots__ = ("statuses", "buckets", "latency_sum", "count", "size_sum", "in_flight")
+
+    def __init__(self, buckets: int) -> None:
+        self.statuses: Dict[str, int] = {}
+        # 区切りごとの件数（累積しない。最後の要素は +Inf）
+        self.buckets = [0] * (buckets + 1)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.size_sum = 0
+        self.in_flight = 0
+
+
+class HTTPMetrics:
+    """ルートごとのメトリクスを保持するレジストリ
+
+    :param buckets: レイテンシのヒストグラムの区切り（秒、昇順）
+    :type buckets: Tuple[float, ...]
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = METRICS_LATENCY_BUCKETS) -> None:
+        self.latency_buckets = buckets
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+
+    def route(self, method: str, path: str) -> RouteMetrics:
+        """ルートのメトリクスを取得する（無い場合は作成する）
+
+        :param method: HTTPメソッド
+        :type method: str
+        :param path: ルートのパス
+        :type path: str
+        :return: ルートのメトリクス
+        :rtype: RouteMetrics
+        """
+        key = (method, path)
+        metrics = self._routes.get(key)
+        if metrics is None:
+            metrics = self._routes[key] = RouteMetrics(len(self.latency_buckets))
+        return metrics
+
+    def observe(self, metrics: RouteMetrics, status_code: int, latency: float, size: int) -> None:
+        """完了したリクエストを記録する
+
+        :param metrics: ルートのメトリクス
+        :type metrics: RouteMetrics
+        :param status_code: レスポンスのステータスコード
+        :type status_code: int
+        :param latency: レイテンシ（秒）
+        :type latency: float
+        :param size: レスポンスの本文のバイト数
+        :type size: int
+        """
+        status_class = f"{status_code // 100}xx"
+        metrics.statuses[status_class] = metrics.statuses.get(status_class, 0) + 1
+        metrics.buckets[bisect_left(self.latency_buckets, latency)] += 1
+        metrics.latency_sum += latency
+        metrics.count += 1
+        metrics.size_sum += size
+
+    def reset(self) -> None:
+        """全てのメトリクスを削除する（テスト用）"""
+        self._routes.clear()
+
+    def render_prometheus(self) -> str:
+        """メトリクスをPrometheusのテキスト形式で返す
+
+        :return: テキスト形式のメトリクス
+        :rtype: str
+        """
+        routes = sorted(self._routes.items())
+        bounds = [_format_value(bucket) for bucket in self.latency_buckets] + ["+Inf"]
+        lines = [
+            "# HELP http_requests_total Total number of HTTP requests by route and status class.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, path), metrics in routes:
+            labels = _labels(method, path)
+            for status_class, count in sorted(metrics.statuses.items()):
+                lines.append(f'http_requests_total{{{labels},status="{status_class}"}} {count}')
+
+        lines += [
+            "# HELP http_request_duration_seconds HTTP request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, path), metrics in routes:
+            labels = _labels(method, path)
+            cumulative = 0
+            for bound, count in zip(bounds, metrics.buckets):
+                cumulative += count
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f"http_request_duration_seconds_sum{{{labels}}} {_format_value(metrics.latency_sum)}"
+            )
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+
+        lines += [
+            "# HELP http_requests_in_flight Number of HTTP requests currently being processed.",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for (method, path), metrics in routes:
+            lines.append(f"http_requests_in_flight{{{_labels(method, path)}}} {metrics.in_flight}")
+
+        lines += [
+            "# HELP http_response_size_bytes HTTP response body size by route.",
+            "# TYPE http_response_size_bytes summary",
+        ]
+        for (method, path), metrics in routes:
+            labels = _labels(method, path)
+            lines.append(f"http_response_size_bytes_sum{{{labels}}} {metrics.size_sum}")
+            lines.append(f"http_response_size_bytes_count{{{labels}}} {metrics.count}")
+        return "\n".join(lines) + "\n"
+
+    def stats(self) -> Dict[str, int]:
+        """集計しているルート数と、リクエスト数の合計を返す
+
+        :return: routes, requests, in_flightを含む辞書
+        :rtype: Dict[str, int]
+        """
+        return {
+            "routes": len(self._routes),
+            "requests": sum(metrics.count for metrics in self._routes.values()),
+            "in_flight": sum(metrics.in_flight for metrics in self._routes.values()),
+        }
+
+
+def _format_value(value: float) -> str:
+    """数値をPrometheusのテキスト形式の値にする（整数の場合は小数点を付けない）"""
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _escape(value: str) -> str:
+    """ラベルの値をエスケープする"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(method: str, path: str) -> str:
+    """メソッドとルートのラベルを返す"""
+    return f'method="{_escape(method)}",route="{_escape(path)}"'
+
+
+def resolve_route(scope: Scope) -> str:
+    """リクエストに一致するルートのパスを返す
+
+    ルーターと同じ順序で照合し、メソッドだけが異なるルート（405になる）のパスも返す。
+
+    :param scope: ASGIのスコープ
+    :type scope: Scope
+    :return: ルートのパス（一致しない場合は UNMATCHED_ROUTE）
+    :rtype: str
+    """
+    app = scope.get("app")
+    partial: Optional[str] = None
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match is Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+        if match is Match.PARTIAL and partial is None:
+            partial = getattr(route, "path", None)
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """リクエストのメトリクスを http_metrics に記録するASGIミドルウェア
+
+    :param app: 次のASGIアプリケーション
+    :type app: ASGIApp
+    :param metrics: 記録先のレジストリ（省略時は http_metrics）
+    :type metrics: Optional[HTTPMetrics]
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Optional[HTTPMetrics] = None) -> None:
+        self.app = app
+        self.metrics = metrics or http_metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics.route(scope["method"], resolve_route(scope))
+        status_code = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            self.metrics.observe(metrics, status_code, time.perf_counter() - started, size)
+
+
+# グローバルなインスタンス
+http_metrics = HTTPMetrics()
+
+
+def render_prometheus() -> str:
+    """http_metrics をPrometheusのテキスト形式で返す"""
+    return http_metrics.render_prometheus()
+
+
+def render_samples(samples: Iterable[Sample]) -> str:
+    """ラベルの無いメトリクス（スレッドプール・キャッシュの統計情報など）をPrometheusのテキスト形式で返す
+
+    :param samples: (メトリクス名, 種類, 説明, 値) の一覧
+    :type samples: Iterable[Sample]
+    :return: テキスト形式のメトリクス
+    :rtype: str
+    """
+    lines = []
+    for name, kind, description, value in samples:
+        lines += [
+            f"# HELP {name} {description}",
+            f"# TYPE {name} {kind}",
+            f"{name} {_format_value(value)}",
+        ]
+    return "\n".join(lines) + "\n" if lines else ""
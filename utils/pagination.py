@@ -0,0 +1,75 @@
+"""キーセット（カーソル）ページネーション用のユーティリティ"""
+import base64
+import binascii
+from typing import Optional
+
+from fastapi import HTTPException, status
+from logger.structured_logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# カーソルの形式バージョン（形式を変更した場合は古いカーソルを拒否できるようにする）
+CURSOR_PREFIX = "v1:"
+
+# 次ページのカーソルを返すレスポンスヘッダー
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(article_id: int) -> str:
+    """最後に返した記事IDから不透明なカーソル文字列を作成する
+
+    :param article_id: ページ内で最後に返した記事ID
+    :type article_id: int
+    :return: URLセーフなカーソル文字列
+    :rtype: str
+    """
+    raw = f"{CURSOR_PREFIX}{article_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """カーソル文字列から記事IDを取り出す
+
+    :param cursor: encode_cursorで作成したカーソル文字列
+    :type cursor: str
+    :return: カーソルが指す記事ID
+    :rtype: int
+    :raises HTTPException: カーソルの形式が不正な場合（400）
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        if not raw.startswith(CURSOR_PREFIX):
+            raise ValueError(raw)
+        return int(raw[len(CURSOR_PREFIX):])
+    except (ValueError, UnicodeError, binascii.Error):
+        logger.warning("無効なカーソルが指定されました: %s", cursor)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="無効なカーソルです"
+        )
+
+
+def next_cursor(
+    last_article_id: Optional[int],
+    page_size: int,
+    limit: Optional[int]
+    ) -> Optional[str]:
+    """次ページのカーソルを返す
+
+    ページが上限件数まで埋まっている場合のみ次ページが存在するとみなす。
+
+    :param last_article_id: ページ内で最後に返した記事ID
+    :type last_article_id: Optional[int]
+    :param page_size: 今回返した記事数
+    :type page_size: int
+    :param limit: 取得上限件数（指定なしの場合は全件取得のため次ページなし）
+    :type limit: Optional[int]
+    :return: 次ページのカーソル（次ページが無い場合はNone）
+    :rtype: Optional[str]
+    """
+    if not limit or last_article_id is None or page_size < limit:
+        return None
+    return encode_cursor(last_article_id)
@@ -0,0 +1,127 @@
+"""クエリの実行計画を確認するモジュール
+
+ルーターが発行したSQLを記録し、EXPLAIN（SQLiteでは EXPLAIN QUERY PLAN）で
+インデックスを使わずにテーブル全体を走査するクエリを検出する。
+テスト（tests/test_query_plans.py）でインデックスの付け忘れを検出するために使う。
+"""
+import json
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Connection, Engine, event
+
+
+# 実行計画を確認するSQL（INSERTなどは対象外）
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+# SQLiteの全件走査（"SCAN articles"。インデックスを使う走査は"USING ... INDEX"が付く）
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING (?:COVERING )?INDEX)")
+
+RecordedQuery = Tuple[str, Any]
+
+
+class QueryRecorder:
+    """エンジンで実行されたSQLとパラメータを記録するクラス"""
+
+    def __init__(self) -> None:
+        self.queries: List[RecordedQuery] = []
+        self._lock = threading.Lock()
+
+    def __call__(
+        self,
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool
+        ) -> None:
+        if executemany or not _EXPLAINABLE.match(statement):
+            return
+        with self._lock:
+            self.queries.append((statement, parameters))
+
+
+@contextmanager
+def record_queries(engine: Engine) -> Iterator[QueryRecorder]:
+    """ブロック内でエンジンが実行したSQLを記録する
+
+    :param engine: SQLAlchemyのエンジン
+    :type engine: Engine
+    :return: 記録したSQLを保持するオブジェクト
+    :rtype: Iterator[QueryRecorder]
+    """
+    recorder = QueryRecorder()
+    event.listen(engine, "before_cursor_execute", recorder)
+    try:
+        yield recorder
+    finally:
+        event.remove(engine, "before_cursor_execute", recorder)
+
+
+def find_full_scan(
+    connection: Connection,
+    statement: str,
+    parameters: Any = None
+    ) -> Optional[str]:
+    """SQLの実行計画にテーブル全体の走査が含まれるかを調べる
+
+    :param connection: 実行計画を取得する接続
+    :type connection: Connection
+    :param statement: 確認するSQL（ドライバに渡された形式）
+    :type statement: str
+    :param parameters: SQLのパラメータ
+    :type parameters: Any
+    :return: 全体を走査する場合は該当する実行計画の行、それ以外はNone
+    :rtype: Optional[str]
+    """
+    if connection.dialect.name == "postgresql":
+        plan = connection.exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + statement, parameters or {}
+        ).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return _find_seq_scan(plan[0]["Plan"])
+    rows = connection.exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + statement, parameters or ()
+    ).all()
+    for row in rows:
+        detail = str(row[-1])
+        if _SQLITE_FULL_SCAN.match(detail):
+            return detail
+    return None
+
+
+def _find_seq_scan(node: Dict[str, Any]) -> Optional[str]:
+    """PostgreSQLの実行計画からSeq Scanを探す"""
+    if node.get("Node Type") == "Seq Scan":
+        return f"Seq Scan on {node.get('Relation Name')}"
+    for child in node.get("Plans", []):
+        found = _find_seq_scan(child)
+        if found:
+            return found
+    return None
+
+
+def check_query_plans(
+    engine: Engine,
+    queries: List[RecordedQuery]
+    ) -> List[Tuple[str, str]]:
+    """記録したSQLのうち、テーブル全体を走査するものを返す
+
+    :param engine: SQLAlchemyのエンジン
+    :type engine: Engine
+    :param queries: 記録したSQLとパラメータ
+    :type queries: List[RecordedQuery]
+    :return: 全体を走査するSQLと実行計画の行のリスト
+    :rtype: List[Tuple[str, str]]
+    """
+    full_scans = []
+    with engine.connect() as connection:
+        for statement, parameters in queries:
+            found = find_full_scan(connection, statement, parameters)
+            if found:
+                full_scans.append((statement, found))
+    return full_scans
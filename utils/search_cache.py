@@ -0,0 +1,182 @@
+"""記事検索結果のキャッシュを管理するモジュール
+
+記事の作成・更新・削除とユーザー削除のたびに記事の世代番号を進め、
+保存時と世代番号が異なるエントリは無効として扱う。
+世代番号はプロセスごとに保持するため、複数プロセスで運用する場合は
+SEARCH_CACHE_TTL を短めに設定すること。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from utils.text_tokens import normalize_text
+
+
+# 検索結果キャッシュの最大件数（0の場合はキャッシュしない）
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+
+# 検索結果キャッシュの有効期間（秒）
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+
+
+class ArticleGeneration:
+    """記事データの世代番号
+
+    記事の内容や件数が変わる書き込みをコミットした後に ``bump`` を呼び出す。
+    """
+
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        """現在の世代番号"""
+        return self._value
+
+    def bump(self) -> int:
+        """世代番号を進める
+
+        :return: 新しい世代番号
+        :rtype: int
+        """
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+articles_generation = ArticleGeneration()
+
+
+class SearchResultCache:
+    """検索結果を保持するTTL付きLRUキャッシュ
+
+    最大件数を超えた場合は最も古く参照されたエントリから破棄し、
+    有効期間を過ぎたエントリ・世代番号が古いエントリは参照時に破棄する。
+
+    :param maxsize: 保持する最大件数（0の場合はキャッシュしない）
+    :param ttl: エントリの有効期間（秒）
+    :param generation: 無効化に使用する世代番号
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        generation: ArticleGeneration
+        ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = generation
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(
+        keywords: Iterable[str],
+        *params: Hashable,
+        normalize: bool = True
+        ) -> Hashable:
+        """検索キーワードとページネーション等の条件からキャッシュキーを作成する
+
+        キーワードはAND検索のため、重複と順序を除いた集合として扱う。
+
+        :param keywords: 検索キーワード
+        :type keywords: Iterable[str]
+        :param params: 件数・スキップ数・カーソル・並び順など結果に影響する条件
+        :type params: Hashable
+        :param normalize: キーワードを検索用に正規化する場合はTrue
+            （正規化しない検索方式では表記の違いを区別する）
+        :type normalize: bool
+        :return: キャッシュキー
+        :rtype: Hashable
+        """
+        terms = frozenset(
+            normalize_text(keyword) if normalize else keyword
+            for keyword in keywords
+        )
+        return (tuple(sorted(terms)), *params)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """キャッシュから検索結果を取得する"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, generation, value = entry
+            if generation != self.generation.value:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        """検索結果をキャッシュに保存する
+
+        :param key: キャッシュキー
+        :type key: Hashable
+        :param value: 検索結果
+        :type value: Any
+        :param generation: 検索を開始した時点の世代番号
+            （検索中に書き込みがあった場合は保存しない）
+        :type generation: int
+        """
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            if generation != self.generation.value:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """キャッシュと統計情報を初期化する"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.invalidations = 0
+
+    def stats(self) -> Dict[str, float]:
+        """キャッシュの統計情報を返す
+
+        :return: size, maxsize, hits, misses, evictions, expirations,
+            invalidations, hit_ratioを含む辞書
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+search_cache = SearchResultCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL, articles_generation)
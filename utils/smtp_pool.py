@@ -0,0 +1,207 @@
+"""SMTPの接続を使い回してメールを送信するモジュール
+
+FastMail はメッセージごとに接続・STARTTLS・AUTHを行い、送信後に切断する。
+``SMTPConnectionPool`` は認証済みの接続を最大 SMTP_POOL_SIZE 本保持し、
+複数のメッセージの送信に使い回す。
+
+- しばらく使わなかった接続（SMTP_POOL_NOOP_AFTER 秒）は、使う前にNOOPで確認する。
+- サーバー側で切断される前に、SMTP_POOL_IDLE_TIMEOUT 秒使わなかった接続は閉じる。
+- ``send_batch`` は複数のメッセージを1本の接続で続けて送信する。途中で切断された
+  場合は、新しい接続で送信し直す。
+"""
+import asyncio
+import os
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from email.message import EmailMessage, Message
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import aiosmtplib
+
+
+# 同時に保持する接続の最大数
+SMTP_POOL_SIZE = max(1, int(os.getenv("SMTP_POOL_SIZE", "4")))
+
+# この時間使わなかった接続は閉じる（秒）
+SMTP_POOL_IDLE_TIMEOUT = float(os.getenv("SMTP_POOL_IDLE_TIMEOUT", "60"))
+
+# この時間使わなかった接続は、使う前にNOOPで確認する（秒）
+SMTP_POOL_NOOP_AFTER = float(os.getenv("SMTP_POOL_NOOP_AFTER", "10"))
+
+
+# 接続が使えなくなったことを示すエラー（接続を破棄し、新しい接続で送信し直す）
+CONNECTION_ERRORS = (ConnectionError, TimeoutError, OSError)
+
+
+@dataclass
+class _PooledConnection:
+    """プールに保持する接続"""
+    smtp: aiosmtplib.SMTP
+    last_used: float
+
+
+class SMTPConnectionPool:
+    """認証済みのSMTP接続を使い回すプール
+
+    1つのイベントループの中で使用する（別のイベントループから使われた場合は、
+    それまでの接続を破棄して作り直す）。
+
+    :param factory: 未接続の aiosmtplib.SMTP を作成する関数（connect で STARTTLS・AUTH まで行う設定にする）
+    :type factory: Callable[[], aiosmtplib.SMTP]
+    :param size: 同時に保持する接続の最大数
+    :type size: int
+    :param idle_timeout: 使わなかった接続を閉じるまでの秒数
+    :type idle_timeout: float
+    :param noop_after: 使う前にNOOPで確認する、使わなかった秒数
+    :type noop_after: float
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], aiosmtplib.SMTP],
+        size: int = SMTP_POOL_SIZE,
+        idle_timeout: float = SMTP_POOL_IDLE_TIMEOUT,
+        noop_after: float = SMTP_POOL_NOOP_AFTER
+        ) -> None:
+        self.factory = factory
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+        self._idle: List[_PooledConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._opened = 0
+        self._reused = 0
+        self._health_check_failures = 0
+        self._sent = 0
+
+    def _bind_loop(self) -> asyncio.Semaphore:
+        """実行中のイベントループ用の同時接続数の制限を返す"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._slots is None:
+            # 別のイベントループで作成した接続は使えない
+            for connection in self._idle:
+                connection.smtp.close()
+            self._idle.clear()
+            self._slots = asyncio.Semaphore(self.size)
+            self._loop = loop
+        return self._slots
+
+    async def _open(self) -> _PooledConnection:
+        """新しい接続を作成する（STARTTLS・AUTHまで行う）"""
+        smtp = self.factory()
+        await smtp.connect()
+        self._opened += 1
+        return _PooledConnection(smtp, time.monotonic())
+
+    async def _checkout(self) -> _PooledConnection:
+        """使える接続を取り出す（無ければ作成する）"""
+        while self._idle:
+            connection = self._idle.pop()
+            idle = time.monotonic() - connection.last_used
+            if idle >= self.idle_timeout or not connection.smtp.is_connected:
+                await self._discard(connection, graceful=connection.smtp.is_connected)
+                continue
+            if idle >= self.noop_after:
+                try:
+                    await connection.smtp.noop()
+                except (aiosmtplib.SMTPException, *CONNECTION_ERRORS):
+                    self._health_check_failures += 1
+                    await self._discard(connection)
+                    continue
+            self._reused += 1
+            return connection
+        return await self._open()
+
+    def _checkin(self, connection: _PooledConnection) -> None:
+        """使い終わった接続をプールに戻す"""
+        connection.last_used = time.monotonic()
+        self._idle.append(connection)
+
+    async def _discard(self, connection: _PooledConnection, graceful: bool = False) -> None:
+        """接続を閉じる（graceful の場合はQUITを送る）"""
+        if graceful:
+            with suppress(aiosmtplib.SMTPException, *CONNECTION_ERRORS):
+                await connection.smtp.quit()
+                return
+        connection.smtp.close()
+
+    async def send_batch(
+        self, messages: Sequence[Union[EmailMessage, Message]]
+        ) -> List[Optional[Exception]]:
+        """複数のメッセージを1本の接続で続けて送信する
+
+        メッセージごとの失敗は例外として送出せず、結果として返す。
+        接続が切断された場合は新しい接続で1回だけ送信し直し、
+        接続を作成できない場合は残りのメッセージを全て同じエラーとする。
+
+        :param messages: 送信するメッセージ
+        :type messages: Sequence[Union[EmailMessage, Message]]
+        :return: メッセージごとの結果（成功した場合はNone、失敗した場合は例外）
+        :rtype: List[Optional[Exception]]
+        """
+        results: List[Optional[Exception]] = []
+        async with self._bind_loop():
+            connection: Optional[_PooledConnection] = None
+            try:
+                for message in messages:
+                    for retry in (False, True):
+                        if connection is None:
+                            try:
+                                connection = await self._open() if retry else await self._checkout()
+                            except (aiosmtplib.SMTPException, *CONNECTION_ERRORS) as e:
+                                results.extend([e] * (len(messages) - len(results)))
+                                return results
+                        try:
+                            await connection.smtp.send_message(message)
+                        except CONNECTION_ERRORS as e:
+                            await self._discard(connection)
+                            connection = None
+                            if retry:
+                                results.append(e)
+                            continue
+                        except aiosmtplib.SMTPException as e:
+                            # サーバーがこのメッセージを拒否した場合（aiosmtplibがRSETを送るため接続は使い続ける）
+                            results.append(e)
+                        else:
+                            self._sent += 1
+                            results.append(None)
+                        break
+            except BaseException:
+                # キャンセルなどで送信が中断された接続は、状態が分からないため破棄する
+                if connection is not None:
+                    connection.smtp.close()
+                    connection = None
+                raise
+            finally:
+                if connection is not None:
+                    self._checkin(connection)
+        return results
+
+    async def send(self, message: Union[EmailMessage, Message]) -> None:
+        """1件のメッセージを送信する
+
+        :param message: 送信するメッセージ
+        :type message: Union[EmailMessage, Message]
+        :raises Exception: 送信に失敗した場合
+        """
+        error = (await self.send_batch([message]))[0]
+        if error is not None:
+            raise error
+
+    async def close(self) -> None:
+        """保持している接続を全て閉じる"""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection, graceful=True)
+
+    def stats(self) -> Dict[str, int]:
+        """接続の作成・再利用の回数を返す"""
+        return {
+            "idle": len(self._idle),
+            "opened": self._opened,
+            "reused": self._reused,
+            "health_check_failures": self._health_check_failures,
+            "sent": self._sent,
+        }
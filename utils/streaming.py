@@ -0,0 +1,137 @@
+"""件数の多い一覧をストリーミングで返すためのユーティリティ
+
+記事を一定件数ずつ読み込み（``yield_per``。PostgreSQLではサーバーサイドカーソル）、
+JSON配列またはNDJSONとして逐次書き出すため、記事数に関係なくメモリ使用量は一定になる。
+"""
+import os
+from typing import Callable, Dict, Iterable, Iterator, Optional, TypeGuard, TypeVar, Union
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Connection, Engine, Row, Select
+from sqlalchemy.orm import Session
+
+
+# 1回に読み込む記事数
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+# ストリーミングの形式とContent-Type
+STREAM_MEDIA_TYPES: Dict[str, str] = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+STREAM_FORMAT_PATTERN = "^(json|ndjson)$"
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def is_stream_format(value: object) -> TypeGuard[str]:
+    """ストリーミング形式が指定されているかどうかを返す"""
+    return isinstance(value, str) and value in STREAM_MEDIA_TYPES
+
+
+def iter_rows(
+    bind: Engine,
+    stmt: Select,
+    batch_size: int = STREAM_BATCH_SIZE
+    ) -> Iterator[Row]:
+    """クエリ結果を一定件数ずつ読み込みながら1行ずつ返す
+
+    レスポンスの送信中にリクエストのセッションが閉じられても読み込めるよう、
+    同じエンジンで専用のセッションを開く。
+
+    :param bind: SQLAlchemyのエンジン
+    :type bind: Engine
+    :param stmt: 実行するクエリ（カラムを指定したselect）
+    :type stmt: Select
+    :param batch_size: 1回に読み込む件数
+    :type batch_size: int
+    :return: 結果の行
+    :rtype: Iterator[Row]
+    """
+    with Session(bind=bind) as db:
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield from partition
+
+
+def encode_items(
+    items: Iterable[BaseModel],
+    stream_format: str,
+    batch_size: int = STREAM_BATCH_SIZE
+    ) -> Iterator[bytes]:
+    """モデルをJSON配列またはNDJSONのバイト列として逐次返す
+
+    書き込み回数を抑えるため、batch_size件ごとにまとめて返す。
+
+    :param items: 書き出すモデル
+    :type items: Iterable[BaseModel]
+    :param stream_format: json（JSON配列）またはndjson
+    :type stream_format: str
+    :param batch_size: まとめて返す件数
+    :type batch_size: int
+    :return: レスポンス本文の断片
+    :rtype: Iterator[bytes]
+    """
+    ndjson = stream_format == "ndjson"
+    separator = b"\n" if ndjson else b","
+    buffer = []
+    first = True
+    if not ndjson:
+        yield b"["
+    for item in items:
+        data = item.model_dump_json().encode("utf-8")
+        if ndjson:
+            buffer.append(data + separator)
+        else:
+            buffer.append(data if first else separator + data)
+        first = False
+        if len(buffer) >= batch_size:
+            yield b"".join(buffer)
+            buffer = []
+    if buffer:
+        yield b"".join(buffer)
+    if not ndjson:
+        yield b"]"
+
+
+def stream_query(
+    bind: Union[Engine, Connection],
+    stmt: Select,
+    convert: Callable[[Row], T],
+    stream_format: str,
+    headers: Optional[Dict[str, str]] = None
+    ) -> StreamingResponse:
+    """クエリ結果をモデルに変換しながらストリーミングで返すレスポンスを作成する
+
+    :param bind: SQLAlchemyのエンジン（リクエストのセッションの ``get_bind()`` でもよい）
+    :type bind: Union[Engine, Connection]
+    :param stmt: 実行するクエリ
+    :type stmt: Select
+    :param convert: 行をレスポンスのモデルに変換する関数
+    :type convert: Callable[[Row], T]
+    :param stream_format: json（JSON配列）またはndjson
+    :type stream_format: str
+    :param headers: レスポンスに追加するヘッダー
+    :type headers: Optional[Dict[str, str]]
+    :return: ストリーミングレスポンス
+    :rtype: StreamingResponse
+    """
+    # リクエストのセッションの接続は使わず、同じエンジンで読み込む
+    items = (convert(row) for row in iter_rows(bind.engine, stmt))
+    return StreamingResponse(
+        encode_items(items, stream_format),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+        headers=headers,
+    )
+
+
+def forward_headers(response: Optional[object]) -> Dict[str, str]:
+    """エンドポイントで設定したヘッダーを、直接返すレスポンスに引き継ぐ"""
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return {}
+    return {
+        name: value for name, value in headers.items()
+        if name.lower() != "content-length"
+    }
@@ -0,0 +1,25 @@
+"""検索用のテキスト正規化を行うモジュール"""
+import re
+import unicodedata
+
+
+# 索引・検索の単位となる単語（記号・空白・アンダースコア以外の連続した文字）
+WORD_RUN = re.compile(r"[^\W_]+")
+
+
+def normalize_text(value: str) -> str:
+    """検索用にテキストを正規化する
+
+    NFKC正規化（全角英数字・半角カナの統一）、大文字小文字の統一、
+    カタカナのひらがな化を行う。
+
+    :param value: 正規化するテキスト
+    :type value: str
+    :return: 正規化したテキスト
+    :rtype: str
+    """
+    normalized = unicodedata.normalize("NFKC", value).casefold()
+    return "".join(
+        chr(ord(ch) - 0x60) if "ァ" <= ch <= "ヶ" else ch
+        for ch in normalized
+    )
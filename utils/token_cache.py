@@ -0,0 +1,156 @@
+"""検証済みトークンのペイロードを保持するキャッシュを管理するモジュール
+
+リクエストごとの jwt.decode（署名の検証とJSONの解析）を省くため、
+検証に成功したトークンのペイロードを、トークンのダイジェストをキーに
+トークンの有効期限（exp）まで保持する。署名の鍵はそのまま保持せず、
+鍵のフィンガープリント（SHA-256）で検証時の条件と照合する。
+
+キャッシュするのは署名と有効期限の検証結果のみで、ログアウトなどによる
+トークンの無効化はキャッシュの有無に関係なく呼び出し側で毎回確認すること。
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from jose import jwt
+
+
+# キャッシュするトークン数の上限（0の場合はキャッシュしない）
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+Payload = Dict[str, Any]
+
+# 署名の検証に使う鍵のフィンガープリントと、許可するアルゴリズム
+Verifier = Tuple[bytes, Tuple[str, ...]]
+
+
+class TokenPayloadCache:
+    """トークンのダイジェストをキーにした、有効期限付きのLRUキャッシュ
+
+    トークン文字列そのものは保持しない。検証に使った鍵・アルゴリズムと
+    異なる条件での参照（鍵の変更後など）はキャッシュを使わない。
+
+    :param maxsize: 保持する最大件数
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Tuple[float, Verifier, Payload]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        """トークンのキャッシュキー（SHA-256のダイジェスト）を返す"""
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str, verifier: Verifier) -> Optional[Payload]:
+        """有効期限内のペイロードを取得する（呼び出し側で変更できるようコピーを返す）
+
+        nbf（有効開始日時）より前の場合は、jwt.decode で拒否されるようキャッシュを使わない。
+
+        :param token: トークン
+        :type token: str
+        :param verifier: 検証に使う鍵のフィンガープリントとアルゴリズム
+        :type verifier: Verifier
+        :return: ペイロード（無い場合はNone）
+        :rtype: Optional[Payload]
+        """
+        cache_key = self.digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or entry[0] <= now or entry[1] != verifier:
+                if entry is not None:
+                    del self._entries[cache_key]
+                self.misses += 1
+                return None
+            not_before = entry[2].get("nbf")
+            if isinstance(not_before, (int, float)) and not_before > now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return dict(entry[2])
+
+    def put(self, token: str, verifier: Verifier, payload: Payload) -> None:
+        """検証済みのペイロードをexpまで保存する（expが無い場合は保存しない）
+
+        :param token: トークン
+        :type token: str
+        :param verifier: 検証に使った鍵のフィンガープリントとアルゴリズム
+        :type verifier: Verifier
+        :param payload: 検証済みのペイロード
+        :type payload: Payload
+        """
+        expires_at = payload.get("exp")
+        if self.maxsize <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        cache_key = self.digest(token)
+        with self._lock:
+            self._entries[cache_key] = (float(expires_at), verifier, dict(payload))
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        """トークンのエントリを削除する（ログアウト時など）"""
+        with self._lock:
+            self._entries.pop(self.digest(token), None)
+
+    def clear(self) -> None:
+        """キャッシュと統計情報を初期化する"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        """キャッシュの統計情報を返す
+
+        :return: size, maxsize, hits, misses, hit_ratioを含む辞書
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+token_payload_cache = TokenPayloadCache(TOKEN_CACHE_SIZE)
+
+
+def key_fingerprint(key: str) -> bytes:
+    """鍵をキャッシュに保持するためのフィンガープリント（SHA-256のダイジェスト）を返す"""
+    return hashlib.sha256(key.encode()).digest()
+
+
+def decode_token(token: str, key: str, algorithms: List[str]) -> Payload:
+    """トークンを検証してペイロードを返す（検証済みのトークンはキャッシュから返す）
+
+    :param token: トークン
+    :type token: str
+    :param key: 署名の検証に使う鍵
+    :type key: str
+    :param algorithms: 許可するアルゴリズム
+    :type algorithms: List[str]
+    :return: トークンのペイロード
+    :rtype: Payload
+    :raises JWTError: トークンが無効または期限切れの場合
+    """
+    verifier = (key_fingerprint(key), tuple(algorithms))
+    payload = token_payload_cache.get(token, verifier)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, key, algorithms=algorithms)
+    token_payload_cache.put(token, verifier, payload)
+    return payload
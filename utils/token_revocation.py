@@ -0,0 +1,360 @@
+"""無効化したトークンを管理するモジュール
+
+ログアウトしたトークンのjtiを revoked_tokens テーブルにトークンの有効期限まで記録し、
+全てのワーカープロセスで同じ無効化状態を参照できるようにする。
+
+認証のたびにデータベースを検索しないよう、プロセス内に無効化済みjtiの
+Bloomフィルタを持つ。フィルタに含まれないjtiは無効化されていないと判定し、
+I/Oを行わない。含まれる場合（誤検出を含む）のみデータベースで確認する。
+
+他のプロセスで無効化されたjtiは、``run_revocation_maintenance`` が
+TOKEN_REVOCATION_SYNC_INTERVAL 秒ごとにフィルタへ取り込む。そのため、
+他のプロセスでの無効化が反映されるまで最大でその時間だけ遅れる。
+同じ処理で、有効期限を過ぎた行の削除とフィルタの再作成（圧縮）を
+TOKEN_REVOCATION_COMPACT_INTERVAL 秒ごとに行う。
+"""
+import asyncio
+import hashlib
+import math
+import os
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Engine, Insert, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import Base, run_db
+from models import RevokedToken
+from logger.structured_logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# Bloomフィルタに登録できる件数の目安（超えた場合は圧縮時に大きくする）
+TOKEN_REVOCATION_CAPACITY = max(1, int(os.getenv("TOKEN_REVOCATION_CAPACITY", "100000")))
+
+# Bloomフィルタの誤検出率（誤検出時はデータベースで確認する）
+TOKEN_REVOCATION_FALSE_POSITIVE_RATE = float(
+    os.getenv("TOKEN_REVOCATION_FALSE_POSITIVE_RATE", "0.01")
+)
+
+# 他のプロセスで無効化されたjtiを取り込む間隔（秒）
+TOKEN_REVOCATION_SYNC_INTERVAL = float(os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", "5"))
+
+# 有効期限を過ぎた行を削除する間隔（秒）
+TOKEN_REVOCATION_COMPACT_INTERVAL = float(
+    os.getenv("TOKEN_REVOCATION_COMPACT_INTERVAL", "3600")
+)
+
+
+# 同期時に、取り込み済みの時刻より前から取り込み直す幅
+# （同時に実行されたトランザクションの、コミット順と revoked_at の順の違いを吸収する）
+_SYNC_OVERLAP = timedelta(seconds=2)
+
+
+def token_id(token: str, payload: Dict[str, Any]) -> str:
+    """トークンを識別するID（jti）を返す
+
+    jtiを含まない（変更前に発行された）トークンは、トークンのSHA-256を使う。
+
+    :param token: トークン
+    :type token: str
+    :param payload: 検証済みのペイロード
+    :type payload: Dict[str, Any]
+    :return: トークンのID
+    :rtype: str
+    """
+    jti = payload.get("jti")
+    if isinstance(jti, str) and jti:
+        return jti
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    """文字列の集合を表すBloomフィルタ（誤検出はあるが、見逃しは無い）
+
+    :param capacity: 登録する件数の目安
+    :param false_positive_rate: 件数が目安以下の場合の誤検出率
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float) -> None:
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str) -> Iterable[int]:
+        # 2つのハッシュ値の線形結合で k 個の位置を求める（Kirsch-Mitzenmacher法）
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+    def add(self, value: str) -> None:
+        """値を登録する"""
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class _EngineState:
+    """エンジンごとのBloomフィルタと同期状態"""
+
+    def __init__(self, capacity: int, false_positive_rate: float) -> None:
+        self.bloom = BloomFilter(capacity, false_positive_rate)
+        # 取り込み済みの revoked_at の最大値（次回はこれ以降の行を取り込む）
+        self.synced_until: Optional[datetime] = None
+        # 圧縮中にこのプロセスで無効化したjti（作り直したフィルタに引き継ぐ）
+        self.revoked_while_compacting: Optional[List[str]] = None
+
+    def add_rows(self, rows: Iterable[Any]) -> None:
+        """revoked_tokens の行（jti, revoked_at）をフィルタに登録する"""
+        for jti, revoked_at in rows:
+            self.bloom.add(jti)
+            if self.synced_until is None or revoked_at > self.synced_until:
+                self.synced_until = revoked_at
+
+
+def _utc_from_timestamp(timestamp: float) -> datetime:
+    """UNIX時刻をUTCのnaiveなdatetimeに変換する（他のテーブルと同じ形式）"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class TokenRevocationStore:
+    """無効化したトークンのjtiをデータベースとBloomフィルタで管理するクラス
+
+    :param capacity: Bloomフィルタに登録する件数の目安
+    :param false_positive_rate: Bloomフィルタの誤検出率
+    """
+
+    def __init__(
+        self,
+        capacity: int = TOKEN_REVOCATION_CAPACITY,
+        false_positive_rate: float = TOKEN_REVOCATION_FALSE_POSITIVE_RATE
+        ) -> None:
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self._states: "weakref.WeakKeyDictionary[Any, _EngineState]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self.fast_path_hits = 0
+        self.lookups = 0
+
+    def _state(self, engine: Engine) -> _EngineState:
+        # 呼び出し側で self._lock を取得しておくこと
+        state = self._states.get(engine)
+        if state is None:
+            state = _EngineState(self.capacity, self.false_positive_rate)
+            self._states[engine] = state
+        return state
+
+    def might_be_revoked(self, engine: Engine, jti: str) -> bool:
+        """jtiが無効化されている可能性があるかをI/Oなしで判定する
+
+        Falseの場合は無効化されていない（同期間隔内の他プロセスでの無効化を除く）。
+        Trueの場合は ``is_revoked`` でデータベースを確認する。
+
+        :param engine: 無効化状態を保持するデータベースのエンジン
+        :type engine: Engine
+        :param jti: トークンのID
+        :type jti: str
+        :return: 無効化されている可能性がある場合はTrue
+        :rtype: bool
+        """
+        with self._lock:
+            if jti in self._state(engine).bloom:
+                return True
+            self.fast_path_hits += 1
+            return False
+
+    def is_revoked(self, engine: Engine, jti: str) -> bool:
+        """jtiが無効化されているかを判定する（フィルタに含まれる場合のみデータベースを検索する）
+
+        :param engine: 無効化状態を保持するデータベースのエンジン
+        :type engine: Engine
+        :param jti: トークンのID
+        :type jti: str
+        :return: 無効化されている場合はTrue
+        :rtype: bool
+        """
+        if not self.might_be_revoked(engine, jti):
+            return False
+        with self._lock:
+            self.lookups += 1
+        with engine.connect() as connection:
+            return connection.execute(
+                select(RevokedToken.jti).where(
+                    RevokedToken.jti == jti,
+                    RevokedToken.expires_at > datetime.utcnow()
+                )
+            ).first() is not None
+
+    def revoke(self, engine: Engine, jti: str, expires_at: float) -> None:
+        """jtiを有効期限まで無効化する
+
+        :param engine: 無効化状態を保持するデータベースのエンジン
+        :type engine: Engine
+        :param jti: トークンのID
+        :type jti: str
+        :param expires_at: トークンの有効期限（UNIX時刻）
+        :type expires_at: float
+        """
+        values = {
+            "jti": jti,
+            "expires_at": _utc_from_timestamp(expires_at),
+            "revoked_at": datetime.utcnow(),
+        }
+        table = Base.metadata.tables[RevokedToken.__tablename__]
+        dialect = engine.dialect.name
+        statement: Insert
+        if dialect == "postgresql":
+            pg_insert = postgresql.insert(table).values(**values)
+            statement = pg_insert.on_conflict_do_nothing()
+        elif dialect == "sqlite":
+            sqlite_insert = sqlite.insert(table).values(**values)
+            statement = sqlite_insert.on_conflict_do_nothing()
+        else:
+            statement = table.insert().values(**values)
+        # リクエストのトランザクションとは別に、すぐに確定させる
+        with engine.begin() as connection:
+            connection.execute(statement)
+        with self._lock:
+            state = self._state(engine)
+            state.bloom.add(jti)
+            if state.revoked_while_compacting is not None:
+                state.revoked_while_compacting.append(jti)
+
+    def sync(self, engine: Engine) -> int:
+        """他のプロセスで無効化されたjtiをBloomフィルタに取り込む
+
+        :param engine: 無効化状態を保持するデータベースのエンジン
+        :type engine: Engine
+        :return: 取り込んだ件数
+        :rtype: int
+        """
+        with self._lock:
+            synced_until = self._state(engine).synced_until
+        statement = select(RevokedToken.jti, RevokedToken.revoked_at).where(
+            RevokedToken.expires_at > datetime.utcnow()
+        )
+        if synced_until is not None:
+            statement = statement.where(
+                RevokedToken.revoked_at >= synced_until - _SYNC_OVERLAP
+            )
+        with engine.connect() as connection:
+            rows = connection.execute(statement).all()
+        with self._lock:
+            # 読み込み中に圧縮で入れ替わった場合も、現在のフィルタに登録する
+            state = self._state(engine)
+            state.add_rows(rows)
+            if state.synced_until is None:
+                state.synced_until = datetime.utcnow()
+        return len(rows)
+
+    def compact(self, engine: Engine) -> int:
+        """有効期限を過ぎた行を削除し、残りの行からBloomフィルタを作り直す
+
+        Bloomフィルタからは値を削除できないため、作り直して期限切れのjtiを除く。
+        件数が目安を超えている場合は、誤検出率を保つよう容量を大きくする。
+
+        :param engine: 無効化状態を保持するデータベースのエンジン
+        :type engine: Engine
+        :return: 削除した件数
+        :rtype: int
+        """
+        with self._lock:
+            current = self._state(engine)
+            current.revoked_while_compacting = []
+        now = datetime.utcnow()
+        try:
+            with engine.begin() as connection:
+                deleted = connection.execute(
+                    delete(RevokedToken).where(RevokedToken.expires_at <= now)
+                ).rowcount
+                rows = connection.execute(
+                    select(RevokedToken.jti, RevokedToken.revoked_at)
+                ).all()
+            capacity = self.capacity
+            while capacity < len(rows):
+                capacity *= 2
+            rebuilt = _EngineState(capacity, self.false_positive_rate)
+            rebuilt.add_rows(rows)
+            if rebuilt.synced_until is None:
+                rebuilt.synced_until = now
+        except BaseException:
+            with self._lock:
+                current.revoked_while_compacting = None
+            raise
+        with self._lock:
+            # 読み込み後にこのプロセスで無効化したjtiを引き継いでから入れ替える
+            for jti in current.revoked_while_compacting or []:
+                rebuilt.bloom.add(jti)
+            current.revoked_while_compacting = None
+            self._states[engine] = rebuilt
+        return deleted
+
+    def reset(self) -> None:
+        """プロセス内の状態と統計情報を初期化する（テスト用）"""
+        with self._lock:
+            self._states = weakref.WeakKeyDictionary()
+            self.fast_path_hits = 0
+            self.lookups = 0
+
+    def stats(self) -> Dict[str, float]:
+        """統計情報を返す
+
+        :return: fast_path_hits（I/Oなしで判定した回数）, lookups（データベースを
+            検索した回数）を含む辞書
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            return {
+                "fast_path_hits": self.fast_path_hits,
+                "lookups": self.lookups,
+            }
+
+
+token_revocation_store = TokenRevocationStore()
+
+
+async def run_revocation_maintenance(
+    engine: Engine,
+    sync_interval: float = TOKEN_REVOCATION_SYNC_INTERVAL,
+    compact_interval: float = TOKEN_REVOCATION_COMPACT_INTERVAL
+    ) -> None:
+    """他のプロセスでの無効化の取り込みと、期限切れの行の削除を定期的に行う
+
+    アプリケーションの起動時にタスクとして開始し、終了時にキャンセルする。
+
+    :param engine: 無効化状態を保持するデータベースのエンジン
+    :type engine: Engine
+    :param sync_interval: 取り込みの間隔（秒）
+    :type sync_interval: float
+    :param compact_interval: 削除の間隔（秒）
+    :type compact_interval: float
+    """
+    last_compacted = None
+    while True:
+        try:
+            if last_compacted is None or time.monotonic() - last_compacted >= compact_interval:
+                deleted = await run_db(token_revocation_store.compact, engine)
+                last_compacted = time.monotonic()
+                logger.info("期限切れの無効化トークンを削除しました: %s件", deleted)
+            else:
+                await run_db(token_revocation_store.sync, engine)
+        except SQLAlchemyError as e:
+            logger.error("無効化トークンの同期に失敗しました: %s", e)
+        await asyncio.sleep(sync_interval)
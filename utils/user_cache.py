@@ -0,0 +1,223 @@
+"""認証済みユーザー情報のキャッシュを管理するモジュール
+
+oauth2.get_current_user がリクエストごとにユーザーを検索しないよう、
+ユーザーIDをキーに軽量なユーザー情報（CachedUser）を一定時間保持する。
+キャッシュから返す場合も ``CachedUser.to_model`` でリクエストのセッションに属する
+User を作成するため、依存関係の型（User）は変わらない。
+
+パスワード変更・退会・有効状態の変更をコミットしたときはエントリを削除する。
+削除はプロセス内でのみ行われるため、複数プロセスで運用する場合は
+他のプロセスのキャッシュに最大 USER_CACHE_MAX_STALENESS 秒だけ古い情報が残る。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, UOWTransaction, make_transient_to_detached
+
+from models import User
+
+
+# キャッシュしたユーザー情報を使用する最大の時間（秒、0の場合はキャッシュしない）
+USER_CACHE_MAX_STALENESS = float(os.getenv("USER_CACHE_MAX_STALENESS", "30"))
+
+# キャッシュするユーザー数の上限
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+# セッションの info に、コミット後に無効化するユーザーIDを保持するキー
+_PENDING_KEY = "user_cache_pending_invalidations"
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """キャッシュに保持するユーザー情報（パスワードなどは保持しない）
+
+    :param id: ユーザーID
+    :param name: ユーザー名
+    :param email: メールアドレス
+    :param is_active: ユーザーの有効状態
+    :param token_version: 発行済みトークンの世代
+    """
+    id: int
+    name: Optional[str]
+    email: Optional[str]
+    is_active: bool
+    token_version: int = 0
+
+    @classmethod
+    def from_model(cls, user: User) -> "CachedUser":
+        """Userモデルからキャッシュ用のユーザー情報を作成する"""
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            is_active=bool(user.is_active),
+            token_version=user.token_version or 0
+        )
+
+    def to_model(self, db: Session) -> User:
+        """セッションに属するUserモデルを作成する（SQLは発行しない）
+
+        キャッシュしていないカラム（password など）とリレーションシップは、
+        参照したときにデータベースから読み込む。
+
+        :param db: データベースセッション
+        :type db: Session
+        :return: ユーザー
+        :rtype: User
+        """
+        user = User(
+            id=self.id,
+            name=self.name,
+            email=self.email,
+            is_active=self.is_active,
+            token_version=self.token_version
+        )
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+class UserCache:
+    """ユーザーIDをキーにしたTTL付きLRUキャッシュ
+
+    ``version`` はエントリを無効化するたびに進む。検索前の値を ``put`` に渡すと、
+    検索中に無効化されたユーザー情報（古い情報）は保存しない。
+
+    :param maxsize: 保持する最大件数
+    :param ttl: エントリの有効期間（秒）
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[float, CachedUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def version(self) -> int:
+        """無効化の回数（検索中に無効化があったかの判定に使う）"""
+        return self._version
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        """キャッシュからユーザー情報を取得する
+
+        :param user_id: ユーザーID
+        :type user_id: int
+        :return: 有効期間内のユーザー情報（無い場合はNone）
+        :rtype: Optional[CachedUser]
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user: CachedUser, version: int) -> None:
+        """ユーザー情報をキャッシュに保存する
+
+        :param user: ユーザー情報
+        :type user: CachedUser
+        :param version: 検索を開始した時点の ``version``
+        :type version: int
+        """
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[user.id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids: int) -> None:
+        """指定したユーザーのエントリを削除する
+
+        :param user_ids: ユーザーID
+        :type user_ids: int
+        """
+        with self._lock:
+            self._version += 1
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        """キャッシュと統計情報を初期化する"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def stats(self) -> Dict[str, float]:
+        """キャッシュの統計情報を返す
+
+        :return: size, maxsize, hits, misses, invalidations, hit_ratioを含む辞書
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_MAX_STALENESS)
+
+
+# 変更された場合にキャッシュを無効化するカラム
+_CACHED_COLUMNS = ("is_active", "password", "email", "name", "token_version")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session: Session, flush_context: UOWTransaction) -> None:
+    """フラッシュで有効状態などが変わったユーザー・削除されたユーザーを記録する
+
+    コミット前に無効化すると、他のリクエストが変更前の行を再びキャッシュする
+    可能性があるため、無効化は after_commit で行う。
+    """
+    changed = {
+        instance.id for instance in session.deleted
+        if isinstance(instance, User) and instance.id is not None
+    }
+    for instance in session.dirty:
+        if isinstance(instance, User) and instance.id is not None:
+            state = inspect(instance)
+            if any(state.attrs[name].history.has_changes() for name in _CACHED_COLUMNS):
+                changed.add(instance.id)
+    if changed:
+        session.info.setdefault(_PENDING_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    """コミットした変更をキャッシュに反映する"""
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        user_cache.invalidate(*pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_users(session: Session) -> None:
+    """ロールバックした変更の無効化を取り消す"""
+    session.info.pop(_PENDING_KEY, None)